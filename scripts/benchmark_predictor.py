@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.ai.benchmark import (DEFAULT_TOLERANCE, compare_to_baseline, load_results, regressions,
+                              run_benchmarks, save_results)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the VariantPredictor encode -> predict path")
+    parser.add_argument('--sequences', type=int, default=2000, help="Sequences encoded per timing")
+    parser.add_argument('--single-calls', type=int, default=50, help="Timed single predict_impact calls")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 256])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', help="Compare against this results JSON")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown tolerated per metric")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with these results")
+    args = parser.parse_args()
+
+    results = run_benchmarks(sequences=args.sequences, single_calls=args.single_calls,
+                             batch_sizes=args.batch_sizes, repeats=args.repeats)
+    if args.output:
+        save_results(results, args.output)
+
+    failed = []
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        comparison = compare_to_baseline(results, load_results(args.baseline), args.tolerance)
+        for name, entry in comparison.items():
+            change = f"{entry['change']:+.1%}" if entry['change'] is not None else "new"
+            print(f"{name:28s} {entry['value']:14.6g} {change:>9s}  {entry['status']}")
+        failed = regressions(comparison)
+    else:
+        for name, metric in results['metrics'].items():
+            print(f"{name:28s} {metric['value']:14.6g} {metric['unit']}")
+        if args.baseline:
+            save_results(results, args.baseline)
+            print(f"Baseline written to {args.baseline}")
+
+    if failed:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import json
+import os
+import platform
+import tempfile
+import time
+import numpy as np
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+DEFAULT_TOLERANCE = 0.2  # Relative slowdown tolerated before a metric counts as a regression
+
+def synthetic_sequences(count: int, length: int = 1000, seed: int = 0, n_fraction: float = 0.01) -> List[str]:
+    """Reproducible random sequences with a sprinkling of N bases"""
+    rng = np.random.default_rng(seed)
+    codes = BASES[rng.integers(0, 4, size=(count, length))]
+    codes[rng.random((count, length)) < n_fraction] = ord('N')
+    return [row.tobytes().decode('ascii') for row in codes]
+
+def _metric(value: float, unit: str, higher_is_better: bool) -> Dict[str, Any]:
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+def _latencies(fn: Callable[[], Any], repeats: int) -> np.ndarray:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+def _default_factory(model_path: Optional[str] = None) -> Any:
+    from .variant_predictor import VariantPredictor
+    return VariantPredictor(model_path)
+
+def _save_model(predictor: Any, directory: str) -> Optional[str]:
+    """Save the predictor's model for the load benchmark; None when the predictor cannot be saved"""
+    if not hasattr(predictor, 'model') or not hasattr(predictor.model, 'save'):
+        return None
+    path = os.path.join(directory, 'model.keras')
+    predictor.model.save(path)
+    return path
+
+def run_benchmarks(predictor_factory: Callable[..., Any] = _default_factory, sequences: int = 2000,
+                   single_calls: int = 50, batch_sizes: Iterable[int] = (32, 256), repeats: int = 5,
+                   seed: int = 0) -> Dict[str, Any]:
+    """
+    Time the encode -> predict path of a predictor on synthetic data.
+
+    Measures model construction and load time, `preprocess_sequence`
+    encoding throughput, single-call `predict_impact` latency, and
+    `predict_impact_batch` throughput for each batch size. The
+    prediction cache is disabled so that every call runs the model.
+    `predictor_factory(model_path)` creates the predictor; the defaults
+    finish in a few minutes on a CPU without network access.
+    """
+    batch_sizes = list(batch_sizes)
+    data = synthetic_sequences(max(sequences, *batch_sizes), seed=seed)
+    metrics: Dict[str, Dict[str, Any]] = {}
+
+    start = time.perf_counter()
+    predictor = predictor_factory()
+    metrics['model_construction'] = _metric(time.perf_counter() - start, 's', False)
+    predictor.prediction_cache = None
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = _save_model(predictor, directory)
+        if model_path:
+            start = time.perf_counter()
+            predictor_factory(model_path)
+            metrics['model_load'] = _metric(time.perf_counter() - start, 's', False)
+
+    encoding = _latencies(lambda: [predictor.preprocess_sequence(sequence) for sequence in data[:sequences]],
+                          repeats)
+    metrics['encode_throughput'] = _metric(sequences / float(np.median(encoding)), 'sequences/s', True)
+
+    predictor.predict_impact(data[0])  # Warm-up: the first call builds the prediction graph
+    single = _latencies(lambda: predictor.predict_impact(data[0]), single_calls)
+    metrics['predict_latency_p50'] = _metric(float(np.percentile(single, 50)), 's', False)
+    metrics['predict_latency_p99'] = _metric(float(np.percentile(single, 99)), 's', False)
+
+    for batch_size in batch_sizes:
+        batch = data[:batch_size]
+        predictor.predict_impact_batch(batch, batch_size)
+        elapsed = _latencies(lambda: predictor.predict_impact_batch(batch, batch_size), repeats)
+        metrics[f'batch_throughput_{batch_size}'] = _metric(batch_size / float(np.median(elapsed)),
+                                                            'sequences/s', True)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'parameters': {'sequences': sequences, 'single_calls': single_calls,
+                       'batch_sizes': batch_sizes, 'repeats': repeats, 'seed': seed},
+        'metrics': metrics,
+    }
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: float = DEFAULT_TOLERANCE) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-metric change against a baseline run.
+
+    `change` is the relative improvement (positive is better whichever
+    direction the metric goes); a metric worse by more than `tolerance`
+    is a 'regression', better by more is an 'improvement', and metrics
+    missing from the baseline are 'new'.
+    """
+    comparison = {}
+    for name, metric in results['metrics'].items():
+        reference = baseline.get('metrics', {}).get(name)
+        if reference is None or not reference['value']:
+            comparison[name] = {'value': metric['value'], 'baseline': None, 'change': None, 'status': 'new'}
+            continue
+        ratio = metric['value'] / reference['value']
+        change = ratio - 1 if metric['higher_is_better'] else 1 - ratio
+        status = 'regression' if change < -tolerance else 'improvement' if change > tolerance else 'ok'
+        comparison[name] = {'value': metric['value'], 'baseline': reference['value'], 'change': change,
+                            'status': status}
+    return comparison
+
+def regressions(comparison: Dict[str, Dict[str, Any]]) -> List[str]:
+    return [name for name, entry in comparison.items() if entry['status'] == 'regression']
+
+def save_results(results: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(results, handle, indent=2)
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
@@ -1,59 +1,202 @@
-from typing import Tuple, List
+from typing import Dict, Optional, Tuple, List
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
 import pandas as pd
-from Bio import SeqIO
-from sklearn.model_selection import train_test_split
+import pysam
+from ..config import settings
+from ..genomics.compressed_io import open_input
+from ..utils.parallel import bounded_map
+from .shards import DEFAULT_SHARD_SIZE, ShardManifest, write_shards
+
+CACHE_VERSION = 1  # Bump when context extraction changes, invalidating cached tensors
+HASH_BLOCK = 4 * 1024 * 1024  # Bytes read per step when hashing inputs
+MISSING_BASE = ord('N')  # Fills contexts running past either end of a contig
+
+SIGNIFICANCE_LABELS = {
+    'Pathogenic': 0,
+    'Likely_pathogenic': 1,
+    'Uncertain_significance': 2,
+    'Likely_benign': 3,
+    'Benign': 4
+}
+
+def read_variants(vcf_path: str) -> pd.DataFrame:
+    """CHROM, POS, REF, ALT and CLNSIG columns of a VCF, or of a tab-separated table with those columns"""
+    meta_lines = 0
+    with open_input(vcf_path, 'r') as handle:
+        for line in handle:
+            if not line.startswith('##'):
+                break
+            meta_lines += 1
+    variants = pd.read_csv(vcf_path, sep='\t', skiprows=meta_lines, low_memory=False,
+                           dtype={'#CHROM': str, 'CHROM': str, 'REF': str, 'ALT': str})
+    variants = variants.rename(columns={'#CHROM': 'CHROM'})
+    if 'CLNSIG' not in variants.columns:
+        info = variants['INFO'] if 'INFO' in variants.columns else pd.Series('', index=variants.index)
+        variants['CLNSIG'] = info.astype(str).str.extract(r'(?:^|;)CLNSIG=([^;]+)')[0]
+    # Multi-allelic records are trained on their first ALT allele
+    variants['ALT'] = variants['ALT'].str.split(',').str[0]
+    return variants[['CHROM', 'POS', 'REF', 'ALT', 'CLNSIG']]
+
+def _chromosome_contexts(task: Tuple[str, str, np.ndarray, List[str], List[str], int]) -> np.ndarray:
+    """
+    (variants, length) uint8 contexts of one chromosome's variants with ALT applied; runs in a worker.
+
+    Every window is centred on its variant: the contig is padded with N on
+    both sides and windows are gathered by fancy indexing into a sliding
+    view, so no per-variant string slicing happens. SNVs are applied with
+    one scatter; indels are spliced row by row.
+    """
+    fasta_path, chrom, positions, refs, alts, length = task
+    with pysam.FastaFile(fasta_path) as fasta:
+        if chrom not in fasta.references:
+            raise ValueError(f"Contig {chrom} is not in the reference {fasta_path}")
+        genome = np.frombuffer(fasta.fetch(chrom).encode('ascii'), dtype=np.uint8)
+    # Positions index the padded contig directly, so out-of-range ones would wrap or fail without context
+    outside = np.flatnonzero((positions < 1) | (positions > len(genome)))
+    if len(outside):
+        raise ValueError(f"Variant at {chrom}:{positions[outside[0]]} lies outside the contig "
+                         f"(1-{len(genome)}) in the reference {fasta_path}")
+    center = length // 2
+    padded = np.full(len(genome) + center + length, MISSING_BASE, dtype=np.uint8)
+    padded[center:center + len(genome)] = genome
+    # Window of variant p (0-based) starts at genome p - center, i.e. padded p
+    offsets = positions - 1
+    contexts = np.lib.stride_tricks.sliding_window_view(padded, length)[offsets]
+
+    ref_lengths = np.fromiter((len(ref) for ref in refs), dtype=np.int64, count=len(refs))
+    alt_lengths = np.fromiter((len(alt) for alt in alts), dtype=np.int64, count=len(alts))
+    snv = (ref_lengths == 1) & (alt_lengths == 1)
+    if snv.any():
+        contexts[snv, center] = np.frombuffer(''.join(np.asarray(alts, dtype=object)[snv]).encode('ascii'),
+                                              dtype=np.uint8)
+    for row in np.flatnonzero(~snv):
+        offset, alt = offsets[row], np.frombuffer(alts[row].encode('ascii'), dtype=np.uint8)
+        right = padded[offset + center + ref_lengths[row]:][:max(length - center - len(alt), 0)]
+        spliced = np.concatenate((padded[offset:offset + center], alt, right))[:length]
+        contexts[row] = MISSING_BASE
+        contexts[row, :len(spliced)] = spliced
+    return contexts
 
 class GenomicDataPreprocessor:
-    def __init__(self, sequence_length: int = 1000):
+    """
+    Builds variant-centred training contexts from a VCF and an indexed reference.
+
+    Variants are grouped by chromosome and each chromosome's contexts are
+    extracted in a worker process from one `pysam.FastaFile` fetch. The
+    encoded contexts are cached under `cache_dir`, keyed by the content
+    hashes of the VCF and the reference, so repeated experiments on the
+    same inputs load them from disk.
+
+    Example:
+        >>> preprocessor = GenomicDataPreprocessor(sequence_length=1000, workers=8)
+        >>> contexts, labels = preprocessor.prepare_encoded("clinvar.vcf.gz", "hg38.fa")
+    """
+    def __init__(self, sequence_length: int = 1000, workers: Optional[int] = None,
+                 cache_dir: Optional[str] = None, cache: bool = True):
         self.sequence_length = sequence_length
+        self.workers = workers
+        self.cache_dir = cache_dir or os.path.join(settings.CACHE_DIR, 'training')
+        self.cache = cache
 
     def prepare_training_data(self, vcf_path: str, fasta_path: str) -> Tuple[List[str], List[int]]:
         """Prepare training data from VCF and reference genome"""
-        # Load reference genome
-        reference = self._load_reference(fasta_path)
-        
-        # Load variants
-        variants_df = pd.read_csv(vcf_path, sep='\t')
-        
-        sequences = []
-        labels = []
-        
-        for _, variant in variants_df.iterrows():
-            # Extract sequence context
-            pos = variant['POS']
-            context = self._get_sequence_context(reference, pos)
-            
-            # Apply variant
-            variant_seq = self._apply_variant(context, variant)
-            sequences.append(variant_seq)
-            
-            # Get label from clinical significance
-            label = self._get_label(variant['CLNSIG'])
-            labels.append(label)
-        
-        return sequences, labels
-
-    def _get_sequence_context(self, reference: str, position: int) -> str:
-        """Extract sequence context around variant"""
-        start = max(0, position - self.sequence_length // 2)
-        end = start + self.sequence_length
-        return reference[start:end]
-
-    def _apply_variant(self, context: str, variant: pd.Series) -> str:
-        """Apply variant to sequence context"""
-        ref = variant['REF']
-        alt = variant['ALT']
-        pos = self.sequence_length // 2
-        
-        return context[:pos] + alt + context[pos + len(ref):]
+        contexts, labels = self.prepare_encoded(vcf_path, fasta_path)
+        return [row.tobytes().decode('ascii') for row in contexts], labels.tolist()
+
+    def prepare_encoded(self, vcf_path: str, fasta_path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (variants, sequence_length) uint8 ASCII contexts and int64 labels, from the cache when possible.
+
+        With caching on, contexts are written straight into the memory-mapped
+        cache entry, so the training set never has to fit in memory.
+        """
+        entry = os.path.join(self.cache_dir, self._cache_key(vcf_path, fasta_path)) if self.cache else None
+        if entry and os.path.exists(os.path.join(entry, 'labels.npy')):
+            return self._load(entry)
+        if not entry:
+            return self._extract(vcf_path, fasta_path)
+
+        # Written beside and renamed, so a concurrent run never sees half an entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            contexts, labels = self._extract(vcf_path, fasta_path, staging)
+            contexts.flush()
+            del contexts
+            np.save(os.path.join(staging, 'labels.npy'), labels)
+            os.replace(staging, entry)
+        except OSError:
+            if not os.path.exists(os.path.join(entry, 'labels.npy')):
+                raise
+        finally:
+            shutil.rmtree(staging, True)  # Left over only when another run stored the same entry first
+        return self._load(entry)
+
+    def write_training_shards(self, vcf_path: str, fasta_path: str, directory: str,
+                              encoding: str = 'packed', shard_size: int = DEFAULT_SHARD_SIZE) -> ShardManifest:
+        """Encode training data once into memory-mapped shards for `VariantPredictor.train_on_shards`"""
+        if self.cache:
+            contexts, labels = self.prepare_encoded(vcf_path, fasta_path)
+            return write_shards(contexts, labels, directory, self.sequence_length, encoding, shard_size)
+        # Without a cache the contexts still go through a memory-mapped scratch file, not RAM
+        with tempfile.TemporaryDirectory() as scratch:
+            contexts, labels = self._extract(vcf_path, fasta_path, scratch)
+            manifest = write_shards(contexts, labels, directory, self.sequence_length, encoding, shard_size)
+            del contexts
+            return manifest
+
+    def _extract(self, vcf_path: str, fasta_path: str,
+                 directory: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Contexts and labels of every variant; contexts go to `directory`/contexts.npy (memory-mapped) when given"""
+        variants = read_variants(vcf_path)
+        labels = variants['CLNSIG'].map(self._get_label).to_numpy(dtype=np.int64)
+        shape = (len(variants), self.sequence_length)
+        contexts = np.lib.format.open_memmap(os.path.join(directory, 'contexts.npy'), 'w+', np.uint8, shape) \
+            if directory else np.empty(shape, dtype=np.uint8)
+        groups = variants.groupby('CHROM', sort=False).indices
+        tasks = ((fasta_path, chrom, variants['POS'].to_numpy(dtype=np.int64)[rows],
+                  variants['REF'].iloc[rows].tolist(), variants['ALT'].iloc[rows].tolist(),
+                  self.sequence_length) for chrom, rows in groups.items())
+        # Each chromosome's contexts are written out as they arrive and then dropped
+        for rows, chromosome in zip(groups.values(), bounded_map(_chromosome_contexts, tasks, self.workers)):
+            contexts[rows] = chromosome
+        return contexts, labels
+
+    def _load(self, entry: str) -> Tuple[np.ndarray, np.ndarray]:
+        return np.load(os.path.join(entry, 'contexts.npy'), mmap_mode='r'), \
+            np.load(os.path.join(entry, 'labels.npy'))
+
+    def _cache_key(self, vcf_path: str, fasta_path: str) -> str:
+        digests = [self._content_hash(path) for path in (vcf_path, fasta_path)]
+        key = f"{CACHE_VERSION}:{self.sequence_length}:{digests[0]}:{digests[1]}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def _content_hash(self, file_path: str) -> str:
+        """Content digest of a file, remembered per (size, mtime) so unchanged inputs are not re-read"""
+        stat = os.stat(file_path)
+        stamps_path = os.path.join(self.cache_dir, 'hashes.json')
+        stamps: Dict[str, List] = {}
+        if os.path.exists(stamps_path):
+            with open(stamps_path) as handle:
+                stamps = json.load(handle)
+        key = os.path.abspath(file_path)
+        if key in stamps and stamps[key][:2] == [stat.st_size, stat.st_mtime_ns]:
+            return stamps[key][2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as handle:
+            while block := handle.read(HASH_BLOCK):
+                digest.update(block)
+        stamps[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(stamps_path, 'w') as handle:
+            json.dump(stamps, handle)
+        return stamps[key][2]
 
     def _get_label(self, clinical_significance: str) -> int:
         """Convert clinical significance to numeric label"""
-        significance_map = {
-            'Pathogenic': 0,
-            'Likely_pathogenic': 1,
-            'Uncertain_significance': 2,
-            'Likely_benign': 3,
-            'Benign': 4
-        }
-        return significance_map.get(clinical_significance, 2) 
\ No newline at end of file
+        return SIGNIFICANCE_LABELS.get(clinical_significance, 2)
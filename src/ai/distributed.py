@@ -0,0 +1,246 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import json
+import multiprocessing as mp
+import os
+import socket
+import tempfile
+import time
+from .prediction_cache import model_fingerprint
+from .shards import ShardManifest
+
+BASE_BATCH_SIZE = 32  # Global batch size the default learning rate was tuned for
+BASE_LEARNING_RATE = 0.001  # Adam's default, as used by `VariantPredictor._create_model`
+
+def assign_shards(manifest: ShardManifest, workers: int) -> List[List[int]]:
+    """
+    Disjoint shard indices per worker, balancing variant counts.
+
+    Shards go largest first to the worker with the fewest variants so far,
+    so a short final shard does not leave one worker with extra work.
+    """
+    if workers > len(manifest.shards):
+        raise ValueError(f"{workers} workers need at least as many shards; found {len(manifest.shards)}")
+    assigned: List[List[int]] = [[] for _ in range(workers)]
+    totals = [0] * workers
+    order = sorted(range(len(manifest.shards)), key=lambda i: -manifest.shards[i]['count'])
+    for index in order:
+        worker = totals.index(min(totals))
+        assigned[worker].append(index)
+        totals[worker] += manifest.shards[index]['count']
+    return [sorted(indices) for indices in assigned]
+
+def steps_per_epoch(manifest: ShardManifest, assignment: List[List[int]], batch_size: int) -> int:
+    """Steps every worker can take per epoch; synchronous workers must all take the same number"""
+    return min(sum(manifest.shards[i]['count'] for i in indices) for indices in assignment) // batch_size
+
+def scaled_learning_rate(global_batch_size: int, base_learning_rate: float = BASE_LEARNING_RATE,
+                         base_batch_size: int = BASE_BATCH_SIZE) -> float:
+    """Linear scaling rule: the learning rate grows with the global batch size"""
+    return base_learning_rate * global_batch_size / base_batch_size
+
+def local_cluster(workers: int) -> List[str]:
+    """Free localhost addresses for the worker processes"""
+    sockets = []
+    try:
+        for _ in range(workers):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(('localhost', 0))
+            sockets.append(sock)
+        return [f"localhost:{sock.getsockname()[1]}" for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+def tf_config(cluster: List[str], worker: int) -> str:
+    """TF_CONFIG of one worker of a local multi-worker cluster"""
+    return json.dumps({'cluster': {'worker': cluster}, 'task': {'type': 'worker', 'index': worker}})
+
+@dataclass
+class WorkerStats:
+    """
+    Training statistics of one worker process.
+
+    Attributes:
+        worker (int): Worker index; worker 0 is the chief that writes the weights
+        shards (List[int]): Shard indices the worker trained on
+        samples_per_second (List[float]): Local training throughput of each epoch
+        loss (List[float]): Training loss of each epoch
+        fingerprint (Optional[str]): Fingerprint of the final weights; the same on every worker
+            when the replicas stayed in sync
+    """
+    worker: int
+    shards: List[int]
+    samples_per_second: List[float] = field(default_factory=list)
+    loss: List[float] = field(default_factory=list)
+    fingerprint: Optional[str] = None
+
+@dataclass
+class TrainingReport:
+    """
+    Outcome of a data-parallel training run.
+
+    Attributes:
+        weights_path (str): Trained weights written by the chief
+        global_batch_size (int): Samples per synchronous step across all workers
+        learning_rate (float): Learning rate after linear scaling
+        workers (List[WorkerStats]): Per-worker statistics
+    """
+    weights_path: str
+    global_batch_size: int
+    learning_rate: float
+    workers: List[WorkerStats]
+
+    @property
+    def samples_per_second(self) -> float:
+        """Aggregate throughput of the last epoch"""
+        return sum(stats.samples_per_second[-1] for stats in self.workers if stats.samples_per_second)
+
+    def summary(self) -> str:
+        lines = ["worker\tshards\tsamples/sec\tloss"]
+        for stats in self.workers:
+            throughput = f"{stats.samples_per_second[-1]:.1f}" if stats.samples_per_second else "-"
+            loss = f"{stats.loss[-1]:.4f}" if stats.loss else "-"
+            lines.append(f"{stats.worker}\t{len(stats.shards)}\t{throughput}\t{loss}")
+        lines.append(f"total\t\t{self.samples_per_second:.1f}")
+        return '\n'.join(lines)
+
+def _default_predictor() -> Any:
+    from .variant_predictor import VariantPredictor
+    return VariantPredictor()
+
+def _train_worker(task: Dict[str, Any]) -> WorkerStats:
+    """Run one worker of the cluster; runs in a spawned process"""
+    os.environ['TF_CONFIG'] = tf_config(task['cluster'], task['worker'])
+    import tensorflow as tf
+    from tensorflow import keras
+
+    tf.config.threading.set_intra_op_parallelism_threads(task['threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(max(task['threads'] // 4, 1))
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING
+        )
+    )
+    stats = WorkerStats(task['worker'], task['shards'])
+
+    with strategy.scope():
+        # Variables created in scope are mirrored; MultiWorkerMirroredStrategy broadcasts the chief's initial values
+        predictor = task['predictor_factory']()
+        model = predictor.model
+        model.compile(
+            optimizer=keras.optimizers.Adam(task['learning_rate']),
+            loss='categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        model.optimizer.build(model.trainable_variables)
+        if task['initial_weights']:
+            # Continue from the caller's model rather than from random initial weights
+            predictor.load_weights(task['initial_weights'])
+    # The strategy treats a distributed dataset's batch as the global batch and splits it across the replicas,
+    # so batching by the global size gives every worker `batch_size` samples per step
+    dataset = predictor.shard_dataset(task['directory'], task['global_batch_size'], shard_indices=task['shards'])
+    options = tf.data.Options()
+    # Each worker already reads only its own shards
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    batches = iter(strategy.experimental_distribute_dataset(dataset.repeat().with_options(options)))
+    loss_fn = keras.losses.CategoricalCrossentropy(reduction=None)
+
+    def replica_step(x, y):
+        with tf.GradientTape() as tape:
+            loss = tf.nn.compute_average_loss(loss_fn(y, model(x, training=True)),
+                                              global_batch_size=task['global_batch_size'])
+        gradients = tape.gradient(loss, model.trainable_variables)
+        # The optimizer all-reduces the gradients, so every replica applies the same update
+        model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        return loss
+
+    @tf.function
+    def train_step(iterator):
+        # A custom loop: Keras 3's fit() cannot build a model from MultiWorkerMirroredStrategy batches
+        x, y = next(iterator)
+        return strategy.reduce(tf.distribute.ReduceOp.SUM, strategy.run(replica_step, args=(x, y)), axis=None)
+
+    for epoch in range(task['epochs']):
+        started = time.perf_counter()
+        loss = sum(float(train_step(batches)) for _ in range(task['steps'])) / task['steps']
+        stats.samples_per_second.append(task['steps'] * task['batch_size'] / (time.perf_counter() - started))
+        stats.loss.append(loss)
+        if task['worker'] == 0:
+            print(f"Epoch {epoch + 1}/{task['epochs']} - loss: {loss:.4f} - "
+                  f"{stats.samples_per_second[-1]:.1f} samples/sec", flush=True)
+    stats.fingerprint = model_fingerprint(predictor.model.get_weights())
+    # Every worker must take part in saving; only the chief's copy is kept
+    if task['worker'] == 0:
+        predictor.model.save_weights(task['weights_path'])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            predictor.model.save_weights(os.path.join(directory, os.path.basename(task['weights_path'])))
+    return stats
+
+class DistributedTrainer:
+    """
+    Data-parallel CPU training of the variant model over local worker processes.
+
+    Each worker is a separate process in a localhost
+    `MultiWorkerMirroredStrategy` cluster that trains on a disjoint
+    subset of the shards written by `write_shards`. Gradients are
+    all-reduced over localhost every step, so all workers keep identical
+    weights.
+
+    `batch_size` is per worker, so the global batch is `batch_size *
+    workers`; each worker's dataset is batched by the global size, which
+    the strategy splits across the replicas. Unless `learning_rate` is given,
+    the base rate is scaled linearly with the global batch (0.001 at 32
+    samples). Large global batches may need a lower rate or warm-up.
+    `threads_per_worker` defaults to an even split of the CPUs across
+    workers. Each worker builds its model with `predictor_factory()`, a
+    VariantPredictor by default; the factory is sent to spawned
+    processes, so it must be picklable (a module-level function or class).
+
+    Example:
+        >>> trainer = DistributedTrainer(workers=8, threads_per_worker=8, batch_size=64)
+        >>> report = trainer.train("train_shards", "models/variant.weights.h5", epochs=10)
+        >>> print(report.summary())
+    """
+    def __init__(self, workers: int = 4, threads_per_worker: Optional[int] = None, batch_size: int = 32,
+                 learning_rate: Optional[float] = None, predictor_factory: Optional[Callable[[], Any]] = None):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max((os.cpu_count() or 1) // workers, 1)
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.predictor_factory = predictor_factory or _default_predictor
+
+    def plan(self, directory: str) -> Tuple[List[List[int]], int]:
+        """Shard assignment per worker and the common steps per epoch"""
+        manifest = ShardManifest.load(directory)
+        assignment = assign_shards(manifest, self.workers)
+        steps = steps_per_epoch(manifest, assignment, self.batch_size)
+        if steps == 0:
+            raise ValueError(f"Each worker needs at least one batch of {self.batch_size} variants")
+        return assignment, steps
+
+    def train(self, directory: str, weights_path: str, epochs: int = 10,
+              initial_weights: Optional[str] = None) -> TrainingReport:
+        """
+        Train on the shards in `directory` and write the final weights to `weights_path`.
+        Workers start from the weights saved at `initial_weights`, or from a fresh model
+        """
+        assignment, steps = self.plan(directory)
+        global_batch_size = self.batch_size * self.workers
+        learning_rate = self.learning_rate or scaled_learning_rate(global_batch_size)
+        cluster = local_cluster(self.workers)
+        os.makedirs(os.path.dirname(os.path.abspath(weights_path)), exist_ok=True)
+        tasks = [{
+            'cluster': cluster, 'worker': worker, 'shards': shards, 'threads': self.threads_per_worker,
+            'directory': directory, 'weights_path': weights_path, 'epochs': epochs, 'steps': steps,
+            'batch_size': self.batch_size, 'global_batch_size': global_batch_size,
+            'learning_rate': learning_rate, 'initial_weights': initial_weights,
+            'predictor_factory': self.predictor_factory
+        } for worker, shards in enumerate(assignment)]
+
+        # TensorFlow is not fork-safe, and every worker must run at once to form the cluster
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context('spawn')) as executor:
+            stats = list(executor.map(_train_worker, tasks))
+        return TrainingReport(weights_path, global_batch_size, learning_rate, stats)
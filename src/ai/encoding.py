@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+import numpy as np
+from ..genomics.packed_sequence import PackedSequence
+
+BASE_ORDER = "ATGC"  # One-hot column of each base, as the predictor's models were trained
+
+def _lookup_table(dtype: np.dtype) -> np.ndarray:
+    """
+    256 x 4 table mapping an ASCII byte to its one-hot row. Only uppercase
+    ACGT are set: soft-masked (lowercase) bases, N, IUPAC and padding encode
+    to zeros, as the predictor's models were trained
+    """
+    table = np.zeros((256, len(BASE_ORDER)), dtype=dtype)
+    for column, base in enumerate(BASE_ORDER):
+        table[ord(base), column] = 1
+    return table
+
+_TABLES: Dict[np.dtype, np.ndarray] = {}
+
+def _ascii(sequence: Any, length: int) -> np.ndarray:
+    """The first `length` bases of a sequence as a uint8 view, without copying strings"""
+    if isinstance(sequence, PackedSequence):
+        return sequence[:length].ascii()
+    if isinstance(sequence, np.ndarray):
+        return sequence[:length].view(np.uint8)
+    if not isinstance(sequence, (bytes, bytearray)):
+        sequence = str(sequence).encode('ascii')
+    return np.frombuffer(sequence, dtype=np.uint8, count=min(len(sequence), length))
+
+def ascii_matrix(sequences: Sequence[Any], length: int) -> np.ndarray:
+    """(batch, length) uint8 bytes of the sequences, trimmed or padded with zero bytes"""
+    codes = np.zeros((len(sequences), length), dtype=np.uint8)
+    for row, sequence in enumerate(sequences):
+        view = _ascii(sequence, length)
+        codes[row, :len(view)] = view
+    return codes
+
+def one_hot_encode(sequences: Union[Sequence[Any], Iterable[Any]], length: int,
+                   dtype: Any = np.float32, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    One-hot encode many sequences into a (batch, length, 4) array.
+
+    Each sequence's bytes are mapped through a 256-entry lookup table, so a
+    batch costs one table gather instead of a dict lookup per base.
+    Lowercase (soft-masked) bases encode to zero rows like N; upper-case
+    the input first to encode them as bases. Sequences are trimmed to `length` or zero-padded at the end. Pass `out`
+    to reuse a preallocated array (its dtype wins over `dtype`).
+    """
+    sequences = sequences if isinstance(sequences, (list, tuple)) else list(sequences)
+    if out is None:
+        out = np.empty((len(sequences), length, len(BASE_ORDER)), dtype=dtype)
+    elif out.shape[0] < len(sequences) or out.shape[1:] != (length, len(BASE_ORDER)):
+        raise ValueError(f"Output buffer of shape {out.shape} cannot hold {len(sequences)} x {length} x 4")
+    dtype = out.dtype
+    table = _TABLES.get(dtype)
+    if table is None:
+        table = _TABLES[dtype] = _lookup_table(dtype)
+
+    # Byte 0 maps to an all-zero row, so padding needs no separate pass
+    np.take(table, ascii_matrix(sequences, length), axis=0, out=out[:len(sequences)])
+    return out[:len(sequences)]
+
+class OneHotEncoder:
+    """
+    Batch one-hot encoder with a reusable output buffer.
+
+    With `reuse=True` every call writes into the same preallocated array
+    (grown on demand), so steady-state batches allocate nothing; the
+    returned array is then only valid until the next call.
+
+    Example:
+        >>> encoder = OneHotEncoder(sequence_length=1000, dtype=np.uint8, reuse=True)
+        >>> batch = encoder.encode(["ACGT" * 250, "NNAC"])
+        >>> batch.shape
+        (2, 1000, 4)
+    """
+    def __init__(self, sequence_length: int = 1000, dtype: Any = np.float32, reuse: bool = False):
+        self.sequence_length = sequence_length
+        self.dtype = np.dtype(dtype)
+        self.reuse = reuse
+        self._buffer: Optional[np.ndarray] = None
+
+    def encode(self, sequences: Union[Sequence[Any], Iterable[Any]],
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+        sequences = sequences if isinstance(sequences, (list, tuple)) else list(sequences)
+        if out is None and self.reuse:
+            if self._buffer is None or len(self._buffer) < len(sequences):
+                self._buffer = np.empty((len(sequences), self.sequence_length, len(BASE_ORDER)), dtype=self.dtype)
+            out = self._buffer
+        return one_hot_encode(sequences, self.sequence_length, self.dtype, out)
+
+    def encode_one(self, sequence: Any) -> np.ndarray:
+        """A single (sequence_length, 4) encoding"""
+        return self.encode([sequence])[0]
@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from ..config import settings
+from .prediction_cache import model_fingerprint
+
+MANIFEST = 'manifest.json'
+WEIGHTS_DATA = 'weights.bin'
+WEIGHTS_LAYOUT = 'weights.json'
+LATEST = 'LATEST'
+WEIGHT_ALIGNMENT = 64  # Byte alignment of each array in weights.bin, so mapped views are SIMD-aligned
+MODEL_FORMATS = ('weights', 'keras')
+
+def save_weights(weights: List[np.ndarray], directory: str):
+    """Write weight arrays back to back into one file that `load_weights` can memory-map"""
+    layout = []
+    with open(os.path.join(directory, WEIGHTS_DATA), 'wb') as handle:
+        offset = 0
+        for array in weights:
+            array = np.ascontiguousarray(array)
+            padding = -offset % WEIGHT_ALIGNMENT
+            handle.write(b'\0' * padding)
+            offset += padding
+            layout.append({'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+            handle.write(array.tobytes())
+            offset += array.nbytes
+    with open(os.path.join(directory, WEIGHTS_LAYOUT), 'w') as handle:
+        json.dump(layout, handle)
+
+def load_weights(directory: str) -> List[np.ndarray]:
+    """Read-only arrays mapped from a `save_weights` directory; pages load on first touch"""
+    with open(os.path.join(directory, WEIGHTS_LAYOUT)) as handle:
+        layout = json.load(handle)
+    path = os.path.join(directory, WEIGHTS_DATA)
+    if os.path.getsize(path) == 0:
+        return [np.zeros(entry['shape'], dtype=entry['dtype']) for entry in layout]
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    return [np.ndarray(entry['shape'], dtype=entry['dtype'], buffer=data, offset=entry['offset'])
+            for entry in layout]
+
+@dataclass
+class ModelVersion:
+    """
+    One registered model artifact.
+
+    Attributes:
+        version (str): Registry version name, e.g. 'v0003'
+        path (str): Artifact directory
+        fingerprint (str): `model_fingerprint` of the weights
+        created (float): Registration time (Unix seconds)
+        sequence_length (int): Context window the model was trained on
+        formats (List[str]): Stored formats; 'weights' (memory-mappable) and/or 'keras'
+        metrics (Dict[str, float]): Evaluation metrics recorded at registration
+    """
+    version: str
+    path: str
+    fingerprint: str
+    created: float
+    sequence_length: int
+    formats: List[str]
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+class ModelRegistry:
+    """
+    Versioned on-disk store of trained variant models.
+
+    Every `register()` writes an immutable `vNNNN` directory holding the
+    weights as one memory-mappable file (plus a full `.keras` copy on
+    request) and a manifest with the weights' content fingerprint;
+    registering the same weights twice returns the existing version.
+    `LATEST` names the version that `load()` serves by default and moves
+    with `promote()` for rollbacks.
+
+    Loading maps the weights into a freshly built architecture, reuses the
+    stored fingerprint (so the prediction cache needs no re-hashing) and
+    runs warm-up predictions, so the graph is traced before the first
+    real request.
+
+    Example:
+        >>> registry = ModelRegistry("models/registry")
+        >>> registry.register(predictor, metrics={'val_accuracy': 0.91})
+        >>> predictor = registry.load()
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.MODEL_REGISTRY
+
+    def versions(self) -> List[ModelVersion]:
+        if not os.path.isdir(self.root):
+            return []
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            manifest = os.path.join(self.root, name, MANIFEST)
+            if name.startswith('v') and os.path.exists(manifest):
+                with open(manifest) as handle:
+                    versions.append(ModelVersion(path=os.path.join(self.root, name), **json.load(handle)))
+        return versions
+
+    def latest(self) -> Optional[ModelVersion]:
+        pointer = os.path.join(self.root, LATEST)
+        if os.path.exists(pointer):
+            with open(pointer) as handle:
+                return self.get(handle.read().strip())
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def get(self, version: Optional[str] = None) -> ModelVersion:
+        """A registered version; the latest when None"""
+        if version is None:
+            entry = self.latest()
+            if entry is None:
+                raise ValueError(f"No models registered in {self.root}")
+            return entry
+        for entry in self.versions():
+            if entry.version == version:
+                return entry
+        raise ValueError(f"Unknown model version {version} in {self.root}")
+
+    def register(self, predictor: Any, metrics: Optional[Dict[str, float]] = None,
+                 formats: Tuple[str, ...] = ('weights',)) -> ModelVersion:
+        """Store the predictor's current weights as a new version and make it the latest"""
+        unknown = [name for name in formats if name not in MODEL_FORMATS]
+        if unknown or 'weights' not in formats:
+            raise ValueError(f"Formats must include 'weights' and be among {', '.join(MODEL_FORMATS)}")
+        weights = predictor.model.get_weights()
+        fingerprint = model_fingerprint(weights)
+        for entry in self.versions():
+            if entry.fingerprint == fingerprint:
+                self.promote(entry.version)
+                return entry
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.root, prefix='.staging-')
+        try:
+            save_weights(weights, staging)
+            if 'keras' in formats:
+                predictor.model.save(os.path.join(staging, 'model.keras'))
+            while True:
+                # Another process may take the same number between listing and renaming
+                number = max((int(entry.version[1:]) for entry in self.versions()), default=0) + 1
+                entry = ModelVersion(f"v{number:04d}", os.path.join(self.root, f"v{number:04d}"), fingerprint,
+                                     time.time(), predictor.sequence_length, list(formats), dict(metrics or {}))
+                with open(os.path.join(staging, MANIFEST), 'w') as handle:
+                    manifest = asdict(entry)
+                    del manifest['path']
+                    json.dump(manifest, handle, indent=1)
+                try:
+                    os.rename(staging, entry.path)
+                    break
+                except OSError:
+                    if not os.path.exists(entry.path):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, True)
+            raise
+        self.promote(entry.version)
+        return entry
+
+    def promote(self, version: str):
+        """Make `version` the one loaded by default"""
+        self.get(version)
+        pointer = os.path.join(self.root, LATEST)
+        with open(f"{pointer}.tmp", 'w') as handle:
+            handle.write(version)
+        os.replace(f"{pointer}.tmp", pointer)
+
+    def load(self, version: Optional[str] = None, warmup: bool = True, **predictor_options: Any) -> Any:
+        """A VariantPredictor of a registered version, warmed up for its first prediction"""
+        from .variant_predictor import VariantPredictor
+        entry = self.get(version)
+        predictor = VariantPredictor(entry.path, **predictor_options)
+        predictor.fingerprint_as(entry.fingerprint)
+        if warmup:
+            predictor.warmup()
+        return predictor
+
+_SHARED: Dict[Tuple[int, str, Optional[str]], Any] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_predictor(version: Optional[str] = None, root: Optional[str] = None) -> Any:
+    """
+    This process's predictor, loaded once on first use.
+
+    Serves the registry's latest (or given) version; with an empty
+    registry it falls back to the model file at `settings.MODEL_PATH`,
+    then to an untrained model. The predictor is frozen, since every
+    component of the process sees its weights; train a `clone()`.
+    """
+    registry = ModelRegistry(root)
+    with _SHARED_LOCK:
+        # Keyed by the resolved version, so asking for the latest by name shares its predictor
+        entry = registry.get(version) if version is not None else registry.latest()
+        key = (os.getpid(), os.path.abspath(registry.root), entry.version if entry else None)
+        if key not in _SHARED:
+            if entry is not None:
+                _SHARED[key] = registry.load(entry.version)
+            else:
+                from .variant_predictor import VariantPredictor
+                _SHARED[key] = VariantPredictor(settings.MODEL_PATH if os.path.exists(settings.MODEL_PATH) else None)
+            _SHARED[key].frozen = True
+        return _SHARED[key]
@@ -0,0 +1,163 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from .encoding import BASE_ORDER, ascii_matrix
+
+DEFAULT_CAPACITY = 65536  # Predictions kept in the in-memory LRU tier
+SQLITE_VARIABLES = 500  # Keys per SELECT ... IN (...) lookup, below SQLite's bound-parameter limit
+UNKNOWN_CODE = len(BASE_ORDER)  # Canonical code of soft-masked, N, IUPAC and padding bytes, which all encode to zeros
+
+def _canonical_table() -> np.ndarray:
+    """256-entry table mapping ASCII bytes to the one-hot column they encode to"""
+    table = np.full(256, UNKNOWN_CODE, dtype=np.uint8)
+    for code, base in enumerate(BASE_ORDER):
+        table[ord(base)] = code
+    return table
+
+_CANONICAL = _canonical_table()
+
+def model_fingerprint(weights: Iterable[np.ndarray]) -> str:
+    """Digest of a model's weight arrays; any change to the weights changes it"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in weights:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+class PredictionCache:
+    """
+    Two-tier memo of model predictions keyed by encoded sequence and model.
+
+    A key is the hash of what the model actually sees: the sequence trimmed
+    or padded to `sequence_length` with every byte other than uppercase
+    ACGT merged, so sequences with identical one-hot encodings share an
+    entry. Entries are also scoped by a model fingerprint, so new weights
+    never see stale predictions. Lookups go through an in-memory LRU of
+    `capacity` entries, then the optional SQLite file at `path`, which
+    persists across runs and can be shared by processes. Values must be
+    JSON-serialisable.
+
+    Example:
+        >>> cache = PredictionCache(".genomescript_cache/predictions.sqlite")
+        >>> keys = cache.keys(["ACGT" * 250])
+        >>> cache.get_many(fingerprint, keys)
+        [None]
+    """
+    def __init__(self, path: Optional[str] = None, capacity: int = DEFAULT_CAPACITY,
+                 sequence_length: int = 1000):
+        self.path = path
+        self.capacity = capacity
+        self.sequence_length = sequence_length
+        self._memory: 'OrderedDict[Tuple[str, bytes], Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def keys(self, sequences: Sequence[Any]) -> List[bytes]:
+        """Cache keys of sequences, hashed from their canonical encoding"""
+        sequences = sequences if isinstance(sequences, (list, tuple)) else list(sequences)
+        codes = _CANONICAL[ascii_matrix(sequences, self.sequence_length)]
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in codes]
+
+    def _database(self) -> sqlite3.Connection:
+        # A forked process must not share its parent's connection
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(fingerprint TEXT, key BLOB, value TEXT, PRIMARY KEY (fingerprint, key)) WITHOUT ROWID"
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_many(self, fingerprint: str, keys: List[bytes]) -> List[Optional[Any]]:
+        """Cached values of `keys` under a model fingerprint, None where absent"""
+        values: List[Optional[Any]] = [None] * len(keys)
+        missing: Dict[bytes, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = (fingerprint, key)
+                if entry in self._memory:
+                    self._memory.move_to_end(entry)
+                    values[i] = self._memory[entry]
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self.path:
+                pending = list(missing)
+                database = self._database()
+                for start in range(0, len(pending), SQLITE_VARIABLES):
+                    chunk = pending[start:start + SQLITE_VARIABLES]
+                    rows = database.execute(
+                        f"SELECT key, value FROM predictions WHERE fingerprint = ? "
+                        f"AND key IN ({','.join('?' * len(chunk))})",
+                        [fingerprint, *chunk]
+                    ).fetchall()
+                    for key, value in rows:
+                        value = json.loads(value)
+                        self._remember((fingerprint, bytes(key)), value)
+                        for i in missing.pop(bytes(key)):
+                            values[i] = value
+                            self.disk_hits += 1
+            self.misses += sum(len(positions) for positions in missing.values())
+        return values
+
+    def put_many(self, fingerprint: str, keys: List[bytes], values: List[Any]):
+        """Store values under a model fingerprint in both tiers"""
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._remember((fingerprint, key), value)
+            if self.path:
+                database = self._database()
+                with database:
+                    database.executemany(
+                        "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                        [(fingerprint, key, json.dumps(value)) for key, value in zip(keys, values)]
+                    )
+
+    def _remember(self, entry: Tuple[str, bytes], value: Any):
+        self._memory[entry] = value
+        self._memory.move_to_end(entry)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def purge(self, keep: Optional[str] = None) -> int:
+        """Delete entries of every model but `keep` (all when None); returns persisted rows removed"""
+        with self._lock:
+            for entry in [entry for entry in self._memory if entry[0] != keep]:
+                del self._memory[entry]
+            if not self.path:
+                return 0
+            database = self._database()
+            with database:
+                return database.execute("DELETE FROM predictions WHERE fingerprint IS NOT ?", (keep,)).rowcount
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit counts per tier and the overall hit rate"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+        }
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,288 @@
+from typing import Any, Callable, Deque, Dict, List, Optional
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from multiprocessing.connection import AuthenticationError, Client, Listener
+import multiprocessing as mp
+import os
+import queue
+import secrets
+import threading
+import time
+import numpy as np
+
+DEFAULT_MAX_BATCH = 256  # Sequences per coalesced model call
+DEFAULT_MAX_LATENCY = 0.005  # Seconds the oldest request may wait for others to join its batch
+REQUEST_BATCH = 256  # Sequences per client request, so other clients' requests interleave
+METRICS_WINDOW = 10000  # Recent requests and batches kept for latency and size statistics
+AUTHKEY_SUFFIX = '.key'  # The generated authkey is stored beside the socket, readable only by its owner
+
+@dataclass
+class _Request:
+    sequences: List[Any]
+    future: Future = field(default_factory=Future)
+    arrived: float = field(default_factory=time.monotonic)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into micro-batches.
+
+    A dispatcher thread takes the oldest pending request and keeps adding
+    requests until `max_batch` sequences are collected or `max_latency`
+    seconds have passed since that request arrived, then runs `predict`
+    once on all of them and resolves each caller's future with its slice
+    of the results.
+
+    Example:
+        >>> batcher = MicroBatcher(predictor.predict_impact_batch, max_batch=256, max_latency=0.005)
+        >>> impacts = batcher.submit(["ACGT" * 250]).result()
+    """
+    def __init__(self, predict: Callable[[List[Any]], List[Any]], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_latency: float = DEFAULT_MAX_LATENCY):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue: 'queue.Queue[Optional[_Request]]' = queue.Queue()
+        self._latencies: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._batch_sizes: Deque[int] = deque(maxlen=METRICS_WINDOW)
+        self._requests = 0
+        self._errors = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, sequences: List[Any]) -> Future:
+        request = _Request(list(sequences))
+        self._queue.put(request)
+        return request.future
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch, size = [request], len(request.sequences)
+            deadline = request.arrived + self.max_latency
+            closing = False
+            while size < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+                size += len(request.sequences)
+            self._dispatch(batch)
+            if closing:
+                return
+
+    def _dispatch(self, batch: List[_Request]):
+        sequences = [sequence for request in batch for sequence in request.sequences]
+        self._requests += len(batch)
+        self._batch_sizes.append(len(sequences))
+        try:
+            results = self.predict(sequences)
+        except Exception as e:
+            self._errors += len(batch)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finished = time.monotonic()
+        offset = 0
+        for request in batch:
+            request.future.set_result(results[offset:offset + len(request.sequences)])
+            offset += len(request.sequences)
+            self._latencies.append(finished - request.arrived)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, batch sizes and p50/p99 request latency (seconds) over recent requests"""
+        latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+        sizes = np.array(self._batch_sizes) if self._batch_sizes else np.zeros(1)
+        return {
+            'queue_depth': self._queue.qsize(),
+            'requests': self._requests,
+            'errors': self._errors,
+            'batches': len(self._batch_sizes),
+            'mean_batch_size': float(sizes.mean()),
+            'max_batch_size': int(sizes.max()),
+            'p50_latency': float(np.percentile(latencies, 50)),
+            'p99_latency': float(np.percentile(latencies, 99)),
+        }
+
+    def close(self):
+        """Finish pending requests and stop the dispatcher thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+def _key_path(address: str) -> str:
+    return address + AUTHKEY_SUFFIX
+
+def _write_authkey(address: str) -> bytes:
+    """Generate a random authkey and store it beside the socket with mode 0600"""
+    authkey = secrets.token_bytes(32)
+    path = _key_path(address)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+def _read_authkey(address: str) -> bytes:
+    try:
+        with open(_key_path(address), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise ValueError(f"No authkey given and no key file at {_key_path(address)}; "
+                         "start the server first or pass authkey=") from None
+
+def _default_predictor() -> Any:
+    from .model_registry import shared_predictor
+    return shared_predictor()
+
+class InferenceServer:
+    """
+    Local model server: one process holding one predictor for many clients.
+
+    Clients connect over a Unix socket; each connection is served by a
+    thread that hands its requests to a shared MicroBatcher, so requests
+    from different processes are predicted together. `start()` runs the
+    server in a background process; `serve_forever()` runs it in the
+    current one.
+
+    Connections are authenticated because requests are unpickled. Without
+    an explicit `authkey` the server generates a random one and stores it
+    in `<address>.key` (mode 0600), where clients on the same account
+    read it; the socket itself is also restricted to its owner.
+
+    Example:
+        >>> server = InferenceServer("/tmp/genomescript-model.sock")
+        >>> server.start()
+        >>> InferenceClient("/tmp/genomescript-model.sock").predict_impact_batch(sequences)
+    """
+    def __init__(self, address: str, predictor_factory: Optional[Callable[[], Any]] = None,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_latency: float = DEFAULT_MAX_LATENCY,
+                 authkey: Optional[bytes] = None):
+        self.address = address
+        self.predictor_factory = predictor_factory or _default_predictor
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.authkey = authkey or _write_authkey(address)
+        self.process: Optional[mp.Process] = None
+
+    def serve_forever(self):
+        """Load the predictor once and serve clients until a shutdown request"""
+        predictor = self.predictor_factory()
+        batcher = MicroBatcher(lambda sequences: predictor.predict_impact_batch(sequences, self.max_batch),
+                               self.max_batch, self.max_latency)
+        if os.path.exists(self.address):
+            os.remove(self.address)  # Stale socket of a previous server
+        stopping = threading.Event()
+        with Listener(self.address, family='AF_UNIX', authkey=self.authkey) as listener:
+            os.chmod(self.address, 0o600)
+            while True:
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, EOFError, OSError):
+                    continue  # A client with the wrong key; keep serving the others
+                if stopping.is_set():
+                    connection.close()
+                    break
+                threading.Thread(target=self._handle, args=(connection, batcher, stopping), daemon=True).start()
+        batcher.close()
+
+    def _handle(self, connection: Any, batcher: MicroBatcher, stopping: threading.Event):
+        with connection:
+            while True:
+                try:
+                    operation, payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if operation == 'predict':
+                    try:
+                        connection.send(('ok', batcher.submit(payload).result()))
+                    except Exception as e:
+                        connection.send(('error', f"{type(e).__name__}: {e}"))
+                elif operation == 'metrics':
+                    connection.send(('ok', batcher.metrics()))
+                elif operation == 'shutdown':
+                    stopping.set()
+                    connection.send(('ok', None))
+                    # Wake the accept loop so it sees the flag
+                    Client(self.address, family='AF_UNIX', authkey=self.authkey).close()
+                    return
+                else:
+                    connection.send(('error', f"Unknown operation: {operation}"))
+
+    def start(self, timeout: float = 60.0) -> mp.Process:
+        """Run the server in a background process and wait until it accepts connections"""
+        self.process = mp.Process(target=self.serve_forever, name="genomescript-model-server", daemon=True)
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                Client(self.address, family='AF_UNIX', authkey=self.authkey).close()
+                return self.process
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not self.process.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"Model server did not start on {self.address}")
+                time.sleep(0.05)
+
+class InferenceClient:
+    """
+    Thin client of an InferenceServer with the predictor's prediction API.
+
+    Usable wherever a VariantPredictor is used for prediction. Each process
+    opens its own connection on first use, so a client can be created
+    before worker processes fork. Without an explicit `authkey` the
+    client uses the key file the server wrote beside the socket.
+
+    Example:
+        >>> predictor = InferenceClient("/tmp/genomescript-model.sock")
+        >>> impact = predictor.predict_impact("ACGT" * 250)
+    """
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        self.address = address
+        self.authkey = authkey or _read_authkey(address)
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str, payload: Any = None) -> Any:
+        with self._lock:
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+                self._pid = os.getpid()
+            self._connection.send((operation, payload))
+            status, result = self._connection.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Model server error: {result}")
+        return result
+
+    def predict_impact(self, variant_sequence: Any) -> Any:
+        return self.predict_impact_batch([variant_sequence])[0]
+
+    def predict_impact_batch(self, sequences: Any, batch_size: int = REQUEST_BATCH) -> List[Any]:
+        impacts, chunk = [], []
+        for sequence in sequences:
+            chunk.append(sequence)
+            if len(chunk) >= batch_size:
+                impacts.extend(self._call('predict', chunk))
+                chunk = []
+        if chunk:
+            impacts.extend(self._call('predict', chunk))
+        return impacts
+
+    def metrics(self) -> Dict[str, Any]:
+        return self._call('metrics')
+
+    def shutdown(self):
+        """Stop the server"""
+        self._call('shutdown')
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
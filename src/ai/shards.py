@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, asdict
+from itertools import islice
+import json
+import os
+import numpy as np
+from .encoding import BASE_ORDER, ascii_matrix, one_hot_encode
+
+SHARD_ENCODINGS = ('packed', 'onehot')
+DEFAULT_SHARD_SIZE = 65536  # Variants per shard file
+MANIFEST = 'manifest.json'
+PACKED_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)  # First base of each byte in the high bits
+
+# 2-bit code of each ASCII byte, 4 for the bytes `one_hot_encode` maps to zeros (including soft-masked bases)
+SHARD_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    SHARD_CODES[ord(_base)] = _code
+
+# One-hot row (BASE_ORDER columns) of each 2-bit code A=0, C=1, G=2, T=3
+CODE_ONE_HOT = np.array([[1 if base == code else 0 for base in BASE_ORDER] for code in "ACGT"], dtype=np.float32)
+
+@dataclass
+class ShardManifest:
+    """
+    Description of a directory of pre-encoded training shards.
+
+    Attributes:
+        sequence_length (int): Bases per encoded variant context
+        encoding (str): 'packed' (2 bits per base plus an N mask) or 'onehot' (uint8, 4 per base)
+        shards (List[Dict[str, Any]]): File stem and variant count of each shard
+    """
+    sequence_length: int
+    encoding: str
+    shards: List[Dict[str, Any]]
+
+    @property
+    def count(self) -> int:
+        return sum(shard['count'] for shard in self.shards)
+
+    def save(self, directory: str):
+        with open(os.path.join(directory, MANIFEST), 'w') as handle:
+            json.dump(asdict(self), handle, indent=1)
+
+    @classmethod
+    def load(cls, directory: str) -> 'ShardManifest':
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            return cls(**json.load(handle))
+
+def pack_sequences(sequences: List[Any], length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """2-bit codes (batch, ceil(length / 4)) and a bit mask of N/padding positions (batch, ceil(length / 8))"""
+    codes = SHARD_CODES[ascii_matrix(sequences, length)]
+    unknown = codes > 3
+    codes[unknown] = 0
+    padded = np.zeros((len(sequences), -(-length // 4) * 4), dtype=np.uint8)
+    padded[:, :length] = codes
+    quads = padded.reshape(len(sequences), -1, 4) << PACKED_SHIFTS
+    return np.bitwise_or.reduce(quads, axis=2), np.packbits(unknown, axis=1)
+
+def unpack_sequences(packed: np.ndarray, mask: np.ndarray, length: int) -> np.ndarray:
+    """One-hot float32 (batch, length, 4) of packed shard rows"""
+    codes = ((packed[:, :, None] >> PACKED_SHIFTS) & 3).reshape(len(packed), -1)[:, :length]
+    encoded = CODE_ONE_HOT[codes]
+    encoded[np.unpackbits(mask, axis=1, count=length).astype(bool)] = 0
+    return encoded
+
+def write_shards(sequences: Iterable[Any], labels: Iterable[int], directory: str,
+                 sequence_length: int = 1000, encoding: str = 'packed',
+                 shard_size: int = DEFAULT_SHARD_SIZE) -> ShardManifest:
+    """
+    Encode (sequence, label) pairs once into memory-mappable shard files.
+
+    Input is consumed `shard_size` variants at a time, so the training set
+    never has to fit in memory. Each shard is stored as `.npy` arrays
+    (`<stem>.x.npy`, `<stem>.y.npy` and, when packed, `<stem>.mask.npy`)
+    listed in `manifest.json`.
+    """
+    if encoding not in SHARD_ENCODINGS:
+        raise ValueError(f"Unknown shard encoding: {encoding}; expected one of {', '.join(SHARD_ENCODINGS)}")
+    os.makedirs(directory, exist_ok=True)
+    manifest = ShardManifest(sequence_length, encoding, [])
+    pairs = zip(sequences, labels)
+    while True:
+        chunk = list(islice(pairs, shard_size))
+        if not chunk:
+            break
+        stem = f"shard-{len(manifest.shards):05d}"
+        batch = [sequence for sequence, _ in chunk]
+        if encoding == 'packed':
+            packed, mask = pack_sequences(batch, sequence_length)
+            np.save(os.path.join(directory, f"{stem}.x.npy"), packed)
+            np.save(os.path.join(directory, f"{stem}.mask.npy"), mask)
+        else:
+            np.save(os.path.join(directory, f"{stem}.x.npy"), one_hot_encode(batch, sequence_length, np.uint8))
+        np.save(os.path.join(directory, f"{stem}.y.npy"), np.array([label for _, label in chunk], dtype=np.int64))
+        manifest.shards.append({'stem': stem, 'count': len(chunk)})
+    manifest.save(directory)
+    return manifest
+
+class ShardDataset:
+    """
+    Pre-encoded training shards, memory-mapped and decoded batch by batch.
+
+    `batches()` streams decoded (x, y) NumPy batches in bounded memory;
+    `VariantPredictor.shard_dataset()` builds the equivalent `tf.data`
+    pipeline over the same files.
+
+    Example:
+        >>> write_shards(sequences, labels, "train_shards")
+        >>> for x, y in ShardDataset("train_shards").batches(256, shuffle=True):
+        ...     model.train_on_batch(x, y)
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest = ShardManifest.load(directory)
+
+    def __len__(self) -> int:
+        return self.manifest.count
+
+    def shard(self, index: int) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """Memory-mapped (encoded rows, N mask or None, labels) of one shard"""
+        stem = os.path.join(self.directory, self.manifest.shards[index]['stem'])
+        mask = np.load(f"{stem}.mask.npy", mmap_mode='r') if self.manifest.encoding == 'packed' else None
+        return np.load(f"{stem}.x.npy", mmap_mode='r'), mask, np.load(f"{stem}.y.npy", mmap_mode='r')
+
+    def decode(self, rows: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """One-hot float32 (batch, sequence_length, 4) of encoded shard rows"""
+        if self.manifest.encoding == 'packed':
+            return unpack_sequences(np.asarray(rows), np.asarray(mask), self.manifest.sequence_length)
+        return np.asarray(rows, dtype=np.float32)
+
+    def batches(self, batch_size: int = 32, shuffle: bool = False,
+                seed: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Decoded (x, y) batches; shuffling permutes shard order and rows within each shard"""
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.manifest.shards)) if shuffle else range(len(self.manifest.shards))
+        for index in order:
+            rows, mask, labels = self.shard(index)
+            positions = rng.permutation(len(labels)) if shuffle else np.arange(len(labels))
+            for start in range(0, len(positions), batch_size):
+                # Sorted positions read the memory map front to back
+                take = np.sort(positions[start:start + batch_size])
+                yield self.decode(rows[take], None if mask is None else mask[take]), np.asarray(labels[take])
@@ -0,0 +1,157 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from dataclasses import dataclass
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+
+try:
+    from tflite_runtime import interpreter as tflite_runtime
+except ImportError:  # The interpreter bundled with TensorFlow is used instead
+    tflite_runtime = None
+
+QUANTIZATION_MODES = ('none', 'dynamic', 'int8')
+CALIBRATION_SAMPLES = 200  # Representative inputs used to calibrate int8 activation ranges
+
+def _interpreter_module() -> Any:
+    if tflite_runtime is not None:
+        return tflite_runtime
+    import tensorflow as tf
+    return tf.lite
+
+def export_tflite(model: Any, path: str, quantization: str = 'none',
+                  representative_data: Optional[np.ndarray] = None) -> str:
+    """
+    Convert a Keras model to a TFLite flatbuffer at `path`.
+
+    'dynamic' stores weights as int8 and dequantizes them at load;
+    'int8' also quantizes activations, calibrated on `representative_data`
+    (a sample of encoded inputs). Inputs and outputs stay float32 in every
+    mode, so callers feed the same one-hot batches, and ops without int8
+    kernels fall back to float.
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization: {quantization}; expected one of {', '.join(QUANTIZATION_MODES)}")
+    if quantization == 'int8' and (representative_data is None or len(representative_data) == 0):
+        raise ValueError("int8 quantization requires representative_data for calibration")
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        samples = np.asarray(representative_data[:CALIBRATION_SAMPLES], dtype=np.float32)
+        converter.representative_dataset = lambda: ([sample[None]] for sample in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    flatbuffer = converter.convert()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as handle:
+        handle.write(flatbuffer)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+class TFLiteBackend:
+    """
+    CPU inference over an exported TFLite model.
+
+    Runs on the XNNPACK delegate (TFLite's default CPU delegate) with
+    `num_threads` threads; `use_xnnpack=False` falls back to the reference
+    kernels for comparison. Uses `tflite_runtime` when it is installed and
+    TensorFlow's bundled interpreter otherwise. The input tensor is resized
+    to each batch, and calls are serialised since an interpreter is not
+    thread-safe.
+
+    Example:
+        >>> backend = TFLiteBackend("models/genomic_model.int8.tflite", num_threads=8)
+        >>> probabilities = backend.predict_on_batch(encoder.encode(sequences))
+    """
+    def __init__(self, model_path: str, num_threads: Optional[int] = None, use_xnnpack: bool = True):
+        self.model_path = model_path
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.use_xnnpack = use_xnnpack
+        module = _interpreter_module()
+        resolver = module.experimental.OpResolverType if hasattr(module, 'experimental') \
+            else module.OpResolverType
+        self.interpreter = module.Interpreter(
+            model_path=model_path,
+            num_threads=self.num_threads,
+            experimental_op_resolver_type=resolver.AUTO if use_xnnpack
+            else resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        )
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = None
+        self._lock = threading.Lock()
+        with open(model_path, 'rb') as handle:
+            self.fingerprint = hashlib.blake2b(handle.read(), digest_size=16).hexdigest()
+
+    def predict_on_batch(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=self._input['dtype'])
+        with self._lock:
+            if self._batch != x.shape[0]:
+                self.interpreter.resize_tensor_input(self._input['index'], x.shape)
+                self.interpreter.allocate_tensors()
+                self._batch = x.shape[0]
+            self.interpreter.set_tensor(self._input['index'], x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output['index']).copy()
+
+@dataclass
+class ParityReport:
+    """
+    Agreement between a reference model's outputs and a candidate backend's.
+
+    Attributes:
+        samples (int): Inputs compared
+        max_abs_error (float): Largest absolute difference of any output
+        mean_abs_error (float): Mean absolute difference over all outputs
+        class_agreement (float): Fraction of inputs with the same top class
+        tolerance (float): Largest max_abs_error accepted
+    """
+    samples: int
+    max_abs_error: float
+    mean_abs_error: float
+    class_agreement: float
+    tolerance: float
+
+    @property
+    def passed(self) -> bool:
+        return self.max_abs_error <= self.tolerance
+
+def compare_outputs(reference: np.ndarray, candidate: np.ndarray, tolerance: float = 0.05) -> ParityReport:
+    """Parity of two (batch, classes) probability arrays"""
+    reference, candidate = np.asarray(reference, dtype=np.float64), np.asarray(candidate, dtype=np.float64)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Output shapes differ: {reference.shape} and {candidate.shape}")
+    errors = np.abs(reference - candidate)
+    return ParityReport(
+        samples=len(reference),
+        max_abs_error=float(errors.max()) if errors.size else 0.0,
+        mean_abs_error=float(errors.mean()) if errors.size else 0.0,
+        class_agreement=float((reference.argmax(axis=1) == candidate.argmax(axis=1)).mean()) if len(reference) else 1.0,
+        tolerance=tolerance
+    )
+
+def benchmark_inference(predict: Callable[[np.ndarray], Any], inputs: np.ndarray,
+                        batch_sizes: Iterable[int] = (1, 32, 256), repeats: int = 20,
+                        warmup: int = 2) -> List[Dict[str, float]]:
+    """Latency percentiles (seconds per call) and throughput (inputs per second) of `predict` per batch size"""
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.asarray(inputs[:batch_size])
+        for _ in range(warmup):
+            predict(batch)
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(batch)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies)
+        results.append({
+            'batch_size': len(batch),
+            'p50_latency': float(np.percentile(latencies, 50)),
+            'p99_latency': float(np.percentile(latencies, 99)),
+            'throughput': len(batch) / float(latencies.mean()),
+        })
+    return results
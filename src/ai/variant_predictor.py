@@ -1,9 +1,22 @@
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple, Union
+import os
+import tempfile
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 from Bio import SeqIO
 from dataclasses import dataclass
+from ..config import settings
+from ..genomics.packed_sequence import PackedSequence
+from .encoding import OneHotEncoder
+from .model_registry import WEIGHTS_LAYOUT, load_weights
+from .prediction_cache import PredictionCache, model_fingerprint
+from .distributed import DistributedTrainer, TrainingReport
+from .tflite_backend import ParityReport, TFLiteBackend, benchmark_inference, compare_outputs, export_tflite
+from .shards import CODE_ONE_HOT, PACKED_SHIFTS, ShardDataset
+
+DEFAULT_PREDICT_BATCH = 256  # Sequences encoded and predicted per model call
+BACKENDS = ('keras', 'tflite')
 
 @dataclass
 class VariantImpact:
@@ -13,29 +26,46 @@ class VariantImpact:
     clinical_significance: str
 
 class VariantPredictor:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, prediction_cache: Optional[PredictionCache] = None,
+                 backend: str = 'keras', tflite_path: str = None, num_threads: int = None):
         self.sequence_length = 1000  # Context window size
+        self.encoder = OneHotEncoder(self.sequence_length)
+        # Prediction chunks are encoded into one reused buffer
+        self._batch_encoder = OneHotEncoder(self.sequence_length, reuse=True)
         self.model = self._create_model() if not model_path else self.load_model(model_path)
+        self.model_version = 0  # Bumped whenever the weights change
+        self.frozen = False  # Set on process-wide shared predictors so training cannot change their weights
+        self._regions: Optional[Tuple[int, List[str]]] = None
+        self._fingerprint: Optional[Tuple[int, str]] = None
+        if prediction_cache is None and settings.PREDICTION_CACHE_SIZE > 0:
+            prediction_cache = PredictionCache(settings.PREDICTION_CACHE or None,
+                                               settings.PREDICTION_CACHE_SIZE, self.sequence_length)
+        self.prediction_cache = prediction_cache
+        self.backend = 'keras'
+        self.runtime: Optional[TFLiteBackend] = None
+        self.use_backend(backend, tflite_path, num_threads)
         
     def _create_model(self) -> keras.Model:
         """Create deep learning model for variant impact prediction"""
-        model = keras.Sequential([
-            # CNN layers for sequence feature extraction
-            keras.layers.Conv1D(64, 3, activation='relu', input_shape=(self.sequence_length, 4)),
-            keras.layers.MaxPooling1D(2),
-            keras.layers.Conv1D(128, 3, activation='relu'),
-            keras.layers.MaxPooling1D(2),
-            
-            # Attention mechanism for important regions
-            keras.layers.MultiHeadAttention(num_heads=8, key_dim=64),
-            keras.layers.GlobalAveragePooling1D(),
-            
-            # Dense layers for prediction
-            keras.layers.Dense(256, activation='relu'),
-            keras.layers.Dropout(0.5),
-            keras.layers.Dense(128, activation='relu'),
-            keras.layers.Dense(4, activation='softmax')  # Multi-class prediction
-        ])
+        # Functional API: the attention layer takes the sequence as both query and value
+        inputs = keras.Input(shape=(self.sequence_length, 4))
+
+        # CNN layers for sequence feature extraction
+        x = keras.layers.Conv1D(64, 3, activation='relu')(inputs)
+        x = keras.layers.MaxPooling1D(2)(x)
+        x = keras.layers.Conv1D(128, 3, activation='relu')(x)
+        x = keras.layers.MaxPooling1D(2)(x)
+
+        # Attention mechanism for important regions
+        x = keras.layers.MultiHeadAttention(num_heads=8, key_dim=64, name='attention')(x, x)
+        x = keras.layers.GlobalAveragePooling1D()(x)
+
+        # Dense layers for prediction
+        x = keras.layers.Dense(256, activation='relu')(x)
+        x = keras.layers.Dropout(0.5)(x)
+        x = keras.layers.Dense(128, activation='relu')(x)
+        outputs = keras.layers.Dense(4, activation='softmax')(x)  # Multi-class prediction
+        model = keras.Model(inputs, outputs)
         
         model.compile(
             optimizer='adam',
@@ -44,17 +74,66 @@ class VariantPredictor:
         )
         return model
 
-    def preprocess_sequence(self, sequence: str) -> np.ndarray:
-        """Convert DNA sequence to one-hot encoding"""
-        mapping = {'A': [1,0,0,0], 'T': [0,1,0,0], 
-                  'G': [0,0,1,0], 'C': [0,0,0,1]}
-        encoded = np.array([mapping.get(base, [0,0,0,0]) for base in sequence])
-        return encoded
+    def load_model(self, model_path: str) -> keras.Model:
+        """Load a registry artifact directory, or a model saved with `model.save` (.keras or .h5)"""
+        if os.path.exists(os.path.join(model_path, WEIGHTS_LAYOUT)):
+            # Building the architecture and mapping the weights skips deserialising a saved graph
+            model = self._create_model()
+            model.set_weights(load_weights(model_path))
+            return model
+        return keras.models.load_model(model_path)
+
+    def warmup(self, batch_sizes: Iterable[int] = (1, DEFAULT_PREDICT_BATCH)):
+        """Trace the prediction graph and derive attention regions before the first request"""
+        for batch_size in batch_sizes:
+            self._infer(np.zeros((batch_size, self.sequence_length, 4), dtype=np.float32))
+        self._affected_regions()
+
+    def _checkpoint(self) -> keras.callbacks.ModelCheckpoint:
+        directory = os.path.join(settings.CACHE_DIR, 'checkpoints')
+        os.makedirs(directory, exist_ok=True)
+        return keras.callbacks.ModelCheckpoint(os.path.join(directory, 'best_model.h5'))
+
+    def preprocess_sequence(self, sequence: Union[str, PackedSequence]) -> np.ndarray:
+        """Convert DNA sequence to one-hot encoding, padded or trimmed to the context window"""
+        return self.encoder.encode_one(sequence)
+
+    def preprocess_batch(self, sequences: List[Union[str, PackedSequence]],
+                         out: np.ndarray = None) -> np.ndarray:
+        """One-hot encode many sequences into a (batch, sequence_length, 4) array"""
+        return self.encoder.encode(sequences, out)
+
+    def clone(self) -> 'VariantPredictor':
+        """An unfrozen predictor with a private copy of the current weights"""
+        copy = VariantPredictor(prediction_cache=self.prediction_cache)
+        copy.set_weights(self.model.get_weights())
+        return copy
+
+    def set_weights(self, weights: List[np.ndarray]):
+        """
+        Replace the model weights and bump `model_version`. Weights must change through this,
+        `load_weights` or the train methods; editing `self.model` directly leaves a stale
+        fingerprint, so the prediction cache would keep answering for the old weights
+        """
+        self._check_trainable()
+        self.model.set_weights(weights)
+        self.model_version += 1
+
+    def load_weights(self, weights_path: str):
+        """Load weights saved with `save_weights` and bump `model_version`"""
+        self._check_trainable()
+        self.model.load_weights(weights_path)
+        self.model_version += 1
+
+    def _check_trainable(self):
+        if self.frozen:
+            raise RuntimeError("This predictor is shared and frozen; train a clone() instead")
 
     def train(self, sequences: List[str], labels: List[int], 
              validation_split: float = 0.2):
         """Train the model on genomic data"""
-        X = np.array([self.preprocess_sequence(seq) for seq in sequences])
+        self._check_trainable()
+        X = self.preprocess_batch(sequences)
         y = keras.utils.to_categorical(labels)
         
         self.model.fit(
@@ -64,33 +143,241 @@ class VariantPredictor:
             validation_split=validation_split,
             callbacks=[
                 keras.callbacks.EarlyStopping(patience=5),
-                keras.callbacks.ModelCheckpoint('best_model.h5')
+                self._checkpoint()
             ]
         )
+        self.model_version += 1
+
+    def shard_dataset(self, directory: str, batch_size: int = 32, shuffle: bool = True,
+                      shuffle_buffer: int = 10000, cycle_length: int = 4,
+                      read_block: int = 1024, shard_indices: List[int] = None) -> tf.data.Dataset:
+        """
+        Streaming tf.data pipeline over shards written by `write_shards`.
+
+        Shards are read from their memory maps `read_block` rows at a time,
+        `cycle_length` shards interleaved in parallel, shuffled through a
+        `shuffle_buffer`-row buffer, then batched and decoded to float32
+        one-hot inside the graph and prefetched, so only the buffers are
+        ever held in memory. `shard_indices` restricts the pipeline to a
+        subset of the shards.
+        """
+        shards = ShardDataset(directory)
+        manifest = shards.manifest
+        length = manifest.sequence_length
+        packed = manifest.encoding == 'packed'
+        rows, mask, _ = shards.shard(0 if shard_indices is None else shard_indices[0])
+        mask_width = mask.shape[1] if packed else 0
+        classes = self.model.output_shape[-1]
+
+        def read_shard(index):
+            rows, mask, labels = shards.shard(int(index))
+            for start in range(0, len(labels), read_block):
+                stop = min(start + read_block, len(labels))
+                yield (np.asarray(rows[start:stop]),
+                       np.asarray(mask[start:stop]) if packed else np.zeros((stop - start, 0), dtype=np.uint8),
+                       np.asarray(labels[start:stop]))
+
+        signature = (
+            tf.TensorSpec((None, *rows.shape[1:]), tf.uint8),
+            tf.TensorSpec((None, mask_width), tf.uint8),
+            tf.TensorSpec((None,), tf.int64)
+        )
+        code_one_hot = tf.constant(CODE_ONE_HOT)
+        shifts = tf.constant(PACKED_SHIFTS)
+        mask_shifts = tf.constant(np.arange(7, -1, -1, dtype=np.uint8))
+
+        def decode(rows, mask, labels):
+            if packed:
+                codes = tf.bitwise.bitwise_and(tf.bitwise.right_shift(rows[..., None], shifts), 3)
+                codes = tf.reshape(codes, (tf.shape(rows)[0], -1))[:, :length]
+                x = tf.gather(code_one_hot, tf.cast(codes, tf.int32))
+                unknown = tf.bitwise.bitwise_and(tf.bitwise.right_shift(mask[..., None], mask_shifts), 1)
+                unknown = tf.reshape(unknown, (tf.shape(mask)[0], -1))[:, :length]
+                x = x * tf.cast(1 - unknown, tf.float32)[..., None]
+            else:
+                x = tf.cast(rows, tf.float32)
+            return x, tf.one_hot(labels, classes)
+
+        indices = list(range(len(manifest.shards))) if shard_indices is None else list(shard_indices)
+        dataset = tf.data.Dataset.from_tensor_slices(tf.constant(indices, dtype=tf.int64))
+        if shuffle:
+            dataset = dataset.shuffle(len(indices), reshuffle_each_iteration=True)
+        dataset = dataset.interleave(
+            lambda index: tf.data.Dataset.from_generator(read_shard, args=(index,), output_signature=signature),
+            cycle_length=cycle_length,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not shuffle
+        ).unbatch()
+        if shuffle:
+            dataset = dataset.shuffle(shuffle_buffer)
+        return dataset.batch(batch_size).map(decode, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+    def train_on_shards(self, directory: str, validation_directory: str = None,
+                        epochs: int = 50, batch_size: int = 32, shuffle_buffer: int = 10000):
+        """Train from pre-encoded shards without holding the training set in memory"""
+        self._check_trainable()
+        validation = self.shard_dataset(validation_directory, batch_size, shuffle=False) \
+            if validation_directory else None
+        self.model.fit(
+            self.shard_dataset(directory, batch_size, shuffle_buffer=shuffle_buffer),
+            epochs=epochs,
+            validation_data=validation,
+            callbacks=[
+                keras.callbacks.EarlyStopping(patience=5, monitor='val_loss' if validation else 'loss'),
+                self._checkpoint()
+            ]
+        )
+        self.model_version += 1
+
+    def train_distributed(self, directory: str, workers: int = 4, threads_per_worker: int = None,
+                          epochs: int = 10, batch_size: int = 32, learning_rate: float = None,
+                          weights_path: str = None) -> TrainingReport:
+        """
+        Data-parallel training over local worker processes; see `DistributedTrainer`.
+        Training continues from the current weights, like `train`. The result goes to
+        `weights_path`, by default the checkpoint directory under CACHE_DIR
+        """
+        self._check_trainable()
+        weights_path = weights_path or os.path.join(settings.CACHE_DIR, 'checkpoints', 'distributed.weights.h5')
+        # Workers build this predictor's class, so subclasses train their own architecture
+        trainer = DistributedTrainer(workers, threads_per_worker, batch_size, learning_rate, type(self))
+        with tempfile.TemporaryDirectory() as staging:
+            initial_weights = os.path.join(staging, 'initial.weights.h5')
+            self.model.save_weights(initial_weights)
+            report = trainer.train(directory, weights_path, epochs, initial_weights)
+        self.load_weights(report.weights_path)
+        return report
 
     def predict_impact(self, variant_sequence: str) -> VariantImpact:
         """Predict the impact of a variant"""
-        X = self.preprocess_sequence(variant_sequence)
-        X = np.expand_dims(X, axis=0)
-        
-        predictions = self.model.predict(X)
-        severity_score = float(predictions[0][0])
-        
-        # Get attention weights for interpretability
-        attention_weights = self.model.layers[4].get_weights()
-        affected_regions = self._identify_affected_regions(attention_weights[0])
-        
-        return VariantImpact(
-            severity_score=severity_score,
-            confidence=float(np.max(predictions)),
-            affected_regions=affected_regions,
-            clinical_significance=self._get_clinical_significance(severity_score)
-        )
+        return self.predict_impact_batch([variant_sequence])[0]
+
+    def predict_impact_batch(self, sequences: Iterable[Union[str, PackedSequence]],
+                             batch_size: int = DEFAULT_PREDICT_BATCH) -> List[VariantImpact]:
+        """Predict the impact of many variants, encoding and predicting `batch_size` at a time"""
+        affected_regions = self._affected_regions()
+        impacts = []
+        chunk = []
+        for sequence in sequences:
+            chunk.append(sequence)
+            if len(chunk) >= batch_size:
+                impacts.extend(self._predict_cached(chunk, affected_regions))
+                chunk = []
+        if chunk:
+            impacts.extend(self._predict_cached(chunk, affected_regions))
+        return impacts
+
+    def _predict_cached(self, sequences: List[Union[str, PackedSequence]],
+                        affected_regions: List[str]) -> List[VariantImpact]:
+        """Predict a chunk, running the model only on sequences missing from the prediction cache"""
+        if self.prediction_cache is None:
+            return self._predict_chunk(sequences, affected_regions)
+        fingerprint = self.model_fingerprint()
+        keys = self.prediction_cache.keys(sequences)
+        rows = self.prediction_cache.get_many(fingerprint, keys)
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            predicted = self._predict_chunk([sequences[i] for i in missing], affected_regions)
+            new_rows = [[impact.severity_score, impact.confidence, impact.affected_regions,
+                         impact.clinical_significance] for impact in predicted]
+            self.prediction_cache.put_many(fingerprint, [keys[i] for i in missing], new_rows)
+            for i, row in zip(missing, new_rows):
+                rows[i] = row
+        return [
+            VariantImpact(severity_score, confidence, list(regions), clinical_significance)
+            for severity_score, confidence, regions, clinical_significance in rows
+        ]
+
+    def _infer(self, x: np.ndarray) -> np.ndarray:
+        """Class probabilities of encoded inputs from the selected backend"""
+        if self.runtime is None:
+            return np.asarray(self.model.predict_on_batch(x))
+        if self._runtime_version != self.model_version:
+            raise RuntimeError("The TFLite model predates the current weights; export it again after training")
+        return self.runtime.predict_on_batch(x)
+
+    def model_fingerprint(self) -> str:
+        """
+        Digest of the current weights and backend, recomputed once per model version.
+        Only `set_weights`, `load_weights` and the train methods bump the version
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.model_version:
+            self.fingerprint_as(model_fingerprint(self.model.get_weights()))
+        return self._fingerprint[1]
+
+    def fingerprint_as(self, weights_fingerprint: str):
+        """Adopt a known digest of the current Keras weights, e.g. from a registry manifest"""
+        if self.runtime is not None:
+            # Quantized models predict slightly differently from the Keras weights
+            weights_fingerprint = f"{weights_fingerprint}:{self.runtime.fingerprint}"
+        self._fingerprint = (self.model_version, weights_fingerprint)
+
+    def use_backend(self, backend: str, tflite_path: str = None, num_threads: int = None):
+        """Run predictions on Keras or on an exported TFLite model of the current weights"""
+        if backend == 'keras':
+            self.runtime = None
+        elif backend == 'tflite':
+            if not tflite_path:
+                raise ValueError("The tflite backend requires tflite_path; create one with export_tflite()")
+            self.runtime = TFLiteBackend(tflite_path, num_threads)
+            self._runtime_version = self.model_version
+        else:
+            raise ValueError(f"Unknown backend: {backend}; expected one of {', '.join(BACKENDS)}")
+        self.backend = backend
+        self._fingerprint = None
+
+    def export_tflite(self, path: str, quantization: str = 'none',
+                      representative_sequences: List[Union[str, PackedSequence]] = None) -> str:
+        """Convert the current model to TFLite, calibrating int8 quantization on sample sequences"""
+        representative_data = self.preprocess_batch(representative_sequences) if representative_sequences else None
+        return export_tflite(self.model, path, quantization, representative_data)
+
+    def check_parity(self, sequences: List[Union[str, PackedSequence]], tolerance: float = 0.05) -> ParityReport:
+        """Compare the TFLite backend's outputs with the Keras model's on sample sequences"""
+        if self.runtime is None:
+            raise RuntimeError("Parity needs the tflite backend; call use_backend('tflite', path) first")
+        x = self.preprocess_batch(sequences)
+        return compare_outputs(np.asarray(self.model.predict_on_batch(x)), self.runtime.predict_on_batch(x), tolerance)
+
+    def benchmark(self, sequences: List[Union[str, PackedSequence]],
+                  batch_sizes: Iterable[int] = (1, 32, DEFAULT_PREDICT_BATCH),
+                  repeats: int = 20) -> Dict[str, List[Dict[str, float]]]:
+        """Latency and throughput of model inference per batch size, for Keras and, if selected, TFLite"""
+        x = self.preprocess_batch(sequences)
+        results = {'keras': benchmark_inference(self.model.predict_on_batch, x, batch_sizes, repeats)}
+        if self.runtime is not None:
+            results['tflite'] = benchmark_inference(self.runtime.predict_on_batch, x, batch_sizes, repeats)
+        return results
+
+    def _predict_chunk(self, sequences: List[Union[str, PackedSequence]],
+                       affected_regions: List[str]) -> List[VariantImpact]:
+        predictions = self._infer(self._batch_encoder.encode(sequences))
+        severity_scores = predictions[:, 0].tolist()
+        confidences = predictions.max(axis=1).tolist()
+        return [
+            VariantImpact(
+                severity_score=severity_score,
+                confidence=confidence,
+                affected_regions=list(affected_regions),
+                clinical_significance=self._get_clinical_significance(severity_score)
+            )
+            for severity_score, confidence in zip(severity_scores, confidences)
+        ]
+
+    def _affected_regions(self) -> List[str]:
+        """Attention-derived regions, computed once per model version"""
+        if self._regions is None or self._regions[0] != self.model_version:
+            # Get attention weights for interpretability
+            attention_weights = self.model.get_layer('attention').get_weights()
+            self._regions = (self.model_version, self._identify_affected_regions(attention_weights[0]))
+        return self._regions[1]
 
     def _identify_affected_regions(self, attention_weights: np.ndarray) -> List[str]:
         """Identify genomic regions most affected by the variant"""
         top_k = 3
-        top_indices = np.argsort(attention_weights.mean(axis=1))[-top_k:]
+        # The query kernel is (features, heads, key_dim); score each input feature
+        scores = attention_weights.reshape(len(attention_weights), -1).mean(axis=1)
+        top_indices = np.argsort(scores)[-top_k:]
         return [f"Region_{i}" for i in top_indices]
 
     def _get_clinical_significance(self, severity_score: float) -> str:
@@ -1,6 +1,7 @@
 from web3 import Web3
 from eth_account import Account
 from typing import Dict, Any
+from ..zkp.genomic_proof import GenomicProof
 
 class EthereumConnector:
     def __init__(self, node_url: str, contract_address: str):
@@ -2,9 +2,13 @@ from typing import List, Dict, Optional
 from dataclasses import dataclass
 import hashlib
 from ..genomics.file_handler import GenomicFileHandler
-from ..ai.variant_predictor import VariantPredictor
+from ..ai.model_registry import ModelRegistry, shared_predictor
+from ..ai.prediction_cache import PredictionCache
+from ..config import settings
 import time
 
+RESULT_BATCH = 1  # Work items are predicted alone, as miners do, so the result bytes never depend on batching
+
 @dataclass
 class GenomicWork:
     query_id: str
@@ -21,9 +25,22 @@ class WorkProof:
     worker_address: str
 
 class PoUWConsensus:
-    def __init__(self):
+    def __init__(self, model_version: Optional[str] = None):
         self.genomic_handler = GenomicFileHandler()
-        self.variant_predictor = VariantPredictor()
+        # Verification is pinned to one registered version so every node computes the same results
+        registry = ModelRegistry()
+        latest = registry.latest() if model_version is None else None
+        self.model_version = model_version or (latest.version if latest else None)
+        # A model server batches requests from many clients and shared caches may hold predictions
+        # from any batch composition, so results are computed locally by a private copy whose own
+        # cache only ever holds its RESULT_BATCH predictions, making repeated verifications cheap
+        if self.model_version is not None:
+            self.variant_predictor = registry.load(self.model_version, warmup=False)
+        else:
+            self.variant_predictor = shared_predictor().clone()
+        self.variant_predictor.prediction_cache = PredictionCache(
+            capacity=settings.PREDICTION_CACHE_SIZE, sequence_length=self.variant_predictor.sequence_length
+        ) if settings.PREDICTION_CACHE_SIZE > 0 else None
         self.min_difficulty = 4
         self.target_block_time = 600  # 10 minutes
         
@@ -40,24 +57,46 @@ class PoUWConsensus:
     def verify_work(self, work: GenomicWork, proof: WorkProof) -> bool:
         """Verify the completed genomic work"""
         # Verify hash difficulty
-        work_hash = hashlib.sha256(
-            work.query_id.encode() + 
-            proof.result + 
-            str(proof.nonce).encode()
-        ).hexdigest()
-        
-        if not work_hash.startswith('0' * work.difficulty):
+        if not self._meets_difficulty(work, proof):
             return False
             
         # Verify computation result
         expected_result = self._compute_result(work.sequence_data)
         return proof.result == expected_result
         
+    def verify_works(self, works: List[GenomicWork], proofs: List[WorkProof]) -> List[bool]:
+        """Verify many completed works, recomputing only the results of those passing the hash check"""
+        valid = []
+        pending = []
+        for work, proof in zip(works, proofs):
+            valid.append(self._meets_difficulty(work, proof))
+            if valid[-1]:
+                pending.append(len(valid) - 1)
+
+        # Only works passing the hash check need their computation re-run
+        expected = self._compute_results([works[i].sequence_data for i in pending])
+        for i, expected_result in zip(pending, expected):
+            valid[i] = proofs[i].result == expected_result
+        return valid
+
+    def _meets_difficulty(self, work: GenomicWork, proof: WorkProof) -> bool:
+        work_hash = hashlib.sha256(
+            work.query_id.encode() + 
+            proof.result + 
+            str(proof.nonce).encode()
+        ).hexdigest()
+        return work_hash.startswith('0' * work.difficulty)
+
     def _compute_result(self, sequence_data: bytes) -> bytes:
         """Compute genomic analysis result"""
+        return self._compute_results([sequence_data])[0]
+
+    def _compute_results(self, sequence_batch: List[bytes]) -> List[bytes]:
+        """Compute the analysis results of many work items, each predicted on its own"""
         # Perform actual genomic computation
-        result = self.variant_predictor.predict_impact(sequence_data.decode())
-        return str(result).encode()
+        results = self.variant_predictor.predict_impact_batch((data.decode() for data in sequence_batch),
+                                                              RESULT_BATCH)
+        return [str(result).encode() for result in results]
         
     def _calculate_reward(self, difficulty: int) -> float:
         """Calculate reward based on work difficulty"""
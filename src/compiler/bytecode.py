@@ -1,24 +1,35 @@
 from typing import List
 from dataclasses import dataclass
 from enum import Enum, auto
-from .parser import ASTNode
+from .parser import ASTNode, LoadNode, AnalyzeNode, ExportNode, AlignNode, FilterNode, SortNode, MergeNode
 
 class OpCode(Enum):
     LOAD = auto()
     STORE = auto()
     ANALYZE = auto()
     FILTER_QUALITY = "FILTER_QUALITY"
+    FILTER = "FILTER"
+    SORT = "SORT"
+    MERGE = "MERGE"
     EXPORT = "EXPORT"
+    ALIGN = "ALIGN"
     LOAD_VAR = "LOAD_VAR"
     GENERATE_PROOF = "GENERATE_PROOF"
     VERIFY_PROOF = "VERIFY_PROOF"
     SUBMIT_PROOF = "SUBMIT_PROOF"
+    LOAD_FILE = "LOAD_FILE"
+    PREDICT_IMPACT = "PREDICT_IMPACT"
+    TRAIN_MODEL = "TRAIN_MODEL"
 
 @dataclass
 class Instruction:
     opcode: OpCode
     operands: List[str] = None
 
+    @property
+    def args(self) -> List[str]:
+        return self.operands
+
 class BytecodeGenerator:
     def generate(self, ast_nodes: List[ASTNode]) -> List[Instruction]:
         instructions = []
@@ -29,8 +40,8 @@ class BytecodeGenerator:
     def _generate_node(self, node: ASTNode) -> List[Instruction]:
         if isinstance(node, LoadNode):
             return [
-                Instruction(OpCode.LOAD, [node.file_type, node.file_path]),
-                Instruction(OpCode.STORE, [node.variable_name])
+                Instruction(OpCode.LOAD, [node.format, node.file_path]),
+                Instruction(OpCode.STORE, [node.target])
             ]
         elif isinstance(node, AnalyzeNode):
             return [
@@ -38,5 +49,31 @@ class BytecodeGenerator:
                 Instruction(OpCode.ANALYZE, [node.operation, node.parameters]),
                 Instruction(OpCode.STORE, [node.output])
             ]
+        elif isinstance(node, ExportNode):
+            return [
+                Instruction(OpCode.EXPORT, [node.source, node.file_path, node.format])
+            ]
+        elif isinstance(node, AlignNode):
+            return [
+                Instruction(OpCode.ALIGN, [node.reads, node.reference, node.parameters]),
+                Instruction(OpCode.STORE, [node.output])
+            ]
+        elif isinstance(node, FilterNode):
+            return [
+                Instruction(OpCode.LOAD_VAR, [node.target]),
+                Instruction(OpCode.FILTER, [node.condition, node.parameters]),
+                Instruction(OpCode.STORE, [node.output])
+            ]
+        elif isinstance(node, SortNode):
+            return [
+                Instruction(OpCode.LOAD_VAR, [node.target]),
+                Instruction(OpCode.SORT, [node.key, node.parameters]),
+                Instruction(OpCode.STORE, [node.output])
+            ]
+        elif isinstance(node, MergeNode):
+            return [
+                Instruction(OpCode.MERGE, [node.inputs, node.options]),
+                Instruction(OpCode.STORE, [node.output])
+            ]
         # Add more node types...
         return [] 
\ No newline at end of file
@@ -8,6 +8,9 @@ class TokenType(Enum):
     ANALYZE = auto()
     FILTER = auto()
     EXPORT = auto()
+    ALIGN = auto()
+    SORT = auto()
+    MERGE = auto()
     TRAIN = auto()
     PREDICT = auto()
     MODEL = auto()
@@ -21,6 +24,7 @@ class TokenType(Enum):
     
     # Operators
     ARROW = auto()
+    EQUALS = auto()
     
     # Literals
     STRING = auto()
@@ -95,6 +99,19 @@ class Lexer:
         self.advance()
         return Token(TokenType.STRING, result, self.line, start_column + 1)
 
+    def _number(self) -> Token:
+        """Handle integer and decimal literals"""
+        result = ''
+        start_column = self.column
+
+        while self.current_char and (self.current_char.isdigit() or self.current_char == '.'):
+            result += self.current_char
+            self.advance()
+
+        if result.count('.') > 1:
+            self.error(f"Invalid number: {result}")
+        return Token(TokenType.NUMBER, result, self.line, start_column)
+
     def _identifier(self) -> Token:
         """Handle identifiers and keywords"""
         result = ''
@@ -110,6 +127,9 @@ class Lexer:
             'ANALYZE': TokenType.ANALYZE,
             'FILTER': TokenType.FILTER,
             'EXPORT': TokenType.EXPORT,
+            'ALIGN': TokenType.ALIGN,
+            'SORT': TokenType.SORT,
+            'MERGE': TokenType.MERGE,
             'TRAIN': TokenType.TRAIN,
             'PREDICT': TokenType.PREDICT,
             'MODEL': TokenType.MODEL,
@@ -150,6 +170,17 @@ class Lexer:
                 tokens.append(Token(TokenType.ARROW, "->", self.line, start_column))
                 continue
 
+            # Handle parameter assignment (k=21)
+            if self.current_char == '=':
+                tokens.append(Token(TokenType.EQUALS, "=", self.line, self.column))
+                self.advance()
+                continue
+
+            # Handle numbers
+            if self.current_char.isdigit():
+                tokens.append(self._number())
+                continue
+
             # Handle identifiers and keywords
             if self.current_char.isalpha():
                 tokens.append(self._identifier())
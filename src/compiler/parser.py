@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from .lexer import Token, TokenType
 
 @dataclass
@@ -17,12 +17,40 @@ class AnalyzeNode(ASTNode):
     target: str
     operation: str
     parameters: List[str]
+    output: Optional[str] = None
 
 @dataclass
 class FilterNode(ASTNode):
     target: str
     condition: str
     output: str
+    parameters: List[str] = field(default_factory=list)
+
+@dataclass
+class ExportNode(ASTNode):
+    source: str
+    file_path: str
+    format: Optional[str] = None
+
+@dataclass
+class AlignNode(ASTNode):
+    reads: str
+    reference: str
+    parameters: List[str]
+    output: Optional[str] = None
+
+@dataclass
+class SortNode(ASTNode):
+    target: str
+    key: str
+    parameters: List[str]
+    output: Optional[str] = None
+
+@dataclass
+class MergeNode(ASTNode):
+    inputs: List[str]
+    options: Dict[str, str] = field(default_factory=dict)
+    output: Optional[str] = None
 
 class Parser:
     def __init__(self, tokens: List[Token]):
@@ -41,12 +69,24 @@ class Parser:
             return self._parse_load()
         elif token.type == TokenType.ANALYZE:
             return self._parse_analyze()
+        elif token.type == TokenType.EXPORT:
+            return self._parse_export()
+        elif token.type == TokenType.ALIGN:
+            return self._parse_align()
+        elif token.type == TokenType.FILTER:
+            return self._parse_filter()
+        elif token.type == TokenType.SORT:
+            return self._parse_sort()
+        elif token.type == TokenType.MERGE:
+            return self._parse_merge()
         else:
             raise SyntaxError(f"Unexpected token {token.type} at line {token.line}")
 
     def _parse_load(self) -> LoadNode:
         self._advance()  # Consume LOAD
-        format_token = self._consume(TokenType.IDENTIFIER)
+        if self._peek().type not in (TokenType.IDENTIFIER, TokenType.FASTA, TokenType.VCF, TokenType.BAM):
+            raise SyntaxError(f"Expected file format at line {self._peek().line}")
+        format_token = self._advance()
         file_token = self._consume(TokenType.STRING)
         self._consume(TokenType.ARROW)
         target_token = self._consume(TokenType.IDENTIFIER)
@@ -76,14 +116,89 @@ class Parser:
 
     def _parse_analyze(self) -> AnalyzeNode:
         self._advance()  # Consume ANALYZE
-        target = self._consume(TokenType.IDENTIFIER).value
+        if self._peek().type == TokenType.STRING:
+            target = self._advance().value  # A file path, streamed without LOAD
+        else:
+            target = self._consume(TokenType.IDENTIFIER).value
         operation = self._consume(TokenType.IDENTIFIER).value
+        parameters = self._parse_flat_parameters()
+        return AnalyzeNode(target, operation, parameters, self._parse_output())
+
+    def _parse_parameters(self) -> List[Tuple[Optional[str], str]]:
+        """(key, value) pairs of key=value options, e.g. KMER k=21; positional parameters have no key"""
         parameters = []
-        
-        while not self._is_at_end() and self._peek().type != TokenType.EOF:
-            if self._peek().type == TokenType.IDENTIFIER:
-                parameters.append(self._advance().value)
-            else:
-                break
-                
-        return AnalyzeNode(target, operation, parameters) 
\ No newline at end of file
+        while self._peek().type in (TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING):
+            value = self._advance().value
+            key = None
+            if self._peek().type == TokenType.EQUALS:
+                self._advance()
+                if self._peek().type not in (TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING):
+                    raise SyntaxError(f"Expected value for {value} at line {self._peek().line}")
+                key, value = value, self._advance().value
+            parameters.append((key, value))
+        return parameters
+
+    def _parse_flat_parameters(self) -> List[str]:
+        """Parameters as strings, options written back as key=value"""
+        return [value if key is None else f"{key}={value}" for key, value in self._parse_parameters()]
+
+    def _parse_output(self) -> Optional[str]:
+        if self._peek().type == TokenType.ARROW:
+            self._advance()
+            return self._consume(TokenType.IDENTIFIER).value
+        return None
+
+    def _parse_align(self) -> AlignNode:
+        self._advance()  # Consume ALIGN
+        reads = self._consume(TokenType.IDENTIFIER).value
+        to_token = self._consume(TokenType.IDENTIFIER)
+        if to_token.value != 'TO':
+            raise SyntaxError(f"Expected TO but got {to_token.value} at line {to_token.line}")
+        reference = self._consume(TokenType.IDENTIFIER).value
+        parameters = self._parse_flat_parameters()
+        return AlignNode(reads, reference, parameters, self._parse_output())
+
+    def _parse_filter(self) -> FilterNode:
+        self._advance()  # Consume FILTER
+        target = self._consume(TokenType.IDENTIFIER).value
+        condition = self._consume(TokenType.IDENTIFIER).value
+        parameters = self._parse_flat_parameters()
+        output = self._parse_output()
+        if output is None:
+            raise SyntaxError(f"Expected -> output for FILTER at line {self._peek().line}")
+        return FilterNode(target, condition, output, parameters)
+
+    def _parse_sort(self) -> SortNode:
+        self._advance()  # Consume SORT
+        target = self._consume(TokenType.IDENTIFIER).value
+        by_token = self._consume(TokenType.IDENTIFIER)
+        if by_token.value != 'BY':
+            raise SyntaxError(f"Expected BY but got {by_token.value} at line {by_token.line}")
+        key = self._consume(TokenType.IDENTIFIER).value
+        parameters = self._parse_flat_parameters()
+        return SortNode(target, key, parameters, self._parse_output())
+
+    def _parse_merge(self) -> MergeNode:
+        self._advance()  # Consume MERGE
+        parameters = self._parse_parameters()
+        # Inputs are kept apart from options, so quoted paths may contain '='
+        inputs = [value for key, value in parameters if key is None]
+        if not inputs:
+            raise SyntaxError(f"Expected VCF inputs for MERGE at line {self._peek().line}")
+        options = {key.lower(): value for key, value in parameters if key is not None}
+        return MergeNode(inputs, options, self._parse_output())
+
+    def _parse_export(self) -> ExportNode:
+        self._advance()  # Consume EXPORT
+        source = self._consume(TokenType.IDENTIFIER).value
+        to_token = self._consume(TokenType.IDENTIFIER)
+        if to_token.value != 'TO':
+            raise SyntaxError(f"Expected TO but got {to_token.value} at line {to_token.line}")
+        file_path = self._consume(TokenType.STRING).value
+
+        # Optional explicit format, otherwise inferred from the file extension
+        file_format = None
+        if self._peek().type in (TokenType.IDENTIFIER, TokenType.FASTA, TokenType.VCF, TokenType.BAM):
+            file_format = self._advance().value
+
+        return ExportNode(source, file_path, file_format)
@@ -1,3 +1,4 @@
+import os
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,9 +6,15 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key"
     ALLOWED_HOSTS: list = ["*"]
     DATABASE_URL: str = "sqlite:///./genomescript.db"
+    # Per-user cache, independent of the working directory
+    CACHE_DIR: str = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "genomescript")
     
     # AI Model settings
     MODEL_PATH: str = "models/genomic_model.h5"
+    MODEL_REGISTRY: str = "models/registry"  # Versioned model artifacts; the latest is served when present
+    MODEL_SERVER: str = ""  # Unix socket of a shared model server; empty loads the model in-process
+    PREDICTION_CACHE: str = ""  # SQLite file persisting predictions across runs; empty keeps them in memory only
+    PREDICTION_CACHE_SIZE: int = 65536  # Predictions memoised in memory; 0 disables the cache
     
     # Blockchain settings
     ETH_NODE_URL: str = "http://localhost:8545"
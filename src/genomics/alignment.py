@@ -0,0 +1,597 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from struct import pack, unpack
+import json
+import os
+import tempfile
+import numpy as np
+import pysam
+from numpy.lib.stride_tricks import sliding_window_view
+from .kmer import encode_bases
+from .packed_sequence import PackedSequence
+from .records import iter_sequences, sequence_fields
+from ..utils.parallel import bounded_map, resolve_workers
+
+INDEX_MAGIC = b'GSMI'
+INDEX_VERSION = 1
+MAX_MINIMIZER_K = 28
+NEG_INF = -(1 << 30)
+
+_INDEXES: Dict[Tuple[str, float], 'MinimizerIndex'] = {}  # Per-process cache of mapped indexes
+
+def _hash64(keys: np.ndarray, mask: np.uint64) -> np.ndarray:
+    """Invertible integer hash so minimizers are not biased towards poly-A k-mers"""
+    keys = (~keys + (keys << np.uint64(21))) & mask
+    keys ^= keys >> np.uint64(24)
+    keys = (keys + (keys << np.uint64(3)) + (keys << np.uint64(8))) & mask
+    keys ^= keys >> np.uint64(14)
+    keys = (keys + (keys << np.uint64(2)) + (keys << np.uint64(4))) & mask
+    keys ^= keys >> np.uint64(28)
+    return (keys + (keys << np.uint64(31))) & mask
+
+def minimizers(codes: np.ndarray, k: int, w: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (w, k)-minimizers of a base-code array (A=0, C=1, G=2, T=3, other=4).
+
+    Returns hashes, start positions and strands (1 when the reverse
+    complement is the canonical k-mer). k-mers with non-ACGT bases and
+    palindromic k-mers are never selected.
+    """
+    if not 0 < k <= MAX_MINIMIZER_K:
+        raise ValueError(f"k must be between 1 and {MAX_MINIMIZER_K}, got {k}")
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+
+    invalid = codes > 3
+    bases = np.where(invalid, 0, codes).astype(np.uint64)
+    forward = np.zeros(n, dtype=np.uint64)
+    reverse = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        forward = (forward << np.uint64(2)) | bases[j:j + n]
+        reverse |= (np.uint64(3) - bases[j:j + n]) << np.uint64(2 * j)
+    invalid_prefix = np.concatenate(([0], np.cumsum(invalid, dtype=np.int64)))
+    valid = (invalid_prefix[k:] == invalid_prefix[:-k]) & (forward != reverse)
+
+    mask = np.uint64((1 << (2 * k)) - 1)
+    hashes = _hash64(np.minimum(forward, reverse), mask)
+    hashes[~valid] = np.iinfo(np.uint64).max
+    if n <= w:
+        positions = np.array([np.argmin(hashes)])
+    else:
+        positions = np.unique(sliding_window_view(hashes, w).argmin(axis=1) + np.arange(n - w + 1))
+    positions = positions[valid[positions]]
+    strands = (reverse[positions] < forward[positions]).astype(np.uint8)
+    return hashes[positions], positions.astype(np.int64), strands
+
+class MinimizerIndex:
+    """
+    Sorted minimizer table over a reference, with the reference base codes.
+
+    Contigs are concatenated into one coordinate space (`offsets` maps
+    contigs to it). The table and reference can be saved to a single file
+    that `load` memory-maps, so large indexes are shared between worker
+    processes through the page cache instead of being copied.
+
+    Example:
+        >>> index = MinimizerIndex.build(genome, k=15, w=10)
+        >>> index.save("genome.gsi")
+        >>> index = MinimizerIndex.load("genome.gsi")
+    """
+    def __init__(self, k: int, w: int, names: List[str], lengths: List[int], hashes: np.ndarray,
+                 positions: np.ndarray, strands: np.ndarray, reference: np.ndarray,
+                 source: Optional[List[int]] = None, path: Optional[str] = None):
+        self.k = k
+        self.w = w
+        self.names = names
+        self.lengths = lengths
+        self.offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        self.hashes = hashes
+        self.positions = positions
+        self.strands = strands
+        self.reference = reference
+        self.source = source  # [size, mtime_ns] of the reference file the index was built from
+        self.path = path
+
+    @classmethod
+    def build(cls, data: Any, k: int = 15, w: int = 10) -> 'MinimizerIndex':
+        """Index every sequence in `data`"""
+        names, lengths, codes, hashes, positions, strands = [], [], [], [], [], []
+        offset = 0
+        for name, sequence in iter_sequences(data):
+            contig_codes = (sequence.base_codes() if isinstance(sequence, PackedSequence)
+                            else encode_bases(sequence))
+            contig_hashes, contig_positions, contig_strands = minimizers(contig_codes, k, w)
+            names.append(name.split()[0] if name else f"seq{len(names)}")
+            lengths.append(len(contig_codes))
+            codes.append(contig_codes)
+            hashes.append(contig_hashes)
+            positions.append(contig_positions + offset)
+            strands.append(contig_strands)
+            offset += len(contig_codes)
+        if not names:
+            raise ValueError("Cannot index an empty reference")
+
+        hashes = np.concatenate(hashes)
+        order = np.argsort(hashes, kind='stable')
+        return cls(k, w, names, lengths, hashes[order], np.concatenate(positions)[order],
+                   np.concatenate(strands)[order], np.concatenate(codes))
+
+    def _arrays(self) -> List[np.ndarray]:
+        return [self.hashes.astype('<u8'), self.positions.astype('<i8'),
+                self.strands.astype(np.uint8), self.reference.astype(np.uint8)]
+
+    def save(self, file_path: str):
+        """Write the index in its memory-mappable layout"""
+        header = json.dumps({'k': self.k, 'w': self.w, 'names': self.names,
+                             'lengths': [int(n) for n in self.lengths],
+                             'minimizers': len(self.hashes), 'source': self.source}).encode()
+        header += b' ' * (-(len(header) + 12) % 8)
+        with open(file_path, 'wb') as f:
+            f.write(INDEX_MAGIC + pack('<II', INDEX_VERSION, len(header)) + header)
+            for array in self._arrays():
+                f.write(array.tobytes())
+                f.write(b'\x00' * (-array.nbytes % 8))
+
+    @classmethod
+    def load(cls, file_path: str) -> 'MinimizerIndex':
+        """Memory-map a saved index (cached per process)"""
+        key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+        if key in _INDEXES:
+            return _INDEXES[key]
+        with open(file_path, 'rb') as f:
+            magic, (version, header_size) = f.read(4), unpack('<II', f.read(8))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"Not a minimizer index: {file_path}")
+            header = json.loads(f.read(header_size))
+        offset = 12 + header_size
+        arrays = []
+        for dtype, count in (('<u8', header['minimizers']), ('<i8', header['minimizers']),
+                             (np.uint8, header['minimizers']), (np.uint8, sum(header['lengths']))):
+            nbytes = np.dtype(dtype).itemsize * count
+            arrays.append(np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+                          if count else np.empty(0, dtype=dtype))
+            offset += nbytes + (-nbytes % 8)
+        index = cls(header['k'], header['w'], header['names'], header['lengths'], *arrays,
+                    source=header.get('source'), path=file_path)
+        _INDEXES[key] = index
+        return index
+
+    def __reduce__(self):
+        # File-backed indexes travel to worker processes as a path and are re-mapped there
+        if self.path:
+            return (MinimizerIndex.load, (self.path,))
+        return (MinimizerIndex, (self.k, self.w, self.names, self.lengths, self.hashes,
+                                 self.positions, self.strands, self.reference, self.source))
+
+    def lookup(self, hashes: np.ndarray, max_occurrences: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reference hits of query minimizers, skipping repetitive ones.
+
+        Returns (query minimizer index, index into the table) for every hit.
+        """
+        lo = np.searchsorted(self.hashes, hashes, side='left')
+        hi = np.searchsorted(self.hashes, hashes, side='right')
+        counts = np.where(hi - lo <= max_occurrences, hi - lo, 0)
+        total = int(counts.sum())
+        query = np.repeat(np.arange(len(hashes)), counts)
+        table = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        return query, table
+
+    def contig_of(self, positions: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.offsets, positions, side='right') - 1
+
+    def header(self) -> pysam.AlignmentHeader:
+        return pysam.AlignmentHeader.from_dict({
+            'HD': {'VN': '1.6', 'SO': 'coordinate'},
+            'SQ': [{'SN': name, 'LN': int(length)} for name, length in zip(self.names, self.lengths)],
+        })
+
+def open_or_build(data: Any, file_path: Optional[str] = None, source: Optional[str] = None,
+                  k: Optional[int] = None, w: Optional[int] = None) -> MinimizerIndex:
+    """
+    Map the index saved at `file_path`, or build it from `data` and save it there.
+
+    A saved index is rebuilt when a given k or w differs from its own, or
+    when the `source` reference file changed size or mtime since the index
+    was built. Without `data` (no reference at hand) a saved index with
+    matching k and w is used as is.
+    """
+    stamp = None
+    if source and os.path.exists(source):
+        stat = os.stat(source)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+    if file_path and os.path.exists(file_path):
+        index = MinimizerIndex.load(file_path)
+        if (k is None or index.k == k) and (w is None or index.w == w) and (data is None or index.source == stamp):
+            return index
+    if data is None:
+        raise ValueError(f"No reference to build a (k={k}, w={w}) minimizer index from")
+    index = MinimizerIndex.build(data, k=k or 15, w=w or 10)
+    index.source = stamp
+    if not file_path:
+        return index
+    index.save(file_path)
+    return MinimizerIndex.load(file_path)
+
+def chain_anchors(ref: np.ndarray, query: np.ndarray, group: np.ndarray, k: int,
+                  max_gap: int = 5000, lookback: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Co-linear chaining DP over anchors sorted by (group, ref, query).
+
+    An anchor extends a predecessor in the same group (contig and strand)
+    that lies before it on both sequences within `max_gap`; the gain is the
+    number of new bases covered minus a gap penalty for the diagonal shift.
+    Returns (scores, predecessors), with -1 marking chain starts.
+    """
+    n = len(ref)
+    scores = np.full(n, float(k))
+    parents = np.full(n, -1, dtype=np.int64)
+    for i in range(1, n):
+        j = np.arange(max(0, i - lookback), i)
+        dr = ref[i] - ref[j]
+        dq = query[i] - query[j]
+        ok = (group[j] == group[i]) & (dr > 0) & (dq > 0) & (dr <= max_gap) & (dq <= max_gap)
+        if not ok.any():
+            continue
+        j, dr, dq = j[ok], dr[ok], dq[ok]
+        gap = np.abs(dr - dq)
+        gain = np.minimum(np.minimum(dr, dq), k) - 0.01 * k * gap - 0.5 * np.log2(gap + 1)
+        candidate = scores[j] + gain
+        best = int(np.argmax(candidate))
+        if candidate[best] > scores[i]:
+            scores[i] = candidate[best]
+            parents[i] = j[best]
+    return scores, parents
+
+PAD = 5  # Code of padding around queries and targets; it never scores positively
+PAD_SCORE = -(1 << 20)
+MAX_TRACE_BYTES = 64 * 1024 * 1024  # Traceback memory per batch of alignments
+
+def _substitution_matrix(match: int, mismatch: int) -> np.ndarray:
+    """Scores indexed by base code pairs; N scores -1 against anything"""
+    matrix = np.full((6, 6), -mismatch, dtype=np.int32)
+    np.fill_diagonal(matrix, match)
+    matrix[4, :] = matrix[:, 4] = -1
+    matrix[PAD, :] = matrix[:, PAD] = PAD_SCORE
+    return matrix
+
+def _traceback(trace: np.ndarray, i: int, j: int, band_lo: int) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """Walk the H/E/F states back from (i, j); returns the start cell and CIGAR tuples"""
+    ops: List[int] = []
+    state = 0
+    while i > 0 and j > 0:
+        code = int(trace[i, j - i - band_lo])
+        if state == 0:
+            source = code & 3
+            if source == 0:
+                break
+            if source == 1:
+                ops.append(0)
+                i, j = i - 1, j - 1
+            else:
+                state = source - 1
+        elif state == 1:  # gap in the query: deletion from the target
+            ops.append(2)
+            state = 1 if code & 4 else 0
+            j -= 1
+        else:  # gap in the target: insertion in the query
+            ops.append(1)
+            state = 2 if code & 8 else 0
+            i -= 1
+
+    cigar: List[Tuple[int, int]] = []
+    for op in reversed(ops):
+        if cigar and cigar[-1][0] == op:
+            cigar[-1] = (op, cigar[-1][1] + 1)
+        else:
+            cigar.append((op, 1))
+    return i, j, cigar
+
+def banded_smith_waterman_batch(queries: List[np.ndarray], targets: List[np.ndarray], band_lo: int,
+                                band_hi: int, match: int = 2, mismatch: int = 4, gap_open: int = 4,
+                                gap_extend: int = 2) -> List[Tuple[int, int, int, int, int, List[Tuple[int, int]]]]:
+    """
+    Banded local alignment of many query/target pairs at once.
+
+    Cells are filled one anti-diagonal at a time: every cell on an
+    anti-diagonal depends only on the previous two, so each step is one
+    vectorized NumPy update over the band of every pair in the batch.
+    Pairs are padded to a common shape with a symbol that never scores
+    positively. Returns one (score, query start, query end, target start,
+    target end, CIGAR tuples) per pair, with half-open coordinates.
+    """
+    count = len(queries)
+    m = max(len(q) for q in queries)
+    n = max(len(t) for t in targets)
+    query = np.full((count, m), PAD, dtype=np.uint8)
+    target = np.full((count, n), PAD, dtype=np.uint8)
+    for row, (q, t) in enumerate(zip(queries, targets)):
+        query[row, :len(q)] = q
+        target[row, :len(t)] = t
+
+    scores = _substitution_matrix(match, mismatch)
+    open_cost, extend_cost = gap_open + gap_extend, gap_extend
+    trace = np.zeros((count, m + 1, band_hi - band_lo + 1), dtype=np.uint8)
+    rows = np.arange(count)
+
+    h2 = np.zeros((count, m + 1), dtype=np.int32)
+    h1 = np.zeros((count, m + 1), dtype=np.int32)
+    e1 = np.full((count, m + 1), NEG_INF, dtype=np.int32)
+    f1 = np.full((count, m + 1), NEG_INF, dtype=np.int32)
+    best = np.zeros(count, dtype=np.int32)
+    best_i = np.zeros(count, dtype=np.int64)
+    best_t = np.zeros(count, dtype=np.int64)
+    for t in range(2, m + n + 1):
+        lo = max(1, t - n, -((band_hi - t) // 2))
+        hi = min(m, t - 1, (t - band_lo) // 2)
+        h0 = np.zeros((count, m + 1), dtype=np.int32)
+        e0 = np.full((count, m + 1), NEG_INF, dtype=np.int32)
+        f0 = np.full((count, m + 1), NEG_INF, dtype=np.int32)
+        if lo <= hi:
+            i = np.arange(lo, hi + 1)
+            e_open, e_extend = h1[:, lo:hi + 1] - open_cost, e1[:, lo:hi + 1] - extend_cost
+            f_open, f_extend = h1[:, lo - 1:hi] - open_cost, f1[:, lo - 1:hi] - extend_cost
+            e = np.maximum(e_open, e_extend)
+            f = np.maximum(f_open, f_extend)
+            diagonal = h2[:, lo - 1:hi] + scores[query[:, lo - 1:hi], target[:, t - i - 1]]
+            h = np.maximum(np.maximum(diagonal, 0), np.maximum(e, f))
+
+            # Source of H in the low two bits (0 start, 1 diagonal, 2 E, 3 F), gap extensions above
+            source = np.where(h == diagonal, 1, np.where(h == e, 2, 3))
+            source[h == 0] = 0
+            trace[:, i, t - 2 * i - band_lo] = (source | ((e_extend > e_open) << 2)
+                                                | ((f_extend > f_open) << 3))
+            h0[:, lo:hi + 1], e0[:, lo:hi + 1], f0[:, lo:hi + 1] = h, e, f
+
+            top = np.argmax(h, axis=1)
+            values = h[rows, top]
+            better = values > best
+            best[better] = values[better]
+            best_i[better] = lo + top[better]
+            best_t[better] = t
+        h2, h1, e1, f1 = h1, h0, e0, f0
+
+    results = []
+    for row in range(count):
+        end_i, end_j = int(best_i[row]), int(best_t[row] - best_i[row])
+        start_i, start_j, cigar = _traceback(trace[row], end_i, end_j, band_lo)
+        results.append((int(best[row]), start_i, end_i, start_j, end_j, cigar))
+    return results
+
+def banded_smith_waterman(query: np.ndarray, target: np.ndarray, band_lo: int, band_hi: int,
+                          match: int = 2, mismatch: int = 4, gap_open: int = 4,
+                          gap_extend: int = 2) -> Tuple[int, int, int, int, int, List[Tuple[int, int]]]:
+    """
+    Local alignment with affine gaps, restricted to diagonals band_lo <= j - i <= band_hi.
+
+    A gap of length L costs gap_open + L * gap_extend.
+    """
+    return banded_smith_waterman_batch([query], [target], band_lo, band_hi,
+                                       match, mismatch, gap_open, gap_extend)[0]
+
+def _reverse_complement_codes(codes: np.ndarray) -> np.ndarray:
+    codes = codes[::-1]
+    return np.where(codes < 4, 3 - codes, codes).astype(np.uint8)
+
+_BASE_LETTERS = np.frombuffer(b"ACGTN", dtype=np.uint8)
+
+@dataclass
+class AlignmentHit:
+    """Best local alignment of one read (contig -1 when unmapped)"""
+    name: str
+    contig: int
+    start: int
+    reverse: bool
+    cigar: List[Tuple[int, int]]
+    score: int
+    mapq: int
+
+@dataclass
+class Alignments:
+    """Aligned reads as coordinate-sorted pysam records, exportable as BAM"""
+    header: pysam.AlignmentHeader
+    records: List[pysam.AlignedSegment]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[pysam.AlignedSegment]:
+        return iter(self.records)
+
+    @property
+    def mapped(self) -> int:
+        return sum(1 for record in self.records if not record.is_unmapped)
+
+class Aligner:
+    """
+    Seed-chain-extend read aligner.
+
+    Query minimizers are looked up in a `MinimizerIndex`, anchors are
+    chained per contig and strand, and the best distinct chains are
+    extended with a banded Smith-Waterman around the chain's diagonal.
+    The extensions of a whole batch of reads run through one vectorized
+    DP, and batches are spread across worker processes.
+
+    Example:
+        >>> aligner = Aligner(MinimizerIndex.build(genome))
+        >>> alignments = aligner.align(reads)
+    """
+    def __init__(self, index: MinimizerIndex, band: int = 32, match: int = 2, mismatch: int = 4,
+                 gap_open: int = 4, gap_extend: int = 2, max_occurrences: int = 200,
+                 min_chain_score: float = 25, min_score: int = 30, max_candidates: int = 5,
+                 workers: Optional[int] = None, batch_size: int = 256):
+        self.index = index
+        self.band = band
+        self.match = match
+        self.mismatch = mismatch
+        self.gap_open = gap_open
+        self.gap_extend = gap_extend
+        self.max_occurrences = max_occurrences
+        self.min_chain_score = min_chain_score
+        self.min_score = min_score
+        self.max_candidates = max_candidates
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _candidates(self, codes: np.ndarray) -> List[Tuple[int, bool, int]]:
+        """Best distinct chains as (contig, reverse, diagonal in contig coordinates)"""
+        index, k = self.index, self.index.k
+        hashes, query_positions, query_strands = minimizers(codes, k, index.w)
+        query, table = index.lookup(hashes, self.max_occurrences)
+        if len(query) == 0:
+            return []
+
+        ref = index.positions[table]
+        reverse = (query_strands[query] ^ index.strands[table]).astype(bool)
+        # Reverse-strand anchors use coordinates on the reverse-complemented read
+        qpos = np.where(reverse, len(codes) - (query_positions[query] + k), query_positions[query])
+        group = index.contig_of(ref) * 2 + reverse
+        order = np.lexsort((qpos, ref, group))
+        ref, qpos, group = ref[order], qpos[order], group[order]
+        scores, parents = chain_anchors(ref, qpos, group, k)
+
+        used = np.zeros(len(ref), dtype=bool)
+        candidates: List[Tuple[int, bool, int]] = []
+        for end in np.argsort(-scores, kind='stable'):
+            if len(candidates) >= self.max_candidates or scores[end] < self.min_chain_score:
+                break
+            if used[end]:
+                continue
+            members, anchor = [], int(end)
+            while anchor >= 0 and not used[anchor]:
+                members.append(anchor)
+                used[anchor] = True
+                anchor = int(parents[anchor])
+            contig = int(group[end] // 2)
+            strand = bool(group[end] % 2)
+            diagonal = int(np.median(ref[members] - qpos[members])) - int(index.offsets[contig])
+            # Fragments of an already selected chain fall inside its band
+            if not any(c == contig and r == strand and abs(d - diagonal) <= self.band
+                       for c, r, d in candidates):
+                candidates.append((contig, strand, diagonal))
+        return candidates
+
+    def _target(self, contig: int, diagonal: int, length: int) -> Tuple[int, np.ndarray]:
+        """Reference window around a diagonal, padded so the diagonal sits `band` columns in"""
+        start, stop = diagonal - self.band, diagonal + length + self.band
+        contig_length = self.index.lengths[contig]
+        offset = int(self.index.offsets[contig])
+        window = np.asarray(self.index.reference[offset + max(start, 0):offset + min(stop, contig_length)])
+        return start, np.concatenate((np.full(max(0, -start), PAD, dtype=np.uint8), window,
+                                      np.full(max(0, stop - contig_length), PAD, dtype=np.uint8)))
+
+    def _extend(self, jobs: List[Tuple[int, int, bool, np.ndarray]]) -> List[Tuple[int, int, int, List[Tuple[int, int]]]]:
+        """Banded Smith-Waterman of (read, contig, reverse, query) jobs, in memory-bounded batches"""
+        results = []
+        width = 2 * self.band + 1
+        for start in range(0, len(jobs), self.batch_size):
+            batch = jobs[start:start + self.batch_size]
+            longest = max(len(query) for _, _, _, query in batch) + 1
+            step = max(1, MAX_TRACE_BYTES // (longest * width))
+            for sub in range(0, len(batch), step):
+                queries, targets, starts = [], [], []
+                for _, contig, diagonal, query in batch[sub:sub + step]:
+                    target_start, target = self._target(contig, diagonal, len(query))
+                    queries.append(query)
+                    targets.append(target)
+                    starts.append(target_start)
+                aligned = banded_smith_waterman_batch(queries, targets, 0, 2 * self.band, self.match,
+                                                      self.mismatch, self.gap_open, self.gap_extend)
+                for query, target_start, (score, q_start, q_end, t_start, _, cigar) in zip(queries, starts, aligned):
+                    clips = [(4, q_start)] if q_start else []
+                    tail = [(4, len(query) - q_end)] if q_end < len(query) else []
+                    results.append((score, target_start + t_start, clips + cigar + tail))
+        return results
+
+    def align_reads(self, reads: List[Tuple[str, str]]) -> List[AlignmentHit]:
+        """Best alignment of every (name, sequence) read"""
+        jobs, keys = [], []
+        for read, (_, sequence) in enumerate(reads):
+            codes = encode_bases(sequence)
+            for contig, reverse, diagonal in self._candidates(codes):
+                query = _reverse_complement_codes(codes) if reverse else codes
+                jobs.append((read, contig, diagonal, query))
+                keys.append((read, contig, reverse))
+
+        found: Dict[int, List[Tuple[int, int, int, bool, List[Tuple[int, int]]]]] = {}
+        for (read, contig, reverse), (score, start, cigar) in zip(keys, self._extend(jobs) if jobs else []):
+            if score >= self.min_score:
+                found.setdefault(read, []).append((score, contig, start, reverse, cigar))
+
+        hits = []
+        for read, (name, _) in enumerate(reads):
+            results = sorted(found.get(read, []), key=lambda r: -r[0])
+            if not results:
+                hits.append(AlignmentHit(name, -1, -1, False, [], 0, 0))
+                continue
+            score, contig, start, reverse, cigar = results[0]
+            second = results[1][0] if len(results) > 1 else 0
+            mapq = int(round(60 * (1 - second / score)))
+            hits.append(AlignmentHit(name, contig, start, reverse, cigar, score, mapq))
+        return hits
+
+    def _records(self, hits: List[AlignmentHit], reads: List[Tuple[str, str, Any]],
+                 header: pysam.AlignmentHeader) -> List[pysam.AlignedSegment]:
+        records = []
+        for hit, (name, sequence, qualities) in zip(hits, reads):
+            record = pysam.AlignedSegment(header)
+            record.query_name = name.split()[0] if name else '*'
+            if qualities is not None:
+                qualities = list(qualities)
+            if hit.contig < 0:
+                record.flag = 4
+                record.reference_id = -1
+                record.reference_start = -1
+            else:
+                if hit.reverse:
+                    codes = _reverse_complement_codes(encode_bases(sequence))
+                    sequence = _BASE_LETTERS[np.minimum(codes, 4)].tobytes().decode()
+                    qualities = qualities[::-1] if qualities is not None else None
+                record.flag = 16 if hit.reverse else 0
+                record.reference_id = hit.contig
+                record.reference_start = hit.start
+                record.mapping_quality = hit.mapq
+                record.cigartuples = hit.cigar
+                record.set_tag('AS', hit.score)
+            record.query_sequence = sequence
+            if qualities is not None:
+                record.query_qualities = pysam.qualitystring_to_array(
+                    ''.join(chr(q + 33) for q in qualities))
+            records.append(record)
+        return records
+
+    def align(self, data: Any) -> Alignments:
+        """Align every read in `data`, returning coordinate-sorted records"""
+        if hasattr(data, 'reset'):
+            data.reset()
+        reads = []
+        for record in data:
+            name, sequence, qualities = sequence_fields(record)
+            reads.append((name, str(sequence), qualities))
+
+        aligner = self
+        with tempfile.TemporaryDirectory() as scratch:
+            if self.index.path is None and resolve_workers(self.workers) > 1 and len(reads) > self.batch_size:
+                # Share an in-memory index with workers through a mapped file
+                path = os.path.join(scratch, "reference.gsi")
+                self.index.save(path)
+                aligner = _with_index(self, MinimizerIndex.load(path))
+            tasks = ((aligner, [(name, sequence) for name, sequence, _ in reads[start:start + self.batch_size]])
+                     for start in range(0, len(reads), self.batch_size))
+            hits = [hit for batch in bounded_map(_align_batch, tasks, self.workers) for hit in batch]
+
+        header = self.index.header()
+        records = self._records(hits, reads, header)
+        records.sort(key=lambda r: (r.reference_id < 0, r.reference_id, r.reference_start))
+        return Alignments(header, records)
+
+def _with_index(aligner: Aligner, index: MinimizerIndex) -> Aligner:
+    copy = object.__new__(Aligner)
+    copy.__dict__.update(aligner.__dict__, index=index)
+    return copy
+
+def _align_batch(task: Tuple[Aligner, List[Tuple[str, str]]]) -> List[AlignmentHit]:
+    """Align one batch of reads; runs in a worker process"""
+    aligner, reads = task
+    return aligner.align_reads(reads)
@@ -0,0 +1,413 @@
+from typing import BinaryIO, Deque, Dict, List, Optional, Tuple, Union
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from enum import Enum
+from struct import pack, unpack_from
+import gzip
+import io
+import multiprocessing
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd input is optional
+    zstandard = None
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024  # 1MB read buffer
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+BGZF_HEADER_SIZE = 18  # Fixed gzip header (12) + the 'BC' extra subfield (6)
+
+class CompressionType(Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    BGZF = "bgzf"
+    ZSTD = "zstd"
+
+def detect_compression(file_path: str) -> CompressionType:
+    """Detect input compression from the leading magic bytes"""
+    with open(file_path, 'rb') as f:
+        header = f.read(BGZF_HEADER_SIZE)
+
+    if header.startswith(ZSTD_MAGIC):
+        return CompressionType.ZSTD
+    if header.startswith(GZIP_MAGIC):
+        if _has_bgzf_subfield(header):
+            return CompressionType.BGZF
+        return CompressionType.GZIP
+    return CompressionType.NONE
+
+def _has_bgzf_subfield(header: bytes) -> bool:
+    """Check a gzip member header for the BGZF 'BC' extra subfield"""
+    if len(header) < 12 or header[2] != 8 or not header[3] & 0x04:
+        return False
+    xlen = unpack_from('<H', header, 10)[0]
+    extra = header[12:12 + xlen]
+    pos = 0
+    while pos + 4 <= len(extra):
+        slen = unpack_from('<H', extra, pos + 2)[0]
+        if extra[pos:pos + 2] == b'BC' and slen == 2:
+            return True
+        pos += 4 + slen
+    return False
+
+_SHARED_POOL: Optional[Tuple[int, ThreadPoolExecutor, int]] = None
+_SHARED_POOL_LOCK = threading.Lock()
+
+def _shared_pool() -> Tuple[ThreadPoolExecutor, int]:
+    """
+    This process's BGZF decompression pool and its size, shared by all readers.
+    Worker processes get a single thread, since their parent already runs one per CPU
+    """
+    global _SHARED_POOL
+    with _SHARED_POOL_LOCK:
+        # A forked child inherits the pool object but none of its threads
+        if _SHARED_POOL is None or _SHARED_POOL[0] != os.getpid():
+            threads = 1 if multiprocessing.parent_process() is not None else os.cpu_count() or 1
+            _SHARED_POOL = (os.getpid(), ThreadPoolExecutor(max_workers=threads), threads)
+        return _SHARED_POOL[1], _SHARED_POOL[2]
+
+class BGZFReader(io.RawIOBase):
+    """
+    Seekable reader for BGZF files that decompresses blocks in parallel.
+
+    BGZF blocks are independent deflate streams, so blocks ahead of the
+    read position are handed to a thread pool (zlib releases the GIL) while
+    the caller consumes the current one. Block boundaries are discovered
+    from the block headers without decompressing, which also gives the
+    uncompressed offset of every block for random seeks.
+
+    By default readers share one per-process pool (one thread per CPU, or
+    a single thread inside worker processes), so opening many files does
+    not multiply threads; pass `threads` for a private pool.
+
+    Example:
+        >>> with io.BufferedReader(BGZFReader("reads.fq.gz")) as f:
+        ...     header = f.readline()
+    """
+    def __init__(self, file_path: str, threads: Optional[int] = None,
+                 readahead: Optional[int] = None):
+        super().__init__()
+        self.name = file_path
+        self._fd = os.open(file_path, os.O_RDONLY)
+        self._file_size = os.fstat(self._fd).st_size
+        if threads:
+            self._executor, self._owns_executor = ThreadPoolExecutor(max_workers=threads), True
+        else:
+            (self._executor, threads), self._owns_executor = _shared_pool(), False
+        self._readahead = readahead or 4 * threads
+
+        # Block index, extended lazily as the file is scanned
+        self._coffsets: List[int] = []
+        self._csizes: List[int] = []
+        self._ustarts: List[int] = [0]
+        self._scan_offset = 0
+
+        self._pending: Dict[int, Future] = {}
+        self._block_index = -1
+        self._block = b''
+        self._block_pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _scan_block(self) -> bool:
+        """Add the next block to the index; False once the file is exhausted"""
+        offset = self._scan_offset
+        if offset >= self._file_size:
+            return False
+
+        header = os.pread(self._fd, BGZF_HEADER_SIZE, offset)
+        if len(header) < BGZF_HEADER_SIZE or not _has_bgzf_subfield(header):
+            raise ValueError(f"Invalid BGZF block at offset {offset}")
+
+        xlen = unpack_from('<H', header, 10)[0]
+        extra = os.pread(self._fd, xlen, offset + 12)
+        block_size = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            slen = unpack_from('<H', extra, pos + 2)[0]
+            if extra[pos:pos + 2] == b'BC':
+                block_size = unpack_from('<H', extra, pos + 4)[0] + 1
+            pos += 4 + slen
+        if block_size is None or offset + block_size > self._file_size:
+            raise ValueError(f"Truncated BGZF block at offset {offset}")
+
+        isize = unpack_from('<I', os.pread(self._fd, 4, offset + block_size - 4))[0]
+        self._coffsets.append(offset)
+        self._csizes.append(block_size)
+        self._ustarts.append(self._ustarts[-1] + isize)
+        self._scan_offset = offset + block_size
+        return True
+
+    def _ensure_scanned(self, index: int) -> bool:
+        while len(self._coffsets) <= index:
+            if not self._scan_block():
+                return False
+        return True
+
+    def _decompress_block(self, index: int) -> bytes:
+        """Read and inflate one block; runs on a worker thread"""
+        data = os.pread(self._fd, self._csizes[index], self._coffsets[index])
+        xlen = unpack_from('<H', data, 10)[0]
+        crc, isize = unpack_from('<II', data, len(data) - 8)
+        block = zlib.decompress(data[12 + xlen:-8], -15)
+        if len(block) != isize or zlib.crc32(block) != crc:
+            raise ValueError(f"Corrupt BGZF block at offset {self._coffsets[index]}")
+        return block
+
+    def _schedule(self, index: int):
+        if index not in self._pending and self._ensure_scanned(index):
+            self._pending[index] = self._executor.submit(self._decompress_block, index)
+
+    def _load_block(self, index: int) -> bool:
+        """Make block `index` current, keeping the read-ahead window full"""
+        if not self._ensure_scanned(index):
+            return False
+        for i in range(index, index + self._readahead):
+            self._schedule(i)
+        self._block = self._pending.pop(index).result()
+        self._block_index = index
+        self._block_pos = 0
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        written = 0
+        while written < len(view):
+            if self._block_pos >= len(self._block):
+                if not self._load_block(self._block_index + 1):
+                    break
+                continue
+            n = min(len(view) - written, len(self._block) - self._block_pos)
+            view[written:written + n] = self._block[self._block_pos:self._block_pos + n]
+            self._block_pos += n
+            written += n
+        return written
+
+    def tell(self) -> int:
+        if self._block_index < 0:
+            return 0
+        return self._ustarts[self._block_index] + self._block_pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+        elif whence == io.SEEK_END:
+            while self._scan_block():
+                pass
+            offset += self._ustarts[-1]
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"Invalid whence: {whence}")
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+
+        while self._ustarts[-1] <= offset and self._scan_block():
+            pass
+        index = max(0, min(bisect_right(self._ustarts, offset) - 1, len(self._coffsets) - 1))
+
+        # Drop read-ahead that the new position will not use
+        for i in list(self._pending):
+            if not index <= i < index + self._readahead:
+                self._pending.pop(i).cancel()
+
+        if self._coffsets and index != self._block_index:
+            self._load_block(index)
+        self._block_pos = offset - self._ustarts[index] if self._coffsets else 0
+        return offset
+
+    def close(self):
+        if not self.closed:
+            futures = list(self._pending.values())
+            for future in futures:
+                future.cancel()
+            self._pending.clear()
+            if self._owns_executor:
+                self._executor.shutdown(wait=True)
+            else:
+                # Blocks still inflating on the shared pool read from this descriptor
+                wait(futures)
+            os.close(self._fd)
+        super().close()
+
+BGZF_MAX_BLOCK_SIZE = 0x10000  # Compressed and uncompressed block sizes are capped at 64 KiB
+
+def _inflate_bgzf_block(data: bytes, offset: int) -> Optional[Tuple[bytes, int]]:
+    """Inflate the block at data[offset:], or None if no valid block starts there"""
+    header = data[offset:offset + BGZF_HEADER_SIZE]
+    if len(header) < BGZF_HEADER_SIZE or not _has_bgzf_subfield(header):
+        return None
+    xlen = unpack_from('<H', header, 10)[0]
+    extra = data[offset + 12:offset + 12 + xlen]
+    block_size, pos = None, 0
+    while pos + 4 <= len(extra):
+        slen = unpack_from('<H', extra, pos + 2)[0]
+        if extra[pos:pos + 2] == b'BC' and slen == 2 and pos + 6 <= len(extra):
+            block_size = unpack_from('<H', extra, pos + 4)[0] + 1
+        pos += 4 + slen
+    if block_size is None or offset + block_size > len(data):
+        return None
+    block = data[offset:offset + block_size]
+    crc, isize = unpack_from('<II', block, block_size - 8)
+    try:
+        payload = zlib.decompress(block[12 + xlen:-8], -15)
+    except zlib.error:
+        return None
+    if len(payload) != isize or zlib.crc32(payload) != crc:
+        return None
+    return payload, block_size
+
+def read_bgzf_blocks_at(file_path: str, offset: int, count: int = 2) -> Tuple[int, int, List[bytes]]:
+    """
+    Inflate `count` consecutive BGZF blocks from the first block at or after a
+    compressed byte offset.
+
+    The block start is found by searching for the gzip magic and accepting
+    the first candidate whose header, size and CRC check out, so any offset
+    can be sampled without scanning the file from the start. Returns (block
+    offset, size of the first block, payloads); the offset is -1 when no
+    block follows.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read((count + 1) * BGZF_MAX_BLOCK_SIZE)
+    pos = data.find(GZIP_MAGIC)
+    while 0 <= pos < BGZF_MAX_BLOCK_SIZE + 1:
+        first = _inflate_bgzf_block(data, pos)
+        if first is not None:
+            payloads, size, cursor = [first[0]], first[1], pos + first[1]
+            while len(payloads) < count:
+                block = _inflate_bgzf_block(data, cursor)
+                if block is None:
+                    break
+                payloads.append(block[0])
+                cursor += block[1]
+            return offset + pos, size, payloads
+        pos = data.find(GZIP_MAGIC, pos + 1)
+    return -1, 0, []
+
+def open_input(file_path: str, mode: str = 'rb', threads: Optional[int] = None,
+               buffer_size: int = DEFAULT_BUFFER_SIZE) -> Union[BinaryIO, io.TextIOWrapper]:
+    """
+    Open a genomic input file, transparently decompressing gzip, BGZF or zstd.
+
+    Returns a buffered binary reader, or a text reader when `mode` is 'r'/'rt'.
+    BGZF input is decompressed in parallel by `threads` worker threads, or
+    by the process's shared pool when `threads` is None.
+    """
+    if mode not in ('r', 'rt', 'rb'):
+        raise ValueError(f"Unsupported input mode: {mode}")
+
+    compression = detect_compression(file_path)
+    if compression == CompressionType.BGZF:
+        handle = io.BufferedReader(BGZFReader(file_path, threads=threads), buffer_size)
+    elif compression == CompressionType.GZIP:
+        handle = gzip.open(file_path, 'rb')
+    elif compression == CompressionType.ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd input requires the 'zstandard' package")
+        raw = open(file_path, 'rb')
+        handle = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(raw, read_size=buffer_size, closefd=True),
+            buffer_size
+        )
+    else:
+        handle = open(file_path, 'rb', buffering=buffer_size)
+
+    if mode == 'rb':
+        return handle
+    return io.TextIOWrapper(handle, encoding='utf-8')
+
+BGZF_BLOCK_SIZE = 0xff00  # Max uncompressed bytes per block, as in htslib
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+def compress_bgzf_block(data: bytes, level: int = 6) -> bytes:
+    """Deflate one BGZF block including its header and trailer"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    block_size = BGZF_HEADER_SIZE + len(cdata) + 8
+    header = pack('<4BI2BH2BHH', 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, block_size - 1)
+    return header + cdata + pack('<II', zlib.crc32(data), len(data))
+
+class BGZFWriter(io.RawIOBase):
+    """
+    BGZF writer that compresses blocks in parallel worker threads.
+
+    Blocks are written to disk strictly in order. The writer remembers the
+    compressed and uncompressed start of every block, so byte positions in
+    the uncompressed stream can be turned into BGZF virtual offsets for
+    indexes built while writing.
+    """
+    def __init__(self, file_path: str, threads: Optional[int] = None, level: int = 6):
+        super().__init__()
+        self.name = file_path
+        self.level = level
+        self._file = open(file_path, 'wb')
+        threads = threads or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._max_pending = 4 * threads
+        self._queue: Deque[Future] = deque()
+        self._pending = bytearray()
+        self._ustarts: List[int] = [0]
+        self._coffsets: List[int] = [0]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._pending += data
+        while len(self._pending) >= BGZF_BLOCK_SIZE:
+            self._submit(bytes(self._pending[:BGZF_BLOCK_SIZE]))
+            del self._pending[:BGZF_BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self._queue.append(self._executor.submit(compress_bgzf_block, block, self.level))
+        self._ustarts.append(self._ustarts[-1] + len(block))
+        while len(self._queue) > self._max_pending:
+            self._drain_one()
+
+    def _drain_one(self):
+        block = self._queue.popleft().result()
+        self._file.write(block)
+        self._coffsets.append(self._coffsets[-1] + len(block))
+
+    def flush(self):
+        """Compress any partial block and write out all queued blocks"""
+        if self._file.closed:
+            return
+        if self._pending:
+            self._submit(bytes(self._pending))
+            self._pending.clear()
+        while self._queue:
+            self._drain_one()
+        self._file.flush()
+
+    def tell(self) -> int:
+        return self._ustarts[-1] + len(self._pending)
+
+    def virtual_offset(self, uoffset: int) -> int:
+        """Map an uncompressed stream offset to a BGZF virtual offset (after flush)"""
+        index = bisect_right(self._ustarts, uoffset) - 1
+        if index >= len(self._coffsets):
+            raise ValueError(f"Offset {uoffset} has not been flushed")
+        return (self._coffsets[index] << 16) | (uoffset - self._ustarts[index])
+
+    def block_offsets(self) -> List[Tuple[int, int]]:
+        """(compressed, uncompressed) start of every block after the first"""
+        return list(zip(self._coffsets[1:-1], self._ustarts[1:-1]))
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self._file.write(BGZF_EOF)
+            self._executor.shutdown(wait=True)
+            self._file.close()
+        super().close()
@@ -0,0 +1,405 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from array import array
+from dataclasses import dataclass
+from itertools import groupby
+import os
+import tempfile
+import numpy as np
+import pysam
+from ..utils.parallel import bounded_map
+
+DEFAULT_EXCLUDE_FLAGS = 0x704  # unmapped, secondary, QC fail, duplicate
+MAX_HISTOGRAM_DEPTH = 1000  # Depths above this share the last histogram bin
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024  # Bases per difference-array chunk
+SPILL_EVENTS = 16 * 1024 * 1024  # Block events buffered in memory before unsorted input is spilled
+
+_OPEN_FILES: Dict[str, pysam.AlignmentFile] = {}  # Per-process handle cache for workers
+
+def read_blocks(reads: Iterable[pysam.AlignedSegment], min_mapq: int = 0,
+                exclude_flags: int = DEFAULT_EXCLUDE_FLAGS) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference start/end arrays of the aligned blocks of reads, splitting at N and D"""
+    starts, ends = [], []
+    for read in reads:
+        if read.flag & exclude_flags or read.mapping_quality < min_mapq:
+            continue
+        for start, end in read.get_blocks():
+            starts.append(start)
+            ends.append(end)
+    return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+def chunk_depth(starts: np.ndarray, ends: np.ndarray, chunk_start: int, chunk_stop: int) -> np.ndarray:
+    """
+    Per-base depth over [chunk_start, chunk_stop) from block coordinates.
+
+    Each block adds +1 at its (clipped) start and -1 at its end in a
+    difference array; one prefix sum turns it into int32 depth.
+    """
+    size = chunk_stop - chunk_start
+    keep = (starts < chunk_stop) & (ends > chunk_start)
+    starts = np.clip(starts[keep], chunk_start, chunk_stop) - chunk_start
+    ends = np.clip(ends[keep], chunk_start, chunk_stop) - chunk_start
+    diff = np.bincount(starts, minlength=size + 1) - np.bincount(ends, minlength=size + 1)
+    return np.cumsum(diff[:size], dtype=np.int32)
+
+def event_depth(events: np.ndarray, size: int, carry: int = 0) -> np.ndarray:
+    """
+    Per-base depth of a chunk from its block events, given the depth `carry`
+    entering it. Events are chunk offsets: a block start as the offset itself,
+    a block end as its bitwise complement (so always negative)
+    """
+    opened = events[events >= 0]
+    closed = ~events[events < 0]
+    diff = np.bincount(opened, minlength=size + 1) - np.bincount(closed, minlength=size + 1)
+    return np.cumsum(diff[:size], dtype=np.int32) + np.int32(carry)
+
+def covered_length(starts: np.ndarray, ends: np.ndarray) -> int:
+    """Number of positions covered by the union of [start, end) intervals"""
+    if len(starts) == 0:
+        return 0
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    # Each interval only adds what lies beyond the furthest end seen before it
+    reach = np.concatenate(([starts[0]], np.maximum.accumulate(ends)[:-1]))
+    return int(np.maximum(ends - np.maximum(starts, reach), 0).sum())
+
+def _chunk_stats(depth: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Window depth sums and the capped depth histogram of one chunk"""
+    if len(depth) == 0:
+        return np.empty(0, dtype=np.int64), np.zeros(MAX_HISTOGRAM_DEPTH + 1, dtype=np.int64)
+    sums = np.add.reduceat(depth, np.arange(0, len(depth), window), dtype=np.int64)
+    histogram = np.bincount(np.minimum(depth, MAX_HISTOGRAM_DEPTH), minlength=MAX_HISTOGRAM_DEPTH + 1)
+    return sums, histogram
+
+def _fetch_blocks(path: str, contig: str, start: int, stop: int, min_mapq: int,
+                  exclude_flags: int) -> Tuple[np.ndarray, np.ndarray]:
+    alignments = _OPEN_FILES.get(path)
+    if alignments is None:
+        alignments = _OPEN_FILES[path] = pysam.AlignmentFile(path)
+    return read_blocks(alignments.fetch(contig, start, stop), min_mapq, exclude_flags)
+
+ChunkStats = Tuple[str, int, np.ndarray, np.ndarray]  # contig, contig length, window sums, histogram
+EventChunk = Tuple[str, int, int, int, np.ndarray, int]  # contig, length, start, stop, events, depth carried in
+
+def _indexed_chunk(task: Tuple[str, str, int, int, int, int, int, int]) -> ChunkStats:
+    """Coverage statistics of one region of an indexed BAM; runs in a worker process"""
+    path, contig, length, start, stop, window, min_mapq, exclude_flags = task
+    if stop <= start:
+        return (contig, length) + _chunk_stats(np.empty(0, dtype=np.int32), window)
+    starts, ends = _fetch_blocks(path, contig, start, stop, min_mapq, exclude_flags)
+    return (contig, length) + _chunk_stats(chunk_depth(starts, ends, start, stop), window)
+
+def _event_chunk(task: Tuple[EventChunk, int]) -> ChunkStats:
+    """Coverage statistics of one chunk of streamed block events; runs in a worker process"""
+    (contig, length, start, stop, events, carry), window = task
+    return (contig, length) + _chunk_stats(event_depth(events, stop - start, carry), window)
+
+@dataclass
+class ContigCoverage:
+    """
+    Coverage summary of one contig.
+
+    Attributes:
+        contig (str): Contig name
+        length (int): Contig length in bases
+        means (np.ndarray): Mean depth per window (float32)
+        histogram (np.ndarray): Number of bases at each depth, capped at MAX_HISTOGRAM_DEPTH
+    """
+    contig: str
+    length: int
+    means: np.ndarray
+    histogram: np.ndarray
+
+@dataclass
+class CoverageProfile:
+    """
+    Windowed mean depth and depth distribution of every contig.
+
+    Iterating yields bedGraph rows (contig, start, end, mean depth).
+    """
+    window: int
+    contigs: List[ContigCoverage]
+
+    @property
+    def histogram(self) -> np.ndarray:
+        """Genome-wide depth histogram"""
+        return np.sum([c.histogram for c in self.contigs], axis=0, dtype=np.int64) \
+            if self.contigs else np.zeros(MAX_HISTOGRAM_DEPTH + 1, dtype=np.int64)
+
+    @property
+    def mean_depth(self) -> float:
+        total = sum(float(c.means.astype(np.float64) @ self._window_lengths(c.length))
+                    for c in self.contigs)
+        length = sum(c.length for c in self.contigs)
+        return total / length if length else 0.0
+
+    def breadth(self, threshold: int = 1) -> float:
+        """Fraction of bases covered at least `threshold` times"""
+        histogram = self.histogram
+        total = histogram.sum()
+        return float(histogram[min(threshold, MAX_HISTOGRAM_DEPTH):].sum() / total) if total else 0.0
+
+    def _window_lengths(self, length: int) -> np.ndarray:
+        starts = np.arange(0, length, self.window)
+        return np.minimum(starts + self.window, length) - starts
+
+    def to_array(self) -> np.ndarray:
+        """All window means concatenated in contig order"""
+        if not self.contigs:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate([c.means for c in self.contigs])
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, float]]:
+        for c in self.contigs:
+            for i, mean in enumerate(c.means.tolist()):
+                yield c.contig, i * self.window, min((i + 1) * self.window, c.length), round(mean, 2)
+
+class DepthTrack:
+    """
+    Lazy per-base depth.
+
+    Iterating streams run-length bedGraph rows (contig, start, end, depth),
+    skipping zero depth, one chunk at a time; nothing is kept in memory.
+    """
+    def __init__(self, calculator: 'CoverageCalculator', data: Any):
+        self.calculator = calculator
+        self.data = data
+
+    def depth(self, contig: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Per-base depth (int32) over a region"""
+        return self.calculator.depth(self.data, contig, start, stop)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, int]]:
+        for contig, chunk_start, depth in self.calculator.iter_depth(self.data):
+            edges = np.flatnonzero(np.diff(depth)) + 1
+            run_starts = np.concatenate(([0], edges))
+            run_ends = np.concatenate((edges, [len(depth)]))
+            values = depth[run_starts]
+            covered = values > 0
+            for start, end, value in zip(run_starts[covered].tolist(), run_ends[covered].tolist(),
+                                         values[covered].tolist()):
+                yield contig, chunk_start + start, chunk_start + end, value
+
+class CoverageCalculator:
+    """
+    Per-base coverage from difference arrays.
+
+    Aligned blocks (split at CIGAR N/D operations) become +1/-1 marks in an
+    int32 difference array, and one NumPy prefix sum yields depth. Indexed
+    BAM/CRAM inputs are cut into fixed-size regions that worker processes
+    fetch and reduce independently, so memory is bounded by the chunk size
+    times the number of workers regardless of genome depth.
+
+    Other inputs (unindexed files, lists of reads) are streamed once, with
+    every block start and end filed as an event under the chunk it falls
+    in. Coordinate-sorted input (SO:coordinate in the header) hands each
+    chunk to the workers as soon as reads start past its end, so only the
+    chunks still open are held. Unsorted input spills its events to one
+    file per chunk under `spill_dir`, flushing every SPILL_EVENTS events,
+    and the chunks are then reduced in parallel. The depth entering a chunk
+    is carried over from the event counts of the chunks before it.
+
+    Example:
+        >>> calculator = CoverageCalculator(window=1000, min_mapq=20)
+        >>> profile = calculator.profile(pysam.AlignmentFile("sample.bam"))
+        >>> profile.breadth(10)
+    """
+    def __init__(self, window: int = 1000, min_mapq: int = 0,
+                 exclude_flags: int = DEFAULT_EXCLUDE_FLAGS, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, spill_dir: Optional[str] = None):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.window = window
+        self.min_mapq = min_mapq
+        self.exclude_flags = exclude_flags
+        self.workers = workers
+        # Chunks hold whole windows so window sums never straddle two chunks
+        self.chunk_size = max(window, chunk_size // window * window)
+        self.spill_dir = spill_dir
+
+    def _is_indexed(self, data: Any) -> bool:
+        return isinstance(data, pysam.AlignmentFile) and bool(data.filename) and data.has_index()
+
+    def _contigs(self, data: Any) -> List[Tuple[str, int]]:
+        return list(zip(data.references, data.lengths))
+
+    def _chunks(self, length: int) -> Iterator[Tuple[int, int]]:
+        for start in range(0, length, self.chunk_size):
+            yield start, min(start + self.chunk_size, length)
+        if length == 0:
+            yield 0, 0  # Empty contigs still get one (empty) chunk, so they stay in the profile
+
+    def _reads(self, data: Any) -> Iterator[pysam.AlignedSegment]:
+        """Mapped reads of an unindexed input"""
+        if hasattr(data, 'reset'):
+            data.reset()
+        for read in data:
+            if not read.is_unmapped and read.reference_name is not None:
+                yield read
+
+    def _add_events(self, read: pysam.AlignedSegment, chunks: Dict[Any, array], key: Any,
+                    length: Optional[int]) -> int:
+        """File the block events of a read under (key, chunk index); returns the number added"""
+        if read.flag & self.exclude_flags or read.mapping_quality < self.min_mapq:
+            return 0
+        size = self.chunk_size
+        added = 0
+        for start, end in read.get_blocks():
+            if length is not None:
+                end = min(end, length)
+            if start >= end:
+                continue
+            index = start // size
+            chunks.setdefault((key, index), array('i')).append(start - index * size)
+            added += 1
+            # An end at the contig's last base closes nothing that is ever read
+            if length is None or end < length:
+                index = end // size
+                chunks.setdefault((key, index), array('i')).append(~(end - index * size))
+                added += 1
+        return added
+
+    def _sorted_events(self, data: Any, header: Any) -> Iterator[EventChunk]:
+        """Chunks of coordinate-sorted input, each emitted once reads start past its end"""
+        contigs = list(zip(header.references, header.lengths))
+        chunks: Dict[Tuple[int, int], array] = {}
+        tid, index, carry = 0, 0, 0
+
+        def pending_stop() -> int:
+            return min((index + 1) * self.chunk_size, contigs[tid][1])
+
+        def emit() -> EventChunk:
+            nonlocal index, carry
+            contig, length = contigs[tid]
+            events = np.frombuffer(chunks.pop((tid, index), array('i')), dtype=np.int32)
+            chunk = (contig, length, index * self.chunk_size, pending_stop(), events, carry)
+            carry += int(np.count_nonzero(events >= 0)) - int(np.count_nonzero(events < 0))
+            index += 1
+            return chunk
+
+        def finish_contig() -> Iterator[EventChunk]:
+            nonlocal tid, index, carry
+            # Empty contigs still get one (empty) chunk, as in `_chunks`
+            while index == 0 or index * self.chunk_size < contigs[tid][1]:
+                yield emit()
+            tid, index, carry = tid + 1, 0, 0
+
+        last = (-1, -1)
+        for read in self._reads(data):
+            position = (read.reference_id, read.reference_start)
+            if position < last:
+                raise ValueError(f"Reads are not coordinate-sorted at {read.query_name}, "
+                                 "although the header says SO:coordinate")
+            last = position
+            while tid < position[0]:
+                yield from finish_contig()
+            # No later read can reach a chunk that ends at or before this read's start
+            while pending_stop() <= position[1] and index * self.chunk_size < contigs[tid][1]:
+                yield emit()
+            self._add_events(read, chunks, tid, contigs[tid][1])
+        while tid < len(contigs):
+            yield from finish_contig()
+
+    def _spilled_events(self, data: Any, header: Any) -> Iterator[EventChunk]:
+        """Chunks of unsorted input, after spilling every event to one file per chunk"""
+        lengths = dict(zip(header.references, header.lengths)) if header is not None else {}
+        tids = {contig: tid for tid, contig in enumerate(lengths)}
+        ends: Dict[str, int] = {}
+        net: Dict[Tuple[int, int], int] = {}
+        with tempfile.TemporaryDirectory(dir=self.spill_dir) as spill_dir:
+            chunks: Dict[Tuple[int, int], array] = {}
+            buffered = 0
+
+            def spill():
+                for (tid, index), events in chunks.items():
+                    codes = np.frombuffer(events, dtype=np.int32)
+                    net[tid, index] = net.get((tid, index), 0) + len(codes) - 2 * int(np.count_nonzero(codes < 0))
+                    with open(os.path.join(spill_dir, f"{tid}.{index}.events"), 'ab') as handle:
+                        handle.write(codes.tobytes())
+                chunks.clear()
+
+            for read in self._reads(data):
+                contig = read.reference_name
+                tid = tids.setdefault(contig, len(tids))
+                ends[contig] = max(ends.get(contig, 0), read.reference_end or 0)
+                buffered += self._add_events(read, chunks, tid, lengths.get(contig))
+                if buffered >= SPILL_EVENTS:
+                    spill()
+                    buffered = 0
+            spill()
+
+            for contig, tid in tids.items():
+                length = lengths.get(contig) or ends.get(contig, 0)
+                carry = 0
+                for index, (start, stop) in enumerate(self._chunks(length)):
+                    # Read here, since the spill directory is gone once the last chunk is handed out
+                    path = os.path.join(spill_dir, f"{tid}.{index}.events")
+                    events = np.fromfile(path, dtype=np.int32) if os.path.exists(path) \
+                        else np.empty(0, dtype=np.int32)
+                    yield contig, length, start, stop, events, carry
+                    carry += net.get((tid, index), 0)
+
+    def _event_chunks(self, data: Any) -> Iterator[EventChunk]:
+        """Block events of an unindexed input, chunk by chunk in contig order"""
+        header = getattr(data, 'header', None)
+        if header is not None and header.to_dict().get('HD', {}).get('SO') == 'coordinate':
+            return self._sorted_events(data, header)
+        return self._spilled_events(data, header)
+
+    def profile(self, data: Any) -> CoverageProfile:
+        """Windowed mean depth and depth histogram for every contig"""
+        if self._is_indexed(data):
+            tasks = (
+                (data.filename.decode(), contig, length, start, stop, self.window,
+                 self.min_mapq, self.exclude_flags)
+                for contig, length in self._contigs(data) for start, stop in self._chunks(length)
+            )
+            results = bounded_map(_indexed_chunk, tasks, self.workers)
+        else:
+            results = bounded_map(_event_chunk, ((chunk, self.window) for chunk in self._event_chunks(data)),
+                                  self.workers)
+
+        coverage = []
+        for (contig, length), chunks in groupby(results, key=lambda result: result[:2]):
+            sums, histogram = [], np.zeros(MAX_HISTOGRAM_DEPTH + 1, dtype=np.int64)
+            for _, _, chunk_sums, chunk_histogram in chunks:
+                sums.append(chunk_sums)
+                histogram += chunk_histogram
+            window_sums = np.concatenate(sums)
+            starts = np.arange(len(window_sums)) * self.window
+            lengths = np.minimum(starts + self.window, length) - starts
+            coverage.append(ContigCoverage(contig, length,
+                                           (window_sums / np.maximum(lengths, 1)).astype(np.float32),
+                                           histogram))
+        return CoverageProfile(self.window, coverage)
+
+    def depth(self, data: Any, contig: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Per-base depth (int32) over one region"""
+        if self._is_indexed(data):
+            stop = data.get_reference_length(contig) if stop is None else stop
+            starts, ends = _fetch_blocks(data.filename.decode(), contig, start, stop,
+                                         self.min_mapq, self.exclude_flags)
+            return chunk_depth(starts, ends, start, stop)
+        depth = None
+        for name, length, chunk_start, chunk_stop, events, carry in self._event_chunks(data):
+            if name != contig:
+                continue
+            if depth is None:
+                stop = length if stop is None else stop
+                depth = np.zeros(max(stop - start, 0), dtype=np.int32)
+            if chunk_start < stop and chunk_stop > start:
+                values = event_depth(events, chunk_stop - chunk_start, carry)
+                lo, hi = max(start, chunk_start), min(stop, chunk_stop)
+                depth[lo - start:hi - start] = values[lo - chunk_start:hi - chunk_start]
+        return depth if depth is not None else np.zeros(max((stop or 0) - start, 0), dtype=np.int32)
+
+    def iter_depth(self, data: Any) -> Iterator[Tuple[str, int, np.ndarray]]:
+        """Stream (contig, chunk start, per-base depth) one chunk at a time"""
+        if self._is_indexed(data):
+            for contig, length in self._contigs(data):
+                for start, stop in self._chunks(length):
+                    if stop > start:
+                        yield contig, start, self.depth(data, contig, start, stop)
+        else:
+            for contig, _, start, stop, events, carry in self._event_chunks(data):
+                if stop > start:
+                    yield contig, start, event_depth(events, stop - start, carry)
@@ -0,0 +1,354 @@
+from typing import Any, Iterator, List, Optional, Tuple
+import os
+import tempfile
+import numpy as np
+import pysam
+from .sketches import hash_strings
+from ..utils.parallel import bounded_map, resolve_workers
+
+DUPLICATE_FLAG = 0x400
+SKIP_FLAGS = 0xB04  # unmapped, secondary, supplementary: never duplicates themselves
+MIN_SCORE_QUALITY = 15  # Bases below this do not count towards a read's score
+CLIP_OPS = (4, 5)  # Soft and hard clips
+REFERENCE_OPS = (0, 2, 3, 7, 8)  # CIGAR operations consuming the reference
+
+SIGNATURE_DTYPE = np.dtype([('key', '<i8'), ('score', '<i8'), ('name', '<u8'), ('order', '<i8')])
+DEFAULT_MEMORY_LIMIT = 512 * 1024 ** 2  # Bytes of signatures resolved at once across all workers
+RESOLVE_BYTES = 2 * SIGNATURE_DTYPE.itemsize  # Per signature while resolving: the record plus lexsort scratch
+
+def _cigar_span(cigar: str) -> Tuple[int, int, int]:
+    """(leading clip, reference span, trailing clip) of a CIGAR string such as the MC tag"""
+    lengths, ops, number = [], [], ''
+    for char in cigar:
+        if char.isdigit():
+            number += char
+        else:
+            lengths.append(int(number))
+            ops.append('MIDNSHP=X'.index(char))
+            number = ''
+    if not ops:
+        return 0, 0, 0
+    lead = sum(l for l, op in zip(lengths[:2], ops[:2]) if op in CLIP_OPS) if ops[0] in CLIP_OPS else 0
+    trail = sum(l for l, op in zip(lengths[-2:], ops[-2:]) if op in CLIP_OPS) if ops[-1] in CLIP_OPS else 0
+    return lead, sum(l for l, op in zip(lengths, ops) if op in REFERENCE_OPS), trail
+
+def five_prime(read: pysam.AlignedSegment) -> int:
+    """Unclipped 5' reference position of a mapped read"""
+    cigar = read.cigartuples or []
+    if read.is_reverse:
+        clip = sum(l for op, l in cigar[-2:] if op in CLIP_OPS) if cigar and cigar[-1][0] in CLIP_OPS else 0
+        return read.reference_end + clip
+    clip = sum(l for op, l in cigar[:2] if op in CLIP_OPS) if cigar and cigar[0][0] in CLIP_OPS else 0
+    return read.reference_start - clip
+
+def _mate_five_prime(read: pysam.AlignedSegment) -> int:
+    """Unclipped 5' position of the mate, exact when the MC (mate CIGAR) tag is present"""
+    start = read.next_reference_start
+    if not read.has_tag('MC'):
+        return start
+    lead, span, trail = _cigar_span(read.get_tag('MC'))
+    return start + span + trail if read.mate_is_reverse else start - lead
+
+def read_score(read: pysam.AlignedSegment) -> int:
+    """
+    Fragment score: the sum of base qualities >= 15, plus for pairs with a
+    mapped mate the mate's score from the `ms` tag (samtools fixmate -m), so
+    both ends of a pair carry the same score
+    """
+    qualities = read.query_qualities
+    score = 0
+    if qualities is not None:
+        qualities = np.frombuffer(qualities, dtype=np.uint8)
+        score = int(qualities[qualities >= MIN_SCORE_QUALITY].sum(dtype=np.int64))
+    if read.is_paired and not read.mate_is_unmapped:
+        if not read.has_tag('ms'):
+            # Scoring the ends separately could keep a different copy at each end of a pair
+            raise ValueError(f"Paired read {read.query_name} has no ms (mate score) tag; "
+                             "run `samtools fixmate -m` before DEDUP")
+        score += int(read.get_tag('ms'))
+    return score
+
+class _Libraries:
+    """Library id of each read group, so only reads of one library can duplicate each other"""
+    def __init__(self, header: Any):
+        groups = header.to_dict().get('RG', []) if header is not None else []
+        names = {group.get('LB', group['ID']) for group in groups}
+        library_ids = {name: i for i, name in enumerate(sorted(names))}
+        self._ids = {group['ID']: library_ids[group.get('LB', group['ID'])] for group in groups}
+
+    def __call__(self, read: pysam.AlignedSegment) -> int:
+        return self._ids.get(read.get_tag('RG'), -1) if read.has_tag('RG') else -1
+
+def signature(read: pysam.AlignedSegment, library: int = -1) -> Tuple[int, int]:
+    """
+    (key, 5' position) identifying the duplicate set of a mapped primary read.
+
+    Single reads are keyed by library, contig, unclipped 5' position and
+    strand. Pairs with a mapped mate add the mate's end, ordered so both
+    mates of duplicate pairs fall into matching sets: the leftmost ends of
+    all copies share one key and the rightmost ends another.
+    """
+    own = (read.reference_id, five_prime(read), read.is_reverse)
+    if not read.is_paired or read.mate_is_unmapped:
+        return hash((library, own)), own[1]
+    mate = (read.next_reference_id, _mate_five_prime(read), read.mate_is_reverse)
+    first = own < mate or (own == mate and read.is_read1)
+    return hash((library, own, mate) if first else (library, mate, own, 1)), own[1]
+
+def best_of_groups(keys: np.ndarray, scores: np.ndarray, names: np.ndarray) -> np.ndarray:
+    """
+    Duplicate mask: all but the highest-scoring read of each key.
+
+    Both ends of a pair carry the same fragment score (see `read_score`)
+    and ties go to the smallest read-name hash, which both mates share, so
+    a kept pair keeps both of its ends.
+    """
+    order = np.lexsort((names, -scores, keys))
+    sorted_keys = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    duplicate = np.empty(len(keys), dtype=bool)
+    duplicate[order] = ~first
+    return duplicate
+
+def _split_partition(path: str, level: int, partitions: int, chunk_rows: int) -> List[str]:
+    """
+    Re-partition a spill file by the next digit of its keys, streaming `chunk_rows`
+    signatures at a time, and delete it. Returns the sub-partition paths
+    """
+    paths = [f"{path}.{i}" for i in range(partitions)]
+    signatures = np.memmap(path, dtype=SIGNATURE_DTYPE, mode='r')
+    divisor = np.uint64(partitions ** level)
+    handles = [open(sub_path, 'wb') for sub_path in paths]
+    try:
+        for start in range(0, len(signatures), chunk_rows):
+            chunk = np.array(signatures[start:start + chunk_rows])
+            partition = chunk['key'].view(np.uint64) // divisor % np.uint64(partitions)
+            for i in np.unique(partition).tolist():
+                chunk[partition == i].tofile(handles[i])
+    finally:
+        for handle in handles:
+            handle.close()
+    del signatures
+    os.remove(path)
+    return paths
+
+def _partition_duplicates(path: str) -> np.ndarray:
+    """Input order of the duplicates in one spilled partition; runs in a worker process"""
+    signatures = np.fromfile(path, dtype=SIGNATURE_DTYPE)
+    return signatures['order'][best_of_groups(signatures['key'], signatures['score'], signatures['name'])]
+
+class _Window:
+    """Reads awaiting a duplicate decision, in input order"""
+    def __init__(self, window: int):
+        self.window = window
+        self.reads: List[pysam.AlignedSegment] = []
+        self.fields: List[Optional[Tuple[int, int, int]]] = []
+        self.duplicate: List[Optional[bool]] = []  # None until decided
+        self.undecided = 0
+
+    def add(self, read: pysam.AlignedSegment, fields: Optional[Tuple[int, int, int]]):
+        self.reads.append(read)
+        self.fields.append(fields)
+        self.duplicate.append(None if fields is not None else False)
+        self.undecided += fields is not None
+
+    def flush(self, frontier: Optional[int]) -> Iterator[Tuple[pysam.AlignedSegment, bool]]:
+        """
+        Decide every signature whose 5' position lies more than `window`
+        before `frontier` (all of them when None), then emit the decided prefix
+        """
+        pending = [i for i, duplicate in enumerate(self.duplicate) if duplicate is None]
+        if pending:
+            keys, positions, scores = (np.array(column, dtype=np.int64)
+                                       for column in zip(*(self.fields[i] for i in pending)))
+            ready = np.ones(len(pending), dtype=bool) if frontier is None \
+                else positions + self.window < frontier
+            indices = np.asarray(pending)[ready]
+            names = hash_strings([self.reads[i].query_name or '' for i in indices])
+            for i, duplicate in zip(indices.tolist(),
+                                    best_of_groups(keys[ready], scores[ready], names).tolist()):
+                self.duplicate[i] = duplicate
+            self.undecided -= len(indices)
+
+        end = next((i for i, duplicate in enumerate(self.duplicate) if duplicate is None), len(self.reads))
+        for read, duplicate in zip(self.reads[:end], self.duplicate[:end]):
+            yield read, duplicate
+        del self.reads[:end], self.fields[:end], self.duplicate[:end]
+
+class MarkedReads:
+    """
+    Lazily duplicate-marked (or filtered) reads of an alignment input.
+
+    Iterating streams the reads in input order; `header` is carried over so
+    the result can be EXPORTed to BAM. Counts are filled in as reads pass.
+
+    Example:
+        >>> deduplicated = DuplicateMarker().mark(pysam.AlignmentFile("sorted.bam"))
+        >>> export_records(deduplicated, "dedup.bam")
+    """
+    def __init__(self, marker: 'DuplicateMarker', data: Any):
+        self.marker = marker
+        self.data = data
+        self.header = getattr(data, 'header', None)
+        self.reads = 0
+        self.duplicates = 0
+
+    @property
+    def duplicate_fraction(self) -> float:
+        return self.duplicates / self.reads if self.reads else 0.0
+
+    def __iter__(self) -> Iterator[pysam.AlignedSegment]:
+        self.reads = self.duplicates = 0
+        if self.marker.assume_sorted is None:
+            sort_order = self.header.to_dict().get('HD', {}).get('SO') if self.header is not None else None
+            is_sorted = sort_order == 'coordinate'
+        else:
+            is_sorted = self.marker.assume_sorted
+        source = self.marker._sorted(self.data) if is_sorted else self.marker._unsorted(self.data)
+        for read, duplicate in source:
+            self.reads += 1
+            if duplicate:
+                self.duplicates += 1
+                if self.marker.remove:
+                    continue
+                read.flag |= DUPLICATE_FLAG
+            else:
+                read.flag &= ~DUPLICATE_FLAG
+            yield read
+
+class DuplicateMarker:
+    """
+    Streaming PCR/optical duplicate marking for alignment files.
+
+    Coordinate-sorted input is processed in one pass: reads sharing a
+    signature (5' unclipped position, strand and mate end) lie within
+    `window` bases of each other, so only reads of the trailing window are
+    held, as arrays of 64-bit signature keys, scores and name hashes. Each
+    full batch resolves every signature that can no longer grow with one
+    lexsort, and the decided prefix of the stream is emitted in order.
+
+    Unsorted input takes two passes: signatures are hash-partitioned into
+    spill files, each partition is resolved independently (in parallel),
+    and duplicates are recorded in an on-disk bitmap consulted while the
+    input is re-read. A partition too large for its worker's share of
+    `memory_limit` is split again by the next digit of its keys, so memory
+    stays bounded however large the input grows.
+
+    Example:
+        >>> marker = DuplicateMarker(remove=False)
+        >>> marked = marker.mark(reads)
+        >>> export_records(marked, "marked.bam")
+        >>> marked.duplicate_fraction
+    """
+    def __init__(self, window: int = 1000, remove: bool = True, assume_sorted: Optional[bool] = None,
+                 batch_size: int = 10000, partitions: int = 64, workers: Optional[int] = None,
+                 spill_dir: Optional[str] = None, memory_limit: int = DEFAULT_MEMORY_LIMIT):
+        self.window = window
+        self.remove = remove
+        self.assume_sorted = assume_sorted
+        self.batch_size = batch_size
+        self.partitions = max(partitions, 2)
+        self.workers = workers
+        self.spill_dir = spill_dir
+        self.memory_limit = memory_limit
+
+    def mark(self, data: Any) -> MarkedReads:
+        """Duplicate-marked (or, with `remove`, deduplicated) reads of `data`"""
+        if isinstance(data, str):
+            data = pysam.AlignmentFile(data)
+        return MarkedReads(self, data)
+
+    def _reads(self, data: Any) -> Iterator[pysam.AlignedSegment]:
+        if isinstance(data, pysam.AlignmentFile):
+            # A fresh handle leaves `data` usable for other statements
+            with pysam.AlignmentFile(data.filename, check_sq=False) as handle:
+                yield from handle.fetch(until_eof=True)
+            return
+        if hasattr(data, 'reset'):
+            data.reset()
+        yield from data
+
+    def _signatures(self, data: Any) -> Iterator[Tuple[pysam.AlignedSegment, Optional[Tuple[int, int, int]]]]:
+        """Reads with (key, 5' position, score), or None for reads that are never duplicates"""
+        libraries = _Libraries(getattr(data, 'header', None))
+        for read in self._reads(data):
+            if read.flag & SKIP_FLAGS:
+                yield read, None
+            else:
+                key, position = signature(read, libraries(read))
+                yield read, (key, position, read_score(read))
+
+    def _sorted(self, data: Any) -> Iterator[Tuple[pysam.AlignedSegment, bool]]:
+        window = _Window(self.window)
+        contig, last_start = None, -1
+        threshold = self.batch_size
+        for read, fields in self._signatures(data):
+            if read.reference_id != contig:
+                # A new contig: no pending signature can gain reads
+                yield from window.flush(None)
+                contig, last_start = read.reference_id, -1
+            elif read.reference_id >= 0 and read.reference_start < last_start:
+                raise ValueError(f"Reads are not coordinate-sorted at {read.query_name}; "
+                                 "mark them with assume_sorted=False")
+            last_start = read.reference_start
+            window.add(read, fields)
+            if window.undecided >= threshold:
+                yield from window.flush(last_start)
+                # Deep pileups can leave most reads undecided; back off instead of re-sorting them per read
+                threshold = max(self.batch_size, 2 * window.undecided)
+        yield from window.flush(None)
+
+    def _resolvable(self, paths: List[str]) -> Iterator[str]:
+        """Spill files small enough to resolve in one worker's memory, splitting larger ones"""
+        max_rows = max(self.memory_limit // (resolve_workers(self.workers) * RESOLVE_BYTES), 1)
+        pending = [(path, 1) for path in reversed(paths)]
+        while pending:
+            path, level = pending.pop()
+            rows = os.path.getsize(path) // SIGNATURE_DTYPE.itemsize
+            # Past the last key digit every signature left shares one key and cannot be split
+            if rows <= max_rows or self.partitions ** level >= 2 ** 64:
+                yield path
+            else:
+                sub_paths = _split_partition(path, level, self.partitions, max_rows)
+                pending.extend((sub_path, level + 1) for sub_path in reversed(sub_paths))
+
+    def _unsorted(self, data: Any) -> Iterator[Tuple[pysam.AlignedSegment, bool]]:
+        with tempfile.TemporaryDirectory(dir=self.spill_dir) as spill_dir:
+            paths = [os.path.join(spill_dir, f"part{i:04d}.sig") for i in range(self.partitions)]
+            handles = [open(path, 'wb') for path in paths]
+            batch: List[Tuple[int, int, str, int]] = []
+            total = 0
+
+            def spill():
+                signatures = np.empty(len(batch), dtype=SIGNATURE_DTYPE)
+                signatures['key'] = [key for key, _, _, _ in batch]
+                signatures['score'] = [score for _, score, _, _ in batch]
+                signatures['name'] = hash_strings([name for _, _, name, _ in batch])
+                signatures['order'] = [order for _, _, _, order in batch]
+                partition = signatures['key'].view(np.uint64) % np.uint64(self.partitions)
+                for i in np.unique(partition).tolist():
+                    signatures[partition == i].tofile(handles[i])
+                batch.clear()
+
+            try:
+                for order, (read, fields) in enumerate(self._signatures(data)):
+                    total = order + 1
+                    if fields is not None:
+                        batch.append((fields[0], fields[2], read.query_name or '', order))
+                        if len(batch) >= self.batch_size:
+                            spill()
+                if batch:
+                    spill()
+            finally:
+                for handle in handles:
+                    handle.close()
+
+            # One bit per input read, kept on disk
+            bitmap = np.memmap(os.path.join(spill_dir, "duplicates.bits"), dtype=np.uint8,
+                               mode='w+', shape=(max(total, 1) + 7) // 8)
+            for orders in bounded_map(_partition_duplicates, self._resolvable(paths), self.workers):
+                np.bitwise_or.at(bitmap, orders // 8, (1 << (orders % 8)).astype(np.uint8))
+            for order, read in enumerate(self._reads(data)):
+                yield read, bool(bitmap[order // 8] >> (order % 8) & 1)
+            del bitmap
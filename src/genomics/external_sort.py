@@ -0,0 +1,258 @@
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+import gzip
+import heapq
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import weakref
+from operator import itemgetter
+import pysam
+from .records import sequence_fields
+from ..utils.parallel import bounded_map, resolve_workers
+
+SORT_KEYS = ('coordinate', 'name', 'kmer')
+DEFAULT_MEMORY_LIMIT = 512 * 1024 ** 2  # Bytes of records held in memory across all pending runs
+DEFAULT_FAN_IN = 128  # Runs merged at once, keeping open files well under the fd limit
+FRAME_RECORDS = 4096  # Records per pickled frame of a run file
+UNMAPPED = sys.maxsize  # Sorts unplaced reads after every contig
+
+def _coordinate(record: Any) -> Tuple:
+    if isinstance(record, pysam.AlignedSegment):
+        tid = record.reference_id
+        return (tid if tid >= 0 else UNMAPPED, record.reference_start, record.is_reverse)
+    if isinstance(record, pysam.VariantRecord):
+        return (record.rid, record.pos)
+    if isinstance(record, dict):
+        return (str(record['chrom']), int(record['start']), int(record.get('end', 0)))
+    if isinstance(record, (tuple, list)):
+        return (str(record[0]), int(record[1]), int(record[2]) if len(record) > 2 else 0)
+    if isinstance(record, str):
+        fields = record.split('\t', 3)
+        return (fields[0], int(fields[1]))
+    raise ValueError(f"Cannot sort {type(record).__name__} by coordinate")
+
+def _name(record: Any) -> str:
+    if isinstance(record, pysam.AlignedSegment):
+        return record.query_name or ''
+    return str(sequence_fields(record)[0])
+
+def _kmer(record: Any) -> str:
+    # Lexicographic order of ACGT strings is the order of their 2-bit packed codes
+    return str(sequence_fields(record)[1]).upper()
+
+def sort_key(key: Union[str, Callable[[Any], Any]]) -> Callable[[Any], Any]:
+    """
+    Key function for `key`: 'coordinate', 'name', 'kmer' or a callable.
+
+    Coordinates order alignments and variants by header contig id (unmapped
+    reads last) and other records by contig name; 'kmer' orders records by
+    their sequence.
+    """
+    if callable(key):
+        return key
+    keys = {'coordinate': _coordinate, 'name': _name, 'kmer': _kmer}
+    if key not in keys:
+        raise ValueError(f"Unknown sort key: {key}; expected one of {', '.join(SORT_KEYS)}")
+    return keys[key]
+
+def _record_size(record: Any) -> int:
+    """Rough in-memory size of a record, for the run budget"""
+    if isinstance(record, pysam.AlignedSegment):
+        return 3 * (record.query_length or 0) + 200
+    if isinstance(record, str):
+        return len(record) + 50
+    if isinstance(record, (tuple, list)):
+        return sum(len(v) if isinstance(v, str) else 8 for v in record) + 100
+    return 200
+
+class RecordCodec:
+    """
+    Converts records to picklable payloads and back.
+
+    pysam records cannot be pickled: alignments travel as SAM text and are
+    rebuilt against their header, variants as VCF text lines.
+    """
+    def __init__(self, header: Any = None):
+        self.header = header
+
+    def encode(self, record: Any) -> Any:
+        if isinstance(record, pysam.AlignedSegment):
+            if self.header is None:
+                self.header = record.header
+            return record.to_string()
+        if isinstance(record, pysam.VariantRecord):
+            return str(record).rstrip('\n')
+        return record
+
+    def decode(self, payload: Any) -> Any:
+        if isinstance(payload, str) and isinstance(self.header, pysam.AlignmentHeader):
+            return pysam.AlignedSegment.fromstring(payload, self.header)
+        return payload
+
+def write_run(path: str, entries: List[Tuple[Any, Any]], level: int = 1):
+    """Write (key, payload) entries, already sorted, as gzip-compressed pickle frames"""
+    with gzip.open(path, 'wb', compresslevel=level) as run:
+        for start in range(0, len(entries), FRAME_RECORDS):
+            pickle.dump(entries[start:start + FRAME_RECORDS], run, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_run(path: str) -> Iterator[Tuple[Any, Any]]:
+    """Stream the (key, payload) entries of a run file"""
+    with gzip.open(path, 'rb') as run:
+        while True:
+            try:
+                frame = pickle.load(run)
+            except EOFError:
+                return
+            yield from frame
+
+def _sort_run(task: Tuple[str, List[Tuple[Any, Any]], int]) -> str:
+    """Sort one run and spill it; runs in a worker process"""
+    path, entries, level = task
+    entries.sort(key=itemgetter(0))
+    write_run(path, entries, level)
+    return path
+
+def _merge_runs(task: Tuple[str, List[str], int]) -> str:
+    """Merge sorted runs into one; runs in a worker process"""
+    path, paths, level = task
+    with gzip.open(path, 'wb', compresslevel=level) as run:
+        frame = []
+        for entry in heapq.merge(*(read_run(p) for p in paths), key=itemgetter(0)):
+            frame.append(entry)
+            if len(frame) >= FRAME_RECORDS:
+                pickle.dump(frame, run, protocol=pickle.HIGHEST_PROTOCOL)
+                frame = []
+        if frame:
+            pickle.dump(frame, run, protocol=pickle.HIGHEST_PROTOCOL)
+    for p in paths:
+        os.remove(p)
+    return path
+
+class SortedRecords:
+    """
+    Sorted records backed by spilled runs, merged lazily on each iteration.
+
+    Iterating k-way merges the run files with a heap, so the sorted stream
+    is produced in bounded memory and can be consumed more than once.
+    The runs are deleted together with this object.
+
+    Example:
+        >>> sorted_reads = ExternalSorter('coordinate').sort(reads)
+        >>> export_records(sorted_reads, "sorted.bam")
+    """
+    def __init__(self, runs: List[str], codec: RecordCodec, key: Union[str, Callable],
+                 records: int, spill_dir: Optional[str] = None, in_memory: Optional[List] = None):
+        self.runs = runs
+        self.codec = codec
+        self.key = key
+        self.records = records
+        self._in_memory = in_memory
+        header = codec.header
+        if isinstance(header, pysam.AlignmentHeader) and key == 'coordinate':
+            header = pysam.AlignmentHeader.from_dict(_with_sort_order(header.to_dict(), 'coordinate'))
+        elif isinstance(header, pysam.AlignmentHeader) and key == 'name':
+            header = pysam.AlignmentHeader.from_dict(_with_sort_order(header.to_dict(), 'queryname'))
+        self.header = header
+        if spill_dir is not None:
+            self._cleanup = weakref.finalize(self, shutil.rmtree, spill_dir, True)
+
+    def __len__(self) -> int:
+        return self.records
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._in_memory is not None:
+            entries = iter(self._in_memory)
+        else:
+            entries = heapq.merge(*(read_run(path) for path in self.runs), key=itemgetter(0))
+        for _, payload in entries:
+            yield self.codec.decode(payload)
+
+def _with_sort_order(header: dict, order: str) -> dict:
+    header = dict(header)
+    header['HD'] = dict(header.get('HD', {'VN': '1.6'}), SO=order)
+    return header
+
+class ExternalSorter:
+    """
+    External merge sort of record streams with bounded memory.
+
+    Records are read in runs of at most `memory_limit` bytes (split across
+    the runs in flight), and each run is sorted and spilled to a
+    gzip-compressed temporary file by a worker process. When more than
+    `fan_in` runs exist they are merged in passes, so no more than
+    `fan_in` files are ever open at once; the final runs are heap-merged
+    lazily. Input that fits in one run is sorted in memory without
+    touching disk.
+
+    Example:
+        >>> sorter = ExternalSorter(key='name', memory_limit=256 * 1024 ** 2)
+        >>> for read in sorter.sort(pysam.AlignmentFile("reads.bam")):
+        ...     process(read)
+    """
+    def __init__(self, key: Union[str, Callable[[Any], Any]] = 'coordinate',
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT, workers: Optional[int] = None,
+                 fan_in: int = DEFAULT_FAN_IN, spill_dir: Optional[str] = None, level: int = 1):
+        self.key = key
+        self._key = sort_key(key)
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self.fan_in = max(fan_in, 2)
+        self.spill_dir = spill_dir
+        self.level = level
+
+    def _runs(self, records: Iterable[Any], codec: RecordCodec, spill_dir: str,
+              budget: int, counts: List[int]) -> Iterator[Tuple[str, List[Tuple[Any, Any]], int]]:
+        entries, size = [], 0
+        for record in records:
+            entries.append((self._key(record), codec.encode(record)))
+            size += _record_size(record)
+            if size >= budget:
+                counts.append(len(entries))
+                yield os.path.join(spill_dir, f"run{len(counts):06d}.gz"), entries, self.level
+                entries, size = [], 0
+        if entries:
+            counts.append(len(entries))
+            yield os.path.join(spill_dir, f"run{len(counts):06d}.gz"), entries, self.level
+
+    def sort(self, data: Any) -> SortedRecords:
+        """Sort every record of `data`, spilling runs to disk as needed"""
+        if hasattr(data, 'reset'):
+            data.reset()
+        if isinstance(data, pysam.AlignmentFile):
+            records = data.fetch(until_eof=True)
+        else:
+            records = iter(data)
+        codec = RecordCodec(getattr(data, 'header', None))
+        workers = resolve_workers(self.workers)
+        # Up to 2 * workers runs are in flight, plus the one being filled
+        budget = max(self.memory_limit // (2 * workers + 1), 1)
+
+        spill_dir = tempfile.mkdtemp(prefix="genomescript-sort-", dir=self.spill_dir)
+        counts: List[int] = []
+        runs = self._runs(records, codec, spill_dir, budget, counts)
+        first = next(runs, None)
+        second = next(runs, None) if first is not None else None
+        if second is None:
+            # Everything fits in one run: no spilling
+            shutil.rmtree(spill_dir, True)
+            entries = first[1] if first is not None else []
+            entries.sort(key=itemgetter(0))
+            return SortedRecords([], codec, self.key, len(entries), in_memory=entries)
+
+        def all_runs():
+            yield first
+            yield second
+            yield from runs
+
+        paths = list(bounded_map(_sort_run, all_runs(), workers))
+        merges = 0
+        while len(paths) > self.fan_in:
+            groups = [paths[i:i + self.fan_in] for i in range(0, len(paths), self.fan_in)]
+            tasks = []
+            for group in groups:
+                merges += 1
+                tasks.append((os.path.join(spill_dir, f"merge{merges:06d}.gz"), group, self.level))
+            paths = list(bounded_map(_merge_runs, tasks, workers))
+        return SortedRecords(paths, codec, self.key, sum(counts), spill_dir=spill_dir)
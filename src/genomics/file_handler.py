@@ -2,6 +2,11 @@ from typing import List, Dict, Any, Iterator, Optional
 import pysam
 from Bio import SeqIO
 from dataclasses import dataclass
+import numpy as np
+from .compressed_io import open_input
+from .coverage import covered_length
+from .records import sequence_fields
+from .sketches import ApproxProfile, ApproxProfiler
 
 @dataclass
 class QualityMetrics:
@@ -77,10 +82,15 @@ class GenomicFileHandler:
         return pysam.AlignmentFile(file_path, "r")
 
     def _load_sff(self, file_path: str) -> Iterator:
-        return SeqIO.parse(file_path, "sff")
+        return self._parse_records(file_path, "sff", 'rb')
 
     def _load_csfasta(self, file_path: str) -> Iterator:
-        return SeqIO.parse(file_path, "csfasta")
+        return self._parse_records(file_path, "csfasta", 'r')
+
+    def _parse_records(self, file_path: str, file_format: str, mode: str) -> Iterator:
+        """SeqIO records of a possibly compressed file, closing it (and any BGZF threads) when done"""
+        with open_input(file_path, mode) as handle:
+            yield from SeqIO.parse(handle, file_format)
 
     def filter_by_quality(self, data: Any, min_phred: int = 20) -> Iterator:
         """Filter reads based on Phred quality scores"""
@@ -111,8 +121,7 @@ class GenomicFileHandler:
         total_bases = 0
         gc_count = 0
         read_lengths = []
-        total_positions = 0
-        coverage_counts = {}
+        span_starts, span_ends = [], []
 
         try:
             # Reset file pointer if needed
@@ -126,21 +135,25 @@ class GenomicFileHandler:
                     seq = record.query_sequence
                     
                     # Track coverage
-                    if record.reference_start is not None:
-                        for pos in range(record.reference_start, record.reference_end or record.reference_start + 1):
-                            coverage_counts[pos] = coverage_counts.get(pos, 0) + 1
+                    if record.reference_start is not None and record.reference_start >= 0:
+                        span_starts.append(record.reference_start)
+                        span_ends.append(record.reference_end or record.reference_start + 1)
                 else:
                     # Handle other formats (FASTQ, FASTA, etc.)
-                    phred_scores.extend(record.letter_annotations.get('phred_quality', []))
-                    seq = str(record.seq)
+                    _, seq, qualities = sequence_fields(record)
+                    if qualities is not None:
+                        phred_scores.extend(int(q) for q in qualities)
+                    seq = str(seq)
 
                 if seq:
                     total_bases += len(seq)
                     gc_count += seq.count('G') + seq.count('C')
                     read_lengths.append(len(seq))
 
-            # Calculate coverage depth
-            avg_coverage = (sum(coverage_counts.values()) / len(coverage_counts)) if coverage_counts else 0.0
+            # Calculate coverage depth: aligned bases over distinct covered positions
+            covered = covered_length(np.array(span_starts, dtype=np.int64),
+                                     np.array(span_ends, dtype=np.int64))
+            avg_coverage = (sum(span_ends) - sum(span_starts)) / covered if covered else 0.0
 
             return QualityMetrics(
                 phred_scores=phred_scores,
@@ -151,6 +164,11 @@ class GenomicFileHandler:
         except Exception as e:
             raise RuntimeError(f"Failed to analyze quality metrics: {str(e)}")
 
+    def approximate_metrics(self, data: Any, error: float = 0.01, sample: Optional[float] = None,
+                            workers: Optional[int] = None) -> ApproxProfile:
+        """Sketch-based quality metrics within `error`, optionally from a `sample` fraction"""
+        return ApproxProfiler(error=error, sample=sample, workers=workers).profile(data)
+
     def _calculate_coverage(self, data: Any) -> float:
         # Implement coverage calculation based on file type
         pass 
\ No newline at end of file
@@ -1 +1,48 @@
- 
\ No newline at end of file
+from enum import Enum
+from typing import Dict
+from .parsers.base_parser import GenomicFileParser
+from .parsers.fasta_parser import FASTAParser
+from .parsers.sff_parser import SFFParser
+from .parsers.csfasta_parser import CSFASTAParser
+from .parsers.twobit_parser import TwoBitParser
+from .parsers.bed_parser import BEDParser
+
+class FileFormat(Enum):
+    FASTA = "FASTA"
+    FASTQ = "FASTQ"
+    VCF = "VCF"
+    BAM = "BAM"
+    CRAM = "CRAM"
+    SAM = "SAM"
+    SFF = "SFF"
+    CSFASTA = "CSFASTA"
+    TWOBIT = "TWOBIT"
+    BED = "BED"
+
+class GenomicFileRegistry:
+    """
+    Registry mapping file formats to their parsers.
+
+    FASTA is parsed into 2-bit PackedSequences, so LOADed references take
+    a quarter of their text size; register `FASTAParser()` to get SeqRecords.
+
+    Example:
+        >>> registry = GenomicFileRegistry()
+        >>> parser = registry.get_parser(FileFormat.SFF)
+    """
+    def __init__(self):
+        self._parsers: Dict[FileFormat, GenomicFileParser] = {
+            FileFormat.FASTA: FASTAParser(packed=True),
+            FileFormat.SFF: SFFParser(),
+            FileFormat.CSFASTA: CSFASTAParser(),
+            FileFormat.TWOBIT: TwoBitParser(),
+            FileFormat.BED: BEDParser(),
+        }
+
+    def register(self, file_format: FileFormat, parser: GenomicFileParser):
+        """Register or replace the parser for a format"""
+        self._parsers[file_format] = parser
+
+    def get_parser(self, file_format: FileFormat) -> GenomicFileParser:
+        """Return the parser for a format; raises KeyError if none is registered"""
+        return self._parsers[file_format]
@@ -0,0 +1,141 @@
+from typing import Any, Iterator, List, Tuple, Union
+from dataclasses import dataclass
+import numpy as np
+from .packed_sequence import PackedSequence
+from .records import iter_sequences
+
+PREFIX_BLOCK_SIZE = 16 * 1024 * 1024  # Bases per cumulative-sum block
+
+# Per-base lookup tables over the uint8 view of a sequence
+GC_TABLE = np.zeros(256, dtype=np.uint8)
+for _base in "GCSgcs":
+    GC_TABLE[ord(_base)] = 1
+CALLED_TABLE = np.zeros(256, dtype=np.uint8)
+for _base in "ACGTSWacgtsw":
+    CALLED_TABLE[ord(_base)] = 1
+# Both counts in one int64 (GC in the high 32 bits) so a single cumsum serves both
+PACKED_TABLE = (GC_TABLE.astype(np.int64) << 32) | CALLED_TABLE
+
+@dataclass
+class GCTrack:
+    """
+    Windowed GC content of one contig.
+
+    Attributes:
+        contig (str): Contig name
+        length (int): Contig length in bases
+        values (np.ndarray): GC fraction per window (float32, NaN if no called bases)
+    """
+    contig: str
+    length: int
+    values: np.ndarray
+
+@dataclass
+class GCProfile:
+    """
+    Sliding-window GC content for every contig of a variable.
+
+    Window coordinates are implied by `window` and `step`, so only one
+    float32 is stored per window. Iterating yields bedGraph rows
+    (contig, start, end, gc) and skips windows without called bases.
+    """
+    window: int
+    step: int
+    tracks: List[GCTrack]
+
+    def windows(self, length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Start and end coordinates of the windows over a contig"""
+        return window_bounds(length, self.window, self.step)
+
+    def to_array(self) -> np.ndarray:
+        """All window values concatenated in contig order"""
+        if not self.tracks:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate([track.values for track in self.tracks])
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, float]]:
+        for track in self.tracks:
+            starts, ends = self.windows(track.length)
+            for start, end, value in zip(starts.tolist(), ends.tolist(), track.values.tolist()):
+                if value == value:  # skip NaN
+                    yield track.contig, start, end, round(value, 4)
+
+def window_bounds(length: int, window: int, step: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Window starts/ends; a final partial window covers any remaining tail that the step reaches"""
+    if window <= 0 or step <= 0:
+        raise ValueError("window and step must be positive")
+    if length == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.arange(0, max(length - window, 0) + 1, step, dtype=np.int64)
+    # With step > window the next start may already lie past the end, leaving no tail to cover
+    if starts[-1] + window < length and starts[-1] + step < length:
+        starts = np.append(starts, starts[-1] + step)
+    return starts, np.minimum(starts + window, length)
+
+def _blocks(sequence: Union[str, bytes, np.ndarray, PackedSequence]) -> Iterator[np.ndarray]:
+    """Yield the sequence as uint8 ASCII blocks of PREFIX_BLOCK_SIZE bases"""
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii')
+    if isinstance(sequence, bytes):
+        sequence = np.frombuffer(sequence, dtype=np.uint8)
+    for block_start in range(0, len(sequence), PREFIX_BLOCK_SIZE):
+        block = sequence[block_start:block_start + PREFIX_BLOCK_SIZE]
+        # Packed sequences are unpacked one block at a time
+        yield block.ascii() if isinstance(block, PackedSequence) else block
+
+def _prefix_at(sequence: Union[str, bytes, np.ndarray, PackedSequence], table: np.ndarray,
+               positions: np.ndarray) -> np.ndarray:
+    """
+    Prefix sums of table[sequence] sampled at sorted `positions`.
+
+    The cumulative sum is taken block by block with a running total, so a
+    whole chromosome never needs a full-length prefix array.
+    """
+    result = np.zeros(len(positions), dtype=np.int64)
+    total = block_start = 0
+    for block in _blocks(sequence):
+        cumulative = np.cumsum(table[block])
+        block_end = block_start + len(cumulative)
+        lo, hi = np.searchsorted(positions, [block_start + 1, block_end + 1])
+        result[lo:hi] = total + cumulative[positions[lo:hi] - block_start - 1]
+        total += int(cumulative[-1])
+        block_start = block_end
+    return result
+
+def gc_windows(sequence: Union[str, bytes, np.ndarray, PackedSequence], window: int = 100,
+               step: int = None) -> np.ndarray:
+    """
+    GC fraction of every window over one sequence.
+
+    Each window costs O(1): the GC and called-base counts are differences of
+    prefix sums at its two ends. N and other ambiguous bases are excluded
+    from the denominator.
+    """
+    step = step or window
+    starts, ends = window_bounds(len(sequence), window, step)
+    positions = np.sort(np.concatenate((starts, ends)))
+    prefix = _prefix_at(sequence, PACKED_TABLE, positions)
+    counts = prefix[np.searchsorted(positions, ends)] - prefix[np.searchsorted(positions, starts)]
+    gc, called = counts >> 32, counts & 0xFFFFFFFF
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(called > 0, gc / called, np.nan).astype(np.float32)
+
+def iter_gc_tracks(data: Any, window: int = 100, step: int = None) -> Iterator[GCTrack]:
+    """Stream GC tracks contig by contig"""
+    for name, sequence in iter_sequences(data):
+        yield GCTrack(name.split()[0] if name else '', len(sequence),
+                      gc_windows(sequence, window, step))
+
+def gc_profile(data: Any, window: int = 100, step: int = None) -> GCProfile:
+    """Sliding-window GC content for every contig in `data`"""
+    step = step or window
+    return GCProfile(window, step, list(iter_gc_tracks(data, window, step)))
+
+def gc_fraction(data: Any) -> float:
+    """Overall GC fraction of called bases across every sequence in `data`"""
+    gc = called = 0
+    for _, sequence in iter_sequences(data):
+        for block in _blocks(sequence):
+            gc += int(GC_TABLE[block].sum(dtype=np.int64))
+            called += int(CALLED_TABLE[block].sum(dtype=np.int64))
+    return gc / called if called else 0.0
@@ -0,0 +1,141 @@
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+from struct import pack
+from .compressed_io import BGZFWriter
+
+LINEAR_SHIFT = 14  # 16kb linear index windows
+META_BIN = 37450  # Pseudo-bin holding per-reference offsets and read counts
+
+# Tabix presets: (format, seq column, begin column, end column, meta char)
+TABIX_PRESETS = {
+    'VCF': (2, 1, 2, 0, '#'),
+    'BED': (0x10000, 1, 2, 3, '#'),
+}
+
+def reg2bin(beg: int, end: int) -> int:
+    """UCSC/SAM binning scheme: smallest bin fully containing [beg, end)"""
+    end -= 1
+    if beg >> 14 == end >> 14:
+        return ((1 << 15) - 1) // 7 + (beg >> 14)
+    if beg >> 17 == end >> 17:
+        return ((1 << 12) - 1) // 7 + (beg >> 17)
+    if beg >> 20 == end >> 20:
+        return ((1 << 9) - 1) // 7 + (beg >> 20)
+    if beg >> 23 == end >> 23:
+        return ((1 << 6) - 1) // 7 + (beg >> 23)
+    if beg >> 26 == end >> 26:
+        return ((1 << 3) - 1) // 7 + (beg >> 26)
+    return 0
+
+@dataclass
+class ReferenceIndex:
+    bins: Dict[int, List[List[int]]] = field(default_factory=dict)
+    linear: List[Optional[int]] = field(default_factory=list)
+    off_beg: Optional[int] = None
+    off_end: int = 0
+    n_mapped: int = 0
+    n_unmapped: int = 0
+
+class BinningIndex:
+    """
+    Bin and linear index shared by BAI and TBI, built while records are written.
+
+    Offsets are recorded as positions in the uncompressed stream and mapped
+    to BGZF virtual offsets when the index is saved, after the last block
+    has been compressed.
+
+    Example:
+        >>> index = BinningIndex()
+        >>> index.add(0, 100, 150, start_offset, end_offset)
+        >>> index.save_bai("sample.bam.bai", n_refs, writer.virtual_offset)
+    """
+    def __init__(self):
+        self.references: List[ReferenceIndex] = []
+        self.n_no_coor = 0
+        self._last = (-1, -1)
+
+    def add(self, ref_id: int, beg: int, end: int, start_offset: int, end_offset: int,
+            unmapped: bool = False):
+        """Record one sorted record spanning [beg, end) on reference `ref_id`"""
+        if ref_id < 0:
+            self.n_no_coor += 1
+            return
+        if (ref_id, beg) < self._last:
+            raise ValueError(
+                f"Records are not coordinate-sorted at reference {ref_id}, position {beg}"
+            )
+        self._last = (ref_id, beg)
+
+        while len(self.references) <= ref_id:
+            self.references.append(ReferenceIndex())
+        ref = self.references[ref_id]
+        end = max(end, beg + 1)
+
+        chunks = ref.bins.setdefault(reg2bin(beg, end), [])
+        if chunks and chunks[-1][1] == start_offset:
+            chunks[-1][1] = end_offset
+        else:
+            chunks.append([start_offset, end_offset])
+
+        last_window = (end - 1) >> LINEAR_SHIFT
+        if len(ref.linear) <= last_window:
+            ref.linear.extend([None] * (last_window + 1 - len(ref.linear)))
+        for window in range(beg >> LINEAR_SHIFT, last_window + 1):
+            if ref.linear[window] is None:
+                ref.linear[window] = start_offset
+
+        if ref.off_beg is None:
+            ref.off_beg = start_offset
+        ref.off_end = end_offset
+        if unmapped:
+            ref.n_unmapped += 1
+        else:
+            ref.n_mapped += 1
+
+    def _encode(self, n_refs: int, resolve: Callable[[int], int]) -> bytes:
+        parts = []
+        for ref_id in range(n_refs):
+            ref = self.references[ref_id] if ref_id < len(self.references) else ReferenceIndex()
+            has_meta = ref.off_beg is not None
+            parts.append(pack('<i', len(ref.bins) + has_meta))
+            for bin_id in sorted(ref.bins):
+                # Chunks that meet inside one BGZF block cost no extra seek; merge them
+                chunks = []
+                for start, end in ref.bins[bin_id]:
+                    start, end = resolve(start), resolve(end)
+                    if chunks and chunks[-1][1] >> 16 == start >> 16:
+                        chunks[-1][1] = max(chunks[-1][1], end)
+                    else:
+                        chunks.append([start, end])
+                parts.append(pack('<Ii', bin_id, len(chunks)))
+                parts.extend(pack('<QQ', start, end) for start, end in chunks)
+            if has_meta:
+                parts.append(pack('<Ii', META_BIN, 2))
+                parts.append(pack('<QQ', resolve(ref.off_beg), resolve(ref.off_end)))
+                parts.append(pack('<QQ', ref.n_mapped, ref.n_unmapped))
+
+            # Empty windows point at the next non-empty one
+            linear = list(ref.linear)
+            for window in range(len(linear) - 2, -1, -1):
+                if linear[window] is None:
+                    linear[window] = linear[window + 1]
+            parts.append(pack('<i', len(linear)))
+            parts.extend(pack('<Q', resolve(offset)) for offset in linear)
+        parts.append(pack('<Q', self.n_no_coor))
+        return b''.join(parts)
+
+    def save_bai(self, file_path: str, n_refs: int, resolve: Callable[[int], int]):
+        """Write a BAM index (.bai)"""
+        with open(file_path, 'wb') as f:
+            f.write(b'BAI\x01' + pack('<i', n_refs) + self._encode(n_refs, resolve))
+
+    def save_tbi(self, file_path: str, names: List[str], preset: str,
+                 resolve: Callable[[int], int]):
+        """Write a BGZF-compressed tabix index (.tbi)"""
+        fmt, col_seq, col_beg, col_end, meta = TABIX_PRESETS[preset]
+        names_blob = b''.join(name.encode() + b'\x00' for name in names)
+        header = b'TBI\x01' + pack(
+            '<8i', len(names), fmt, col_seq, col_beg, col_end, ord(meta), 0, len(names_blob)
+        )
+        with BGZFWriter(file_path, threads=1) as f:
+            f.write(header + names_blob + self._encode(len(names), resolve))
@@ -0,0 +1,225 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+import numpy as np
+import pysam
+
+@dataclass
+class Intervals:
+    """
+    Columnar half-open intervals.
+
+    Attributes:
+        contigs (List[str]): Contig names, indexed by `contig`
+        contig (np.ndarray): Contig id of each interval (int32)
+        start (np.ndarray): 0-based starts (int64)
+        end (np.ndarray): Exclusive ends (int64)
+        fields (Optional[List[str]]): Remaining columns of each interval, tab-joined
+    """
+    contigs: List[str]
+    contig: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    fields: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def row(self, i: int) -> Tuple:
+        row = (self.contigs[self.contig[i]], int(self.start[i]), int(self.end[i]))
+        if self.fields is not None and self.fields[i]:
+            row += tuple(self.fields[i].split('\t'))
+        return row
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def is_sorted(self) -> bool:
+        """Whether intervals are ordered by (contig id, start)"""
+        keys = self.contig.astype(np.int64) << 32 | self.start
+        return bool(np.all(keys[1:] >= keys[:-1]))
+
+class IntervalBuilder:
+    """Accumulates intervals row by row into columnar arrays"""
+    def __init__(self):
+        self.contig_ids: Dict[str, int] = {}
+        self.contig: List[int] = []
+        self.start: List[int] = []
+        self.end: List[int] = []
+        self.fields: List[str] = []
+
+    def add(self, contig: str, start: int, end: int, fields: str = ''):
+        contig_id = self.contig_ids.get(contig)
+        if contig_id is None:
+            contig_id = self.contig_ids[contig] = len(self.contig_ids)
+        self.contig.append(contig_id)
+        self.start.append(start)
+        self.end.append(end)
+        self.fields.append(fields)
+
+    def build(self) -> Intervals:
+        return Intervals(list(self.contig_ids), np.array(self.contig, dtype=np.int32),
+                         np.array(self.start, dtype=np.int64), np.array(self.end, dtype=np.int64),
+                         self.fields if any(self.fields) else None)
+
+def to_intervals(data: Any) -> Intervals:
+    """
+    Intervals of BED rows, variants or aligned reads.
+
+    Accepts `Intervals`, pysam VariantFile/AlignmentFile handles or their
+    records, (contig, start, end, ...) tuples and dicts with chrom/start/end.
+    Unmapped reads are skipped; variants span their reference allele.
+    """
+    if isinstance(data, Intervals):
+        return data
+    if hasattr(data, 'reset'):
+        data.reset()
+    builder = IntervalBuilder()
+    for record in data:
+        if isinstance(record, pysam.AlignedSegment):
+            if record.is_unmapped or record.reference_name is None:
+                continue
+            builder.add(record.reference_name, record.reference_start, record.reference_end,
+                        record.query_name or '')
+        elif isinstance(record, pysam.VariantRecord):
+            builder.add(record.chrom, record.start, record.stop, record.id or '.')
+        elif isinstance(record, dict):
+            builder.add(str(record['chrom']), int(record['start']), int(record['end']),
+                        str(record.get('name', '')))
+        elif isinstance(record, (tuple, list)):
+            builder.add(str(record[0]), int(record[1]), int(record[2]),
+                        '\t'.join(str(v) for v in record[3:]))
+        else:
+            raise ValueError(f"Cannot use {type(record).__name__} as an interval")
+    return builder.build()
+
+def _rank(keys: np.ndarray, values: np.ndarray, side: str, order: Optional[np.ndarray]) -> np.ndarray:
+    """
+    `np.searchsorted(keys, values, side)` as a merge join over `values[order]`.
+
+    A stable sort of two concatenated sorted runs is a single linear merge;
+    placing values before (left) or after (right) equal keys gives the rank.
+    Small query batches fall back to binary search.
+    """
+    if len(values) < len(keys) // 8:
+        return np.searchsorted(keys, values, side=side)
+    ordered = values if order is None else values[order]
+    merged = np.concatenate((ordered, keys) if side == 'left' else (keys, ordered))
+    merge = np.argsort(merged, kind='stable')
+    is_value = merge < len(values) if side == 'left' else merge >= len(keys)
+    ranks = np.flatnonzero(is_value) - np.arange(len(values))
+    if order is None:
+        return ranks
+    result = np.empty_like(ranks)
+    result[order] = ranks
+    return result
+
+def _sort_order(values: np.ndarray) -> Optional[np.ndarray]:
+    """Permutation sorting `values`, or None when they are already sorted"""
+    if np.all(values[1:] >= values[:-1]):
+        return None
+    return np.argsort(values, kind='stable')
+
+@dataclass
+class OverlapHits:
+    """
+    Overlapping (query, interval) pairs as index arrays into both sets.
+
+    Iterating yields bedtools `-wa -wb` style rows: the query columns
+    followed by the overlapping interval's columns.
+    """
+    queries: Intervals
+    targets: Intervals
+    query: np.ndarray
+    target: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.query)
+
+    def counts(self) -> np.ndarray:
+        """Number of overlapping intervals per query"""
+        return np.bincount(self.query, minlength=len(self.queries))
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for q, t in zip(self.query.tolist(), self.target.tolist()):
+            yield self.queries.row(q) + self.targets.row(t)
+
+class IntervalIndex:
+    """
+    Nested containment list over NumPy arrays.
+
+    Intervals are sorted by (start, -end) and split into containment
+    layers: each layer holds the intervals not contained in another
+    interval of the remaining set, so within a layer both starts and ends
+    are sorted and the intervals overlapping a query form one contiguous
+    range found with two binary searches. Contigs share one coordinate
+    space, and whole query batches are answered per layer with one merge
+    join of the sorted query coordinates against the layer.
+
+    Example:
+        >>> index = IntervalIndex(annotations)
+        >>> hits = index.overlap(variants)
+        >>> hits.counts()
+    """
+    def __init__(self, data: Any):
+        self.intervals = to_intervals(data)
+        intervals = self.intervals
+        lengths = np.zeros(len(intervals.contigs), dtype=np.int64)
+        np.maximum.at(lengths, intervals.contig, intervals.end)
+        bases = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        self._bases = dict(zip(intervals.contigs, bases.tolist()))
+        self._lengths = dict(zip(intervals.contigs, lengths.tolist()))
+
+        starts = bases[intervals.contig] + intervals.start
+        ends = bases[intervals.contig] + intervals.end
+        remaining = np.lexsort((-ends, starts))
+        self._layers: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        while len(remaining):
+            layer_ends = ends[remaining]
+            contained = np.zeros(len(remaining), dtype=bool)
+            contained[1:] = np.maximum.accumulate(layer_ends)[:-1] >= layer_ends[1:]
+            layer = remaining[~contained]
+            self._layers.append((starts[layer], ends[layer], layer))
+            remaining = remaining[contained]
+
+    @property
+    def depth(self) -> int:
+        """Number of containment layers"""
+        return len(self._layers)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def overlap(self, data: Any) -> OverlapHits:
+        """All (query, interval) pairs sharing at least one base, ordered by query"""
+        queries = to_intervals(data)
+        bases = np.array([self._bases.get(name, -1) for name in queries.contigs], dtype=np.int64)
+        lengths = np.array([self._lengths.get(name, 0) for name in queries.contigs], dtype=np.int64)
+        query_bases = bases[queries.contig] if len(queries) else np.empty(0, dtype=np.int64)
+        query_lengths = lengths[queries.contig] if len(queries) else np.empty(0, dtype=np.int64)
+        # Queries are clipped to their contig's span, so none reaches into a neighbouring contig
+        known = np.flatnonzero((query_bases >= 0) & (queries.start < query_lengths) & (queries.end > 0))
+        query_starts = query_bases[known] + np.maximum(queries.start[known], 0)
+        query_ends = query_bases[known] + np.minimum(queries.end[known], query_lengths[known])
+        # Sorted once so every layer is a merge join; pre-sorted inputs skip the sort
+        start_order, end_order = _sort_order(query_starts), _sort_order(query_ends)
+
+        hit_queries, hit_targets = [], []
+        for layer_starts, layer_ends, ids in self._layers:
+            lo = _rank(layer_ends, query_starts, 'right', start_order)
+            hi = _rank(layer_starts, query_ends, 'left', end_order)
+            counts = np.maximum(hi - lo, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+            offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)
+            hit_queries.append(np.repeat(known, counts))
+            hit_targets.append(ids[offsets])
+
+        if not hit_queries:
+            empty = np.empty(0, dtype=np.int64)
+            return OverlapHits(queries, self.intervals, empty, empty)
+        query = np.concatenate(hit_queries)
+        target = np.concatenate(hit_targets)
+        order = np.lexsort((self.intervals.start[target], query))
+        return OverlapHits(queries, self.intervals, query[order], target[order])
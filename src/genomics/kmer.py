@@ -0,0 +1,242 @@
+from typing import Any, Iterator, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import os
+import tempfile
+import numpy as np
+from .packed_sequence import PackedSequence
+from .records import iter_sequences
+from ..utils.parallel import bounded_map
+
+MAX_K = 32  # k-mers are packed 2 bits per base into one uint64
+
+# 2-bit base codes (A=0, C=1, G=2, T=3); anything else maps to 4 and breaks k-mers
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+SPILL_DTYPE = np.dtype([('kmer', '<u8'), ('count', '<u4')])
+
+def encode_bases(sequence: Union[str, bytes]) -> np.ndarray:
+    """Map a sequence to 2-bit base codes (uint8, 4 for non-ACGT)"""
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii')
+    return BASE_CODES[np.frombuffer(sequence, dtype=np.uint8)]
+
+def kmer_codes(sequence: Union[str, bytes, np.ndarray], k: int,
+               canonical: bool = True) -> np.ndarray:
+    """
+    Pack every k-mer of a sequence into a uint64, skipping k-mers with non-ACGT bases.
+
+    The rolling update is vectorized over all windows at once: each of the
+    k steps shifts the whole array of partial k-mers and ORs in the next
+    base column. Canonical k-mers are the minimum of forward and reverse
+    complement encodings.
+    """
+    if not 0 < k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+    codes = sequence if isinstance(sequence, np.ndarray) else encode_bases(sequence)
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    invalid = codes > 3
+    bases = np.where(invalid, 0, codes).astype(np.uint64)
+    forward = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        forward <<= np.uint64(2)
+        forward |= bases[j:j + n]
+    if canonical:
+        reverse = np.zeros(n, dtype=np.uint64)
+        complement = np.uint64(3) - bases
+        for j in range(k):
+            reverse |= complement[j:j + n] << np.uint64(2 * j)
+        np.minimum(forward, reverse, out=forward)
+
+    # A window is valid when it contains no non-ACGT base
+    invalid_prefix = np.concatenate(([0], np.cumsum(invalid, dtype=np.int64)))
+    return forward[invalid_prefix[k:] == invalid_prefix[:-k]]
+
+def encode_kmer(kmer: str, canonical: bool = True) -> int:
+    """Pack a single k-mer string"""
+    codes = kmer_codes(kmer, len(kmer), canonical)
+    if len(codes) == 0:
+        raise ValueError(f"Invalid k-mer: {kmer}")
+    return int(codes[0])
+
+def decode_kmer(code: int, k: int) -> str:
+    """Unpack a uint64 k-mer code into its bases"""
+    return ''.join("ACGT"[(int(code) >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+def reduce_counts(kmers: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort-and-reduce: sum the counts of equal k-mers, returning sorted unique k-mers"""
+    if len(kmers) == 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint32)
+    order = np.argsort(kmers, kind='stable')
+    kmers = kmers[order]
+    starts = np.flatnonzero(np.concatenate(([True], kmers[1:] != kmers[:-1])))
+    totals = np.add.reduceat(counts[order].astype(np.uint64), starts)
+    return kmers[starts], np.minimum(totals, np.iinfo(np.uint32).max).astype(np.uint32)
+
+def sequence_chunks(data: Any, k: int, chunk_size: int) -> Iterator[Any]:
+    """
+    Every sequence in `data` cut into chunks starting `chunk_size` bases apart, for per-chunk
+    k-mer work. Packed sequences come out as 2-bit base codes, others as slices of themselves
+    """
+    for _, sequence in iter_sequences(data):
+        for start in range(0, max(len(sequence) - k + 1, 1), chunk_size):
+            # Overlap by k-1 bases so k-mers spanning chunk borders are kept
+            chunk = sequence[start:start + chunk_size + k - 1]
+            yield chunk.base_codes() if isinstance(chunk, PackedSequence) else chunk
+
+def _count_chunk(task: Tuple[Union[bytes, np.ndarray], int, bool]) -> Tuple[np.ndarray, np.ndarray]:
+    """Count the k-mers of one sequence chunk; runs in a worker process"""
+    sequence, k, canonical = task
+    kmers, counts = np.unique(kmer_codes(sequence, k, canonical), return_counts=True)
+    return kmers, counts.astype(np.uint32)
+
+def _reduce_partition(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce one spilled partition file; runs in a worker process"""
+    records = np.fromfile(path, dtype=SPILL_DTYPE)
+    return reduce_counts(records['kmer'], records['count'])
+
+@dataclass
+class KmerSpectrum:
+    """
+    Sorted k-mer count table.
+
+    Attributes:
+        k (int): k-mer length
+        canonical (bool): Whether k-mers were canonicalized with their reverse complement
+        kmers (np.ndarray): Sorted unique 2-bit packed k-mers (uint64)
+        counts (np.ndarray): Occurrence count of each k-mer (uint32)
+    """
+    k: int
+    canonical: bool
+    kmers: np.ndarray
+    counts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.kmers)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum(dtype=np.uint64))
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Batch lookup of packed k-mers by binary search; missing k-mers count 0"""
+        codes = np.asarray(codes, dtype=np.uint64)
+        if len(self.kmers) == 0:
+            return np.zeros(len(codes), dtype=np.uint32)
+        index = np.minimum(np.searchsorted(self.kmers, codes), len(self.kmers) - 1)
+        return np.where(self.kmers[index] == codes, self.counts[index], 0).astype(np.uint32)
+
+    def get(self, kmer: str) -> int:
+        """Count of a single k-mer string"""
+        if len(kmer) != self.k:
+            raise ValueError(f"Expected a {self.k}-mer, got {kmer}")
+        return int(self.lookup([encode_kmer(kmer, self.canonical)])[0])
+
+    def histogram(self) -> np.ndarray:
+        """k-mer spectrum: entry i is the number of distinct k-mers seen i times"""
+        return np.bincount(self.counts)
+
+    def most_common(self, n: int = 10) -> List[Tuple[str, int]]:
+        top = np.argsort(self.counts, kind='stable')[::-1][:n]
+        return [(decode_kmer(self.kmers[i], self.k), int(self.counts[i])) for i in top]
+
+class _PartitionStore:
+    """Range-partitioned (k-mer, count) buffers that spill to disk past a memory budget"""
+    def __init__(self, k: int, partitions: int, memory_limit: int, spill_dir: str):
+        bits = min(max(partitions, 1).bit_length() - 1, 2 * k)
+        self.shift = np.uint64(2 * k - bits)
+        self.n_partitions = 1 << bits
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.parts: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(self.n_partitions)]
+        self.in_memory = 0
+        self.spilled = False
+
+    def _path(self, partition: int) -> str:
+        return os.path.join(self.spill_dir, f"partition_{partition:05d}.bin")
+
+    def add(self, kmers: np.ndarray, counts: np.ndarray):
+        # Chunk results are sorted, so partitions are contiguous slices
+        bounds = np.searchsorted(kmers >> self.shift, np.arange(self.n_partitions + 1, dtype=np.uint64))
+        for partition in range(self.n_partitions):
+            lo, hi = bounds[partition], bounds[partition + 1]
+            if hi > lo:
+                self.parts[partition].append((kmers[lo:hi], counts[lo:hi]))
+        self.in_memory += kmers.nbytes + counts.nbytes
+        if self.in_memory > self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        for partition, parts in enumerate(self.parts):
+            if not parts:
+                continue
+            records = np.empty(sum(len(kmers) for kmers, _ in parts), dtype=SPILL_DTYPE)
+            records['kmer'] = np.concatenate([kmers for kmers, _ in parts])
+            records['count'] = np.concatenate([counts for _, counts in parts])
+            with open(self._path(partition), 'ab') as f:
+                records.tofile(f)
+            parts.clear()
+        self.in_memory = 0
+        self.spilled = True
+
+    def finish(self, workers: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.spilled:
+            self.spill()
+            paths = [self._path(p) for p in range(self.n_partitions) if os.path.exists(self._path(p))]
+            results = list(bounded_map(_reduce_partition, paths, workers))
+        else:
+            results = [
+                reduce_counts(np.concatenate([k for k, _ in parts]), np.concatenate([c for _, c in parts]))
+                for parts in self.parts if parts
+            ]
+        if not results:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint32)
+        # Partitions are k-mer ranges, so concatenating them keeps the table sorted
+        return (np.concatenate([kmers for kmers, _ in results]),
+                np.concatenate([counts for _, counts in results]))
+
+class KmerCounter:
+    """
+    Parallel 2-bit k-mer counter.
+
+    Sequences are cut into overlapping chunks whose k-mers are packed and
+    pre-reduced (sort-and-reduce) in worker processes. Results are range-
+    partitioned by their high bits and spilled to disk once `memory_limit`
+    bytes are buffered; each partition is then reduced independently, so
+    peak memory is bounded by the largest partition rather than the input.
+
+    Example:
+        >>> counter = KmerCounter(k=21)
+        >>> spectrum = counter.count(records)
+        >>> spectrum.get("ACGTACGTACGTACGTACGTA")
+    """
+    def __init__(self, k: int = 21, canonical: bool = True, workers: Optional[int] = None,
+                 partitions: int = 64, memory_limit: int = 1024 ** 3,
+                 chunk_size: int = 4 * 1024 * 1024, spill_dir: Optional[str] = None):
+        if not 0 < k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+        self.k = k
+        self.canonical = canonical
+        self.workers = workers
+        self.partitions = partitions
+        self.memory_limit = memory_limit
+        self.chunk_size = chunk_size
+        self.spill_dir = spill_dir
+
+    def _chunks(self, data: Any) -> Iterator[Tuple[bytes, int, bool]]:
+        for chunk in sequence_chunks(data, self.k, self.chunk_size):
+            yield chunk.encode('ascii') if isinstance(chunk, str) else chunk, self.k, self.canonical
+
+    def count(self, data: Any) -> KmerSpectrum:
+        """Count k-mers across every sequence in `data`"""
+        with tempfile.TemporaryDirectory(dir=self.spill_dir) as spill_dir:
+            store = _PartitionStore(self.k, self.partitions, self.memory_limit, spill_dir)
+            for kmers, counts in bounded_map(_count_chunk, self._chunks(data), self.workers):
+                store.add(kmers, counts)
+            kmers, counts = store.finish(self.workers)
+        return KmerSpectrum(self.k, self.canonical, kmers, counts)
@@ -0,0 +1,233 @@
+from typing import Any, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+import os
+import numpy as np
+import pysam
+from .kmer import MAX_K, kmer_codes, sequence_chunks
+from .records import FileRecords
+from .sketches import mix64
+from ..utils.parallel import bounded_map
+
+SIDECAR_SUFFIX = '.minhash'
+CHUNK_SIZE = 4 * 1024 * 1024  # Bases hashed per step, bounding memory for whole chromosomes
+
+@dataclass
+class MinHashSketch:
+    """
+    Bottom-k MinHash sketch: the `size` smallest hashes of a sample's canonical k-mers.
+
+    Attributes:
+        name (str): Sample name
+        k (int): k-mer length
+        size (int): Maximum number of hashes kept
+        seed (int): Hash seed; only sketches with equal k and seed are comparable
+        hashes (np.ndarray): Sorted unique uint64 hashes
+    """
+    name: str
+    k: int
+    size: int
+    seed: int
+    hashes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, codes: np.ndarray):
+        """Fold packed k-mers into the sketch"""
+        hashes = mix64(codes ^ np.uint64(self.seed))
+        if len(self.hashes) >= self.size:
+            # Only hashes below the current maximum can enter a full sketch
+            hashes = hashes[hashes < self.hashes[-1]]
+        merged = np.sort(np.concatenate((self.hashes, hashes)))
+        if len(merged):
+            merged = merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+        self.hashes = merged[:self.size]
+
+    def save(self, file_path: str, source: Optional[os.stat_result] = None):
+        """Write the sketch, stamped with the size and mtime of the file it was computed from"""
+        stamp = (source.st_size, source.st_mtime_ns) if source is not None else (-1, -1)
+        with open(file_path, 'wb') as handle:
+            np.savez(handle, hashes=self.hashes, name=self.name,
+                     params=np.array([self.k, self.size, self.seed, *stamp], dtype=np.int64))
+
+    @classmethod
+    def load(cls, file_path: str) -> Tuple['MinHashSketch', Tuple[int, int]]:
+        """Read a saved sketch and the (size, mtime) stamp of its source"""
+        with np.load(file_path) as saved:
+            k, size, seed, source_size, source_mtime = saved['params'].tolist()
+            return cls(str(saved['name']), k, size, seed, saved['hashes']), (source_size, source_mtime)
+
+def source_path(data: Any) -> Optional[str]:
+    """Path of the file behind `data` (a path, FileRecords or pysam handle), if any"""
+    if isinstance(data, str):
+        return data if os.path.exists(data) else None
+    if isinstance(data, FileRecords):
+        return data.file_path
+    filename = getattr(data, 'filename', None)
+    if isinstance(filename, bytes):
+        filename = filename.decode()
+    return filename if isinstance(filename, str) and os.path.exists(filename) else None
+
+def _sketch_sample(task: Tuple['MinHasher', str, Any]) -> MinHashSketch:
+    """Sketch one sample; runs in a worker process"""
+    hasher, name, data = task
+    if isinstance(data, str):
+        data = FileRecords(data)
+    sketch = MinHashSketch(name, hasher.k, hasher.size, hasher.seed, np.empty(0, dtype=np.uint64))
+    if hasattr(data, 'reset'):
+        data.reset()
+    for chunk in sequence_chunks(data, hasher.k, CHUNK_SIZE):
+        sketch.add(kmer_codes(chunk, hasher.k))
+    return sketch
+
+@dataclass
+class SimilarityMatrix:
+    """
+    All-vs-all similarity of sketched samples.
+
+    Behaves as a NumPy matrix of the chosen `metric` (`np.asarray(matrix)`),
+    and iterates as labelled rows so EXPORT writes it as a TSV table.
+
+    Attributes:
+        names (List[str]): Sample names, in row/column order
+        jaccard (np.ndarray): Estimated Jaccard similarity of k-mer sets
+        k (int): k-mer length used for the Mash distance
+        metric (str): 'jaccard' or 'distance'
+    """
+    names: List[str]
+    jaccard: np.ndarray
+    k: int
+    metric: str = 'jaccard'
+
+    @property
+    def distance(self) -> np.ndarray:
+        """Mash distance -ln(2J / (1 + J)) / k, capped at 1 for disjoint samples"""
+        with np.errstate(divide='ignore'):
+            distance = -np.log(2 * self.jaccard / (1 + self.jaccard)) / self.k
+        return np.minimum(distance, 1.0)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.distance if self.metric == 'distance' else self.jaccard
+
+    @property
+    def header(self) -> str:
+        return '\t'.join(['sample'] + self.names)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for name, row in zip(self.names, self.values.tolist()):
+            yield (name, *(f"{value:.6g}" for value in row))
+
+def jaccard_matrix(sketches: List[MinHashSketch]) -> np.ndarray:
+    """
+    Pairwise Jaccard estimates from bottom-k sketches.
+
+    For sketches A and B of capacity s, the estimate is the fraction of the
+    s smallest hashes of A | B that occur in both. Each row is computed
+    against all other sketches at once: a hash of B at column c is among
+    the union's bottom s when |A < h| + c - |shared before c| < s, with
+    |A < h| found by one batched binary search into A.
+    """
+    n = len(sketches)
+    size = min((s.size for s in sketches), default=0)
+    lengths = np.array([len(s) for s in sketches], dtype=np.int64)
+    width = max(int(lengths.max(initial=0)), 1)
+    table = np.full((n, width), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, sketch in enumerate(sketches):
+        table[i, :len(sketch)] = sketch.hashes
+    valid = np.arange(width) < lengths[:, None]
+    columns = np.arange(width)
+
+    jaccard = np.eye(n)
+    for i in range(n - 1):
+        own = table[i, :lengths[i]]
+        others, others_valid = table[i + 1:], valid[i + 1:]
+        below = np.searchsorted(own, others)
+        shared = (own[np.minimum(below, max(len(own) - 1, 0))] == others) & others_valid \
+            if len(own) else np.zeros_like(others_valid)
+        union_rank = below + columns - (np.cumsum(shared, axis=1) - shared)
+        in_bottom = shared & (union_rank < size)
+        union = np.minimum(size, lengths[i] + lengths[i + 1:] - shared.sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            row = np.where(union > 0, in_bottom.sum(axis=1) / np.maximum(union, 1), 0.0)
+        jaccard[i, i + 1:] = jaccard[i + 1:, i] = row
+    return jaccard
+
+class MinHasher:
+    """
+    Bottom-k MinHash sketching and all-vs-all comparison of samples.
+
+    Samples are sketched in parallel worker processes. Sketches of samples
+    backed by a file are saved beside it as `<file>.minhash` and reused
+    while the file's size, mtime, k, size and seed are unchanged, so
+    re-runs only hash new or modified inputs.
+
+    Example:
+        >>> hasher = MinHasher(k=21, size=1000)
+        >>> matrix = hasher.compare([("a", "a.fq.gz"), ("b", genome)])
+        >>> matrix.distance
+    """
+    def __init__(self, k: int = 21, size: int = 1000, seed: int = 42,
+                 workers: Optional[int] = None, cache: bool = True):
+        if not 0 < k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+        if size < 1:
+            raise ValueError("size must be positive")
+        self.k = k
+        self.size = size
+        self.seed = seed
+        self.workers = workers
+        self.cache = cache
+
+    def _cached(self, name: str, path: Optional[str]) -> Optional[MinHashSketch]:
+        sidecar = path + SIDECAR_SUFFIX if path else None
+        if not self.cache or not sidecar or not os.path.exists(sidecar):
+            return None
+        try:
+            sketch, stamp = MinHashSketch.load(sidecar)
+        except (OSError, ValueError, KeyError):
+            return None
+        stat = os.stat(path)
+        if stamp != (stat.st_size, stat.st_mtime_ns) or \
+                (sketch.k, sketch.size, sketch.seed) != (self.k, self.size, self.seed):
+            return None
+        sketch.name = name
+        return sketch
+
+    def sketch(self, samples: List[Tuple[str, Any]],
+               sources: Optional[List[Optional[str]]] = None) -> List[MinHashSketch]:
+        """
+        Sketch (name, data) samples, reusing and writing sidecar sketches.
+
+        `sources` names the file each sample was loaded from when `data`
+        itself does not carry its path (e.g. parsed FASTA records).
+        """
+        sources = sources or [None] * len(samples)
+        paths = [source or source_path(data) for (_, data), source in zip(samples, sources)]
+        sketches = [self._cached(name, path) for (name, _), path in zip(samples, paths)]
+        missing = [i for i, sketch in enumerate(sketches) if sketch is None]
+        # Open alignment files cannot be pickled; workers re-open them by path
+        tasks = [(self, samples[i][0], FileRecords(paths[i])
+                  if isinstance(samples[i][1], pysam.AlignmentFile) else samples[i][1]) for i in missing]
+        for i, sketch in zip(missing, bounded_map(_sketch_sample, tasks, self.workers)):
+            sketches[i] = sketch
+            if self.cache and paths[i]:
+                try:
+                    sketch.save(paths[i] + SIDECAR_SUFFIX, os.stat(paths[i]))
+                except OSError:
+                    pass  # Read-only location: the sketch is simply not persisted
+        return sketches
+
+    def compare(self, samples: List[Tuple[str, Any]], metric: str = 'jaccard',
+                sources: Optional[List[Optional[str]]] = None) -> SimilarityMatrix:
+        """Sketch every sample and compute the all-vs-all matrix"""
+        if metric not in ('jaccard', 'distance'):
+            raise ValueError(f"Unknown similarity metric: {metric}")
+        sketches = self.sketch(samples, sources)
+        return SimilarityMatrix([s.name for s in sketches], jaccard_matrix(sketches), self.k, metric)
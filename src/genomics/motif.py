@@ -0,0 +1,334 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from dataclasses import dataclass
+from itertools import product
+from collections import deque
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from .kmer import encode_bases
+from .packed_sequence import PackedSequence
+from .records import iter_sequences
+from ..config import settings
+from ..utils.parallel import bounded_map
+
+MAX_EXPANSIONS = 4096  # Concrete sequences a single degenerate motif may expand to
+AUTOMATON_VERSION = 2  # Bump when the cached automaton layout changes
+AUTOMATON_ARRAYS = ('transitions', 'out_offsets', 'out_entries', 'entry_motif', 'entry_strand', 'entry_length')
+
+IUPAC_CODES = {
+    'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'U': 'T',
+    'R': 'AG', 'Y': 'CT', 'S': 'CG', 'W': 'AT', 'K': 'GT', 'M': 'AC',
+    'B': 'CGT', 'D': 'AGT', 'H': 'ACT', 'V': 'ACG', 'N': 'ACGT',
+}
+_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+_AUTOMATA: Dict[str, 'MotifAutomaton'] = {}  # In-process cache keyed by pattern-set digest
+_MAPPED: Dict[str, 'MotifAutomaton'] = {}  # Per-process cache of automata mapped from disk
+
+def expand_iupac(pattern: str) -> List[str]:
+    """All concrete ACGT sequences matched by a degenerate IUPAC pattern"""
+    pattern = pattern.upper()
+    try:
+        choices = [IUPAC_CODES[base] for base in pattern]
+    except KeyError as e:
+        raise ValueError(f"Invalid IUPAC code {e.args[0]!r} in motif {pattern}")
+    total = int(np.prod([len(c) for c in choices])) if choices else 0
+    if not pattern or total > MAX_EXPANSIONS:
+        raise ValueError(f"Motif {pattern!r} must expand to 1-{MAX_EXPANSIONS} sequences")
+    return [''.join(bases) for bases in product(*choices)]
+
+def load_motifs(file_path: str) -> Dict[str, str]:
+    """Read motifs from FASTA or from lines of `pattern` / `name<TAB>pattern`"""
+    motifs, name = {}, None
+    with open(file_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('>'):
+                name = line[1:].split()[0]
+            elif name is not None:
+                motifs[name] = motifs.get(name, '') + line
+            else:
+                fields = line.split('\t')
+                motifs[fields[0]] = fields[-1]
+    return motifs
+
+class MotifAutomaton:
+    """
+    Aho-Corasick automaton over the 2-bit alphabet, flattened to a DFA table.
+
+    Every expanded motif (and its reverse complement when searching both
+    strands, unless the motif already matches it on the forward strand, as
+    palindromic sites do) is an entry in the trie. Failure links are folded into a dense
+    `(states, 5)` transition table; symbol 4 (N and other non-ACGT bases)
+    always returns to the root. Matching entries per state are stored in
+    CSR form.
+
+    Because the state after any position depends only on the preceding
+    `max_length` bases, `scan` runs the DFA for `max_length` vectorized
+    steps starting from every position at once, instead of one Python step
+    per base.
+    """
+    def __init__(self, transitions: np.ndarray, out_offsets: np.ndarray, out_entries: np.ndarray,
+                 entry_motif: np.ndarray, entry_strand: np.ndarray, entry_length: np.ndarray,
+                 path: Optional[str] = None):
+        self.transitions = transitions
+        self.out_offsets = out_offsets
+        self.out_entries = out_entries
+        self.entry_motif = entry_motif
+        self.entry_strand = entry_strand
+        self.entry_length = entry_length
+        self.max_length = int(entry_length.max()) if len(entry_length) else 0
+        self.path = path
+
+    @classmethod
+    def build(cls, patterns: List[str], both_strands: bool = True) -> 'MotifAutomaton':
+        """Build the automaton for a list of IUPAC patterns"""
+        entries = []
+        for motif, pattern in enumerate(patterns):
+            sequences = expand_iupac(pattern)
+            forward = set(sequences)
+            for sequence in sequences:
+                entries.append((sequence, motif, 1))
+                reverse = sequence[::-1].translate(_COMPLEMENT)
+                # A reverse complement the motif itself matches (e.g. GAATTC) would report each site twice
+                if both_strands and reverse not in forward:
+                    entries.append((reverse, motif, -1))
+
+        goto: List[List[int]] = [[-1] * 4]
+        outputs: List[List[int]] = [[]]
+        for entry, (sequence, _, _) in enumerate(entries):
+            state = 0
+            for symbol in encode_bases(sequence).tolist():
+                if goto[state][symbol] < 0:
+                    goto[state][symbol] = len(goto)
+                    goto.append([-1] * 4)
+                    outputs.append([])
+                state = goto[state][symbol]
+            outputs[state].append(entry)
+
+        # Breadth-first pass folds failure links into a complete transition table
+        transitions = np.zeros((len(goto), 5), dtype=np.int32)
+        fail = [0] * len(goto)
+        queue = deque()
+        for symbol in range(4):
+            child = goto[0][symbol]
+            if child > 0:
+                transitions[0, symbol] = child
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for symbol in range(4):
+                child = goto[state][symbol]
+                if child > 0:
+                    fail[child] = int(transitions[fail[state], symbol])
+                    transitions[state, symbol] = child
+                    queue.append(child)
+                else:
+                    transitions[state, symbol] = transitions[fail[state], symbol]
+
+        out_offsets = np.zeros(len(goto) + 1, dtype=np.int64)
+        out_offsets[1:] = np.cumsum([len(o) for o in outputs])
+        out_entries = np.array([e for o in outputs for e in o], dtype=np.int32)
+        return cls(
+            transitions, out_offsets, out_entries,
+            np.array([motif for _, motif, _ in entries], dtype=np.int32),
+            np.array([strand for _, _, strand in entries], dtype=np.int8),
+            np.array([len(sequence) for sequence, _, _ in entries], dtype=np.int64),
+        )
+
+    @classmethod
+    def compile(cls, patterns: List[str], both_strands: bool = True,
+                cache_dir: Optional[str] = None) -> 'MotifAutomaton':
+        """
+        Build or reuse the automaton for a pattern set.
+
+        Automata are cached in-process and, when `cache_dir` is set, on disk
+        as directories of `.npy` arrays keyed by a digest of the patterns, so
+        a motif library is only compiled once across runs. Cached automata
+        are memory-mapped and reach worker processes as a path.
+        """
+        key = hashlib.sha256(json.dumps(
+            [AUTOMATON_VERSION, both_strands, [p.upper() for p in patterns]]
+        ).encode()).hexdigest()
+        if key in _AUTOMATA:
+            return _AUTOMATA[key]
+
+        path = os.path.join(cache_dir, f"motifs-{key[:32]}") if cache_dir else None
+        if path and os.path.isdir(path):
+            automaton = cls.load(path)
+        else:
+            automaton = cls.build(patterns, both_strands)
+            if path:
+                automaton.save(path)
+                automaton = cls.load(path)
+        _AUTOMATA[key] = automaton
+        return automaton
+
+    def save(self, directory: str):
+        """Write the arrays as `.npy` files that `load` memory-maps"""
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+        try:
+            for name in AUTOMATON_ARRAYS:
+                np.save(os.path.join(staging, f"{name}.npy"), getattr(self, name))
+            os.rename(staging, directory)
+        except OSError:
+            shutil.rmtree(staging, True)
+            # Another process may have saved the same automaton first
+            if not os.path.isdir(directory):
+                raise
+
+    @classmethod
+    def load(cls, directory: str) -> 'MotifAutomaton':
+        """Memory-map a saved automaton (cached per process)"""
+        key = os.path.abspath(directory)
+        if key not in _MAPPED:
+            _MAPPED[key] = cls(**{name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                                  for name in AUTOMATON_ARRAYS}, path=directory)
+        return _MAPPED[key]
+
+    def __reduce__(self):
+        # Saved automata travel to worker processes as a path and are mapped once per process
+        if self.path:
+            return (MotifAutomaton.load, (self.path,))
+        return (MotifAutomaton, tuple(getattr(self, name) for name in AUTOMATON_ARRAYS))
+
+    def scan(self, codes: np.ndarray, context: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find matches in a buffer of base codes (A=0, C=1, G=2, T=3, other=4).
+
+        The first `context` codes only prime the automaton; matches must end
+        after them. Returns (start positions, entry indices), starts relative
+        to the end of the context.
+        """
+        n = len(codes) - context
+        if n <= 0 or self.max_length == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        m = self.max_length
+        lead = max(m - 1 - context, 0)
+        padded = np.concatenate((np.full(lead, 4, dtype=np.uint8), codes[max(context - m + 1, 0):]))
+        flat = self.transitions.ravel()
+        states = np.zeros(n, dtype=np.int32)
+        for j in range(m):
+            states = flat[states * 5 + padded[j:j + n]]
+
+        counts = self.out_offsets[states + 1] - self.out_offsets[states]
+        ends = np.flatnonzero(counts)
+        counts = counts[ends]
+        total = int(counts.sum())
+        first = np.repeat(self.out_offsets[states[ends]] - (np.cumsum(counts) - counts), counts)
+        entries = self.out_entries[first + np.arange(total)]
+        starts = np.repeat(ends, counts) + 1 - self.entry_length[entries]
+        return starts, entries
+
+def _chunk_codes(chunk: Union[str, bytes, np.ndarray, PackedSequence]) -> np.ndarray:
+    if isinstance(chunk, PackedSequence):
+        return chunk.base_codes()
+    return encode_bases(chunk.tobytes() if isinstance(chunk, np.ndarray) else chunk)
+
+def _scan_chunk(task: Tuple[MotifAutomaton, np.ndarray, int, int, int]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Scan one chunk; runs in a worker process"""
+    automaton, codes, context, contig, offset = task
+    starts, entries = automaton.scan(codes, context)
+    return contig, starts + offset, entries
+
+@dataclass
+class MotifHits:
+    """
+    Motif matches as parallel columns.
+
+    Attributes:
+        contigs (List[str]): Contig names indexed by `contig`
+        motifs (List[str]): Motif names indexed by `motif`
+        contig (np.ndarray): Contig index of each hit (int32)
+        start (np.ndarray): 0-based start (int64)
+        end (np.ndarray): Exclusive end (int64)
+        motif (np.ndarray): Motif index (int32)
+        strand (np.ndarray): +1 or -1 (int8)
+    """
+    contigs: List[str]
+    motifs: List[str]
+    contig: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    motif: np.ndarray
+    strand: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of hits per motif"""
+        totals = np.bincount(self.motif, minlength=len(self.motifs))
+        return dict(zip(self.motifs, totals.tolist()))
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, str, int, str]]:
+        """BED6 rows"""
+        for contig, start, end, motif, strand in zip(self.contig.tolist(), self.start.tolist(),
+                                                     self.end.tolist(), self.motif.tolist(),
+                                                     self.strand.tolist()):
+            yield (self.contigs[contig], start, end, self.motifs[motif], 0,
+                   '+' if strand > 0 else '-')
+
+class MotifFinder:
+    """
+    Multi-pattern motif search over both strands.
+
+    Patterns may use IUPAC degenerate codes. Sequences are cut into chunks
+    that overlap by the longest motif length minus one and scanned in worker
+    processes; plain strings, `uint8` ASCII buffers and packed sequences are
+    all accepted. The compiled automaton is cached under `cache_dir`, by
+    default `CACHE_DIR/motifs`; pass `cache=False` to skip the disk cache.
+
+    Example:
+        >>> finder = MotifFinder({"EcoRI": "GAATTC", "TATA": "TATAWAWR"})
+        >>> hits = finder.find(genome)
+        >>> hits.counts()
+    """
+    def __init__(self, motifs: Union[Dict[str, str], List[str]], both_strands: bool = True,
+                 workers: Optional[int] = None, chunk_size: int = 4 * 1024 * 1024,
+                 cache_dir: Optional[str] = None, cache: bool = True):
+        if not isinstance(motifs, dict):
+            motifs = {pattern: pattern for pattern in motifs}
+        if not motifs:
+            raise ValueError("At least one motif is required")
+        self.names = list(motifs)
+        # Resolved per call, so changes to settings.CACHE_DIR after import are honoured
+        cache_dir = (cache_dir or os.path.join(settings.CACHE_DIR, 'motifs')) if cache else None
+        self.automaton = MotifAutomaton.compile(list(motifs.values()), both_strands, cache_dir)
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def _tasks(self, data: Any, contigs: List[str]) -> Iterator[Tuple[MotifAutomaton, np.ndarray, int, int, int]]:
+        overlap = self.automaton.max_length - 1
+        for name, sequence in iter_sequences(data):
+            contig = len(contigs)
+            contigs.append(name.split()[0] if name else f"seq{contig}")
+            if isinstance(sequence, str):
+                sequence = sequence.encode('ascii')
+            for start in range(0, len(sequence), self.chunk_size):
+                context = min(overlap, start)
+                chunk = sequence[start - context:start + self.chunk_size]
+                yield self.automaton, _chunk_codes(chunk), context, contig, start
+
+    def find(self, data: Any) -> MotifHits:
+        """Find every motif occurrence in `data`"""
+        contigs: List[str] = []
+        parts = list(bounded_map(_scan_chunk, self._tasks(data, contigs), self.workers))
+        automaton = self.automaton
+        contig = np.concatenate([np.full(len(s), c, dtype=np.int32) for c, s, _ in parts] or
+                                [np.empty(0, dtype=np.int32)])
+        starts = np.concatenate([s for _, s, _ in parts] or [np.empty(0, dtype=np.int64)])
+        entries = np.concatenate([e for _, _, e in parts] or [np.empty(0, dtype=np.int32)])
+
+        order = np.lexsort((entries, starts, contig))
+        contig, starts, entries = contig[order], starts[order], entries[order]
+        return MotifHits(contigs, self.names, contig, starts, starts + automaton.entry_length[entries],
+                         automaton.entry_motif[entries], automaton.entry_strand[entries])
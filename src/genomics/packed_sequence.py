@@ -0,0 +1,303 @@
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from struct import pack, unpack_from
+import mmap
+import numpy as np
+
+TWO_BIT_SIGNATURE = 0x1A412743
+
+# .2bit base codes (T=0, C=1, A=2, G=3), first base in the high bits of each byte
+TWO_BIT_CODES = np.zeros(256, dtype=np.uint8)
+for _code, _base in enumerate("TCAG"):
+    TWO_BIT_CODES[ord(_base)] = _code
+    TWO_BIT_CODES[ord(_base.lower())] = _code
+TWO_BIT_BASES = np.frombuffer(b"TCAG", dtype=np.uint8)
+UNPACK_TABLE = np.array(
+    [[(byte >> shift) & 3 for shift in (6, 4, 2, 0)] for byte in range(256)], dtype=np.uint8
+)
+# .2bit codes to the A=0, C=1, G=2, T=3 codes used by the k-mer counter
+TWO_BIT_TO_ACGT = np.array([3, 1, 0, 2], dtype=np.uint8)
+
+_UPPER = np.arange(256, dtype=np.uint8)
+_UPPER[ord('a'):ord('z') + 1] -= 32
+_IS_ACGT = np.zeros(256, dtype=bool)
+_IS_ACGT[[ord(b) for b in "ACGT"]] = True
+
+COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in ("AT", "CG", "RY", "KM", "BV", "DH"):
+    for _x, _y in ((_a, _b), (_a.lower(), _b.lower())):
+        COMPLEMENT[ord(_x)], COMPLEMENT[ord(_y)] = ord(_y), ord(_x)
+
+def _runs(flags: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end coordinates of the runs of True in a boolean array"""
+    edges = np.diff(np.concatenate(([0], flags.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def _runs_to_bitmap(starts: np.ndarray, ends: np.ndarray, length: int) -> np.ndarray:
+    edges = np.zeros(length + 1, dtype=np.int8)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends, -1)
+    return np.packbits(np.cumsum(edges[:-1], dtype=np.int8) > 0)
+
+def pack_bases(codes: np.ndarray) -> np.ndarray:
+    """Pack 2-bit codes four to a byte, first base in the high bits"""
+    padded = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+class _PackedStore:
+    """Backing storage shared by a sequence and all of its views"""
+    __slots__ = ('packed', 'length', 'n_starts', 'n_ends', 'iupac_positions', 'iupac_codes', 'mask')
+
+    def __init__(self, packed, length, n_starts, n_ends, iupac_positions, iupac_codes, mask):
+        self.packed = packed
+        self.length = length
+        self.n_starts = n_starts
+        self.n_ends = n_ends
+        self.iupac_positions = iupac_positions
+        self.iupac_codes = iupac_codes
+        self.mask = mask
+
+    def codes(self, start: int, stop: int) -> np.ndarray:
+        """Unpacked .2bit codes for [start, stop)"""
+        quads = UNPACK_TABLE[self.packed[start // 4:(stop + 3) // 4]].reshape(-1)
+        return quads[start % 4:start % 4 + stop - start]
+
+    def ambiguous(self, start: int, stop: int) -> Iterator[Tuple[int, int]]:
+        """N runs overlapping [start, stop), clipped to it"""
+        lo = np.searchsorted(self.n_ends, start, side='right')
+        hi = np.searchsorted(self.n_starts, stop, side='left')
+        for run_start, run_end in zip(self.n_starts[lo:hi].tolist(), self.n_ends[lo:hi].tolist()):
+            yield max(run_start, start), min(run_end, stop)
+
+    def iupac(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = np.searchsorted(self.iupac_positions, [start, stop])
+        return self.iupac_positions[lo:hi], self.iupac_codes[lo:hi]
+
+    def ascii(self, start: int, stop: int) -> np.ndarray:
+        out = TWO_BIT_BASES[self.codes(start, stop)]
+        for run_start, run_end in self.ambiguous(start, stop):
+            out[run_start - start:run_end - start] = ord('N')
+        positions, codes = self.iupac(start, stop)
+        out[positions - start] = codes
+        if self.mask is not None:
+            bits = np.unpackbits(self.mask[start // 8:(stop + 7) // 8])
+            out[bits[start % 8:start % 8 + stop - start].view(bool)] |= 0x20
+        return out
+
+    def base_codes(self, start: int, stop: int) -> np.ndarray:
+        out = TWO_BIT_TO_ACGT[self.codes(start, stop)]
+        for run_start, run_end in self.ambiguous(start, stop):
+            out[run_start - start:run_end - start] = 4
+        out[self.iupac(start, stop)[0] - start] = 4
+        return out
+
+class PackedSequence:
+    """
+    Nucleotide sequence stored 2 bits per base.
+
+    Bases are packed four to a byte in the `.2bit` layout. N runs are kept
+    as a sparse list of intervals, other IUPAC codes as (position, code)
+    pairs, and soft-masked (lowercase) bases in an optional bitmap, so a
+    sequence costs about a quarter of its `str` form. Slicing and reverse
+    complement return views over the same storage in O(1); bases are only
+    unpacked when a consumer asks for them with `ascii()` or `base_codes()`.
+
+    Example:
+        >>> seq = PackedSequence.from_string("ACGTNNacgt", name="chr1")
+        >>> str(seq[2:8].reverse_complement())
+        'gtNNAC'
+    """
+    __slots__ = ('name', '_store', '_start', '_stop', '_reverse')
+
+    def __init__(self, packed: np.ndarray, length: int,
+                 n_blocks: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 iupac: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 mask: Optional[np.ndarray] = None, name: str = ''):
+        empty = np.empty(0, dtype=np.int64)
+        n_starts, n_ends = n_blocks if n_blocks is not None else (empty, empty)
+        positions, codes = iupac if iupac is not None else (empty, np.empty(0, dtype=np.uint8))
+        self._store = _PackedStore(packed, length, np.asarray(n_starts, dtype=np.int64),
+                                   np.asarray(n_ends, dtype=np.int64),
+                                   np.asarray(positions, dtype=np.int64),
+                                   np.asarray(codes, dtype=np.uint8), mask)
+        self.name = name
+        self._start, self._stop, self._reverse = 0, length, False
+
+    @classmethod
+    def from_string(cls, sequence: Union[str, bytes], name: str = '') -> 'PackedSequence':
+        """Pack a nucleotide string, keeping N runs, IUPAC codes and soft-masking"""
+        if isinstance(sequence, str):
+            sequence = sequence.encode('ascii')
+        codes = np.frombuffer(sequence, dtype=np.uint8)
+        lower = (codes >= ord('a')) & (codes <= ord('z'))
+        upper = _UPPER[codes]
+        is_n = upper == ord('N')
+        iupac_positions = np.flatnonzero(~_IS_ACGT[upper] & ~is_n)
+        return cls(
+            pack_bases(TWO_BIT_CODES[codes]), len(codes),
+            n_blocks=_runs(is_n),
+            iupac=(iupac_positions, upper[iupac_positions]),
+            mask=np.packbits(lower) if lower.any() else None,
+            name=name,
+        )
+
+    def _view(self, start: int, stop: int, reverse: bool) -> 'PackedSequence':
+        view = object.__new__(PackedSequence)
+        view.name = self.name
+        view._store = self._store
+        view._start, view._stop, view._reverse = start, stop, reverse
+        return view
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, 'PackedSequence']:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("PackedSequence slices must be contiguous")
+            stop = max(stop, start)
+            if self._reverse:
+                return self._view(self._stop - stop, self._stop - start, True)
+            return self._view(self._start + start, self._start + stop, False)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("PackedSequence index out of range")
+        return str(self[key:key + 1])
+
+    @property
+    def is_reverse(self) -> bool:
+        return self._reverse
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the backing storage"""
+        store = self._store
+        return (store.packed.nbytes + store.n_starts.nbytes + store.n_ends.nbytes
+                + store.iupac_positions.nbytes + store.iupac_codes.nbytes
+                + (store.mask.nbytes if store.mask is not None else 0))
+
+    def reverse_complement(self) -> 'PackedSequence':
+        """Reverse complement view; no bases are copied"""
+        return self._view(self._start, self._stop, not self._reverse)
+
+    def ascii(self) -> np.ndarray:
+        """Bases as a uint8 array of ASCII codes (lowercase where soft-masked)"""
+        out = self._store.ascii(self._start, self._stop)
+        return COMPLEMENT[out[::-1]] if self._reverse else out
+
+    def base_codes(self) -> np.ndarray:
+        """Bases as A=0, C=1, G=2, T=3 codes, with 4 for N and other IUPAC codes"""
+        out = self._store.base_codes(self._start, self._stop)
+        if self._reverse:
+            out = out[::-1]
+            return np.where(out < 4, 3 - out, out).astype(np.uint8)
+        return out
+
+    def __bytes__(self) -> bytes:
+        return self.ascii().tobytes()
+
+    def __str__(self) -> str:
+        return bytes(self).decode('ascii')
+
+    def __repr__(self) -> str:
+        strand = ', reverse' if self._reverse else ''
+        return f"PackedSequence(name={self.name!r}, length={len(self)}{strand})"
+
+def _record_parts(sequence: PackedSequence) -> Tuple[bytes, bytes]:
+    """Encode one sequence as a .2bit record, returning (header, packed bases)"""
+    ascii = sequence.ascii()
+    n_starts, n_ends = _runs(~_IS_ACGT[_UPPER[ascii]])
+    mask_starts, mask_ends = _runs((ascii >= ord('a')) & (ascii <= ord('z')))
+    header = b''.join((
+        pack('<II', len(ascii), len(n_starts)),
+        n_starts.astype('<u4').tobytes(), (n_ends - n_starts).astype('<u4').tobytes(),
+        pack('<I', len(mask_starts)),
+        mask_starts.astype('<u4').tobytes(), (mask_ends - mask_starts).astype('<u4').tobytes(),
+        pack('<I', 0),
+    ))
+    return header, pack_bases(TWO_BIT_CODES[ascii]).tobytes()
+
+def iter_2bit_chunks(sequences: Iterable[PackedSequence]) -> Iterator[bytes]:
+    """Serialize sequences to the .2bit format, yielding the file in pieces"""
+    names, records = [], []
+    for sequence in sequences:
+        name = (sequence.name.split() or [''])[0].encode()
+        if not 0 < len(name) < 256:
+            raise ValueError(f"Invalid .2bit sequence name: {sequence.name!r}")
+        names.append(name)
+        records.append(_record_parts(sequence))
+
+    index_size = sum(1 + len(name) + 4 for name in names)
+    total = 16 + index_size + sum(len(h) + len(p) for h, p in records)
+    version = 0 if total < 1 << 32 else 1
+    offset_format = '<I' if version == 0 else '<Q'
+    if version:
+        index_size += 4 * len(names)
+
+    offset = 16 + index_size
+    index = []
+    for name, (header, packed) in zip(names, records):
+        index.append(bytes([len(name)]) + name + pack(offset_format, offset))
+        offset += len(header) + len(packed)
+    yield pack('<4I', TWO_BIT_SIGNATURE, version, len(names), 0) + b''.join(index)
+    for header, packed in records:
+        yield header
+        yield packed
+
+def write_2bit(file_path: str, sequences: Iterable[PackedSequence]):
+    """Write sequences to a .2bit file"""
+    with open(file_path, 'wb') as f:
+        for chunk in iter_2bit_chunks(sequences):
+            f.write(chunk)
+
+def iter_2bit(file_path: str, soft_mask: bool = True) -> Iterator[PackedSequence]:
+    """
+    Memory-map a .2bit file and yield its sequences.
+
+    Packed bases are zero-copy views into the mapping; only the N and mask
+    block tables are decoded.
+    """
+    with open(file_path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if unpack_from('<I', buffer)[0] == TWO_BIT_SIGNATURE:
+        endian = '<'
+    elif unpack_from('>I', buffer)[0] == TWO_BIT_SIGNATURE:
+        endian = '>'
+    else:
+        raise ValueError(f"Invalid .2bit file: {file_path}")
+    version, count = unpack_from(endian + 'II', buffer, 4)
+    offset_format = endian + ('I' if version == 0 else 'Q')
+    u32 = np.dtype(endian + 'u4')
+
+    entries, position = [], 16
+    for _ in range(count):
+        name_size = buffer[position]
+        name = buffer[position + 1:position + 1 + name_size].decode()
+        position += 1 + name_size
+        entries.append((name, unpack_from(offset_format, buffer, position)[0]))
+        position += 4 if version == 0 else 8
+
+    for name, offset in entries:
+        length, n_count = unpack_from(endian + 'II', buffer, offset)
+        blocks = np.frombuffer(buffer, dtype=u32, count=2 * n_count, offset=offset + 8).astype(np.int64)
+        offset += 8 + 8 * n_count
+        mask_count = unpack_from(endian + 'I', buffer, offset)[0]
+        mask_blocks = np.frombuffer(buffer, dtype=u32, count=2 * mask_count,
+                                    offset=offset + 4).astype(np.int64)
+        offset += 4 + 8 * mask_count + 4
+        packed = np.frombuffer(buffer, dtype=np.uint8, count=(length + 3) // 4, offset=offset)
+
+        n_starts = blocks[:n_count]
+        mask = None
+        if soft_mask and mask_count:
+            mask_starts = mask_blocks[:mask_count]
+            mask = _runs_to_bitmap(mask_starts, mask_starts + mask_blocks[mask_count:], length)
+        yield PackedSequence(packed, length, n_blocks=(n_starts, n_starts + blocks[n_count:]),
+                             mask=mask, name=name)
+
+def read_2bit(file_path: str, soft_mask: bool = True) -> List[PackedSequence]:
+    """Read every sequence of a .2bit file"""
+    return list(iter_2bit(file_path, soft_mask))
@@ -1 +1,26 @@
- 
\ No newline at end of file
+from abc import ABC, abstractmethod
+from typing import Any, Iterator, Optional
+from ..compressed_io import open_input
+
+class GenomicFileParser(ABC):
+    """
+    Base class for genomic file parsers.
+
+    Subclasses read their input through `open`, which detects gzip, BGZF and
+    zstd compression from the magic bytes and returns a buffered, seekable
+    reader, so every parser accepts compressed files without scratch copies.
+    """
+    def __init__(self, threads: Optional[int] = None):
+        self.threads = threads
+
+    def open(self, file_path: str, mode: str = 'rb'):
+        """Open an input file, decompressing it transparently"""
+        return open_input(file_path, mode, threads=self.threads)
+
+    @abstractmethod
+    def parse(self, file_path: str) -> Iterator[Any]:
+        """Parse file and yield records"""
+
+    @abstractmethod
+    def validate(self, file_path: str) -> bool:
+        """Check whether the file looks like this parser's format"""
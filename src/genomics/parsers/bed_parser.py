@@ -0,0 +1,44 @@
+from typing import Iterator, Tuple
+from .base_parser import GenomicFileParser
+from ..intervals import Intervals, IntervalBuilder
+
+HEADER_PREFIXES = ('#', 'track', 'browser')
+
+class BEDParser(GenomicFileParser):
+    """Parser for BED/bedGraph interval files"""
+
+    def _rows(self, file_path: str) -> Iterator[Tuple[str, int, int, str]]:
+        with self.open(file_path, 'r') as bed_file:
+            for number, line in enumerate(bed_file, 1):
+                line = line.rstrip('\r\n')
+                if not line or line.startswith(HEADER_PREFIXES):
+                    continue
+                fields = line.split('\t', 3)
+                if len(fields) < 3:
+                    raise ValueError(f"Expected at least 3 columns on line {number}")
+                yield fields[0], int(fields[1]), int(fields[2]), fields[3] if len(fields) > 3 else ''
+
+    def parse(self, file_path: str) -> Iterator[Tuple]:
+        """Yield (chrom, start, end, *extra columns) tuples"""
+        if not self.validate(file_path):
+            raise ValueError(f"Invalid BED file: {file_path}")
+        for chrom, start, end, rest in self._rows(file_path):
+            yield (chrom, start, end) + (tuple(rest.split('\t')) if rest else ())
+
+    def read(self, file_path: str) -> Intervals:
+        """Load the whole file as columnar intervals"""
+        if not self.validate(file_path):
+            raise ValueError(f"Invalid BED file: {file_path}")
+        builder = IntervalBuilder()
+        for chrom, start, end, rest in self._rows(file_path):
+            builder.add(chrom, start, end, rest)
+        return builder.build()
+
+    def validate(self, file_path: str) -> bool:
+        """Check that the first data line has a name and integer start <= end"""
+        try:
+            for chrom, start, end, _ in self._rows(file_path):
+                return bool(chrom) and 0 <= start <= end
+            return True  # Header-only files hold no intervals
+        except Exception:
+            return False
@@ -13,7 +13,7 @@ class CSFASTAParser(GenomicFileParser):
             current_header = None
             current_sequence = []
             
-            with open(file_path, 'r') as csfasta_file:
+            with self.open(file_path, 'r') as csfasta_file:
                 for line in csfasta_file:
                     line = line.strip()
                     if not line:
@@ -45,7 +45,7 @@ class CSFASTAParser(GenomicFileParser):
     def validate(self, file_path: str) -> bool:
         """Validate CSFASTA file format"""
         try:
-            with open(file_path) as f:
+            with self.open(file_path, 'r') as f:
                 content = f.read().strip()
                 if not content:  # Empty file
                     return False
@@ -0,0 +1,35 @@
+from typing import Iterator, Optional, Union
+from Bio import SeqIO
+from Bio.SeqRecord import SeqRecord
+from .base_parser import GenomicFileParser
+from ..packed_sequence import PackedSequence
+
+class FASTAParser(GenomicFileParser):
+    """Parser for (optionally compressed) FASTA files"""
+
+    def __init__(self, threads: Optional[int] = None, packed: bool = False):
+        super().__init__(threads)
+        self.packed = packed
+
+    def parse(self, file_path: str) -> Iterator[Union[SeqRecord, PackedSequence]]:
+        """Parse FASTA file and yield one record per sequence (2-bit packed if `packed`)"""
+        if not self.validate(file_path):
+            raise ValueError(f"Invalid FASTA file: {file_path}")
+
+        with self.open(file_path, 'r') as fasta_file:
+            for record in SeqIO.parse(fasta_file, "fasta"):
+                if self.packed:
+                    yield PackedSequence.from_string(str(record.seq), name=record.description)
+                else:
+                    yield record
+
+    def validate(self, file_path: str) -> bool:
+        """Validate FASTA file format"""
+        try:
+            with self.open(file_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        return line.startswith('>')
+                return False
+        except Exception:
+            return False
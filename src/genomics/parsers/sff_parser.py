@@ -11,7 +11,7 @@ class SFFParser(GenomicFileParser):
             raise ValueError(f"Invalid SFF file: {file_path}")
         
         try:
-            with open(file_path, 'rb') as sff_file:
+            with self.open(file_path) as sff_file:
                 # Parse SFF header
                 magic = sff_file.read(4)
                 if magic != b'.sff':
@@ -61,7 +61,7 @@ class SFFParser(GenomicFileParser):
     def validate(self, file_path: str) -> bool:
         """Validate SFF file format"""
         try:
-            with open(file_path, 'rb') as f:
+            with self.open(file_path) as f:
                 # Check magic number
                 magic = f.read(4)
                 if magic != b'.sff':
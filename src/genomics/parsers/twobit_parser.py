@@ -0,0 +1,27 @@
+from typing import Iterator
+from struct import unpack
+from .base_parser import GenomicFileParser
+from ..packed_sequence import PackedSequence, TWO_BIT_SIGNATURE, iter_2bit
+
+class TwoBitParser(GenomicFileParser):
+    """Parser for UCSC .2bit files, memory-mapped into packed sequences"""
+
+    def __init__(self, soft_mask: bool = True):
+        super().__init__()
+        self.soft_mask = soft_mask
+
+    def parse(self, file_path: str) -> Iterator[PackedSequence]:
+        """Yield one packed sequence per record"""
+        if not self.validate(file_path):
+            raise ValueError(f"Invalid 2bit file: {file_path}")
+        yield from iter_2bit(file_path, self.soft_mask)
+
+    def validate(self, file_path: str) -> bool:
+        """Check the .2bit signature in either byte order"""
+        try:
+            with open(file_path, 'rb') as f:
+                header = f.read(4)
+            return len(header) == 4 and TWO_BIT_SIGNATURE in (unpack('<I', header)[0],
+                                                              unpack('>I', header)[0])
+        except Exception:
+            return False
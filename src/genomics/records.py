@@ -0,0 +1,99 @@
+from typing import Any, Iterator, Optional, Tuple, Union
+import os
+import numpy as np
+import pysam
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+from Bio.SeqIO.QualityIO import FastqGeneralIterator
+from .compressed_io import open_input
+from .packed_sequence import PackedSequence
+
+Sequence = Union[str, PackedSequence]
+
+def _sequence(value: Any) -> Sequence:
+    return value if isinstance(value, PackedSequence) else str(value)
+
+def _field(record: dict, keys: Tuple[str, ...], default: Any = None) -> Any:
+    """The value of the first key present and not None; empty values and arrays count as present"""
+    for key in keys:
+        value = record.get(key)
+        if value is not None:
+            return value
+    return default
+
+def sequence_fields(record: Any) -> Tuple[str, Sequence, Optional[Any]]:
+    """Extract (name, sequence, qualities) from the record types parsers produce"""
+    if isinstance(record, str):
+        return '', record, None
+    if isinstance(record, PackedSequence):
+        return record.name, record, None
+    if isinstance(record, dict):
+        name = _field(record, ('name', 'header', 'id'), '')
+        sequence = _field(record, ('sequence', 'bases', 'seq'), '')
+        qualities = _field(record, ('quality_scores', 'qualities'))
+        return name, _sequence(sequence), qualities
+    if isinstance(record, tuple):
+        name, sequence = record[0], record[1]
+        return name, _sequence(sequence), record[2] if len(record) > 2 else None
+    if isinstance(record, pysam.AlignedSegment):
+        return record.query_name, record.query_sequence or '', record.query_qualities
+    # Bio.SeqRecord
+    qualities = getattr(record, 'letter_annotations', {}).get('phred_quality')
+    return record.description or record.id, str(record.seq), qualities
+
+def iter_sequences(data: Any) -> Iterator[Tuple[str, Sequence]]:
+    """Yield (name, sequence) for a variable holding one record or many"""
+    if isinstance(data, (str, tuple, dict, PackedSequence)):
+        data = [data]
+    if hasattr(data, 'reset'):
+        data.reset()
+    for record in data:
+        name, sequence, _ = sequence_fields(record)
+        yield name, sequence
+
+COMPRESSION_SUFFIXES = ('.gz', '.bgz', '.zst')
+ALIGNMENT_SUFFIXES = ('.bam', '.cram', '.sam')
+FASTQ_SUFFIXES = ('.fq', '.fastq')
+FASTA_SUFFIXES = ('.fa', '.fasta', '.fna', '.fas')
+
+def file_kind(file_path: str) -> str:
+    """'alignment', 'fastq' or 'fasta' from the extension, ignoring compression suffixes"""
+    name = file_path.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    for kind, suffixes in (('alignment', ALIGNMENT_SUFFIXES), ('fastq', FASTQ_SUFFIXES),
+                           ('fasta', FASTA_SUFFIXES)):
+        if name.endswith(suffixes):
+            return kind
+    raise ValueError(f"Cannot infer the record format of {file_path}")
+
+class FileRecords:
+    """
+    Lazy, re-iterable records of a sequence or alignment file.
+
+    Nothing is loaded up front: each iteration streams the file again, so
+    single-pass analyses run in constant memory. FASTQ/FASTA records are
+    yielded as (name, sequence, qualities) tuples with Phred scores as
+    uint8 arrays; alignment files yield pysam records.
+
+    Example:
+        >>> metrics = handler.analyze_quality_metrics(FileRecords("reads.fq.gz"))
+    """
+    def __init__(self, file_path: str):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        self.file_path = file_path
+        self.kind = file_kind(file_path)
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.kind == 'alignment':
+            with pysam.AlignmentFile(self.file_path, check_sq=False) as alignments:
+                yield from alignments.fetch(until_eof=True)
+            return
+        with open_input(self.file_path, 'r') as handle:
+            if self.kind == 'fastq':
+                for name, sequence, qualities in FastqGeneralIterator(handle):
+                    yield name, sequence, np.frombuffer(qualities.encode(), dtype=np.uint8) - 33
+            else:
+                for name, sequence in SimpleFastaParser(handle):
+                    yield name, sequence, None
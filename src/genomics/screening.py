@@ -0,0 +1,270 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from struct import pack, unpack
+import json
+import math
+import os
+import numpy as np
+from .kmer import MAX_K, encode_bases, kmer_codes, sequence_chunks
+from .records import iter_sequences, sequence_fields
+from .sketches import mix64
+from ..utils.parallel import bounded_map, resolve_workers
+
+FILTER_MAGIC = b'GSBF'
+FILTER_VERSION = 1
+BLOCK_WORDS = 8  # 256-bit blocks of eight 32-bit words; each k-mer sets one bit per word
+CHUNK_SIZE = 4 * 1024 * 1024  # Reference bases hashed per worker task
+
+# Odd multipliers picking the bit within each word (as in Parquet's split block Bloom filter)
+SALTS = np.array([0x47b6137b, 0x44974d91, 0x8824ad5b, 0xa2b7289d,
+                  0x705495c7, 0x2df1424b, 0x9efc4947, 0x5c6bfb31], dtype=np.uint64)
+
+_FILTERS: Dict[Tuple[str, int, int], 'BlockedBloomFilter'] = {}  # Per-process cache of mapped filters
+
+def _hash_chunk(task: Tuple[Any, int, int]) -> np.ndarray:
+    """Distinct hashes of the canonical k-mers of one reference chunk; runs in a worker process"""
+    chunk, k, seed = task
+    hashes = np.sort(mix64(kmer_codes(chunk, k) ^ np.uint64(seed)))
+    return hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))] if len(hashes) else hashes
+
+def _count_bases(data: Any) -> int:
+    """Total reference length, from a .fai index when one sits beside the file"""
+    path = getattr(data, 'file_path', None)
+    if path and os.path.exists(path + '.fai'):
+        with open(path + '.fai') as fai:
+            return sum(int(line.split('\t')[1]) for line in fai if line.strip())
+    return sum(len(sequence) for _, sequence in iter_sequences(data))
+
+class BlockedBloomFilter:
+    """
+    Split-block Bloom filter over canonical k-mers.
+
+    Each k-mer hash selects one 256-bit block and sets one bit in each of
+    its eight 32-bit words, so an insert or a lookup touches a single
+    cache line. The bits live in a NumPy array that is written in a
+    memory-mappable layout: reloading a saved filter maps it instead of
+    rebuilding it.
+
+    Example:
+        >>> bloom = BlockedBloomFilter.build(FileRecords("host.fa"), k=31, fpr=0.001)
+        >>> bloom.save("host.bloom")
+        >>> bloom = BlockedBloomFilter.load("host.bloom")
+    """
+    def __init__(self, k: int, blocks: int, seed: int = 0, bits: Optional[np.ndarray] = None,
+                 source: Optional[List[int]] = None, path: Optional[str] = None):
+        if not 0 < k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+        self.k = k
+        self.blocks = max(int(blocks), 1)
+        self.seed = seed
+        self.bits = bits if bits is not None else np.zeros(self.blocks * BLOCK_WORDS, dtype=np.uint32)
+        self.source = source
+        self.path = path
+
+    @staticmethod
+    def blocks_for(capacity: int, fpr: float) -> int:
+        """Blocks for `capacity` k-mers at roughly `fpr` false positives"""
+        if not 0 < fpr < 1:
+            raise ValueError("fpr must be between 0 and 1")
+        # Optimal Bloom sizing plus ~20% for the uneven load of blocks
+        bits = 1.2 * max(capacity, 1) * -math.log(fpr) / math.log(2) ** 2
+        return max(1, math.ceil(bits / (32 * BLOCK_WORDS)))
+
+    @classmethod
+    def build(cls, data: Any, k: int = 31, fpr: float = 0.001, capacity: Optional[int] = None,
+              workers: Optional[int] = None, seed: int = 0) -> 'BlockedBloomFilter':
+        """Insert every canonical k-mer of the reference sequences in `data`"""
+        bloom = cls(k, cls.blocks_for(capacity or _count_bases(data), fpr), seed)
+        tasks = ((chunk, k, seed) for chunk in sequence_chunks(data, k, CHUNK_SIZE))
+        for hashes in bounded_map(_hash_chunk, tasks, workers):
+            bloom.add_hashes(hashes)
+        return bloom
+
+    def _locate(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Word indices (n x 8) and single-bit masks of each hash"""
+        block = ((hashes >> np.uint64(32)) * np.uint64(self.blocks)) >> np.uint64(32)
+        low = (hashes & np.uint64(0xffffffff))[:, None]
+        shifts = ((low * SALTS) & np.uint64(0xffffffff)) >> np.uint64(27)
+        words = block[:, None].astype(np.int64) * BLOCK_WORDS + np.arange(BLOCK_WORDS)
+        return words, (np.uint32(1) << shifts.astype(np.uint32))
+
+    def add_hashes(self, hashes: np.ndarray):
+        words, masks = self._locate(hashes)
+        np.bitwise_or.at(self.bits, words.ravel(), masks.ravel())
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        words, masks = self._locate(hashes)
+        return np.all(self.bits[words] & masks != 0, axis=1)
+
+    def contains(self, codes: np.ndarray) -> np.ndarray:
+        """Membership of packed canonical k-mer codes"""
+        return self.contains_hashes(mix64(codes ^ np.uint64(self.seed)))
+
+    @property
+    def fill_ratio(self) -> float:
+        """Fraction of set bits; the false-positive rate is about its 8th power"""
+        return float(np.unpackbits(np.asarray(self.bits).view(np.uint8)).mean()) if len(self.bits) else 0.0
+
+    def save(self, file_path: str):
+        """Write the filter in its memory-mappable layout"""
+        header = json.dumps({'k': self.k, 'blocks': self.blocks, 'seed': self.seed,
+                             'source': self.source}).encode()
+        header += b' ' * (-(len(header) + 12) % 8)
+        for key in [key for key in _FILTERS if key[0] == os.path.abspath(file_path)]:
+            del _FILTERS[key]
+        # Write beside and rename, so filters still mapped from the old file stay valid
+        with open(file_path + '.tmp', 'wb') as f:
+            f.write(FILTER_MAGIC + pack('<II', FILTER_VERSION, len(header)) + header)
+            f.write(np.asarray(self.bits).tobytes())
+        os.replace(file_path + '.tmp', file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'BlockedBloomFilter':
+        """Memory-map a saved filter (cached per process)"""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if key in _FILTERS:
+            return _FILTERS[key]
+        with open(file_path, 'rb') as f:
+            magic, (version, header_size) = f.read(4), unpack('<II', f.read(8))
+            if magic != FILTER_MAGIC or version != FILTER_VERSION:
+                raise ValueError(f"Not a Bloom filter: {file_path}")
+            header = json.loads(f.read(header_size))
+        bits = np.memmap(file_path, dtype=np.uint32, mode='r', offset=12 + header_size,
+                         shape=(header['blocks'] * BLOCK_WORDS,))
+        bloom = cls(header['k'], header['blocks'], header['seed'], bits, header['source'], path=file_path)
+        _FILTERS[key] = bloom
+        return bloom
+
+    def __reduce__(self):
+        # File-backed filters travel to worker processes as a path and are re-mapped there
+        if self.path:
+            return (BlockedBloomFilter.load, (self.path,))
+        return (BlockedBloomFilter, (self.k, self.blocks, self.seed, np.asarray(self.bits), self.source))
+
+def open_or_build(data: Any, file_path: Optional[str] = None, source: Optional[str] = None,
+                  k: int = 31, fpr: float = 0.001, workers: Optional[int] = None) -> BlockedBloomFilter:
+    """
+    Map the filter saved at `file_path`, or build it from `data` and save it there.
+
+    A saved filter is rebuilt when its k differs or when the `source`
+    reference file changed size or mtime since the filter was built.
+    """
+    stamp = None
+    if source and os.path.exists(source):
+        stat = os.stat(source)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+    if file_path and os.path.exists(file_path):
+        bloom = BlockedBloomFilter.load(file_path)
+        if bloom.k == k and bloom.source == stamp:
+            return bloom
+    bloom = BlockedBloomFilter.build(data, k=k, fpr=fpr, workers=workers)
+    bloom.source = stamp
+    if not file_path:
+        return bloom
+    bloom.save(file_path)
+    return BlockedBloomFilter.load(file_path)
+
+@dataclass
+class ScreenHits:
+    """
+    Per-read k-mer hits against a screening filter.
+
+    Reads whose hit fraction reaches `threshold` are classified as matching
+    the reference (host or contaminant). Iterating yields TSV-ready rows of
+    (name, k-mers, hits, fraction, 'match'/'clean').
+
+    Attributes:
+        names (List[str]): Read names, in input order
+        kmers (np.ndarray): Valid k-mers per read
+        hits (np.ndarray): k-mers found in the filter per read
+        threshold (float): Hit fraction classifying a read as matching
+    """
+    names: List[str]
+    kmers: np.ndarray
+    hits: np.ndarray
+    threshold: float
+
+    header = '\t'.join(('read', 'kmers', 'hits', 'fraction', 'class'))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def fraction(self) -> np.ndarray:
+        return np.divide(self.hits, self.kmers, out=np.zeros(len(self.kmers)), where=self.kmers > 0)
+
+    @property
+    def matched(self) -> np.ndarray:
+        return (self.kmers > 0) & (self.fraction >= self.threshold)
+
+    def summary(self) -> Dict[str, Any]:
+        matched = int(self.matched.sum())
+        return {'reads': len(self), 'matched': matched, 'clean': len(self) - matched,
+                'matched_fraction': matched / len(self) if len(self) else 0.0}
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for name, kmers, hits, fraction, matched in zip(self.names, self.kmers.tolist(), self.hits.tolist(),
+                                                        self.fraction.tolist(), self.matched.tolist()):
+            yield name, kmers, hits, f"{fraction:.4f}", 'match' if matched else 'clean'
+
+def _screen_batch(task: Tuple[BlockedBloomFilter, List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(k-mers, hits) per read of one batch; runs in a worker process"""
+    bloom, sequences = task
+    k = bloom.k
+    # N separators break k-mers, so one pass covers the whole batch
+    codes = encode_bases('N'.join(sequences))
+    starts = np.cumsum([0] + [len(s) + 1 for s in sequences[:-1]])
+    invalid_prefix = np.concatenate(([0], np.cumsum(codes > 3, dtype=np.int64)))
+    valid = np.flatnonzero(invalid_prefix[k:] == invalid_prefix[:-k]) if len(codes) >= k \
+        else np.empty(0, dtype=np.int64)
+    read = np.searchsorted(starts, valid, side='right') - 1
+    found = bloom.contains(kmer_codes(codes, k))
+    return (np.bincount(read, minlength=len(sequences)),
+            np.bincount(read, weights=found, minlength=len(sequences)).astype(np.int64))
+
+class ReadScreener:
+    """
+    Classifies reads by the fraction of their k-mers found in a reference filter.
+
+    Reads are hashed in batches (one vectorized k-mer pass per batch) in
+    worker processes; file-backed filters are mapped by each worker rather
+    than copied.
+
+    Example:
+        >>> screener = ReadScreener(open_or_build(host, "host.bloom"), threshold=0.5)
+        >>> hits = screener.screen(reads)
+        >>> hits.summary()
+    """
+    def __init__(self, bloom: BlockedBloomFilter, threshold: float = 0.5,
+                 workers: Optional[int] = None, batch_size: int = 10000):
+        self.bloom = bloom
+        self.threshold = threshold
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _batches(self, data: Any, names: List[str]) -> Iterator[Tuple[BlockedBloomFilter, List[str]]]:
+        if hasattr(data, 'reset'):
+            data.reset()
+        batch = []
+        for record in data:
+            name, sequence, _ = sequence_fields(record)
+            names.append(name)
+            batch.append(str(sequence))
+            if len(batch) >= self.batch_size:
+                yield self.bloom, batch
+                batch = []
+        if batch:
+            yield self.bloom, batch
+
+    def screen(self, data: Any) -> ScreenHits:
+        """Count filter hits for every read in `data`"""
+        names: List[str] = []
+        workers = resolve_workers(self.workers) if self.bloom.path else 1
+        kmers, hits = [], []
+        for batch_kmers, batch_hits in bounded_map(_screen_batch, self._batches(data, names), workers):
+            kmers.append(batch_kmers)
+            hits.append(batch_hits)
+        empty = np.empty(0, dtype=np.int64)
+        return ScreenHits(names, np.concatenate(kmers) if kmers else empty,
+                          np.concatenate(hits) if hits else empty, self.threshold)
@@ -0,0 +1,489 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from hashlib import blake2b
+import math
+import os
+import numpy as np
+import pysam
+from .compressed_io import CompressionType, detect_compression, read_bgzf_blocks_at
+from .kmer import decode_kmer, kmer_codes
+from .records import FileRecords, sequence_fields
+from ..utils.parallel import bounded_map
+
+SKETCHES = ('distinct_reads', 'distinct_kmers', 'quality', 'length', 'heavy_kmers', 'sample')
+MIN_HLL_PRECISION = 4
+MAX_HLL_PRECISION = 18  # 256 KiB of registers, ~0.2% standard error
+SAMPLE_WINDOW = 16384  # Genomic window fetched per sample from indexed alignments
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def mix64(keys: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: spreads uint64 keys uniformly over 64 bits"""
+    keys = keys.astype(np.uint64)
+    keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return keys ^ (keys >> np.uint64(31))
+
+def hash_strings(values: Sequence[str]) -> np.ndarray:
+    """Stable 64-bit hashes of strings (identical across processes and runs)"""
+    return np.array([int.from_bytes(blake2b(v.encode(), digest_size=8).digest(), 'little')
+                     for v in values], dtype=np.uint64)
+
+def _sorted_unique(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique uint64 keys and their counts by sort-and-reduce"""
+    keys = np.sort(keys)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.diff(np.append(starts, len(keys)))
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Exact count of leading zero bits of uint64 values (64 for zero)"""
+    zeros = np.zeros(len(values), dtype=np.uint8)
+    values = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = values < np.uint64(1 << (64 - shift))
+        zeros[small] += shift
+        values[small] <<= np.uint64(shift)
+    zeros[values == 0] = 64
+    return zeros
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with relative standard error ~1.04 / sqrt(2^precision).
+
+    Example:
+        >>> hll = HyperLogLog(error=0.01)
+        >>> hll.add(mix64(kmers))
+        >>> hll.estimate()
+    """
+    def __init__(self, error: float = 0.01, precision: Optional[int] = None):
+        if precision is None:
+            precision = math.ceil(2 * math.log2(1.04 / error))
+        self.precision = min(max(precision, MIN_HLL_PRECISION), MAX_HLL_PRECISION)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray):
+        """Add uniformly distributed 64-bit hashes"""
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.precision)) + 1,
+                          64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return float(raw)
+
+class DDSketch:
+    """
+    Quantile sketch with relative accuracy: every reported quantile is within
+    `relative_accuracy` of a true value. Buckets are logarithmic and dense.
+
+    Example:
+        >>> sketch = DDSketch(0.01)
+        >>> sketch.add(read_lengths)
+        >>> sketch.quantile(0.5)
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0  # Bucket key of counts[0]
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _grow(self, low: int, high: int):
+        if not len(self.counts):
+            self.offset, self.counts = low, np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low, new_high = min(low, self.offset), max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if not len(positive):
+            return
+        keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+        low, high = int(keys.min()), int(keys.max())
+        self._grow(low, high)
+        self.counts += np.bincount(keys - self.offset, minlength=len(self.counts))
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge DDSketches of different accuracy")
+        if len(other.counts):
+            self._grow(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start:start + len(other.counts)] += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right'))
+        value = 2 * self.gamma ** (self.offset + bucket) / (self.gamma + 1)
+        return float(min(max(value, self.min), self.max))
+
+class CountMinSketch:
+    """
+    Frequency sketch: estimates never undercount and overcount by at most
+    `error` * total with probability `confidence`. The `capacity` keys with
+    the highest estimates seen so far are kept as heavy-hitter candidates,
+    and re-ranked whenever sketches are updated or merged.
+
+    Example:
+        >>> cms = CountMinSketch(error=0.001)
+        >>> cms.add(kmers)
+        >>> cms.heavy_hitters(10)
+    """
+    def __init__(self, error: float = 0.001, confidence: float = 0.99, capacity: int = 100):
+        self.width = math.ceil(math.e / error)
+        self.depth = math.ceil(math.log(1 / (1 - confidence)))
+        self.capacity = capacity
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        self.candidates = np.empty(0, dtype=np.uint64)
+        self._seeds = mix64(np.arange(1, self.depth + 1, dtype=np.uint64))
+
+    def _columns(self, keys: np.ndarray) -> np.ndarray:
+        return (mix64(keys[None, :] ^ self._seeds[:, None]) % np.uint64(self.width)).astype(np.int64)
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        return self.table[np.arange(self.depth)[:, None], self._columns(keys)].min(axis=0)
+
+    def _rank_candidates(self, keys: np.ndarray, estimates: np.ndarray):
+        """Keep the `capacity` best of the current candidates and `keys`"""
+        if len(keys) > self.capacity:
+            # Keys outside the top `capacity` of this update cannot make the overall top
+            top = np.argpartition(-estimates, self.capacity - 1)[:self.capacity]
+            keys = keys[top]
+        pool, _ = _sorted_unique(np.concatenate((self.candidates, keys)))
+        if len(pool) > self.capacity:
+            pool = pool[np.argpartition(-self.estimate(pool), self.capacity - 1)[:self.capacity]]
+        self.candidates = pool
+
+    def add(self, keys: np.ndarray):
+        keys, counts = _sorted_unique(np.asarray(keys, dtype=np.uint64))
+        if not len(keys):
+            return
+        columns = self._columns(keys)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(columns[row], weights=counts,
+                                           minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+        self._rank_candidates(keys, self.table[np.arange(self.depth)[:, None], columns].min(axis=0))
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different shape")
+        self.table += other.table
+        self.total += other.total
+        self._rank_candidates(other.candidates, self.estimate(other.candidates))
+        return self
+
+    def heavy_hitters(self, n: int = 10) -> List[Tuple[int, int]]:
+        """Top-n (key, estimated count) among the tracked candidates"""
+        estimates = self.estimate(self.candidates)
+        order = np.argsort(-estimates, kind='stable')[:n]
+        return [(int(self.candidates[i]), int(estimates[i])) for i in order]
+
+class ReservoirSample:
+    """
+    Uniform sample without replacement, kept as the `size` items with the
+    smallest random priorities, so two samples merge by keeping the
+    smallest priorities of their union.
+    """
+    def __init__(self, size: int = 1000, seed: Optional[int] = None):
+        self.size = size
+        self.items: List[Any] = []
+        self.priorities = np.empty(0, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def _keep(self, items: List[Any], priorities: np.ndarray):
+        if len(priorities) > self.size:
+            keep = np.argpartition(priorities, self.size - 1)[:self.size]
+            items, priorities = [items[i] for i in keep], priorities[keep]
+        self.items, self.priorities = items, priorities
+
+    def add(self, items: List[Any]):
+        priorities = self._rng.random(len(items))
+        if len(self.priorities) >= self.size:
+            # Only items beating the current threshold can enter
+            chosen = np.flatnonzero(priorities < self.priorities.max())
+            items, priorities = [items[i] for i in chosen], priorities[chosen]
+        self._keep(self.items + list(items), np.concatenate((self.priorities, priorities)))
+
+    def merge(self, other: 'ReservoirSample') -> 'ReservoirSample':
+        self._keep(self.items + other.items, np.concatenate((self.priorities, other.priorities)))
+        return self
+
+@dataclass
+class ApproxProfile:
+    """
+    Mergeable sketches of one pass over a read set.
+
+    `fraction` is the share of the input that was read (1.0 for a full
+    pass); read and base totals are scaled by it, distinct counts are not.
+    """
+    error: float
+    k: int
+    reads: int = 0
+    bases: int = 0
+    fraction: float = 1.0
+    sketches: Dict[str, Any] = field(default_factory=dict)
+
+    def merge(self, other: 'ApproxProfile') -> 'ApproxProfile':
+        self.reads += other.reads
+        self.bases += other.bases
+        for name, sketch in other.sketches.items():
+            if name in self.sketches:
+                self.sketches[name].merge(sketch)
+            else:
+                self.sketches[name] = sketch
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        scale = 1 / self.fraction if self.fraction else 0.0
+        summary: Dict[str, Any] = {'reads': round(self.reads * scale), 'bases': round(self.bases * scale),
+                                   'sampled_fraction': self.fraction}
+        sketches = self.sketches
+        if 'distinct_reads' in sketches:
+            summary['distinct_reads'] = round(sketches['distinct_reads'].estimate())
+        if 'distinct_kmers' in sketches:
+            summary['distinct_kmers'] = round(sketches['distinct_kmers'].estimate())
+        for name in ('quality', 'length'):
+            if name in sketches:
+                summary[f'{name}_quantiles'] = {q: sketches[name].quantile(q) for q in QUANTILES}
+        if 'heavy_kmers' in sketches:
+            summary['heavy_kmers'] = [(decode_kmer(code, self.k), round(count * scale))
+                                      for code, count in sketches['heavy_kmers'].heavy_hitters()]
+        if 'sample' in sketches:
+            summary['sample_size'] = len(sketches['sample'].items)
+        return summary
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return iter(self.summary().items())
+
+def _fastq_text_records(text: bytes, limit: int) -> Iterator[Tuple[str, str, np.ndarray]]:
+    """FASTQ records starting before `limit` in a text fragment, resynchronised at the first header"""
+    lines = text.split(b'\n')
+    starts = np.concatenate(([0], np.cumsum([len(line) + 1 for line in lines])))
+    i = 0
+    while i + 3 < len(lines) and not (lines[i].startswith(b'@') and lines[i + 2].startswith(b'+')
+                                      and len(lines[i + 1]) == len(lines[i + 3])):
+        i += 1
+    # The last line may be cut at the fragment end, so a record needs a line after it
+    while i + 4 < len(lines) and starts[i] < limit:
+        name, sequence, qualities = lines[i], lines[i + 1], lines[i + 3]
+        if not name.startswith(b'@') or len(sequence) != len(qualities):
+            break
+        yield (name[1:].decode(), sequence.decode(),
+               np.frombuffer(qualities, dtype=np.uint8) - 33)
+        i += 4
+
+def _fasta_text_records(text: bytes, limit: int) -> Iterator[Tuple[str, str, None]]:
+    """Sequence lines of the first block of a FASTA fragment as one pseudo-read"""
+    lines = text[:limit].split(b'\n')[1:-1]  # Edge lines may be partial
+    sequence = b''.join(line for line in lines if not line.startswith(b'>')).decode()
+    if sequence:
+        yield '', sequence, None
+
+class ApproxProfiler:
+    """
+    One-pass approximate read-set profiling with mergeable sketches.
+
+    HyperLogLog counts distinct reads and canonical k-mers, DDSketch gives
+    quality and read-length quantiles, Count-Min tracks heavy-hitter
+    k-mers, and a bottom-k reservoir keeps a uniform sample of reads. All
+    sketches are sized from one `error` bound and merge exactly, so
+    batches are sketched in worker processes and combined.
+
+    With `sample` set, only that fraction of the input is read: random
+    BGZF blocks of compressed FASTQ/FASTA (found by resynchronising at
+    arbitrary byte offsets, without scanning the file), random genomic
+    windows of indexed BAM/CRAM, or a Bernoulli sample of other records.
+
+    Example:
+        >>> profiler = ApproxProfiler(error=0.01, sample=0.001)
+        >>> profiler.profile(FileRecords("reads.fq.gz")).summary()
+    """
+    def __init__(self, error: float = 0.01, k: int = 21, sketches: Optional[List[str]] = None,
+                 sample: Optional[float] = None, sample_size: int = 1000,
+                 workers: Optional[int] = None, batch_size: int = 10000, seed: Optional[int] = None):
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1")
+        if sample is not None and not 0 < sample <= 1:
+            raise ValueError("sample must be a fraction in (0, 1]")
+        unknown = set(sketches or ()) - set(SKETCHES)
+        if unknown:
+            raise ValueError(f"Unknown sketches: {', '.join(sorted(unknown))}")
+        self.error = error
+        self.k = k
+        self.sketches = list(sketches or SKETCHES)
+        self.sample = sample
+        self.sample_size = sample_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def empty(self, seed: Optional[int] = None) -> ApproxProfile:
+        factories = {
+            'distinct_reads': lambda: HyperLogLog(self.error),
+            'distinct_kmers': lambda: HyperLogLog(self.error),
+            'quality': lambda: DDSketch(self.error),
+            'length': lambda: DDSketch(self.error),
+            'heavy_kmers': lambda: CountMinSketch(self.error / 10),
+            'sample': lambda: ReservoirSample(self.sample_size, seed),
+        }
+        return ApproxProfile(self.error, self.k, sketches={name: factories[name]() for name in self.sketches})
+
+    def sketch_batch(self, reads: List[Tuple[str, str, Any]], seed: Optional[int] = None) -> ApproxProfile:
+        """Sketch (name, sequence, qualities) reads into a fresh profile"""
+        profile = self.empty(seed)
+        sketches = profile.sketches
+        sequences = [sequence for _, sequence, _ in reads]
+        profile.reads = len(reads)
+        profile.bases = sum(len(s) for s in sequences)
+        if 'distinct_reads' in sketches:
+            sketches['distinct_reads'].add(hash_strings(sequences))
+        if 'distinct_kmers' in sketches or 'heavy_kmers' in sketches:
+            # N separators break k-mers, so one call covers the whole batch
+            kmers = kmer_codes('N'.join(sequences), self.k)
+            if 'distinct_kmers' in sketches:
+                sketches['distinct_kmers'].add(mix64(kmers))
+            if 'heavy_kmers' in sketches:
+                sketches['heavy_kmers'].add(kmers)
+        if 'quality' in sketches:
+            qualities = [np.asarray(q) for _, _, q in reads if q is not None]
+            if qualities:
+                sketches['quality'].add(np.concatenate(qualities))
+        if 'length' in sketches:
+            sketches['length'].add(np.array([len(s) for s in sequences]))
+        if 'sample' in sketches:
+            sketches['sample'].add(reads)
+        return profile
+
+    def _batches(self, records: Iterator[Any], sample: Optional[float]) -> Iterator[Tuple['ApproxProfiler', int, List]]:
+        rng = np.random.default_rng(self.seed)
+        batch, index = [], 0
+        for record in records:
+            if sample is not None and rng.random() >= sample:
+                continue
+            name, sequence, qualities = sequence_fields(record)
+            batch.append((name, str(sequence), None if qualities is None else np.asarray(qualities, dtype=np.uint8)))
+            if len(batch) >= self.batch_size:
+                yield self, index, batch
+                batch, index = [], index + 1
+        if batch:
+            yield self, index, batch
+
+    def _block_tasks(self, file_path: str, kind: str) -> Iterator[Tuple['ApproxProfiler', str, str, int, int]]:
+        size = os.path.getsize(file_path)
+        _, block_size, _ = read_bgzf_blocks_at(file_path, 0, 1)
+        count = max(1, math.ceil(self.sample * size / max(block_size, 1)))
+        # One random offset per stratum spreads the sample over the whole file
+        rng = np.random.default_rng(self.seed)
+        offsets = (np.arange(count) + rng.random(count)) * (size / count)
+        for i, offset in enumerate(offsets.astype(np.int64).tolist()):
+            yield self, file_path, kind, offset, i
+
+    def _window_tasks(self, alignments: pysam.AlignmentFile) -> List[Tuple[str, int, int]]:
+        """Random non-overlapping genomic windows covering a `sample` fraction of the reference"""
+        bounds = np.cumsum(alignments.lengths)
+        available = max(int(bounds[-1]) // SAMPLE_WINDOW, 1)
+        count = min(available, max(1, math.ceil(self.sample * available)))
+        rng = np.random.default_rng(self.seed)
+        windows = []
+        for position in (np.sort(rng.choice(available, count, replace=False)) * SAMPLE_WINDOW).tolist():
+            contig = int(np.searchsorted(bounds, position, side='right'))
+            start = position - (int(bounds[contig - 1]) if contig else 0)
+            windows.append((alignments.references[contig], start, start + SAMPLE_WINDOW))
+        return windows
+
+    def profile(self, data: Any) -> ApproxProfile:
+        """Sketch all of `data`, or a `sample` fraction of it, in one pass"""
+        profile = self.empty(self.seed)
+        file_path = data.file_path if isinstance(data, FileRecords) else None
+
+        if self.sample is not None and file_path and data.kind != 'alignment' \
+                and detect_compression(file_path) == CompressionType.BGZF:
+            seen, sampled = set(), 0
+            for block_offset, block_size, partial in bounded_map(
+                    _sketch_blocks, self._block_tasks(file_path, data.kind), self.workers):
+                if block_offset < 0 or block_offset in seen:
+                    continue  # Two offsets resynchronised to the same block
+                seen.add(block_offset)
+                sampled += block_size
+                profile.merge(partial)
+            profile.fraction = sampled / os.path.getsize(file_path)
+            return profile
+
+        if self.sample is not None and file_path and data.kind == 'alignment':
+            alignments = pysam.AlignmentFile(file_path)
+            if alignments.has_index():
+                windows = self._window_tasks(alignments)
+                # Reads count once, in the window where they start
+                records = (read for contig, start, stop in windows
+                           for read in alignments.fetch(contig, start, stop) if read.reference_start >= start)
+                for partial in bounded_map(_sketch_records, self._batches(records, None), self.workers):
+                    profile.merge(partial)
+                profile.fraction = len(windows) * SAMPLE_WINDOW / sum(alignments.lengths)
+                return profile
+
+        if hasattr(data, 'reset'):
+            data.reset()
+        for partial in bounded_map(_sketch_records, self._batches(iter(data), self.sample), self.workers):
+            profile.merge(partial)
+        if self.sample is not None:
+            profile.fraction = self.sample
+        return profile
+
+def _sketch_records(task: Tuple[ApproxProfiler, int, List]) -> ApproxProfile:
+    """Sketch one batch of reads; runs in a worker process"""
+    profiler, index, reads = task
+    return profiler.sketch_batch(reads, None if profiler.seed is None else profiler.seed + index + 1)
+
+def _sketch_blocks(task: Tuple[ApproxProfiler, str, str, int, int]) -> Tuple[int, int, ApproxProfile]:
+    """Sketch the records starting in one sampled BGZF block; runs in a worker process"""
+    profiler, file_path, kind, offset, index = task
+    block_offset, block_size, payloads = read_bgzf_blocks_at(file_path, offset, 2)
+    if block_offset < 0 or not payloads:
+        return -1, 0, profiler.empty()
+    text, limit = b''.join(payloads), len(payloads[0])
+    parse = _fastq_text_records if kind == 'fastq' else _fasta_text_records
+    seed = None if profiler.seed is None else profiler.seed + index + 1
+    return block_offset, block_size, profiler.sketch_batch(list(parse(text, limit)), seed)
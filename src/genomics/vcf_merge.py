@@ -0,0 +1,267 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from collections import Counter
+import gzip
+import heapq
+import io
+import os
+import resource
+import shutil
+import tempfile
+import weakref
+from operator import itemgetter
+import numpy as np
+from .compressed_io import CompressionType, detect_compression, open_input
+from ..utils.parallel import bounded_map, resolve_workers
+
+DEFAULT_MAX_OPEN = 512  # Inputs open at once per process, well under common fd limits
+DEFAULT_BLOCK_SIZE = 10000  # Positions per columnar genotype block
+MISSING_GENOTYPE = './.'
+GT_HEADER = '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">'
+FIXED_COLUMNS = ('CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO')
+
+def max_open_files(reserve: int = 64) -> int:
+    """Inputs that may be open at once: the soft fd limit less `reserve`, capped at DEFAULT_MAX_OPEN"""
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return DEFAULT_MAX_OPEN
+    return max(2, min(DEFAULT_MAX_OPEN, soft - reserve))
+
+def _open_vcf(file_path: str) -> io.TextIOBase:
+    # One single-threaded stream per input: thousands of open inputs must not
+    # each hold a window of BGZF read-ahead blocks
+    if detect_compression(file_path) in (CompressionType.BGZF, CompressionType.GZIP):
+        return gzip.open(file_path, 'rt')
+    return open_input(file_path, 'rt')
+
+def read_vcf_header(file_path: str) -> Tuple[List[str], List[str]]:
+    """Meta lines (##...) and sample names of a VCF"""
+    meta = []
+    with _open_vcf(file_path) as handle:
+        for line in handle:
+            line = line.rstrip('\n')
+            if line.startswith('##'):
+                meta.append(line)
+            elif line.startswith('#'):
+                return meta, line.split('\t')[9:]
+            else:
+                break
+    raise ValueError(f"Missing #CHROM header line: {file_path}")
+
+def _meta_id(line: str) -> Tuple[str, str]:
+    """(type, ID) of a structured meta line, or the whole line for free-form ones"""
+    kind, _, value = line[2:].partition('=')
+    if value.startswith('<') and 'ID=' in value:
+        return kind, value[value.index('ID=') + 3:].split(',', 1)[0].rstrip('>')
+    return kind, value
+
+def _genotypes(fields: List[str], samples: int) -> List[str]:
+    if len(fields) <= 9 or not fields[8].startswith('GT'):
+        return [MISSING_GENOTYPE] * samples
+    if fields[8] == 'GT':
+        return fields[9:]
+    return [sample.split(':', 1)[0] for sample in fields[9:]]
+
+def _records(file_path: str, source: int, ranks: Dict[str, int]) -> Iterator[Tuple[Tuple, int, List[str]]]:
+    """(key, source, fields) of every record of one position-sorted VCF"""
+    # Records sharing a position may list their alleles in any order; they are
+    # buffered and sorted so the stream is ordered by the full merge key
+    position, pending = None, []
+    with _open_vcf(file_path) as handle:
+        for line in handle:
+            if line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            rank = ranks.get(fields[0])
+            if rank is None:
+                # Contigs missing from every header are ordered by first appearance
+                rank = ranks.setdefault(fields[0], len(ranks))
+            key = (rank, int(fields[1]), fields[3], fields[4])
+            if key[:2] != position:
+                if position is not None and key[:2] < position:
+                    raise ValueError(f"VCF is not position-sorted at {fields[0]}:{fields[1]}: {file_path}")
+                pending.sort(key=itemgetter(0))
+                yield from pending
+                position, pending = key[:2], []
+            pending.append((key, source, fields))
+    pending.sort(key=itemgetter(0))
+    yield from pending
+
+def genotype_codes(genotypes: List[str]) -> np.ndarray:
+    """
+    Allele indices (n x 2, int16) of GT strings; -1 marks missing alleles.
+
+    Diploid single-digit calls ('0/1', '1|1', './.') are decoded in one
+    vectorized pass; anything else (haploid, multi-digit) falls back to
+    per-call parsing.
+    """
+    raw = np.array(genotypes, dtype='S')
+    if len(raw) and raw.dtype.itemsize == 3:
+        chars = raw.view(np.uint8).reshape(-1, 3)
+        if np.all((chars[:, 1] == ord('/')) | (chars[:, 1] == ord('|'))):
+            alleles = chars[:, [0, 2]]
+            return np.where(alleles == ord('.'), -1, alleles.astype(np.int16) - ord('0')).astype(np.int16)
+    codes = np.full((len(genotypes), 2), -1, dtype=np.int16)
+    for i, genotype in enumerate(genotypes):
+        for j, allele in enumerate(genotype.replace('|', '/').split('/')[:2]):
+            if allele not in ('.', ''):
+                codes[i, j] = int(allele)
+    return codes
+
+@dataclass
+class GenotypeBlock:
+    """
+    Columnar genotypes of a run of consecutive merged positions.
+
+    Attributes:
+        chrom (List[str]): Contig of each position
+        pos (np.ndarray): 1-based positions
+        ref (List[str]): Reference alleles
+        alt (List[str]): Alternate alleles, as written in the inputs
+        genotypes (np.ndarray): Allele indices, shape (positions, samples, 2), -1 when missing
+    """
+    chrom: List[str]
+    pos: np.ndarray
+    ref: List[str]
+    alt: List[str]
+    genotypes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+class MergedVariants:
+    """
+    Lazy k-way merge of position-sorted VCFs.
+
+    Each iteration heap-merges the inputs by (contig, position, REF, ALT)
+    and yields merged VCF lines, so the merge is streamed straight into
+    EXPORT. Records of the same site share one line whose sample columns
+    hold each input's genotypes (GT only), with `./.` for inputs lacking
+    the site; the site columns come from the first input carrying it.
+    `blocks()` yields the same merge as columnar genotype matrices.
+
+    Example:
+        >>> merged = VCFMerger().merge(["s1.vcf.gz", "s2.vcf.gz"])
+        >>> export_records(merged, "cohort.vcf.gz")
+        >>> for block in merged.blocks(10000):
+        ...     allele_counts = (block.genotypes > 0).sum(axis=(1, 2))
+    """
+    def __init__(self, paths: List[str], spill_dir: Optional[str] = None):
+        if not paths:
+            raise ValueError("MERGE requires at least one VCF")
+        self.paths = list(paths)
+        meta: Dict[Tuple[str, str], str] = {}
+        contigs: Dict[str, None] = {}
+        self.samples: List[str] = []
+        self._widths: List[int] = []
+        for path in self.paths:
+            lines, samples = read_vcf_header(path)
+            for line in lines:
+                kind, name = _meta_id(line)
+                if kind == 'contig':
+                    contigs.setdefault(name)
+                if kind not in ('fileformat', 'FORMAT'):
+                    meta.setdefault((kind, name), line)
+            self.samples.extend(samples)
+            self._widths.append(len(samples))
+        duplicates = sorted(name for name, count in Counter(self.samples).items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Samples occur in more than one input: {', '.join(duplicates[:10])}")
+        self.contigs = list(contigs)
+        self._meta = list(meta.values())
+        if spill_dir is not None:
+            self._cleanup = weakref.finalize(self, shutil.rmtree, spill_dir, True)
+
+    @property
+    def header(self) -> str:
+        lines = ['##fileformat=VCFv4.2'] + self._meta + [GT_HEADER]
+        lines.append('#' + '\t'.join(FIXED_COLUMNS + ('FORMAT',) + tuple(self.samples)))
+        return '\n'.join(lines) + '\n'
+
+    def rows(self) -> Iterator[Tuple[List[str], List[List[str]]]]:
+        """(site fields, genotypes per input) of every merged site, in order"""
+        ranks = {contig: rank for rank, contig in enumerate(self.contigs)}
+        missing = [[MISSING_GENOTYPE] * width for width in self._widths]
+        site, row, row_key = None, None, None
+        for key, source, fields in heapq.merge(*(_records(path, i, ranks) for i, path in enumerate(self.paths))):
+            # A repeated site within one input starts a new line rather than overwriting
+            if key != row_key or row[source] is not missing[source]:
+                if site is not None:
+                    yield site, row
+                site, row, row_key = fields[:8], list(missing), key
+            row[source] = _genotypes(fields, self._widths[source])
+        if site is not None:
+            yield site, row
+
+    def __iter__(self) -> Iterator[str]:
+        for site, row in self.rows():
+            yield '\t'.join(site + ['GT'] + [genotype for genotypes in row for genotype in genotypes])
+
+    def blocks(self, size: int = DEFAULT_BLOCK_SIZE) -> Iterator[GenotypeBlock]:
+        """The merge as GenotypeBlocks of at most `size` positions"""
+        sites, calls = [], []
+        for site, row in self.rows():
+            sites.append(site)
+            calls.extend(genotype for genotypes in row for genotype in genotypes)
+            if len(sites) >= size:
+                yield self._block(sites, calls)
+                sites, calls = [], []
+        if sites:
+            yield self._block(sites, calls)
+
+    def _block(self, sites: List[List[str]], calls: List[str]) -> GenotypeBlock:
+        genotypes = genotype_codes(calls).reshape(len(sites), len(self.samples), 2)
+        return GenotypeBlock([s[0] for s in sites], np.array([int(s[1]) for s in sites], dtype=np.int64),
+                             [s[3] for s in sites], [s[4] for s in sites], genotypes)
+
+def _merge_group(task: Tuple[str, List[str], int]) -> str:
+    """Merge one group of inputs into an intermediate VCF; runs in a worker process"""
+    path, paths, level = task
+    merged = MergedVariants(paths)
+    with gzip.open(path, 'wt', compresslevel=level) as out:
+        out.write(merged.header)
+        for line in merged:
+            out.write(line + '\n')
+    return path
+
+class VCFMerger:
+    """
+    Merges many position-sorted VCFs with a bounded number of open files.
+
+    Up to `max_open` inputs (by default derived from the soft fd limit) are
+    merged directly. Larger cohorts are merged in passes: groups of
+    `max_open` inputs are merged into temporary VCFs by parallel worker
+    processes, preserving sample order, until one final streaming merge
+    remains. Every pass reads each record once, so the cost is linear in
+    the records times the number of passes (log base `max_open` of the
+    inputs).
+
+    Example:
+        >>> merged = VCFMerger(max_open=256, workers=8).merge(sample_paths)
+        >>> export_records(merged, "cohort.vcf.gz")
+    """
+    def __init__(self, max_open: Optional[int] = None, workers: Optional[int] = None,
+                 spill_dir: Optional[str] = None, level: int = 1):
+        self.max_open = max(max_open or max_open_files(), 2)
+        self.workers = workers
+        self.spill_dir = spill_dir
+        self.level = level
+
+    def merge(self, paths: List[str]) -> MergedVariants:
+        """Merge the VCFs at `paths`; samples keep the order of the inputs"""
+        paths = list(paths)
+        if len(paths) <= self.max_open:
+            return MergedVariants(paths)
+        spill_dir = tempfile.mkdtemp(prefix="genomescript-merge-", dir=self.spill_dir)
+        workers = resolve_workers(self.workers)
+        passes = 0
+        while len(paths) > self.max_open:
+            passes += 1
+            tasks = [(os.path.join(spill_dir, f"pass{passes}-{i:06d}.vcf.gz"), paths[start:start + self.max_open],
+                      self.level) for i, start in enumerate(range(0, len(paths), self.max_open))]
+            merged = list(bounded_map(_merge_group, tasks, workers))
+            if passes > 1:
+                for path in paths:
+                    os.remove(path)
+            paths = merged
+        return MergedVariants(paths, spill_dir=spill_dir)
@@ -0,0 +1,410 @@
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from struct import pack
+import numpy as np
+import pysam
+from .compressed_io import BGZFWriter
+from .indexing import BinningIndex, reg2bin
+from .packed_sequence import PackedSequence, iter_2bit_chunks
+from .records import sequence_fields
+
+DEFAULT_WRITE_BUFFER = 4 * 1024 * 1024  # 4MB write buffer
+
+class RecordWriter(ABC):
+    """
+    Base class for streaming record writers.
+
+    Records are serialized into a large in-memory buffer that is handed to
+    the output in one call once full. Outputs ending in `.gz`/`.bgz` (and all
+    BAM files) are BGZF-compressed by parallel worker threads, and any index
+    is built from the record offsets as they are written, so no second pass
+    over the output is needed.
+
+    Example:
+        >>> with FASTAWriter("contigs.fa.gz") as writer:
+        ...     writer.write_all(records)
+    """
+    compressed_by_default = False
+
+    def __init__(self, file_path: str, compress: Optional[bool] = None,
+                 threads: Optional[int] = None, buffer_size: int = DEFAULT_WRITE_BUFFER,
+                 index: bool = True):
+        self.file_path = file_path
+        if compress is None:
+            compress = self.compressed_by_default or file_path.endswith(('.gz', '.bgz'))
+        self.compressed = compress
+        self.build_index = index
+        self.buffer_size = buffer_size
+        self.records_written = 0
+        self._handle = BGZFWriter(file_path, threads=threads) if compress else open(file_path, 'wb')
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def _emit(self, data: bytes):
+        self._buffer += data
+        self._offset += len(data)
+        if len(self._buffer) >= self.buffer_size:
+            self._handle.write(self._buffer)
+            self._buffer = bytearray()
+
+    def _resolve(self, offset: int) -> int:
+        """Map an uncompressed offset to the offset stored in indexes"""
+        return self._handle.virtual_offset(offset) if self.compressed else offset
+
+    @abstractmethod
+    def write(self, record: Any):
+        """Serialize one record to the output"""
+
+    def write_all(self, records: Iterable[Any]) -> int:
+        """Stream every record to the output and return the number written"""
+        for record in records:
+            self.write(record)
+        return self.records_written
+
+    def close(self):
+        if self._handle.closed:
+            return
+        if self._buffer:
+            self._handle.write(self._buffer)
+            self._buffer = bytearray()
+        self._handle.close()
+        if self.build_index:
+            self._write_index()
+
+    def _write_index(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _quality_string(qualities: Any) -> bytes:
+    if isinstance(qualities, str):
+        return qualities.encode()
+    return (np.asarray(qualities, dtype=np.uint8) + 33).tobytes()
+
+def _record_name(name: Any, number: int) -> str:
+    """Header text for a record, naming unnamed records `seq<number>` so `.fai` lookups work"""
+    name = str(name or '').strip()
+    return name if name else f"seq{number}"
+
+class FASTAWriter(RecordWriter):
+    """Writes FASTA with a `.fai` index (plus `.gzi` when BGZF-compressed)"""
+    def __init__(self, file_path: str, line_width: int = 60, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self.line_width = line_width
+        self._fai: List[str] = []
+
+    def write(self, record: Any):
+        name, sequence, _ = sequence_fields(record)
+        name = _record_name(name, self.records_written + 1)
+        self._emit(f">{name}\n".encode())
+        start = self._offset
+        width = self.line_width
+        data = bytes(sequence) if isinstance(sequence, PackedSequence) else sequence.encode()
+        self._emit(b''.join(
+            data[i:i + width] + b'\n' for i in range(0, len(data), width)
+        ))
+        self._fai.append(f"{name.split()[0]}\t{len(sequence)}\t{start}\t{width}\t{width + 1}\n")
+        self.records_written += 1
+
+    def _write_index(self):
+        with open(self.file_path + '.fai', 'w') as f:
+            f.writelines(self._fai)
+        if self.compressed:
+            blocks = self._handle.block_offsets()
+            with open(self.file_path + '.gzi', 'wb') as f:
+                f.write(pack('<Q', len(blocks)))
+                f.write(b''.join(pack('<QQ', c, u) for c, u in blocks))
+
+class FASTQWriter(RecordWriter):
+    """Writes four-line FASTQ with a samtools-compatible `.fai` index"""
+    def __init__(self, file_path: str, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._fai: List[str] = []
+
+    def write(self, record: Any):
+        name, sequence, qualities = sequence_fields(record)
+        name = _record_name(name, self.records_written + 1)
+        if qualities is None:
+            raise ValueError(f"Record {name} has no base qualities for FASTQ output")
+        header = f"@{name}\n".encode()
+        seq_offset = self._offset + len(header)
+        qual_offset = seq_offset + len(sequence) + 3
+        data = bytes(sequence) if isinstance(sequence, PackedSequence) else sequence.encode()
+        self._emit(header + data + b'\n+\n' + _quality_string(qualities) + b'\n')
+        length = len(sequence)
+        self._fai.append(
+            f"{name.split()[0]}\t{length}\t{seq_offset}\t{length}\t{length + 1}\t{qual_offset}\n"
+        )
+        self.records_written += 1
+
+    def _write_index(self):
+        with open(self.file_path + '.fai', 'w') as f:
+            f.writelines(self._fai)
+
+class TabixWriter(RecordWriter):
+    """Base for tab-delimited outputs indexed with `.tbi` when BGZF-compressed"""
+    preset = 'BED'
+
+    def __init__(self, file_path: str, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._index = BinningIndex()
+        self._ref_ids: Dict[str, int] = {}
+
+    @abstractmethod
+    def _format(self, record: Any) -> str:
+        """One output line for a record; an empty line skips it"""
+
+    @abstractmethod
+    def _interval(self, fields: List[str]) -> Tuple[str, int, int]:
+        """(chrom, 0-based start, end) of a written line, for the index"""
+
+    def write(self, record: Any):
+        line = self._format(record).rstrip('\n')
+        if not line:
+            return
+        start = self._offset
+        self._emit(line.encode() + b'\n')
+        self.records_written += 1
+        if self.compressed and self.build_index:
+            chrom, beg, end = self._interval(line.split('\t'))
+            ref_id = self._ref_ids.setdefault(chrom, len(self._ref_ids))
+            self._index.add(ref_id, beg, end, start, self._offset)
+
+    def _write_index(self):
+        if self.compressed:
+            self._index.save_tbi(self.file_path + '.tbi', list(self._ref_ids), self.preset,
+                                 self._resolve)
+
+class VCFWriter(TabixWriter):
+    """Writes VCF records (pysam records, dicts or text lines)"""
+    preset = 'VCF'
+    columns = ('CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO')
+
+    def __init__(self, file_path: str, header: Any = None, **kwargs):
+        super().__init__(file_path, **kwargs)
+        if header is None:
+            header = "##fileformat=VCFv4.2\n#" + '\t'.join(self.columns) + "\n"
+        self._emit(str(header).encode())
+
+    def _format(self, record: Any) -> str:
+        if isinstance(record, dict):
+            return '\t'.join(str(record.get(c, '.')) for c in self.columns)
+        return str(record)
+
+    def _interval(self, fields: List[str]) -> Tuple[str, int, int]:
+        beg = int(fields[1]) - 1
+        end = beg + len(fields[3])
+        for item in fields[7].split(';') if len(fields) > 7 else []:
+            if item.startswith('END='):
+                end = int(item[4:])
+        return fields[0], beg, end
+
+class BEDWriter(TabixWriter):
+    """Writes BED/bedGraph intervals from tuples, dicts or text lines"""
+    preset = 'BED'
+    columns = ('chrom', 'start', 'end', 'name', 'score', 'strand')
+
+    def _format(self, record: Any) -> str:
+        if isinstance(record, dict):
+            return '\t'.join(str(record[c]) for c in self.columns if c in record)
+        if isinstance(record, (tuple, list)):
+            return '\t'.join(str(v) for v in record)
+        return str(record)
+
+    def _interval(self, fields: List[str]) -> Tuple[str, int, int]:
+        return fields[0], int(fields[1]), int(fields[2])
+
+class TSVWriter(RecordWriter):
+    """Writes tables (matrix rows, tuples or dicts) as tab-separated lines"""
+
+    def __init__(self, file_path: str, header: Any = None, **kwargs):
+        super().__init__(file_path, **kwargs)
+        if header is not None:
+            self._emit(str(header).rstrip('\n').encode() + b'\n')
+
+    def write(self, record: Any):
+        if isinstance(record, dict):
+            record = record.values()
+        if isinstance(record, str):
+            line = record.rstrip('\n')
+        else:
+            line = '\t'.join(str(v) for v in (record.tolist() if isinstance(record, np.ndarray) else record))
+        self._emit(line.encode() + b'\n')
+        self.records_written += 1
+
+# BAM 4-bit base encoding, indexed by ASCII code
+_BAM_SEQ_CODES = np.full(256, 15, dtype=np.uint8)
+for _code, _base in enumerate("=ACMGRSVTWYHKDBN"):
+    _BAM_SEQ_CODES[ord(_base)] = _code
+    _BAM_SEQ_CODES[ord(_base.lower())] = _code
+
+_BAM_TAG_FORMATS = {'c': 'b', 'C': 'B', 's': 'h', 'S': 'H', 'i': 'i', 'I': 'I', 'f': 'f'}
+_BAM_ARRAY_TYPES = {'b': 'c', 'B': 'C', 'h': 's', 'H': 'S', 'i': 'i', 'I': 'I',
+                    'l': 'i', 'L': 'I', 'f': 'f'}
+
+def _encode_tag(tag: str, value: Any, value_type: str) -> bytes:
+    key = tag.encode() + value_type.encode()
+    if value_type in _BAM_TAG_FORMATS:
+        return key + pack('<' + _BAM_TAG_FORMATS[value_type], value)
+    if value_type == 'A':
+        return key + str(value).encode()[:1]
+    if value_type in 'ZH':
+        return key + str(value).encode() + b'\x00'
+    if value_type == 'B':
+        subtype = _BAM_ARRAY_TYPES[getattr(value, 'typecode', 'i')]
+        fmt = _BAM_TAG_FORMATS[subtype]
+        return key + subtype.encode() + pack(f'<i{len(value)}{fmt}', len(value), *value)
+    raise ValueError(f"Unsupported BAM tag type {value_type} for {tag}")
+
+def encode_bam_record(segment: pysam.AlignedSegment) -> Tuple[bytes, int, int]:
+    """Serialize an aligned segment to BAM; returns (bytes, start, end)"""
+    name = (segment.query_name or '*').encode() + b'\x00'
+    cigar = segment.cigartuples or []
+    sequence = (segment.query_sequence or '').encode()
+    qualities = segment.query_qualities
+    beg = segment.reference_start
+    end = segment.reference_end or beg + 1
+
+    codes = _BAM_SEQ_CODES[np.frombuffer(sequence, dtype=np.uint8)]
+    if len(codes) % 2:
+        codes = np.append(codes, 0)
+    packed_seq = ((codes[0::2] << 4) | codes[1::2]).astype(np.uint8).tobytes()
+    if qualities is None:
+        qual = b'\xff' * len(sequence)
+    else:
+        qual = np.asarray(qualities, dtype=np.uint8).tobytes()
+    tags = b''.join(_encode_tag(*tag) for tag in segment.get_tags(with_value_type=True))
+
+    body = pack(
+        '<iiBBHHHiiii',
+        segment.reference_id, beg, len(name), segment.mapping_quality,
+        reg2bin(beg, end) if beg >= 0 else 4680, len(cigar), segment.flag, len(sequence),
+        segment.next_reference_id, segment.next_reference_start, segment.template_length
+    ) + name + b''.join(pack('<I', length << 4 | op) for op, length in cigar) \
+        + packed_seq + qual + tags
+    return pack('<i', len(body)) + body, beg, end
+
+class BAMWriter(RecordWriter):
+    """Writes coordinate-sorted BAM and builds the `.bai` index while writing"""
+    compressed_by_default = True
+
+    def __init__(self, file_path: str, header: Any = None, **kwargs):
+        if header is None:
+            raise ValueError("BAM output needs a header: pass header= or export pysam AlignedSegments")
+        super().__init__(file_path, **kwargs)
+        if isinstance(header, dict):
+            header = pysam.AlignmentHeader.from_dict(header)
+        self.header = header
+        self._index = BinningIndex()
+
+        text = str(header).encode()
+        refs = b''.join(
+            pack('<i', len(name) + 1) + name.encode() + b'\x00' + pack('<i', length)
+            for name, length in zip(header.references, header.lengths)
+        )
+        self._emit(b'BAM\x01' + pack('<i', len(text)) + text
+                   + pack('<i', len(header.references)) + refs)
+
+    def write(self, record: pysam.AlignedSegment):
+        data, beg, end = encode_bam_record(record)
+        start = self._offset
+        self._emit(data)
+        self.records_written += 1
+        if self.build_index:
+            self._index.add(record.reference_id, beg, end, start, self._offset,
+                            unmapped=record.is_unmapped)
+
+    def _write_index(self):
+        self._index.save_bai(self.file_path + '.bai', len(self.header.references), self._resolve)
+
+class TwoBitWriter(RecordWriter):
+    """
+    Writes UCSC `.2bit` files.
+
+    The format puts an offset index ahead of the sequences, so records are
+    collected in packed form (a quarter of their text size) and serialized
+    when the writer is closed.
+    """
+    def __init__(self, file_path: str, **kwargs):
+        kwargs['compress'] = False
+        super().__init__(file_path, **kwargs)
+        self._sequences: List[PackedSequence] = []
+
+    def write(self, record: Any):
+        name, sequence, _ = sequence_fields(record)
+        if isinstance(sequence, PackedSequence):
+            sequence = sequence[:]
+            sequence.name = name
+        else:
+            sequence = PackedSequence.from_string(sequence, name=name)
+        self._sequences.append(sequence)
+        self.records_written += 1
+
+    def close(self):
+        if not self._handle.closed:
+            for chunk in iter_2bit_chunks(self._sequences):
+                self._emit(chunk)
+            self._sequences = []
+        super().close()
+
+WRITERS: Dict[str, Type[RecordWriter]] = {
+    'FASTA': FASTAWriter,
+    'FASTQ': FASTQWriter,
+    'VCF': VCFWriter,
+    'BED': BEDWriter,
+    'BAM': BAMWriter,
+    'TWOBIT': TwoBitWriter,
+    'TSV': TSVWriter,
+}
+
+_EXTENSIONS = {
+    '.fa': 'FASTA', '.fasta': 'FASTA', '.fna': 'FASTA',
+    '.fq': 'FASTQ', '.fastq': 'FASTQ',
+    '.vcf': 'VCF',
+    '.bed': 'BED', '.bedgraph': 'BED',
+    '.bam': 'BAM',
+    '.2bit': 'TWOBIT',
+    '.tsv': 'TSV',
+}
+
+def detect_output_format(file_path: str) -> str:
+    """Infer the output format from the file extension"""
+    name = file_path.lower()
+    for suffix in ('.gz', '.bgz'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    for extension, file_format in _EXTENSIONS.items():
+        if name.endswith(extension):
+            return file_format
+    raise ValueError(f"Cannot infer output format from: {file_path}")
+
+def open_writer(file_path: str, file_format: Optional[str] = None, **kwargs) -> RecordWriter:
+    """Create the streaming writer for `file_format` (inferred from the path if omitted)"""
+    file_format = (file_format or detect_output_format(file_path)).upper()
+    if file_format not in WRITERS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    return WRITERS[file_format](file_path, **kwargs)
+
+def export_records(data: Any, file_path: str, file_format: Optional[str] = None,
+                   **kwargs) -> int:
+    """Stream records (a list, parser iterator or pysam file) to `file_path`"""
+    file_format = (file_format or detect_output_format(file_path)).upper()
+    if file_format in ('VCF', 'BAM', 'TSV') and 'header' not in kwargs:
+        # pysam VariantFile/AlignmentFile handles and labelled tables carry the header to copy
+        kwargs['header'] = getattr(data, 'header', None)
+    if hasattr(data, 'reset'):
+        data.reset()
+    if file_format == 'BAM' and kwargs.get('header') is None:
+        # Plain lists and iterators of AlignedSegments carry the header on each read
+        records = iter(data)
+        first = next(records, None)
+        kwargs['header'] = getattr(first, 'header', None)
+        data = records if first is None else itertools.chain([first], records)
+
+    with open_writer(file_path, file_format, **kwargs) as writer:
+        return writer.write_all(data)
@@ -0,0 +1,36 @@
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional
+from collections import deque
+from itertools import chain, islice
+from concurrent.futures import Future, ProcessPoolExecutor
+import os
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Default to one worker per CPU"""
+    return workers or os.cpu_count() or 1
+
+def bounded_map(fn: Callable[[Any], Any], items: Iterable[Any], workers: Optional[int] = None,
+                max_pending: Optional[int] = None) -> Iterator[Any]:
+    """
+    Ordered `map` over a process pool that never has more than `max_pending`
+    items in flight, so arbitrarily large inputs stream in bounded memory.
+
+    With a single worker or a single item the function runs inline, avoiding
+    pool start-up for small inputs. `fn` must be a picklable module-level function.
+    """
+    workers = resolve_workers(workers)
+    items = iter(items)
+    head = list(islice(items, 2))
+    if workers <= 1 or len(head) < 2:
+        for item in chain(head, items):
+            yield fn(item)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for item in chain(head, items):
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -1,13 +1,31 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import glob
+import os
 import pysam
 from Bio import SeqIO
 from ..genomics.file_handler import GenomicFileHandler
+from ..genomics.compressed_io import open_input
 from ..genomics.file_registry import FileFormat, GenomicFileRegistry
-from ..compiler.parser import LoadNode, AnalyzeNode
+from ..genomics.writers import export_records
+from ..genomics.kmer import KmerCounter
+from ..genomics.gc_content import gc_fraction, gc_profile
+from ..genomics.coverage import CoverageCalculator, DepthTrack
+from ..genomics.motif import MotifFinder, load_motifs
+from ..genomics.alignment import Aligner, open_or_build as open_or_build_index
+from ..genomics.intervals import IntervalIndex
+from ..genomics.records import FileRecords
+from ..genomics.sketches import ApproxProfiler
+from ..genomics.minhash import MinHasher
+from ..genomics.duplicates import DuplicateMarker
+from ..genomics.external_sort import ExternalSorter
+from ..genomics.screening import ReadScreener, open_or_build
+from ..genomics.vcf_merge import MergedVariants, VCFMerger
+from ..compiler.parser import LoadNode, AnalyzeNode, ExportNode, AlignNode, FilterNode, SortNode, MergeNode
 
 class GenomeVM:
     def __init__(self):
         self.variables: Dict[str, Any] = {}
+        self.sources: Dict[str, Tuple[str, Any]] = {}
         self.file_registry = GenomicFileRegistry()
         self.file_handler = GenomicFileHandler()
 
@@ -20,37 +38,277 @@ class GenomeVM:
             self._execute_load(node)
         elif isinstance(node, AnalyzeNode):
             self._execute_analyze(node)
+        elif isinstance(node, ExportNode):
+            self._execute_export(node)
+        elif isinstance(node, AlignNode):
+            self._execute_align(node)
+        elif isinstance(node, FilterNode):
+            self._execute_filter(node)
+        elif isinstance(node, SortNode):
+            self._execute_sort(node)
+        elif isinstance(node, MergeNode):
+            self._execute_merge(node)
 
     def _execute_load(self, node: LoadNode):
         self.execute_load(node)
+        # Remember the file behind the value so file-backed caches can live beside it
+        self.sources[node.target] = (node.file_path, self.variables[node.target])
+
+    def _resolve_input(self, name: str) -> Tuple[Any, Optional[str]]:
+        """A variable, or a file path streamed as records, with the file it came from"""
+        if name in self.variables:
+            value = self.variables[name]
+            source, loaded = self.sources.get(name, (None, None))
+            return value, source if loaded is value else None
+        if os.path.exists(name):
+            return FileRecords(name), name
+        raise RuntimeError(f"Undefined variable: {name}")
 
     def execute_load(self, node):
         """Execute LOAD command"""
+        self.variables[node.target] = self.load(node.format, node.file_path)
+
+    def load(self, file_format: str, file_path: str) -> Any:
+        """Read a file of the given format into a VM value"""
         try:
-            format_type = FileFormat[node.format.upper()]
+            format_type = FileFormat[file_format.upper()]
+            if format_type in (FileFormat.BAM, FileFormat.CRAM, FileFormat.SAM):
+                # Alignment files stay open so indexed region queries remain possible
+                return self.file_handler.load_file(file_path, format_type.value)
+            if format_type == FileFormat.VCF:
+                return self._load_vcf(file_path)
             parser = self.file_registry.get_parser(format_type)
+            if format_type == FileFormat.BED:
+                # Intervals stay columnar so OVERLAP can index them without conversion
+                return parser.read(file_path)
             
             # Validate file
-            if not parser.validate(node.file_path):
-                raise ValueError(f"Invalid {format_type.value} file: {node.file_path}")
+            if not parser.validate(file_path):
+                raise ValueError(f"Invalid {format_type.value} file: {file_path}")
             
             # Parse file
-            data = list(parser.parse(node.file_path))
-            self.variables[node.target] = data
+            return list(parser.parse(file_path))
             
         except KeyError:
-            raise ValueError(f"Unsupported file format: {node.format}")
+            raise ValueError(f"Unsupported file format: {file_format}")
         except Exception as e:
             raise RuntimeError(f"Error loading file: {str(e)}")
 
     def _execute_analyze(self, node: AnalyzeNode):
-        data = self.variables[node.target]
-        if node.operation == "QUALITY":
-            metrics = self.file_handler.analyze_quality_metrics(data)
-            self.variables[node.output] = metrics
+        self.variables[node.output] = self.analyze(node.target, node.operation, node.parameters)
+
+    def analyze(self, target: str, operation: str, parameters: List[str]) -> Any:
+        """Run an ANALYZE operation on a variable or file path and return its result"""
+        data, source = self._resolve_input(target)
+        args, options = self._split_parameters(parameters)
+
+        if operation == "QUALITY":
+            return self.file_handler.analyze_quality_metrics(data)
+        elif operation == "KMER":
+            counter = KmerCounter(
+                k=int(options.get('k', 21)),
+                canonical=options.get('canonical', 'true').lower() != 'false',
+                workers=int(options['workers']) if 'workers' in options else None
+            )
+            return counter.count(data)
+        elif operation == "COUNT_GC":
+            if 'window' not in options:
+                return gc_fraction(data)
+            window = int(options['window'])
+            profile = gc_profile(data, window=window, step=int(options.get('step', window)))
+            if options.get('format', 'bedgraph').lower() == 'array':
+                return profile.to_array()
+            else:
+                return profile
+        elif operation == "COVERAGE":
+            calculator = CoverageCalculator(
+                window=int(options.get('window', 1000)),
+                min_mapq=int(options.get('min_mapq', 0)),
+                workers=int(options['workers']) if 'workers' in options else None
+            )
+            if options.get('mode', 'window').lower() == 'per_base':
+                return DepthTrack(calculator, data)
+            else:
+                return calculator.profile(data)
+        elif operation == "FIND_MOTIF":
+            motifs = {pattern: pattern for pattern in args}
+            if 'motifs' in options:
+                motifs.update(load_motifs(options['motifs']))
+            finder = MotifFinder(
+                motifs,
+                both_strands=options.get('strand', 'both').lower() == 'both',
+                workers=int(options['workers']) if 'workers' in options else None
+            )
+            return finder.find(data)
+        elif operation == "OVERLAP":
+            if not args:
+                raise ValueError("OVERLAP requires an interval variable, e.g. OVERLAP annotations")
+            if args[0] not in self.variables:
+                raise RuntimeError(f"Undefined variable: {args[0]}")
+            index = self.variables[args[0]]
+            if not isinstance(index, IntervalIndex):
+                index = IntervalIndex(index)
+            hits = index.overlap(data)
+            if options.get('mode', 'pairs').lower() == 'count':
+                return hits.counts()
+            else:
+                return hits
+        elif operation == "APPROX":
+            profiler = ApproxProfiler(
+                error=float(options.get('error', 0.01)),
+                k=int(options.get('k', 21)),
+                sketches=[name.lower() for name in args] or None,
+                sample=float(options['sample']) if 'sample' in options else None,
+                workers=int(options['workers']) if 'workers' in options else None,
+                seed=int(options['seed']) if 'seed' in options else None
+            )
+            return profiler.profile(data)
+        elif operation == "SIMILARITY":
+            if isinstance(data, dict) and not args:
+                samples, sources = list(data.items()), None
+            else:
+                inputs = [(data, source)] + [self._resolve_input(name) for name in args]
+                samples = [(name, value) for name, (value, _) in zip([target] + args, inputs)]
+                sources = [source for _, source in inputs]
+            hasher = MinHasher(
+                k=int(options.get('k', 21)),
+                size=int(options.get('size', 1000)),
+                seed=int(options.get('seed', 42)),
+                workers=int(options['workers']) if 'workers' in options else None,
+                cache=options.get('cache', 'true').lower() != 'false'
+            )
+            return hasher.compare(
+                samples, metric=options.get('metric', 'jaccard').lower(), sources=sources)
+        elif operation == "SCREEN":
+            references = [name for name in args if name.upper() != 'AGAINST']
+            if not references:
+                raise ValueError("SCREEN requires a reference, e.g. SCREEN AGAINST genome")
+            reference, reference_source = self._resolve_input(references[0])
+            # The filter is mapped from beside the reference file when one was built before
+            index_path = options.get('index') or (reference_source + '.bloom' if reference_source else None)
+            workers = int(options['workers']) if 'workers' in options else None
+            bloom = open_or_build(reference, index_path, reference_source, k=int(options.get('k', 31)),
+                                  fpr=float(options.get('fpr', 0.001)), workers=workers)
+            screener = ReadScreener(bloom, threshold=float(options.get('threshold', 0.5)), workers=workers)
+            return screener.screen(data)
+        else:
+            raise ValueError(f"Unsupported analysis operation: {operation}")
+
+    def _execute_align(self, node: AlignNode):
+        self.variables[node.output] = self.align(node.reads, node.reference, node.parameters)
+
+    def align(self, reads: str, reference_name: str, parameters: List[str]) -> Any:
+        """Align reads to a reference, reusing or persisting a minimizer index"""
+        if reads not in self.variables:
+            raise RuntimeError(f"Undefined variable: {reads}")
+        _, options = self._split_parameters(parameters)
+        index_path = options.get('index')
+        if reference_name in self.variables:
+            reference, reference_source = self._resolve_input(reference_name)
+        elif index_path and os.path.exists(index_path):
+            reference, reference_source = None, None  # The saved index alone is aligned against
+        else:
+            raise RuntimeError(f"Undefined variable: {reference_name}")
+        # A saved index is rebuilt when its k/w or the reference file changed
+        index = open_or_build_index(reference, index_path, reference_source,
+                                    k=int(options['k']) if 'k' in options else None,
+                                    w=int(options['w']) if 'w' in options else None)
+        aligner = Aligner(
+            index,
+            band=int(options.get('band', 32)),
+            min_score=int(options.get('min_score', 30)),
+            workers=int(options['workers']) if 'workers' in options else None
+        )
+        return aligner.align(self.variables[reads])
+
+    def _split_parameters(self, parameters: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Separate positional parameters from key=value options"""
+        args, options = [], {}
+        for parameter in parameters:
+            if '=' in parameter:
+                key, value = parameter.split('=', 1)
+                options[key.lower()] = value
+            else:
+                args.append(parameter)
+        return args, options
+
+    def _execute_filter(self, node: FilterNode):
+        self.variables[node.output] = self.filter(node.target, node.condition, node.parameters)
+
+    def filter(self, target: str, condition: str, parameters: List[str]) -> Any:
+        """Derive a lazily filtered record stream from a variable or file"""
+        data, _ = self._resolve_input(target)
+        _, options = self._split_parameters(parameters)
+        if condition == "DEDUP":
+            sort_order = options.get('sorted', 'auto').lower()
+            marker = DuplicateMarker(
+                window=int(options.get('window', 1000)),
+                remove=options.get('mode', 'remove').lower() != 'mark',
+                assume_sorted=None if sort_order == 'auto' else sort_order != 'false',
+                workers=int(options['workers']) if 'workers' in options else None
+            )
+            if isinstance(data, FileRecords):
+                data = data.file_path
+            return marker.mark(data)
+        raise ValueError(f"Unsupported filter condition: {condition}")
+
+    def _execute_sort(self, node: SortNode):
+        self.variables[node.output] = self.sort(node.target, node.key, node.parameters)
+
+    def sort(self, target: str, key: str, parameters: List[str]) -> Any:
+        """Sort a variable or file with spilled runs, leaving a lazily merged stream"""
+        data, _ = self._resolve_input(target)
+        _, options = self._split_parameters(parameters)
+        if isinstance(data, FileRecords) and data.kind == 'alignment':
+            data = pysam.AlignmentFile(data.file_path, check_sq=False)
+        sorter = ExternalSorter(
+            key=key.lower(),
+            memory_limit=int(options.get('memory_mb', 512)) * 1024 ** 2,
+            workers=int(options['workers']) if 'workers' in options else None
+        )
+        return sorter.sort(data)
+
+    def _merge_inputs(self, name: str) -> List[str]:
+        """VCF paths named by a variable, a glob pattern or a file listing one path per line"""
+        if name in self.variables:
+            value = self.variables[name]
+            if isinstance(value, MergedVariants):
+                return value.paths
+            if isinstance(value, pysam.VariantFile):
+                return [value.filename.decode() if isinstance(value.filename, bytes) else value.filename]
+            if isinstance(value, (list, tuple)):
+                return [str(path) for path in value]
+            raise ValueError(f"Cannot MERGE {name}: expected VCF files")
+        if glob.has_magic(name):
+            return sorted(glob.glob(name))
+        if name.endswith(('.txt', '.list')) and os.path.exists(name):
+            with open(name) as listing:
+                return [line.strip() for line in listing if line.strip()]
+        if os.path.exists(name):
+            return [name]
+        raise RuntimeError(f"Undefined variable: {name}")
+
+    def _execute_merge(self, node: MergeNode):
+        self.variables[node.output] = self.merge(node.inputs, node.options)
+
+    def merge(self, inputs: List[str], options: Dict[str, str]) -> MergedVariants:
+        """k-way merge many sorted VCFs into one lazily streamed cohort"""
+        paths = [path for name in inputs for path in self._merge_inputs(name)]
+        merger = VCFMerger(
+            max_open=int(options['max_open']) if 'max_open' in options else None,
+            workers=int(options['workers']) if 'workers' in options else None
+        )
+        return merger.merge(paths)
+
+    def _execute_export(self, node: ExportNode):
+        """Stream a variable's records to a file, building indexes while writing"""
+        if node.source not in self.variables:
+            raise RuntimeError(f"Undefined variable: {node.source}")
+        export_records(self.variables[node.source], node.file_path, node.format)
 
     def _load_fasta(self, file_path: str):
-        return list(SeqIO.parse(file_path, "fasta"))
+        with open_input(file_path, 'r') as handle:
+            return list(SeqIO.parse(handle, "fasta"))
 
     def _load_vcf(self, file_path: str):
         return pysam.VariantFile(file_path)
@@ -1,51 +1,112 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import multiprocessing as mp
 from ..compiler.bytecode import Instruction, OpCode
 from ..genomics.file_handler import GenomicFileHandler
+from ..genomics.writers import export_records
 from ..zkp.genomic_proof import GenomicZKP
 from ..blockchain.eth_connector import EthereumConnector
-from ..ai.variant_predictor import VariantPredictor
+from ..ai.variant_predictor import DEFAULT_PREDICT_BATCH
+from ..ai.model_registry import shared_predictor
+from ..ai.serving import InferenceClient
+from ..genomics.packed_sequence import PackedSequence
+from .genome_vm import GenomeVM
+from ..config import settings
 
 class OptimizedGenomeVM:
-    def __init__(self, num_workers: int = None, eth_node: str = None):
+    def __init__(self, num_workers: int = None, eth_node: str = None, model_server: str = None):
         self.variables: Dict[str, Any] = {}
         self.file_handler = GenomicFileHandler()
         self.num_workers = num_workers or mp.cpu_count()
         self.pool = mp.Pool(self.num_workers)
         self.zkp = GenomicZKP()
         self.eth_connector = EthereumConnector(eth_node) if eth_node else None
-        self.variant_predictor = VariantPredictor()
+        model_server = model_server or settings.MODEL_SERVER
+        # A shared model server batches this VM's predictions with other processes'
+        self.variant_predictor = InferenceClient(model_server) if model_server else shared_predictor()
+        # Record operations run through GenomeVM's implementations on this VM's variables
+        self.genome_vm = GenomeVM()
+        self.genome_vm.variables = self.variables
+        self.operand: Any = None  # Variable named by the last LOAD_VAR
+        self.result: Any = None  # Value of the last operation, kept by the next STORE
+        self.source: Optional[str] = None  # File the pending result was LOADed from
 
     def execute_bytecode(self, instructions: List[Instruction]):
         for instruction in instructions:
             self._execute_instruction(instruction)
 
     def _execute_instruction(self, instruction: Instruction):
-        if instruction.opcode == OpCode.LOAD_FILE:
+        if instruction.opcode == OpCode.LOAD_VAR:
+            self.operand = instruction.args[0]
+        elif instruction.opcode == OpCode.STORE:
+            name = instruction.args[0]
+            self.variables[name] = self.result
+            if self.source is not None:
+                # Remember the file behind the value so file-backed caches can live beside it
+                self.genome_vm.sources[name] = (self.source, self.result)
+            self.result, self.source = None, None
+        elif instruction.opcode == OpCode.LOAD:
+            file_format, file_path = instruction.args
+            self.result = self.genome_vm.load(file_format, file_path)
+            self.source = file_path
+        elif instruction.opcode == OpCode.LOAD_FILE:
             file_type, file_path = instruction.args
             self._parallel_load(file_type, file_path)
         elif instruction.opcode == OpCode.ANALYZE:
             operation, params = instruction.args
-            self._parallel_analyze(operation, params)
+            self.result = self.genome_vm.analyze(self.operand, operation, params)
         elif instruction.opcode == OpCode.GENERATE_PROOF:
             sequence, query = instruction.args
             proof = self.zkp.generate_proof(sequence, query, None)
             if self.eth_connector:
-                tx_hash = self.eth_connector.submit_proof(proof)
-                return tx_hash
+                proof = self.eth_connector.submit_proof(proof)  # The transaction hash
+            self.result = proof
             return proof
         elif instruction.opcode == OpCode.VERIFY_PROOF:
             proof_id = instruction.args[0]
             if self.eth_connector:
-                return self.eth_connector.verify_on_chain(proof_id)
-            return self.zkp.verify_proof(proof_id)
+                self.result = self.eth_connector.verify_on_chain(proof_id)
+            else:
+                self.result = self.zkp.verify_proof(proof_id)
+            return self.result
         elif instruction.opcode == OpCode.PREDICT_IMPACT:
-            sequence = instruction.args[0]
-            return self.variant_predictor.predict_impact(sequence)
+            sequences = instruction.args[0]
+            if isinstance(sequences, (str, PackedSequence)):
+                self.result = self.variant_predictor.predict_impact(sequences)
+            else:
+                # Many variants are encoded and predicted in chunks instead of one model call each
+                batch_size = int(instruction.args[1]) if len(instruction.args) > 1 else DEFAULT_PREDICT_BATCH
+                self.result = self.variant_predictor.predict_impact_batch(sequences, batch_size)
+            return self.result
         elif instruction.opcode == OpCode.TRAIN_MODEL:
             sequences, labels = instruction.args
+            if isinstance(self.variant_predictor, InferenceClient):
+                raise RuntimeError(f"TRAIN_MODEL is not available through the model server at "
+                                   f"{self.variant_predictor.address}; train without MODEL_SERVER")
+            if self.variant_predictor.frozen:
+                # The shared predictor also serves consensus; this VM trains and predicts with its own copy
+                self.variant_predictor = self.variant_predictor.clone()
             self.variant_predictor.train(sequences, labels)
-        # Add more opcodes...
+        elif instruction.opcode == OpCode.EXPORT:
+            source, file_path, file_format = instruction.args
+            self._export(source, file_path, file_format)
+        elif instruction.opcode == OpCode.ALIGN:
+            reads, reference, params = instruction.args
+            self.result = self.genome_vm.align(reads, reference, params)
+        elif instruction.opcode == OpCode.FILTER:
+            condition, params = instruction.args
+            self.result = self.genome_vm.filter(self.operand, condition, params)
+        elif instruction.opcode == OpCode.SORT:
+            key, params = instruction.args
+            self.result = self.genome_vm.sort(self.operand, key, params)
+        elif instruction.opcode == OpCode.MERGE:
+            inputs, options = instruction.args
+            self.result = self.genome_vm.merge(inputs, options)
+        else:
+            raise ValueError(f"Unsupported opcode: {instruction.opcode}")
+
+    def _export(self, source: str, file_path: str, file_format: str = None):
+        # Records are streamed; BGZF blocks are compressed on writer threads
+        export_records(self.variables[source], file_path, file_format, threads=self.num_workers)
 
     def _parallel_load(self, file_type: str, file_path: str):
         # Implement chunked loading for large files
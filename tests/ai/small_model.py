@@ -0,0 +1,20 @@
+from tensorflow import keras
+from src.ai.variant_predictor import VariantPredictor
+
+class SmallPredictor(VariantPredictor):
+    """
+    VariantPredictor over a few-thousand-parameter model with the same input,
+    attention layer and output, for tests that run real Keras and TFLite.
+    Module-level so spawned training workers can unpickle it.
+    """
+    def _create_model(self) -> keras.Model:
+        keras.utils.set_random_seed(0)
+        inputs = keras.Input(shape=(self.sequence_length, 4))
+        x = keras.layers.Conv1D(16, 3, activation='relu')(inputs)
+        x = keras.layers.MaxPooling1D(4)(x)
+        x = keras.layers.MultiHeadAttention(num_heads=2, key_dim=8, name='attention')(x, x)
+        x = keras.layers.GlobalAveragePooling1D()(x)
+        outputs = keras.layers.Dense(4, activation='softmax')(x)
+        model = keras.Model(inputs, outputs)
+        model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        return model
@@ -0,0 +1,65 @@
+import json
+import numpy as np
+import pytest
+from src.ai.benchmark import compare_to_baseline, regressions, run_benchmarks, synthetic_sequences
+
+class EncodingPredictor:
+    """NumPy stand-in with the predictor's encode and predict API"""
+    def __init__(self, model_path=None):
+        self.model_path = model_path
+        self.prediction_cache = "enabled"
+        self.calls = []
+
+    def preprocess_sequence(self, sequence):
+        return np.frombuffer(sequence.encode(), dtype=np.uint8)
+
+    def predict_impact(self, sequence):
+        return self.predict_impact_batch([sequence])[0]
+
+    def predict_impact_batch(self, sequences, batch_size=256):
+        self.calls.append(len(sequences))
+        return [sequence.count('G') for sequence in sequences]
+
+def test_synthetic_sequences_are_reproducible():
+    """Test seeded generation of fixed-length sequences with some N bases"""
+    sequences = synthetic_sequences(20, 500, seed=3)
+
+    assert sequences == synthetic_sequences(20, 500, seed=3) != synthetic_sequences(20, 500, seed=4)
+    assert all(len(sequence) == 500 and set(sequence) <= set("ACGTN") for sequence in sequences)
+    assert 0 < sum(sequence.count('N') for sequence in sequences) < 500
+
+def test_run_benchmarks_reports_every_metric():
+    """Test the JSON report of a fake predictor, with its cache disabled and every batch size timed"""
+    created = []
+    def factory(model_path=None):
+        created.append(EncodingPredictor(model_path))
+        return created[-1]
+
+    results = run_benchmarks(factory, sequences=50, single_calls=5, batch_sizes=[8, 64], repeats=2)
+
+    assert set(results['metrics']) == {'model_construction', 'encode_throughput', 'predict_latency_p50',
+                                       'predict_latency_p99', 'batch_throughput_8', 'batch_throughput_64'}
+    assert created[0].prediction_cache is None and created[0].calls == [1] * 6 + [8] * 3 + [64] * 3
+    assert all(metric['value'] > 0 for metric in results['metrics'].values())
+    assert json.loads(json.dumps(results)) == results
+
+def test_run_benchmarks_on_the_keras_model():
+    """Test the default factory: the real model builds, saves, reloads and predicts"""
+    results = run_benchmarks(sequences=4, single_calls=1, batch_sizes=[4], repeats=1)
+
+    assert {'model_construction', 'model_load', 'batch_throughput_4'} <= set(results['metrics'])
+
+def test_compare_to_baseline():
+    """Test regression detection in both metric directions against a tolerance"""
+    metric = lambda value, higher: {'value': value, 'unit': '', 'higher_is_better': higher}
+    baseline = {'metrics': {'throughput': metric(100.0, True), 'latency': metric(0.010, False),
+                            'load': metric(2.0, False)}}
+    results = {'metrics': {'throughput': metric(70.0, True), 'latency': metric(0.011, False),
+                           'load': metric(1.0, False), 'batch_throughput_512': metric(5.0, True)}}
+
+    comparison = compare_to_baseline(results, baseline, tolerance=0.2)
+
+    assert {name: entry['status'] for name, entry in comparison.items()} == {
+        'throughput': 'regression', 'latency': 'ok', 'load': 'improvement', 'batch_throughput_512': 'new'}
+    assert regressions(comparison) == ['throughput']
+    assert comparison['latency']['change'] == pytest.approx(-0.1)
@@ -0,0 +1,108 @@
+import random
+import numpy as np
+import pytest
+from src.ai import data_preprocessor
+from src.ai.data_preprocessor import GenomicDataPreprocessor, read_variants
+from src.ai.encoding import one_hot_encode
+from src.ai.shards import ShardDataset
+
+LENGTH = 11
+
+def _naive_context(genome: str, pos: int, ref: str, alt: str) -> str:
+    """Centred context with ALT applied, built base by base"""
+    p0 = pos - 1
+    base = lambda i: genome[i] if 0 <= i < len(genome) else 'N'
+    left = ''.join(base(i) for i in range(p0 - LENGTH // 2, p0))
+    right = ''.join(base(i) for i in range(p0 + len(ref), p0 + len(ref) + LENGTH))
+    return (left + alt + right)[:LENGTH]
+
+@pytest.fixture
+def inputs(tmp_path):
+    rng = random.Random(5)
+    genomes = {chrom: ''.join(rng.choice("ACGT") for _ in range(60)) for chrom in ("chr1", "chr2")}
+    fasta = tmp_path / "ref.fa"
+    fasta.write_text(''.join(f">{chrom}\n{sequence}\n" for chrom, sequence in genomes.items()))
+    variants = [("chr2", 30, "G", "T", "Pathogenic"), ("chr1", 1, "A", "C", "Benign"),
+                ("chr1", 10, "ACG", "A", "Likely_benign"), ("chr2", 58, "T", "TTTTTTTTTT", "Uncertain_significance"),
+                ("chr1", 60, "A", "G", None), ("chr2", 3, "C", "GA,T", "Likely_pathogenic")]
+    lines = ["##fileformat=VCFv4.2", "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO"]
+    expected = []
+    for chrom, pos, ref, alt, significance in variants:
+        # Reference bases are taken from the genome so REF always matches
+        ref = genomes[chrom][pos - 1:pos - 1 + len(ref)]
+        info = f"DP=3;CLNSIG={significance}" if significance else "DP=3"
+        lines.append(f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t.\tPASS\t{info}")
+        expected.append(_naive_context(genomes[chrom], pos, ref, alt.split(',')[0]))
+    vcf = tmp_path / "variants.vcf"
+    vcf.write_text('\n'.join(lines) + '\n')
+    return str(vcf), str(fasta), expected
+
+def test_contexts_match_naive_extraction(inputs, tmp_path):
+    """Test per-chromosome vectorized contexts for SNVs and indels, N-padded at contig ends"""
+    vcf, fasta, expected = inputs
+    preprocessor = GenomicDataPreprocessor(LENGTH, workers=2, cache_dir=str(tmp_path / "cache"))
+
+    sequences, labels = preprocessor.prepare_training_data(vcf, fasta)
+
+    assert sequences == expected
+    assert sequences[1].startswith('N' * 5) and sequences[4].endswith('N' * 5)
+    assert labels == [0, 4, 3, 2, 2, 1]
+
+def test_encoded_contexts_are_cached(inputs, tmp_path, monkeypatch):
+    """Test that a repeat run with unchanged inputs loads the cache, and changed inputs rebuild it"""
+    vcf, fasta, expected = inputs
+    preprocessor = GenomicDataPreprocessor(LENGTH, workers=1, cache_dir=str(tmp_path / "cache"))
+    contexts, _ = preprocessor.prepare_encoded(vcf, fasta)
+
+    def fail(task):
+        raise AssertionError("contexts were re-extracted")
+    monkeypatch.setattr(data_preprocessor, "_chromosome_contexts", fail)
+    cached, labels = preprocessor.prepare_encoded(vcf, fasta)
+    assert isinstance(cached, np.memmap) and np.array_equal(cached, contexts)
+    assert labels.tolist() == [0, 4, 3, 2, 2, 1]
+
+    with open(vcf, 'a') as handle:
+        handle.write("chr1\t5\t.\tA\tC\t.\tPASS\tCLNSIG=Benign\n")
+    with pytest.raises(AssertionError, match="re-extracted"):
+        preprocessor.prepare_encoded(vcf, fasta)
+
+def test_read_variants_and_unknown_contig(inputs, tmp_path):
+    """Test CLNSIG extraction from INFO and the error for contigs missing from the reference"""
+    vcf, fasta, _ = inputs
+    variants = read_variants(vcf)
+    assert variants['CLNSIG'].tolist()[:2] == ["Pathogenic", "Benign"]
+    assert variants['ALT'].iloc[5] == "GA"
+
+    with open(vcf, 'a') as handle:
+        handle.write("chrX\t5\t.\tA\tC\t.\tPASS\tCLNSIG=Benign\n")
+    with pytest.raises(ValueError, match="chrX"):
+        GenomicDataPreprocessor(LENGTH, workers=1, cache=False).prepare_encoded(vcf, fasta)
+
+@pytest.mark.parametrize("pos", [0, 61])
+def test_positions_outside_contig(inputs, pos):
+    """Test that POS must lie within its contig"""
+    vcf, fasta, _ = inputs
+    with open(vcf, 'a') as handle:
+        handle.write(f"chr1\t{pos}\t.\tA\tC\t.\tPASS\tCLNSIG=Benign\n")
+    with pytest.raises(ValueError, match=f"chr1:{pos} lies outside"):
+        GenomicDataPreprocessor(LENGTH, workers=1, cache=False).prepare_encoded(vcf, fasta)
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_training_shards_from_memory_mapped_contexts(inputs, tmp_path, cache):
+    """Test that shards are written from contexts extracted into a file, with and without the cache"""
+    vcf, fasta, expected = inputs
+    preprocessor = GenomicDataPreprocessor(LENGTH, workers=1, cache_dir=str(tmp_path / "cache"), cache=cache)
+    if cache:
+        assert isinstance(preprocessor.prepare_encoded(vcf, fasta)[0], np.memmap)
+
+    manifest = preprocessor.write_training_shards(vcf, fasta, str(tmp_path / "shards"), encoding='onehot',
+                                                  shard_size=4)
+
+    x, _, y = ShardDataset(str(tmp_path / "shards")).shard(0)
+    assert manifest.count == 6 and y.tolist() == [0, 4, 3, 2]
+    assert np.array_equal(x, one_hot_encode(expected[:4], LENGTH, np.uint8))
+    if cache:
+        assert [path.name for path in (tmp_path / "cache").iterdir() if path.is_dir()] == \
+            [preprocessor._cache_key(vcf, fasta)]
+    else:
+        assert not (tmp_path / "cache").exists()
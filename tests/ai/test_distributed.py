@@ -0,0 +1,87 @@
+import json
+import pytest
+from src.ai import distributed
+from src.ai.distributed import (DistributedTrainer, TrainingReport, WorkerStats, assign_shards,
+                                scaled_learning_rate, tf_config)
+from src.ai.benchmark import synthetic_sequences
+from src.ai.prediction_cache import model_fingerprint
+from src.ai.shards import ShardManifest, write_shards
+from small_model import SmallPredictor
+
+def test_assign_shards_balances_disjoint_subsets():
+    """Test that every shard goes to exactly one worker with balanced variant counts"""
+    manifest = ShardManifest(8, 'packed', [{'stem': f"shard-{i}", 'count': count}
+                                           for i, count in enumerate([100, 100, 100, 100, 100, 20])])
+    assignment = assign_shards(manifest, 3)
+
+    assert sorted(i for shards in assignment for i in shards) == list(range(6))
+    assert sorted(sum(manifest.shards[i]['count'] for i in shards) for shards in assignment) == [120, 200, 200]
+    with pytest.raises(ValueError, match="at least as many shards"):
+        assign_shards(manifest, 7)
+
+def test_plan_and_learning_rate_scaling(tmp_path):
+    """Test equal steps per worker, linear learning-rate scaling and the cluster spec"""
+    write_shards(["ACGT"] * 50, [0] * 50, str(tmp_path), 4, shard_size=10)
+    assignment, steps = DistributedTrainer(workers=2, batch_size=8).plan(str(tmp_path))
+
+    assert [len(shards) for shards in assignment] == [3, 2] and steps == 2
+    assert scaled_learning_rate(256) == pytest.approx(0.008)
+    with pytest.raises(ValueError, match="at least one batch"):
+        DistributedTrainer(workers=2, batch_size=32).plan(str(tmp_path))
+
+    config = json.loads(tf_config(["localhost:1", "localhost:2"], 1))
+    assert config == {'cluster': {'worker': ["localhost:1", "localhost:2"]}, 'task': {'type': 'worker', 'index': 1}}
+
+def test_report_summary():
+    """Test per-worker and aggregate throughput reporting"""
+    report = TrainingReport("weights.h5", 64, 0.002, [WorkerStats(0, [0, 2], [900.0, 1000.0], [0.9, 0.5]),
+                                                      WorkerStats(1, [1], [950.0], [0.6])])
+
+    assert report.samples_per_second == 1950.0
+    assert report.summary().splitlines() == ["worker\tshards\tsamples/sec\tloss", "0\t2\t1000.0\t0.5000",
+                                             "1\t1\t950.0\t0.6000", "total\t\t1950.0"]
+
+def test_workers_start_from_initial_weights(tmp_path, monkeypatch):
+    """Test that the caller's starting weights are handed to every worker"""
+    write_shards(["ACGT"] * 40, [0] * 40, str(tmp_path), 4, shard_size=10)
+    tasks = []
+
+    class InlineExecutor:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, fn, items):
+            return [fn(item) for item in items]
+
+    monkeypatch.setattr(distributed, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(distributed, "_train_worker",
+                        lambda task: tasks.append(task) or WorkerStats(task['worker'], task['shards']))
+
+    report = DistributedTrainer(workers=2, batch_size=8).train(str(tmp_path), str(tmp_path / "out.h5"), 1,
+                                                              initial_weights="start.weights.h5")
+
+    assert [task['initial_weights'] for task in tasks] == ["start.weights.h5"] * 2
+    assert all(task['predictor_factory'] is distributed._default_predictor for task in tasks)
+    assert all(task['global_batch_size'] == 16 for task in tasks) and len(report.workers) == 2
+
+def test_two_workers_train_in_sync(tmp_path):
+    """Test a real two-process cluster: the weights change and both workers end with the same weights"""
+    write_shards(synthetic_sequences(64, seed=2), [i % 4 for i in range(64)], str(tmp_path / "shards"),
+                 shard_size=16)
+    predictor = SmallPredictor()
+    predictor.prediction_cache = None
+    before = model_fingerprint(predictor.model.get_weights())
+
+    report = predictor.train_distributed(str(tmp_path / "shards"), workers=2, threads_per_worker=1, epochs=1,
+                                         batch_size=8, weights_path=str(tmp_path / "out.weights.h5"))
+
+    after = model_fingerprint(predictor.model.get_weights())
+    assert after != before
+    assert [stats.fingerprint for stats in report.workers] == [after, after]
+    assert all(len(stats.loss) == 1 and stats.samples_per_second[0] > 0 for stats in report.workers)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from src.ai.encoding import OneHotEncoder, one_hot_encode
+from src.genomics.packed_sequence import PackedSequence
+
+def _reference_encoding(sequence, length):
+    mapping = {'A': [1, 0, 0, 0], 'T': [0, 1, 0, 0], 'G': [0, 0, 1, 0], 'C': [0, 0, 0, 1]}
+    rows = [mapping.get(base, [0, 0, 0, 0]) for base in sequence[:length]]
+    return np.array(rows + [[0, 0, 0, 0]] * (length - len(rows)), dtype=np.float32)
+
+def test_batch_matches_per_base_mapping():
+    """Test the lookup-table encoding against the dict mapping, with soft-masked bases, padding and trimming"""
+    sequences = ["ACGTNacgt", "GATTACA" * 3, "", "RYKMacgtTTT"]
+
+    batch = one_hot_encode(sequences, 12)
+
+    assert batch.shape == (4, 12, 4) and batch.dtype == np.float32
+    for row, sequence in zip(batch, sequences):
+        assert np.array_equal(row, _reference_encoding(sequence, 12))
+
+def test_packed_and_bytes_inputs():
+    """Test PackedSequence and bytes encode like their text"""
+    text = "ACGTNNNNGGCCAATT"
+
+    batch = one_hot_encode([PackedSequence.from_string(text), text.encode()], 20, dtype=np.uint8)
+
+    assert batch.dtype == np.uint8
+    assert np.array_equal(batch[0], batch[1])
+    assert np.array_equal(batch[0], _reference_encoding(text, 20))
+
+def test_reusable_buffer():
+    """Test that a reusing encoder writes into one buffer and rejects a wrong-shaped one"""
+    encoder = OneHotEncoder(sequence_length=8, dtype=np.uint8, reuse=True)
+
+    first = encoder.encode(["AAAA", "CCCC", "GGGG"])
+    second = encoder.encode(["TTTT"])
+
+    assert np.shares_memory(first, second) and second.shape == (1, 8, 4)
+    assert np.array_equal(second[0], _reference_encoding("TTTT", 8))
+    assert encoder.encode_one("A").shape == (8, 4)
+    with pytest.raises(ValueError):
+        one_hot_encode(["ACGT"], 8, out=np.zeros((1, 4, 4)))
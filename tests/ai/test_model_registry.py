@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from src.ai import model_registry
+from src.ai.model_registry import ModelRegistry, load_weights, save_weights, shared_predictor
+from src.ai.prediction_cache import model_fingerprint
+
+class WeightsModel:
+    def __init__(self, weights):
+        self.weights = weights
+
+    def get_weights(self):
+        return self.weights
+
+class WeightsPredictor:
+    """Stand-in exposing the predictor attributes the registry stores"""
+    def __init__(self, scale=1.0):
+        self.sequence_length = 1000
+        self.model = WeightsModel([np.arange(12, dtype=np.float32).reshape(3, 4) * scale,
+                                   np.array([scale], dtype=np.float64), np.zeros((0, 5), dtype=np.float32)])
+
+def test_weights_round_trip_memory_mapped(tmp_path):
+    """Test that saved weights map back with their dtypes, shapes and aligned offsets"""
+    weights = WeightsPredictor(2.5).model.get_weights()
+    save_weights(weights, str(tmp_path))
+
+    loaded = load_weights(str(tmp_path))
+
+    assert all(np.array_equal(a, b) and a.dtype == b.dtype for a, b in zip(weights, loaded))
+    assert isinstance(loaded[0].base, np.memmap) and not loaded[0].flags.writeable
+    assert all(array.ctypes.data % 64 == 0 for array in loaded[:2])
+    assert model_fingerprint(loaded) == model_fingerprint(weights)
+
+def test_register_versions_and_promote(tmp_path):
+    """Test versioned registration, deduplication by fingerprint and LATEST promotion"""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    first = registry.register(WeightsPredictor(1.0), metrics={'val_accuracy': 0.8})
+    second = registry.register(WeightsPredictor(2.0))
+
+    assert [entry.version for entry in registry.versions()] == ["v0001", "v0002"]
+    assert registry.latest() == second and registry.get("v0001") == first
+    assert first.metrics == {'val_accuracy': 0.8} and first.fingerprint != second.fingerprint
+
+    assert registry.register(WeightsPredictor(1.0)) == first
+    assert registry.latest() == first and len(registry.versions()) == 2
+    assert np.array_equal(load_weights(second.path)[1], [2.0])
+    with pytest.raises(ValueError, match="Unknown model version"):
+        registry.promote("v0009")
+    with pytest.raises(ValueError, match="Formats must include"):
+        registry.register(WeightsPredictor(3.0), formats=('savedmodel',))
+
+def test_shared_predictor_loads_once_per_process(tmp_path, monkeypatch):
+    """Test the lazily loaded, frozen per-process predictor"""
+    root = str(tmp_path / "registry")
+    ModelRegistry(root).register(WeightsPredictor())
+    loads = []
+    monkeypatch.setattr(ModelRegistry, "load",
+                        lambda self, version=None: loads.append(version) or SimpleNamespace(frozen=False))
+    monkeypatch.setattr(model_registry, "_SHARED", {})
+
+    predictor = shared_predictor(root=root)
+
+    assert shared_predictor(root=root) is predictor and loads == ["v0001"] and predictor.frozen
+    assert shared_predictor("v0001", root=root) is predictor and loads == ["v0001"]
+    ModelRegistry(root).register(WeightsPredictor(2.0))
+    assert shared_predictor("v0001", root=root) is predictor
+    assert shared_predictor(root=root) is not predictor and loads == ["v0001", "v0002"]
@@ -0,0 +1,70 @@
+import numpy as np
+from src.ai.prediction_cache import PredictionCache, model_fingerprint
+
+def test_keys_follow_the_encoding():
+    """Test that sequences with the same one-hot encoding share a key and others do not"""
+    cache = PredictionCache(sequence_length=8)
+    keys = cache.keys(["ACGT", "ACGTNNNN", "ACGTR", "ACGTACGTAAAA", "ACGTACGT", "ACGA", "acgt", "NNNNryac"])
+
+    assert keys[0] == keys[1] == keys[2]
+    assert keys[3] == keys[4]
+    assert keys[6] == keys[7] != keys[0]
+    assert len({keys[0], keys[3], keys[5]}) == 3
+
+def test_memory_and_disk_tiers(tmp_path):
+    """Test LRU eviction, SQLite persistence across instances and hit-rate metrics"""
+    path = str(tmp_path / "cache" / "predictions.sqlite")
+    cache = PredictionCache(path, capacity=2, sequence_length=4)
+    keys = cache.keys(["AAAA", "CCCC", "GGGG"])
+    cache.put_many("model-a", keys, [[0.1, 0.9, ["Region_1"], "Benign"], [0.5], [0.9]])
+
+    assert cache.get_many("model-a", keys) == [[0.1, 0.9, ["Region_1"], "Benign"], [0.5], [0.9]]
+    assert cache.metrics()['memory_hits'] == 2 and cache.metrics()['disk_hits'] == 1
+
+    reopened = PredictionCache(path, capacity=2, sequence_length=4)
+    assert reopened.get_many("model-a", keys + cache.keys(["TTTT"])) == [[0.1, 0.9, ["Region_1"], "Benign"],
+                                                                         [0.5], [0.9], None]
+    metrics = reopened.metrics()
+    assert (metrics['disk_hits'], metrics['misses'], metrics['memory_entries']) == (3, 1, 2)
+    assert metrics['hit_rate'] == 0.75
+
+def test_model_fingerprint_scopes_entries(tmp_path):
+    """Test that changed weights miss the cache and purge keeps only the current model"""
+    weights = [np.ones((3, 2), dtype=np.float32), np.zeros(2, dtype=np.float32)]
+    before = model_fingerprint(weights)
+    weights[1][0] = 1e-6
+    after = model_fingerprint(weights)
+    assert before != after and model_fingerprint(weights) == after
+
+    cache = PredictionCache(str(tmp_path / "predictions.sqlite"), sequence_length=4)
+    keys = cache.keys(["ACGT"])
+    cache.put_many(before, keys, [[0.2]])
+    assert cache.get_many(after, keys) == [None]
+
+    cache.put_many(after, keys, [[0.7]])
+    assert cache.purge(keep=after) == 1
+    assert cache.get_many(before, keys) == [None] and cache.get_many(after, keys) == [[0.7]]
+
+def test_weight_changes_invalidate_prediction_cache(tmp_path, stub_predictor):
+    """Test that set_weights and load_weights give a new fingerprint, so cached predictions are not reused"""
+    predictor = stub_predictor
+    predictor.prediction_cache = PredictionCache(str(tmp_path / "predictions.sqlite"))
+    sequence = "ACGT" * 250
+    before = predictor.model_fingerprint()
+    predictor.predict_impact(sequence)
+    predictor.predict_impact(sequence)
+    assert predictor.model.calls == 1
+    predictor.model.save_weights(str(tmp_path / "original.weights"))
+
+    predictor.set_weights([weights * 2 for weights in predictor.model.get_weights()])
+    assert predictor.model_fingerprint() != before
+    keys = predictor.prediction_cache.keys([sequence])
+    assert predictor.prediction_cache.get_many(predictor.model_fingerprint(), keys) == [None]
+    predictor.predict_impact(sequence)
+    assert predictor.model.calls == 2
+    assert predictor.prediction_cache.get_many(predictor.model_fingerprint(), keys) != [None]
+
+    predictor.load_weights(str(tmp_path / "original.weights"))
+    assert predictor.model_fingerprint() == before
+    predictor.predict_impact(sequence)
+    assert predictor.model.calls == 2
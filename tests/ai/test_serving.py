@@ -0,0 +1,88 @@
+import os
+import stat
+import threading
+from multiprocessing import AuthenticationError
+import pytest
+from src.ai.serving import InferenceClient, InferenceServer, MicroBatcher
+
+class LengthPredictor:
+    """Predicts each sequence's length, recording the batch sizes it was called with"""
+    def __init__(self):
+        self.batches = []
+
+    def predict_impact_batch(self, sequences, batch_size=256):
+        self.batches.append(len(sequences))
+        if any(sequence == "FAIL" for sequence in sequences):
+            raise ValueError("bad sequence")
+        return [len(sequence) for sequence in sequences]
+
+def test_concurrent_requests_are_coalesced():
+    """Test that requests arriving within the deadline share one model call"""
+    predictor = LengthPredictor()
+    batcher = MicroBatcher(predictor.predict_impact_batch, max_batch=100, max_latency=0.2)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.submit(["A" * i, "C" * (i + 1)]).result()
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {i: [i, i + 1] for i in range(1, 9)}
+    assert sum(predictor.batches) == 16 and len(predictor.batches) < 8
+    metrics = batcher.metrics()
+    assert metrics['requests'] == 8 and metrics['queue_depth'] == 0
+    assert 0 < metrics['p50_latency'] <= metrics['p99_latency']
+
+def test_batch_size_cap_and_errors():
+    """Test that batches stop at max_batch and prediction errors reach only their batch"""
+    predictor = LengthPredictor()
+    batcher = MicroBatcher(predictor.predict_impact_batch, max_batch=4, max_latency=0.5)
+
+    futures = [batcher.submit(["AA", "CC"]) for _ in range(4)]
+    assert [f.result() for f in futures] == [[2, 2]] * 4
+    assert predictor.batches == [4, 4]
+    with pytest.raises(ValueError, match="bad sequence"):
+        batcher.submit(["FAIL"]).result()
+    batcher.close()
+
+def test_server_round_trip(tmp_path):
+    """Test a client against a server process, including metrics and shutdown"""
+    address = str(tmp_path / "model.sock")
+    server = InferenceServer(address, predictor_factory=LengthPredictor, max_latency=0.01, authkey=b"test")
+    process = server.start()
+    client = InferenceClient(address, authkey=b"test")
+
+    assert client.predict_impact("ACGT") == 4
+    assert client.predict_impact_batch(["A", "CC", "GGG"], batch_size=2) == [1, 2, 3]
+    with pytest.raises(RuntimeError, match="bad sequence"):
+        client.predict_impact("FAIL")
+    metrics = client.metrics()
+    assert metrics['requests'] == 4 and metrics['errors'] == 1
+
+    client.shutdown()
+    process.join(timeout=10)
+    assert not process.is_alive()
+
+def test_server_generates_private_authkey(tmp_path):
+    """Test that a server without an authkey writes a random owner-only key its clients pick up"""
+    address = str(tmp_path / "model.sock")
+    with pytest.raises(ValueError, match="No authkey"):
+        InferenceClient(address)
+    server = InferenceServer(address, predictor_factory=LengthPredictor, max_latency=0.01)
+    process = server.start()
+
+    assert len(server.authkey) == 32
+    assert stat.S_IMODE(os.stat(address + ".key").st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+    client = InferenceClient(address)
+    assert client.predict_impact("ACGT") == 4
+    with pytest.raises(AuthenticationError):
+        InferenceClient(address, authkey=b"your-secret-key").predict_impact("ACGT")
+
+    client.shutdown()
+    process.join(timeout=10)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from src.ai.encoding import one_hot_encode
+from src.ai.shards import ShardDataset, ShardManifest, pack_sequences, unpack_sequences, write_shards
+
+SEQUENCES = ["ACGTNacgtRYA", "GATTACA" * 3, "", "TTTTT", "ccggaatt"]
+
+def test_packed_round_trip_matches_one_hot():
+    """Test 2-bit packing with an N mask decodes to the one-hot encoding"""
+    packed, mask = pack_sequences(SEQUENCES, 13)
+
+    assert packed.shape == (5, 4) and mask.shape == (5, 2)
+    assert np.array_equal(unpack_sequences(packed, mask, 13), one_hot_encode(SEQUENCES, 13))
+
+@pytest.mark.parametrize("encoding", ["packed", "onehot"])
+def test_shards_stream_in_order_and_shuffled(tmp_path, encoding):
+    """Test shard writing from iterators and batched decoding, in order and shuffled"""
+    manifest = write_shards(iter(SEQUENCES * 4), iter(range(20)), str(tmp_path), 13, encoding, shard_size=6)
+
+    assert [shard['count'] for shard in manifest.shards] == [6, 6, 6, 2]
+    assert ShardManifest.load(str(tmp_path)) == manifest
+    dataset = ShardDataset(str(tmp_path))
+    x, y = (np.concatenate(parts) for parts in zip(*dataset.batches(4)))
+    assert np.array_equal(x, one_hot_encode(SEQUENCES * 4, 13)) and y.tolist() == list(range(20))
+
+    shuffled = list(dataset.batches(4, shuffle=True, seed=3))
+    labels = np.concatenate([batch_y for _, batch_y in shuffled])
+    assert sorted(labels.tolist()) == list(range(20)) and labels.tolist() != list(range(20))
+    for batch_x, batch_y in shuffled:
+        assert np.array_equal(batch_x, one_hot_encode([(SEQUENCES * 4)[i] for i in batch_y], 13))
+
+def test_unknown_encoding(tmp_path):
+    """Test that unsupported shard encodings are rejected"""
+    with pytest.raises(ValueError, match="Unknown shard encoding"):
+        write_shards(["ACGT"], [0], str(tmp_path), encoding="fp16")
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from src.ai.benchmark import synthetic_sequences
+from src.ai.tflite_backend import benchmark_inference, compare_outputs, export_tflite
+from small_model import SmallPredictor
+
+def test_compare_outputs():
+    """Test parity statistics between reference and candidate probabilities"""
+    reference = np.array([[0.7, 0.1, 0.1, 0.1], [0.2, 0.5, 0.2, 0.1], [0.25, 0.25, 0.3, 0.2]])
+    candidate = reference + np.array([[0.01, 0, 0, -0.01], [0, -0.02, 0.02, 0], [0, 0.06, 0, -0.06]])
+
+    report = compare_outputs(reference, candidate, tolerance=0.05)
+
+    assert report.samples == 3 and report.max_abs_error == pytest.approx(0.06)
+    assert report.class_agreement == pytest.approx(2 / 3)
+    assert not report.passed and compare_outputs(reference, candidate, tolerance=0.1).passed
+    with pytest.raises(ValueError, match="shapes differ"):
+        compare_outputs(reference, candidate[:2])
+
+def test_benchmark_inference():
+    """Test latency and throughput reporting per batch size"""
+    calls = []
+    results = benchmark_inference(lambda batch: calls.append(len(batch)), np.zeros((40, 8, 4)),
+                                  batch_sizes=(1, 32, 64), repeats=3, warmup=1)
+
+    assert [result['batch_size'] for result in results] == [1, 32, 40]
+    assert calls == [1] * 4 + [32] * 4 + [40] * 4
+    assert all(result['p99_latency'] >= result['p50_latency'] > 0 and result['throughput'] > 0
+               for result in results)
+
+def test_export_validates_quantization(tmp_path):
+    """Test that unknown modes and uncalibrated int8 exports are rejected"""
+    with pytest.raises(ValueError, match="Unknown quantization"):
+        export_tflite(None, str(tmp_path / "model.tflite"), quantization="fp8")
+    with pytest.raises(ValueError, match="representative_data"):
+        export_tflite(None, str(tmp_path / "model.tflite"), quantization="int8")
+
+@pytest.mark.parametrize("quantization, tolerance", [("none", 1e-5), ("dynamic", 0.05), ("int8", 0.05)])
+def test_tflite_round_trip(tmp_path, quantization, tolerance):
+    """Test exporting a Keras model, predicting through TFLite and the predictor's parity check"""
+    predictor = SmallPredictor()
+    predictor.prediction_cache = None
+    sequences = synthetic_sequences(16, seed=1)
+    keras_scores = [impact.severity_score for impact in predictor.predict_impact_batch(sequences)]
+    path = str(tmp_path / f"model-{quantization}.tflite")
+
+    assert predictor.export_tflite(path, quantization, representative_sequences=sequences) == path
+    with pytest.raises(RuntimeError, match="use_backend"):
+        predictor.check_parity(sequences)
+    predictor.use_backend('tflite', path, num_threads=1)
+
+    report = predictor.check_parity(sequences, tolerance)
+    assert report.samples == 16 and report.passed
+    tflite_scores = [impact.severity_score for impact in predictor.predict_impact_batch(sequences, batch_size=5)]
+    assert tflite_scores == pytest.approx(keras_scores, abs=tolerance)
+    assert predictor.runtime.predict_on_batch(predictor.preprocess_batch(sequences[:3])).shape == (3, 4)
@@ -0,0 +1,30 @@
+import pytest
+from src.ai.variant_predictor import VariantPredictor
+
+def test_predict_impact_batch_matches_single(stub_predictor):
+    """Test batched impact prediction against one call per variant"""
+    predictor = stub_predictor
+    sequences = ["ACGT" * 250, "GATTACA" * 100, "N" * 1000]
+
+    batched = predictor.predict_impact_batch(sequences, batch_size=2)
+    assert predictor.model.batches == [2, 1]
+    single = [predictor.predict_impact(sequence) for sequence in sequences]
+
+    assert len(batched) == 3
+    for batch_impact, single_impact in zip(batched, single):
+        assert batch_impact.severity_score == pytest.approx(single_impact.severity_score, abs=1e-5)
+        assert batch_impact.confidence == pytest.approx(single_impact.confidence, abs=1e-5)
+        assert batch_impact.affected_regions == single_impact.affected_regions
+        assert batch_impact.clinical_significance == single_impact.clinical_significance
+    assert len({impact.severity_score for impact in batched}) == 3
+
+def test_keras_model_predicts_with_attention_regions():
+    """Test that the default model builds and names its regions after attention features"""
+    predictor = VariantPredictor()
+    predictor.prediction_cache = None
+
+    impact = predictor.predict_impact("ACGT" * 250)
+
+    assert 0 <= impact.severity_score <= 1
+    assert len(impact.affected_regions) == 3
+    assert all(region.startswith("Region_") and region[7:].isdigit() for region in impact.affected_regions)
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from src.zkp.genomic_proof import GenomicProof
 from src.genomics.file_handler import GenomicFileHandler
@@ -12,4 +13,50 @@ def genomic_proof():
 
 @pytest.fixture
 def file_handler():
-    return GenomicFileHandler() 
\ No newline at end of file
+    return GenomicFileHandler()
+
+class StubModel:
+    """
+    NumPy stand-in for the Keras model: softmax of the mean one-hot row
+    times a 4x4 weight, with settable and savable weights. `batches`
+    records the size of every predict call.
+    """
+    def __init__(self):
+        self.weights = [np.linspace(-2, 2, 16, dtype=np.float32).reshape(4, 4)]
+        self.batches = []
+
+    @property
+    def calls(self):
+        return len(self.batches)
+
+    def get_layer(self, name):
+        return self
+
+    def get_weights(self):
+        return self.weights
+
+    def set_weights(self, weights):
+        self.weights = [np.array(array) for array in weights]
+
+    def save_weights(self, path):
+        with open(path, 'wb') as handle:
+            np.save(handle, self.weights[0])
+
+    def load_weights(self, path):
+        with open(path, 'rb') as handle:
+            self.weights = [np.load(handle)]
+
+    def predict_on_batch(self, x):
+        self.batches.append(len(x))
+        logits = x.mean(axis=1) @ self.weights[0]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+@pytest.fixture
+def stub_predictor(monkeypatch):
+    """A VariantPredictor without a prediction cache; it and any other built during the test use StubModel"""
+    from src.ai.variant_predictor import VariantPredictor  # Imported here so other tests do not load TensorFlow
+    monkeypatch.setattr(VariantPredictor, "_create_model", lambda self: StubModel())
+    predictor = VariantPredictor()
+    predictor.prediction_cache = None
+    return predictor
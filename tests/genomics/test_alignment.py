@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from src.genomics.alignment import (
+    Aligner, MinimizerIndex, banded_smith_waterman, banded_smith_waterman_batch, minimizers, open_or_build
+)
+from src.genomics.kmer import encode_bases
+from src.genomics.packed_sequence import PackedSequence
+
+def _reverse_complement(sequence):
+    return sequence[::-1].translate(str.maketrans("ACGT", "TGCA"))
+
+def _naive_smith_waterman(query, target, match=2, mismatch=4, gap_open=4, gap_extend=2):
+    m, n = len(query), len(target)
+    H = np.zeros((m + 1, n + 1), dtype=int)
+    E = np.full((m + 1, n + 1), -10 ** 9)
+    F = np.full((m + 1, n + 1), -10 ** 9)
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            E[i, j] = max(H[i, j - 1] - gap_open - gap_extend, E[i, j - 1] - gap_extend)
+            F[i, j] = max(H[i - 1, j] - gap_open - gap_extend, F[i - 1, j] - gap_extend)
+            score = match if query[i - 1] == target[j - 1] else -mismatch
+            H[i, j] = max(0, H[i - 1, j - 1] + score, E[i, j], F[i, j])
+    return H.max()
+
+def _cigar_score(query, target, q_start, t_start, cigar, match=2, mismatch=4, gap_open=4, gap_extend=2):
+    i, j, score = q_start, t_start, 0
+    for op, length in cigar:
+        if op == 0:
+            score += sum(match if query[i + x] == target[j + x] else -mismatch for x in range(length))
+            i, j = i + length, j + length
+        else:
+            score -= gap_open + gap_extend * length
+            i, j = (i + length, j) if op == 1 else (i, j + length)
+    return score, i, j
+
+@pytest.fixture
+def genome():
+    rng = np.random.default_rng(7)
+    return [("chr1", ''.join(rng.choice(list("ACGT"), 30000))),
+            ("chr2", ''.join(rng.choice(list("ACGT"), 20000)))]
+
+def _simulate(genome, count, seed=11):
+    """Reads with substitutions, small indels and both strands; returns reads and truth"""
+    rng = np.random.default_rng(seed)
+    reads, truth = [], []
+    for r in range(count):
+        contig, sequence = genome[r % 2]
+        start = int(rng.integers(0, len(sequence) - 200))
+        bases = list(sequence[start:start + 150])
+        for position in rng.integers(10, 140, 3):
+            bases[position] = "ACGT"[("ACGT".index(bases[position]) + 1) % 4]
+        if r % 3 == 0:
+            del bases[70:72]
+        read = ''.join(bases)
+        reverse = r % 4 >= 2
+        reads.append((f"read{r}", _reverse_complement(read) if reverse else read))
+        truth.append((contig, start, reverse))
+    return reads, truth
+
+def test_minimizers_are_strand_symmetric():
+    """Test that a sequence and its reverse complement share minimizers"""
+    sequence = ''.join(np.random.default_rng(1).choice(list("ACGT"), 500))
+    forward, positions, strands = minimizers(encode_bases(sequence), 15, 10)
+    reverse, _, _ = minimizers(encode_bases(_reverse_complement(sequence)), 15, 10)
+    assert set(forward.tolist()) == set(reverse.tolist())
+    assert np.all(np.diff(positions) <= 10)
+    assert len(minimizers(encode_bases("ACGTN" * 10), 15, 10)[0]) == 0
+
+def test_banded_smith_waterman_matches_full_dp():
+    """Test banded scores and tracebacks against an unbanded reference DP"""
+    rng = np.random.default_rng(5)
+    queries, targets = [], []
+    for _ in range(20):
+        target = rng.integers(0, 4, int(rng.integers(10, 50))).astype(np.uint8)
+        query = np.concatenate((target[:len(target) // 2], rng.integers(0, 4, 2).astype(np.uint8),
+                                target[len(target) // 2 + 1:]))
+        query[rng.integers(0, len(query))] = rng.integers(0, 4)
+        queries.append(query)
+        targets.append(target)
+
+    for query, target, result in zip(queries, targets, banded_smith_waterman_batch(queries, targets, -60, 60)):
+        score, q_start, q_end, t_start, t_end, cigar = result
+        assert score == _naive_smith_waterman(query, target)
+        assert _cigar_score(query, target, q_start, t_start, cigar) == (score, q_end, t_end)
+    assert banded_smith_waterman(queries[0], targets[0], -60, 60)[0] == _naive_smith_waterman(queries[0], targets[0])
+
+def test_index_save_and_mmap_load(tmp_path, genome):
+    """Test index persistence and packed reference input"""
+    packed = [PackedSequence.from_string(sequence, name=name) for name, sequence in genome]
+    index = MinimizerIndex.build(packed, k=13, w=8)
+    path = tmp_path / "genome.gsi"
+    index.save(str(path))
+
+    loaded = MinimizerIndex.load(str(path))
+    assert isinstance(loaded.hashes, np.memmap)
+    assert (loaded.k, loaded.w, loaded.names, loaded.lengths) == (13, 8, ["chr1", "chr2"], [30000, 20000])
+    assert np.array_equal(loaded.hashes, index.hashes)
+    assert np.array_equal(loaded.positions, index.positions)
+    assert np.array_equal(loaded.reference, encode_bases(genome[0][1] + genome[1][1]))
+
+def test_open_or_build_rebuilds_stale_index(tmp_path, genome):
+    """Test that a saved index is reused only while its k, w and reference file match"""
+    source = tmp_path / "genome.fa"
+    source.write_text(''.join(f">{name}\n{sequence}\n" for name, sequence in genome))
+    path = str(tmp_path / "genome.gsi")
+
+    index = open_or_build(genome, path, str(source), k=13, w=8)
+    assert open_or_build(genome, path, str(source), k=13, w=8) is index
+    assert open_or_build(None, path) is index
+    assert open_or_build(genome, path, str(source), k=15).k == 15
+
+    with open(source, 'a') as handle:
+        handle.write(">chr3\nACGT\n")
+    rebuilt = open_or_build(genome[:1], path, str(source))
+    assert rebuilt.names == ["chr1"] and rebuilt.source[0] == source.stat().st_size
+    with pytest.raises(ValueError, match="No reference"):
+        open_or_build(None, path, k=13)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_align_simulated_reads(genome, workers):
+    """Test placement, strand and CIGAR lengths of simulated reads"""
+    reads, truth = _simulate(genome, 60)
+    reads.append(("random", ''.join(np.random.default_rng(2).choice(list("ACGT"), 150))))
+
+    alignments = Aligner(MinimizerIndex.build(genome), workers=workers, batch_size=16).align(reads)
+
+    assert len(alignments) == 61 and alignments.mapped == 60
+    records = {record.query_name: record for record in alignments}
+    assert records["random"].is_unmapped
+    for (name, sequence), (contig, start, reverse) in zip(reads, truth):
+        record = records[name]
+        assert (record.reference_name, record.is_reverse) == (contig, reverse)
+        assert abs(record.reference_start - start) <= 10
+        assert record.infer_query_length() == len(sequence)
+        assert record.mapping_quality == 60
+    positions = [(r.reference_id, r.reference_start) for r in alignments if not r.is_unmapped]
+    assert positions == sorted(positions)
@@ -0,0 +1,113 @@
+import gzip
+import io
+import multiprocessing
+import os
+import pytest
+from Bio import bgzf
+from src.genomics.compressed_io import (
+    BGZFReader, BGZFWriter, CompressionType, _shared_pool, detect_compression, open_input
+)
+from src.genomics.parsers.csfasta_parser import CSFASTAParser
+
+PAYLOAD = b"".join(b">read%d\nACGTACGTNNACGT%d\n" % (i, i) for i in range(20000))
+
+@pytest.fixture
+def plain_file(tmp_path):
+    path = tmp_path / "reads.fa"
+    path.write_bytes(PAYLOAD)
+    return str(path)
+
+@pytest.fixture
+def gzip_file(tmp_path):
+    path = tmp_path / "reads.fa.gz"
+    with gzip.open(path, 'wb') as f:
+        f.write(PAYLOAD)
+    return str(path)
+
+@pytest.fixture
+def bgzf_file(tmp_path):
+    path = tmp_path / "reads.fa.bgz"
+    with bgzf.BgzfWriter(str(path), 'wb') as f:
+        f.write(PAYLOAD)
+    return str(path)
+
+def test_detect_compression(plain_file, gzip_file, bgzf_file):
+    """Test compression detection from magic bytes"""
+    assert detect_compression(plain_file) == CompressionType.NONE
+    assert detect_compression(gzip_file) == CompressionType.GZIP
+    assert detect_compression(bgzf_file) == CompressionType.BGZF
+
+def test_open_input_roundtrip(plain_file, gzip_file, bgzf_file):
+    """Test that every compression yields the original bytes"""
+    for path in (plain_file, gzip_file, bgzf_file):
+        with open_input(path) as f:
+            assert f.read() == PAYLOAD
+        with open_input(path, 'r') as f:
+            assert f.readline() == ">read0\n"
+
+def test_bgzf_reader_multiple_blocks(bgzf_file):
+    """Test parallel decompression across many blocks"""
+    with BGZFReader(bgzf_file, threads=4, readahead=2) as raw:
+        data = io.BufferedReader(raw, 4096).read()
+        assert data == PAYLOAD
+        assert len(raw._coffsets) > 3
+
+def _pool_size(bgzf_file):
+    with BGZFReader(bgzf_file) as raw:
+        return raw._executor._max_workers, raw.read(6)
+
+def test_bgzf_readers_share_one_pool(bgzf_file):
+    """Test that default readers share the process pool, which worker processes size at one thread"""
+    with BGZFReader(bgzf_file) as first, BGZFReader(bgzf_file) as second:
+        assert first._executor is second._executor is _shared_pool()[0]
+        assert io.BufferedReader(first).read() == io.BufferedReader(second).read() == PAYLOAD
+    assert _shared_pool()[1] == (os.cpu_count() or 1)
+    assert not _shared_pool()[0]._shutdown
+
+    with multiprocessing.get_context('fork').Pool(1) as pool:
+        assert pool.apply(_pool_size, (bgzf_file,)) == (1, b">read0")
+
+def test_bgzf_reader_seek(bgzf_file):
+    """Test random access into the uncompressed stream"""
+    with open_input(bgzf_file, threads=2) as f:
+        for offset in (0, 70000, 150001, len(PAYLOAD) - 5):
+            f.seek(offset)
+            assert f.read(16) == PAYLOAD[offset:offset + 16]
+        assert f.seek(0, io.SEEK_END) == len(PAYLOAD)
+        assert f.read() == b""
+
+def test_bgzf_corrupt_block(tmp_path, bgzf_file):
+    """Test that CRC mismatches are reported"""
+    data = bytearray(open(bgzf_file, 'rb').read())
+    data[40] ^= 0xFF
+    corrupt = tmp_path / "corrupt.bgz"
+    corrupt.write_bytes(bytes(data))
+
+    with pytest.raises(Exception):
+        with open_input(str(corrupt)) as f:
+            f.read()
+
+def test_parser_reads_compressed_input(tmp_path):
+    """Test that parsers accept compressed files directly"""
+    path = tmp_path / "reads.csfasta.gz"
+    with bgzf.BgzfWriter(str(path), 'wb') as f:
+        f.write(b">read1\n0123\n>read2\n3210\n")
+
+    parser = CSFASTAParser()
+    records = list(parser.parse(str(path)))
+    assert [r['header'] for r in records] == ['read1', 'read2']
+
+def test_bgzf_writer_roundtrip(tmp_path):
+    """Test parallel BGZF compression against the reader and virtual offsets"""
+    path = tmp_path / "out.bgz"
+    with BGZFWriter(str(path), threads=4) as writer:
+        writer.write(PAYLOAD[:1000])
+        writer.write(PAYLOAD[1000:])
+    assert detect_compression(str(path)) == CompressionType.BGZF
+
+    with open_input(str(path)) as f:
+        assert f.read() == PAYLOAD
+    with bgzf.BgzfReader(str(path), 'rb') as f:
+        for offset in (0, 65280, 200000):
+            f.seek(writer.virtual_offset(offset))
+            assert f.read(10) == PAYLOAD[offset:offset + 10]
@@ -0,0 +1,178 @@
+import numpy as np
+import pysam
+import pytest
+from src.genomics import coverage
+from src.genomics.coverage import (
+    CoverageCalculator, DepthTrack, chunk_depth, covered_length, event_depth, read_blocks
+)
+
+HEADER = {'HD': {'VN': '1.0', 'SO': 'coordinate'},
+          'SQ': [{'LN': 5000, 'SN': 'chr1'}, {'LN': 3000, 'SN': 'chr2'}]}
+
+def _reads(header, count=300, seed=7):
+    rng = np.random.default_rng(seed)
+    reads = []
+    for i in range(count):
+        a = pysam.AlignedSegment(header)
+        a.query_name = f"read_{i}"
+        a.reference_id = int(rng.integers(0, 2))
+        a.reference_start = int(rng.integers(0, 2800))
+        a.mapping_quality = int(rng.integers(0, 60))
+        # Every third read is spliced, every fifth has a deletion
+        if i % 3 == 0:
+            a.cigartuples = [(0, 40), (3, 100), (0, 60)]
+        elif i % 5 == 0:
+            a.cigartuples = [(0, 50), (2, 10), (0, 50)]
+        else:
+            a.cigartuples = [(0, 100)]
+        a.query_sequence = "A" * 100
+        reads.append(a)
+    return sorted(reads, key=lambda r: (r.reference_id, r.reference_start))
+
+def _naive_depth(reads, contig, length, min_mapq=0):
+    depth = np.zeros(length, dtype=np.int32)
+    for read in reads:
+        if read.reference_name == contig and read.mapping_quality >= min_mapq:
+            for start, end in read.get_blocks():
+                depth[start:end] += 1
+    return depth
+
+@pytest.fixture
+def indexed_bam(tmp_path):
+    path = str(tmp_path / "reads.bam")
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    reads = _reads(header)
+    with pysam.AlignmentFile(path, "wb", header=header) as out:
+        for read in reads:
+            out.write(read)
+    pysam.index(path)
+    return path, reads
+
+def test_chunk_depth_clips_blocks():
+    """Test difference-array depth with blocks crossing the chunk edges"""
+    starts, ends = np.array([0, 5, 8]), np.array([10, 12, 30])
+    assert chunk_depth(starts, ends, 6, 14).tolist() == [2, 2, 3, 3, 2, 2, 1, 1]
+
+def test_event_depth_carries_open_blocks():
+    """Test chunk depth from start offsets, complemented end offsets and the entering depth"""
+    events = np.array([0, ~3, 2, ~6], dtype=np.int32)
+    assert event_depth(events, 6, carry=1).tolist() == [2, 2, 3, 2, 2, 2]
+
+def test_covered_length():
+    """Test the size of a union of intervals"""
+    assert covered_length(np.array([10, 0, 5, 40]), np.array([20, 8, 12, 41])) == 21
+    assert covered_length(np.array([]), np.array([])) == 0
+
+@pytest.mark.parametrize("workers,chunk_size", [(1, 1 << 20), (2, 700)])
+def test_profile_matches_naive(indexed_bam, workers, chunk_size):
+    """Test windowed means and breadth from an indexed BAM, serially and in parallel"""
+    path, reads = indexed_bam
+    calculator = CoverageCalculator(window=100, min_mapq=20, workers=workers, chunk_size=chunk_size)
+    profile = calculator.profile(pysam.AlignmentFile(path))
+
+    depths = [_naive_depth(reads, c, n, 20) for c, n in (("chr1", 5000), ("chr2", 3000))]
+    for contig, depth in zip(profile.contigs, depths):
+        np.testing.assert_allclose(contig.means, depth.reshape(-1, 100).mean(axis=1), rtol=1e-6)
+    combined = np.concatenate(depths)
+    assert profile.breadth(1) == pytest.approx((combined >= 1).mean())
+    assert profile.breadth(5) == pytest.approx((combined >= 5).mean())
+    assert profile.mean_depth == pytest.approx(combined.mean())
+    assert list(profile)[0] == ("chr1", 0, 100, round(float(depths[0][:100].mean()), 2))
+
+def test_in_memory_reads_match_indexed(indexed_bam):
+    """Test that a list of reads gives the same depth as the indexed path"""
+    path, reads = indexed_bam
+    calculator = CoverageCalculator(window=250, chunk_size=1000)
+    from_file = calculator.depth(pysam.AlignmentFile(path), "chr2", 100, 2900)
+    np.testing.assert_array_equal(calculator.depth(reads, "chr2", 100, 2900), from_file)
+    np.testing.assert_array_equal(from_file, _naive_depth(reads, "chr2", 3000)[100:2900])
+
+def test_depth_track_runs(indexed_bam):
+    """Test per-base bedGraph runs streamed chunk by chunk"""
+    path, reads = indexed_bam
+    track = DepthTrack(CoverageCalculator(chunk_size=1000), pysam.AlignmentFile(path))
+    rebuilt = np.zeros(5000, dtype=np.int32)
+    for contig, start, end, depth in track:
+        assert depth > 0
+        if contig == "chr1":
+            rebuilt[start:end] = depth
+    np.testing.assert_array_equal(rebuilt, _naive_depth(reads, "chr1", 5000))
+
+def test_read_blocks_filters():
+    """Test flag and mapping-quality filters"""
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    reads = _reads(header, count=3)
+    reads[0].is_duplicate = True
+    reads[1].mapping_quality = 5
+    starts, _ = read_blocks(reads, min_mapq=10)
+    assert len(starts) == len(reads[2].get_blocks())
+
+def test_unindexed_profile_counts_empty_contigs(tmp_path):
+    """Test that contigs without reads stay in the profile of an unindexed file"""
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    reads = [read for read in _reads(header) if read.reference_name == "chr1"]
+    path = str(tmp_path / "chr1_only.bam")
+    with pysam.AlignmentFile(path, "wb", header=header) as out:
+        for read in reads:
+            out.write(read)
+
+    profile = CoverageCalculator(window=100, chunk_size=1000).profile(pysam.AlignmentFile(path))
+
+    assert [(c.contig, c.length) for c in profile.contigs] == [("chr1", 5000), ("chr2", 3000)]
+    assert not profile.contigs[1].means.any()
+    assert profile.mean_depth == pytest.approx(_naive_depth(reads, "chr1", 5000).sum() / 8000)
+
+def _write_unindexed(path, header, reads):
+    with pysam.AlignmentFile(path, "wb", header=header) as out:
+        for read in reads:
+            out.write(read)
+    return path
+
+@pytest.mark.parametrize("sort_order", ["coordinate", "unsorted"])
+def test_unindexed_input_streams_chunks(tmp_path, monkeypatch, sort_order):
+    """Test sorted (streamed) and unsorted (spilled) unindexed files against the naive depth"""
+    monkeypatch.setattr(coverage, "SPILL_EVENTS", 50)
+    header = pysam.AlignmentHeader.from_dict(dict(HEADER, HD={'VN': '1.0', 'SO': sort_order}))
+    reads = _reads(header)
+    if sort_order == "unsorted":
+        reads = [reads[i] for i in np.random.default_rng(3).permutation(len(reads))]
+    path = _write_unindexed(str(tmp_path / "reads.bam"), header, reads)
+    calculator = CoverageCalculator(window=100, min_mapq=20, workers=2, chunk_size=700)
+
+    profile = calculator.profile(pysam.AlignmentFile(path))
+
+    depths = [_naive_depth(reads, c, n, 20) for c, n in (("chr1", 5000), ("chr2", 3000))]
+    for contig, depth in zip(profile.contigs, depths):
+        np.testing.assert_allclose(contig.means, depth.reshape(-1, 100).mean(axis=1), rtol=1e-6)
+    np.testing.assert_array_equal(calculator.depth(pysam.AlignmentFile(path), "chr2", 650, 2150),
+                                  depths[1][650:2150])
+    rebuilt = np.zeros(3000, dtype=np.int32)
+    for contig, start, end, depth in DepthTrack(calculator, pysam.AlignmentFile(path)):
+        if contig == "chr2":
+            rebuilt[start:end] = depth
+    np.testing.assert_array_equal(rebuilt, depths[1])
+
+def test_sorted_input_emits_passed_chunks(tmp_path):
+    """Test that a sorted stream releases a chunk once reads start past it, not at the end"""
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    reads = _reads(header)
+    consumed = []
+
+    class Reads:
+        def __init__(self):
+            self.header = header
+
+        def __iter__(self):
+            for read in reads:
+                consumed.append(read)
+                yield read
+
+    chunks = CoverageCalculator(window=100, chunk_size=500)._event_chunks(Reads())
+    contig, length, start, stop, events, carry = next(chunks)
+
+    assert (contig, start, stop, carry) == ("chr1", 0, 500, 0)
+    assert len(consumed) < len(reads) // 4
+    np.testing.assert_array_equal(event_depth(events, 500), _naive_depth(reads, "chr1", 5000)[:500])
+    with pytest.raises(ValueError, match="not coordinate-sorted"):
+        list(CoverageCalculator()._event_chunks(type("Shuffled", (), {
+            'header': header, '__iter__': lambda self: iter(reads[::-1])})()))
@@ -0,0 +1,145 @@
+import numpy as np
+import pysam
+import pytest
+from src.genomics import duplicates
+from src.genomics.duplicates import RESOLVE_BYTES, SIGNATURE_DTYPE, DuplicateMarker, five_prime
+from src.genomics.writers import export_records
+
+HEADER = {'HD': {'VN': '1.6', 'SO': 'coordinate'},
+          'SQ': [{'LN': 20000, 'SN': 'chr1'}, {'LN': 20000, 'SN': 'chr2'}]}
+
+def _pair(header, name, contig, start, length, clip, quality):
+    """A properly paired fragment whose forward read carries `clip` soft-clipped bases"""
+    end = start + length - 100
+    reads = []
+    for first in (True, False):
+        read = pysam.AlignedSegment(header)
+        read.query_name = name
+        read.flag = 0x1 | 0x2 | (0x40 | 0x20 if first else 0x80 | 0x10)
+        read.reference_id = read.next_reference_id = contig
+        read.reference_start = start + clip if first else end
+        read.next_reference_start = end if first else start + clip
+        read.cigarstring = f"{clip}S{100 - clip}M" if first and clip else "100M"
+        read.query_sequence = "A" * 100
+        read.query_qualities = pysam.qualitystring_to_array(chr(33 + quality) * 100)
+        read.set_tag('MC', "100M" if first else (f"{clip}S{100 - clip}M" if clip else "100M"))
+        read.set_tag('ms', 100 * quality)  # samtools fixmate -m: the mate's quality sum
+        reads.append(read)
+    return reads
+
+def _write_bam(path, seed=0, fragments=300):
+    rng = np.random.default_rng(seed)
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    reads, copies = [], {}
+    for i in range(fragments):
+        contig, start = int(rng.integers(0, 2)), int(rng.integers(0, 19000))
+        length = int(rng.integers(200, 600))
+        for copy in range(1 if rng.random() < 0.7 else int(rng.integers(2, 5))):
+            # Copies differ in clipping and quality but share unclipped 5' ends
+            name = f"frag{i}_{copy}"
+            reads += _pair(header, name, contig, start, length, int(rng.integers(0, 3)),
+                           int(rng.integers(20, 40)))
+            copies[name] = i
+    unmapped = pysam.AlignedSegment(header)
+    unmapped.query_name, unmapped.flag, unmapped.query_sequence = "unmapped", 0x4, "A" * 100
+    reads.sort(key=lambda r: (r.reference_id, r.reference_start))
+    with pysam.AlignmentFile(str(path), 'wb', header=header) as bam:
+        for read in reads + [unmapped]:
+            bam.write(read)
+    return copies
+
+def _flags(marked):
+    return {(read.query_name, read.is_read1): read.is_duplicate for read in marked}
+
+def test_sorted_and_unsorted_marking_agree(tmp_path):
+    """Test one kept pair per fragment, the best-quality copy, in both modes"""
+    path = tmp_path / "reads.bam"
+    copies = _write_bam(path)
+
+    marked = DuplicateMarker(remove=False, batch_size=64, workers=1).mark(str(path))
+    flags = _flags(marked)
+    unsorted = _flags(DuplicateMarker(remove=False, assume_sorted=False, partitions=4,
+                                      workers=1).mark(str(path)))
+
+    assert flags == unsorted
+    assert marked.reads == 2 * len(copies) + 1
+    assert not flags[("unmapped", False)]
+    kept = {name for (name, _), duplicate in flags.items() if not duplicate and name != "unmapped"}
+    assert sorted(copies[name] for name in kept) == sorted(set(copies.values()))
+    assert all(flags[(name, True)] == flags[(name, False)] for name in copies)
+    qualities = {read.query_name: read.query_qualities[0]
+                 for read in pysam.AlignmentFile(str(path)) if not read.is_unmapped}
+    for name in kept:
+        siblings = [other for other, fragment in copies.items() if fragment == copies[name]]
+        assert qualities[name] == max(qualities[other] for other in siblings)
+
+def test_oversized_partitions_are_split(tmp_path, monkeypatch):
+    """Test that unsorted partitions over the memory budget are re-partitioned before resolving"""
+    path = tmp_path / "reads.bam"
+    _write_bam(path)
+    resolve = duplicates._partition_duplicates
+    sizes = []
+    monkeypatch.setattr(duplicates, "_partition_duplicates",
+                        lambda part: sizes.append(len(np.fromfile(part, dtype=SIGNATURE_DTYPE))) or resolve(part))
+
+    flags = _flags(DuplicateMarker(remove=False, assume_sorted=False, partitions=2, workers=1,
+                                   memory_limit=64 * RESOLVE_BYTES).mark(str(path)))
+
+    assert flags == _flags(DuplicateMarker(remove=False, workers=1).mark(str(path)))
+    assert len(sizes) > 8 and max(sizes) <= 64 and sum(sizes) == len(flags) - 1
+
+def test_remove_mode_streams_in_order(tmp_path):
+    """Test deduplicated output stays coordinate-sorted and exports to BAM"""
+    path = tmp_path / "reads.bam"
+    copies = _write_bam(path, seed=1)
+    output = tmp_path / "dedup.bam"
+
+    deduplicated = DuplicateMarker(batch_size=50, workers=1).mark(str(path))
+    export_records(deduplicated, str(output))
+
+    reads = list(pysam.AlignmentFile(str(output)))
+    assert len(reads) == 2 * len(set(copies.values())) + 1
+    assert deduplicated.duplicates == 2 * (len(copies) - len(set(copies.values())))
+    positions = [(r.reference_id, r.reference_start) for r in reads if not r.is_unmapped]
+    assert positions == sorted(positions)
+
+def test_five_prime_and_sort_check(tmp_path):
+    """Test unclipped 5' ends and rejection of unsorted input in sorted mode"""
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    forward, reverse = _pair(header, "frag", 0, 1000, 300, 5, 30)
+    assert five_prime(forward) == 1000 and five_prime(reverse) == 1300
+
+    path = tmp_path / "unsorted.bam"
+    with pysam.AlignmentFile(str(path), 'wb', header=header) as bam:
+        for read in (reverse, forward):
+            bam.write(read)
+    with pytest.raises(ValueError, match="not coordinate-sorted"):
+        list(DuplicateMarker(workers=1).mark(str(path)))
+    assert len(list(DuplicateMarker(assume_sorted=False, workers=1).mark(str(path)))) == 2
+
+def test_pairs_are_scored_as_fragments(tmp_path):
+    """Test that both ends of a pair keep the same copy, and that mate scores are required"""
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    # Copy a has the better left read, copy b the better fragment
+    reads = []
+    for name, (left, right) in {"a": (40, 20), "b": (30, 35)}.items():
+        forward, reverse = _pair(header, name, 0, 1000, 300, 0, left)
+        reverse.query_qualities = pysam.qualitystring_to_array(chr(33 + right) * 100)
+        forward.set_tag('ms', 100 * right)
+        reverse.set_tag('ms', 100 * left)
+        reads += [forward, reverse]
+    path = tmp_path / "pairs.bam"
+    with pysam.AlignmentFile(str(path), 'wb', header=header) as bam:
+        for read in sorted(reads, key=lambda r: r.reference_start):
+            bam.write(read)
+
+    flags = _flags(DuplicateMarker(remove=False, workers=1).mark(str(path)))
+    assert flags == {("a", True): True, ("a", False): True, ("b", True): False, ("b", False): False}
+
+    for read in reads:
+        read.set_tag('ms', None)
+    with pysam.AlignmentFile(str(path), 'wb', header=header) as bam:
+        for read in sorted(reads, key=lambda r: r.reference_start):
+            bam.write(read)
+    with pytest.raises(ValueError, match="samtools fixmate -m"):
+        list(DuplicateMarker(workers=1).mark(str(path)))
@@ -0,0 +1,55 @@
+import numpy as np
+import pysam
+import pytest
+from src.genomics.external_sort import ExternalSorter, sort_key
+
+def test_spilled_runs_merge_in_passes(tmp_path):
+    """Test a many-run sort with intermediate merges against sorted()"""
+    rng = np.random.default_rng(0)
+    records = [(f"chr{c}", int(s), int(s) + 10, f"id{i}")
+               for i, (c, s) in enumerate(zip(rng.integers(1, 4, 5000), rng.integers(0, 1000, 5000)))]
+    sorter = ExternalSorter('coordinate', memory_limit=20000, workers=1, fan_in=3, spill_dir=str(tmp_path))
+
+    result = sorter.sort(records)
+
+    assert len(result.runs) <= 3
+    assert list(result) == sorted(records, key=lambda r: (r[0], r[1], r[2]))  # stable for ties
+    assert list(result) == list(result)  # re-iterable
+    spill_dirs = list(tmp_path.iterdir())
+    del result
+    assert all(not path.exists() for path in spill_dirs)
+
+def test_alignments_sort_by_name_and_coordinate(tmp_path):
+    """Test pysam reads survive spilling and carry an updated header"""
+    header = pysam.AlignmentHeader.from_dict({'HD': {'VN': '1.6', 'SO': 'unsorted'},
+                                              'SQ': [{'SN': 'chr1', 'LN': 10000}, {'SN': 'chr2', 'LN': 10000}]})
+    rng = np.random.default_rng(1)
+    path = tmp_path / "reads.bam"
+    with pysam.AlignmentFile(str(path), 'wb', header=header) as bam:
+        for i in range(500):
+            read = pysam.AlignedSegment(header)
+            read.query_name = f"read{rng.integers(0, 10 ** 6):07d}"
+            read.reference_id = int(rng.integers(-1, 2))
+            if read.reference_id >= 0:
+                read.reference_start, read.cigarstring = int(rng.integers(0, 9000)), "20M"
+            else:
+                read.flag = 0x4
+            read.query_sequence = "ACGT" * 5
+            bam.write(read)
+
+    by_name = ExternalSorter('name', memory_limit=3000, workers=1).sort(pysam.AlignmentFile(str(path)))
+    names = [read.query_name for read in by_name]
+    assert names == sorted(names) and len(names) == 500
+    assert by_name.header.to_dict()['HD']['SO'] == 'queryname'
+
+    by_position = ExternalSorter('coordinate', memory_limit=3000, workers=1).sort(by_name)
+    keys = [(r.reference_id if r.reference_id >= 0 else 99, r.reference_start) for r in by_position]
+    assert keys == sorted(keys)
+    assert by_position.header.to_dict()['HD']['SO'] == 'coordinate'
+
+def test_kmer_key_and_unknown_key():
+    """Test sequence ordering and key validation"""
+    records = [("a", "TTGA"), ("b", "acgt"), ("c", "GATT")]
+    assert [name for name, _ in ExternalSorter('kmer', workers=1).sort(records)] == ["b", "c", "a"]
+    with pytest.raises(ValueError, match="Unknown sort key"):
+        sort_key('position')
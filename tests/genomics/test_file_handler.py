@@ -1,6 +1,7 @@
 import pytest
 from pathlib import Path
 import pysam
+from src.genomics import file_handler
 from src.genomics.file_handler import GenomicFileHandler, QualityMetrics
 
 @pytest.fixture
@@ -101,4 +102,20 @@ def test_metrics_edge_cases(test_data_dir):
     metrics = handler.analyze_quality_metrics(data)
     assert metrics.coverage_depth == 0
     assert metrics.gc_content == 0
-    assert metrics.read_length == 0 
\ No newline at end of file
+    assert metrics.read_length == 0 
+
+
+def test_seqio_handle_closed_after_reading(test_data_dir, monkeypatch):
+    """Test that SeqIO-parsed files close their BGZF handle once read"""
+    plain = test_data_dir / "reads.fa"
+    plain.write_text(">r1\nACGT\n>r2\nTTGA\n")
+    path = test_data_dir / "reads.fa.gz"
+    pysam.tabix_compress(str(plain), str(path))
+    handles = []
+    open_input = file_handler.open_input
+    monkeypatch.setattr(file_handler, "open_input", lambda *args: handles.append(open_input(*args)) or handles[-1])
+
+    records = list(GenomicFileHandler()._parse_records(str(path), "fasta", 'r'))
+
+    assert [record.id for record in records] == ["r1", "r2"]
+    assert len(handles) == 1 and handles[0].closed
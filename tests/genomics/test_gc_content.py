@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from src.genomics import gc_content
+from src.genomics.gc_content import gc_fraction, gc_profile, gc_windows, window_bounds
+
+def _naive_gc(sequence, window, step):
+    values = []
+    starts, ends = window_bounds(len(sequence), window, step)
+    for start, end in zip(starts, ends):
+        chunk = sequence[start:end].upper()
+        called = sum(chunk.count(b) for b in "ACGT")
+        gc = chunk.count("G") + chunk.count("C")
+        values.append(gc / called if called else np.nan)
+    return np.array(values, dtype=np.float32)
+
+def test_window_bounds():
+    """Test window layout including the trailing partial window"""
+    starts, ends = window_bounds(250, 100, 100)
+    assert starts.tolist() == [0, 100, 200]
+    assert ends.tolist() == [100, 200, 250]
+    starts, ends = window_bounds(50, 100, 25)
+    assert (starts.tolist(), ends.tolist()) == ([0], [50])
+    with pytest.raises(ValueError):
+        window_bounds(10, 0, 1)
+
+def test_window_bounds_with_step_past_window():
+    """Test that a step longer than the window never starts a tail window past the contig end"""
+    starts, ends = window_bounds(1003, 10, 30)
+    assert starts[-1] == 990 and ends[-1] == 1000
+    assert (starts < ends).all() and (ends <= 1003).all()
+    assert window_bounds(1025, 10, 30)[0][-1] == 1020
+    profile = gc_profile([("chr1", "GC" * 500 + "ATA")], window=10, step=30)
+    assert all(start <= end for _, start, end, _ in profile)
+
+@pytest.mark.parametrize("window,step", [(10, 10), (7, 3), (50, 50), (1, 1), (10, 30)])
+def test_gc_windows_matches_naive(window, step):
+    """Test prefix-sum windows against a direct count"""
+    rng = np.random.default_rng(1)
+    sequence = ''.join(rng.choice(list("ACGTNacgt"), 333))
+    np.testing.assert_allclose(
+        gc_windows(sequence, window, step), _naive_gc(sequence, window, step), equal_nan=True
+    )
+
+def test_gc_windows_across_prefix_blocks(monkeypatch):
+    """Test that blockwise prefix sums give the same result as a single block"""
+    monkeypatch.setattr(gc_content, "PREFIX_BLOCK_SIZE", 64)
+    sequence = "GGCCATAT" * 100 + "NNNN"
+    np.testing.assert_allclose(
+        gc_windows(sequence, 30, 11), _naive_gc(sequence, 30, 11), equal_nan=True
+    )
+
+def test_gc_profile_bedgraph_rows():
+    """Test per-contig tracks and bedGraph iteration skipping N-only windows"""
+    profile = gc_profile([("chr1 test", "GGGGAAAA"), ("chr2", "NNNNCCCC")], window=4)
+    assert [track.contig for track in profile.tracks] == ["chr1", "chr2"]
+    assert list(profile) == [("chr1", 0, 4, 1.0), ("chr1", 4, 8, 0.0), ("chr2", 4, 8, 1.0)]
+    assert len(profile.to_array()) == 4
+
+def test_gc_fraction():
+    """Test overall GC fraction ignoring ambiguous bases"""
+    assert gc_fraction(["GCAT", "NNGG"]) == pytest.approx(4 / 6)
+    assert gc_fraction([]) == 0.0
@@ -0,0 +1,90 @@
+import numpy as np
+import pysam
+import pytest
+from src.genomics import intervals
+from src.genomics.intervals import IntervalIndex, Intervals, to_intervals
+from src.genomics.parsers.bed_parser import BEDParser
+
+def _random_intervals(rng, count, max_length, contigs=("chr1", "chr2", "chr3")):
+    contig = rng.integers(0, len(contigs), count).astype(np.int32)
+    start = rng.integers(0, 100000, count).astype(np.int64)
+    return Intervals(list(contigs), contig, start, start + rng.integers(1, max_length, count))
+
+def _naive_pairs(queries, targets):
+    pairs = set()
+    for q, (contig, start, end) in enumerate(zip(queries.contig, queries.start, queries.end)):
+        name = queries.contigs[contig]
+        for t, (t_contig, t_start, t_end) in enumerate(zip(targets.contig, targets.start, targets.end)):
+            if targets.contigs[t_contig] == name and t_start < end and t_end > start:
+                pairs.add((q, t))
+    return pairs
+
+def test_overlap_matches_naive_join():
+    """Test nested, duplicate and giant intervals against a nested-loop join"""
+    rng = np.random.default_rng(0)
+    targets = _random_intervals(rng, 400, 3000)
+    targets.start[:3], targets.end[:3] = 0, 90000  # identical containers of everything
+    queries = _random_intervals(rng, 300, 200, contigs=("chr2", "chr1", "chrUn"))
+
+    index = IntervalIndex(targets)
+    hits = index.overlap(queries)
+
+    assert index.depth > 1
+    assert set(zip(hits.query.tolist(), hits.target.tolist())) == _naive_pairs(queries, targets)
+    assert len(hits) == len(_naive_pairs(queries, targets))
+    assert np.all(np.diff(hits.query) >= 0)
+    assert hits.counts()[queries.contig == 2].sum() == 0  # contig absent from the index
+
+def test_queries_past_contig_ends_stay_on_their_contig():
+    """Test queries beyond the last target of a contig against a nested-loop join"""
+    targets = to_intervals([("chr1", 100, 500), ("chr2", 10, 50), ("chr2", 0, 5)])
+    queries = to_intervals([("chr1", 510, 540), ("chr1", 490, 900), ("chr2", -20, 1), ("chr2", 60, 70),
+                            ("chr1", -5, 0)])
+
+    hits = IntervalIndex(targets).overlap(queries)
+
+    assert list(hits) == [("chr1", 490, 900, "chr1", 100, 500), ("chr2", -20, 1, "chr2", 0, 5)]
+    assert set(zip(hits.query.tolist(), hits.target.tolist())) == _naive_pairs(queries, targets)
+
+def test_sorted_and_unsorted_queries_agree(monkeypatch):
+    """Test the merge-join path against binary search"""
+    rng = np.random.default_rng(1)
+    targets = _random_intervals(rng, 2000, 500)
+    queries = _random_intervals(rng, 5000, 50)
+    order = np.lexsort((queries.start, queries.contig))
+    sorted_queries = Intervals(queries.contigs, queries.contig[order], queries.start[order], queries.end[order])
+    assert sorted_queries.is_sorted() and not queries.is_sorted()
+
+    index = IntervalIndex(targets)
+    merged = index.overlap(sorted_queries)
+    unsorted = index.overlap(queries)
+    monkeypatch.setattr(intervals, "_rank", lambda keys, values, side, order: np.searchsorted(keys, values, side))
+    searched = index.overlap(sorted_queries)
+
+    assert np.array_equal(merged.query, searched.query) and np.array_equal(merged.target, searched.target)
+    assert sorted(zip(order[merged.query].tolist(), merged.target.tolist())) == \
+        sorted(zip(unsorted.query.tolist(), unsorted.target.tolist()))
+
+def test_bed_parser_and_rows(tmp_path):
+    """Test BED loading, header skipping and bedtools-style hit rows"""
+    bed = tmp_path / "genes.bed"
+    bed.write_text("track name=genes\n#comment\nchr1\t100\t200\tgeneA\t0\t+\nchr1\t150\t400\tgeneB\n")
+    parser = BEDParser()
+    assert parser.validate(str(bed))
+    assert list(parser.parse(str(bed)))[0] == ("chr1", 100, 200, "geneA", "0", "+")
+
+    genes = parser.read(str(bed))
+    header = pysam.AlignmentHeader.from_dict({'SQ': [{'SN': 'chr1', 'LN': 1000}]})
+    read = pysam.AlignedSegment(header)
+    read.query_name, read.reference_id, read.reference_start = "r1", 0, 180
+    read.cigarstring, read.query_sequence = "10M", "A" * 10
+
+    hits = IntervalIndex(genes).overlap([read, ("chr1", 300, 301)])
+    assert list(hits) == [
+        ("chr1", 180, 190, "r1", "chr1", 100, 200, "geneA", "0", "+"),
+        ("chr1", 180, 190, "r1", "chr1", 150, 400, "geneB"),
+        ("chr1", 300, 301, "chr1", 150, 400, "geneB"),
+    ]
+    assert to_intervals([{"chrom": "chr2", "start": 5, "end": 9}]).row(0) == ("chr2", 5, 9)
+    with pytest.raises(ValueError):
+        to_intervals([42])
@@ -0,0 +1,75 @@
+from collections import Counter
+import numpy as np
+import pytest
+from src.genomics.kmer import (
+    KmerCounter, decode_kmer, encode_kmer, kmer_codes, reduce_counts
+)
+
+def _reverse_complement(sequence):
+    return sequence[::-1].translate(str.maketrans("ACGT", "TGCA"))
+
+def _naive_counts(sequences, k):
+    counts = Counter()
+    for sequence in sequences:
+        for i in range(len(sequence) - k + 1):
+            kmer = sequence[i:i + k]
+            if set(kmer) <= set("ACGT"):
+                counts[min(kmer, _reverse_complement(kmer))] += 1
+    return counts
+
+@pytest.fixture
+def sequences():
+    rng = np.random.default_rng(7)
+    seqs = [''.join(rng.choice(list("ACGT"), size=n)) for n in (5000, 3000, 40)]
+    seqs.append("ACGTNNACGTACGTTTGACNA")
+    return seqs
+
+def test_kmer_codes_roundtrip():
+    """Test 2-bit packing and decoding"""
+    codes = kmer_codes("ACGTTGCA", 4, canonical=False)
+    assert [decode_kmer(c, 4) for c in codes] == ["ACGT", "CGTT", "GTTG", "TTGC", "TGCA"]
+    assert decode_kmer(encode_kmer("A" * 32, canonical=False), 32) == "A" * 32
+    assert decode_kmer(encode_kmer("T" * 32, canonical=False), 32) == "T" * 32
+
+def test_kmer_codes_canonical_and_invalid_bases():
+    """Test reverse-complement canonicalization and N handling"""
+    assert encode_kmer("GGGA") == encode_kmer("TCCC")
+    assert len(kmer_codes("ACGNACG", 3)) == 2
+    with pytest.raises(ValueError):
+        kmer_codes("ACGT", 33)
+
+def test_reduce_counts():
+    """Test sort-and-reduce aggregation"""
+    kmers, counts = reduce_counts(np.array([5, 1, 5, 3], dtype=np.uint64),
+                                  np.array([1, 2, 3, 4], dtype=np.uint32))
+    assert kmers.tolist() == [1, 3, 5]
+    assert counts.tolist() == [2, 4, 4]
+
+def test_counter_matches_naive(sequences):
+    """Test the counter against a dictionary reference"""
+    expected = _naive_counts(sequences, 11)
+    spectrum = KmerCounter(k=11, workers=1).count(sequences)
+
+    assert len(spectrum) == len(expected)
+    assert spectrum.total == sum(expected.values())
+    assert np.all(np.diff(spectrum.kmers.astype(np.float64)) > 0)
+    for kmer, count in list(expected.items())[:200]:
+        assert spectrum.get(kmer) == count
+
+def test_counter_spills_and_chunks(sequences, tmp_path):
+    """Test chunked, parallel counting with partitions spilled to disk"""
+    reference = KmerCounter(k=15, workers=1).count(sequences)
+    spilled = KmerCounter(k=15, workers=2, partitions=8, memory_limit=1024,
+                          chunk_size=500, spill_dir=str(tmp_path)).count(sequences)
+
+    assert np.array_equal(reference.kmers, spilled.kmers)
+    assert np.array_equal(reference.counts, spilled.counts)
+    assert list(tmp_path.iterdir()) == []
+
+def test_spectrum_lookup_and_histogram():
+    """Test batch lookups and the count histogram"""
+    spectrum = KmerCounter(k=3, workers=1).count(["AAAAAC"])
+    assert spectrum.get("AAA") == 3
+    assert spectrum.get("CCC") == 0
+    assert spectrum.histogram().tolist() == [0, 1, 0, 1]
+    assert spectrum.most_common(1) == [("AAA", 3)]
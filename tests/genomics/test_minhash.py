@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pytest
+from src.genomics import minhash
+from src.genomics.kmer import kmer_codes
+from src.genomics.minhash import MinHasher, jaccard_matrix
+from src.genomics.writers import export_records
+
+def _mutants(rng, length=20000, count=4):
+    genome = rng.choice(list("ACGT"), length)
+    samples = []
+    for i in range(count):
+        mutant = genome.copy()
+        mutant[rng.integers(0, length, 150 * i)] = rng.choice(list("ACGT"), 150 * i)
+        samples.append((f"s{i}", [("chr1", ''.join(mutant))]))
+    return samples
+
+def test_jaccard_matches_bottom_k_estimate():
+    """Test the vectorized matrix against a per-pair bottom-k merge and exact Jaccard"""
+    samples = _mutants(np.random.default_rng(0)) + [("tiny", [("c", "ACGTTGCAACGGTAC" * 3)])]
+    sketches = MinHasher(k=15, size=500, workers=1).sketch(samples)
+    matrix = jaccard_matrix(sketches)
+
+    for a, sa in enumerate(sketches):
+        for b, sb in enumerate(sketches):
+            union = np.union1d(sa.hashes, sb.hashes)[:500]
+            expected = np.isin(union, np.intersect1d(sa.hashes, sb.hashes)).mean()
+            assert matrix[a, b] == pytest.approx(expected)
+    kmers = [set(kmer_codes(records[0][1], 15).tolist()) for _, records in samples]
+    exact = len(kmers[0] & kmers[1]) / len(kmers[0] | kmers[1])
+    assert abs(matrix[0, 1] - exact) < 0.05
+    assert matrix[0, -1] == 0
+
+def test_sidecar_sketches_are_reused(tmp_path, monkeypatch):
+    """Test that file sketches persist beside the file and are invalidated on change"""
+    samples = _mutants(np.random.default_rng(1), count=2)
+    paths = []
+    for name, records in samples:
+        paths.append(str(tmp_path / f"{name}.fa"))
+        export_records(records, paths[-1])
+    hasher = MinHasher(k=15, size=200, workers=1)
+    first = hasher.compare([("a", paths[0]), ("b", paths[1])], metric='distance')
+    assert os.path.exists(paths[0] + ".minhash")
+
+    calls = []
+    sketch_sample = minhash._sketch_sample
+    monkeypatch.setattr(minhash, "_sketch_sample", lambda task: calls.append(task[1]) or sketch_sample(task))
+    again = hasher.compare([("a", paths[0]), ("b", paths[1])], metric='distance')
+    assert calls == [] and np.array_equal(np.asarray(again), np.asarray(first))
+
+    export_records(samples[1][1], paths[0])
+    os.utime(paths[0], ns=(0, 0))
+    changed = hasher.compare([("a", paths[0]), ("b", paths[1])])
+    assert calls == ["a"] and changed.jaccard[0, 1] == 1.0
+    assert MinHasher(k=17, size=200, workers=1).sketch([("a", paths[0])])[0].k == 17
+
+def test_similarity_matrix_exports_tsv(tmp_path):
+    """Test distances and the labelled TSV table"""
+    matrix = MinHasher(k=15, size=300, workers=1).compare(_mutants(np.random.default_rng(2), count=3),
+                                                          metric='distance')
+    output = tmp_path / "distances.tsv"
+
+    export_records(matrix, str(output))
+
+    lines = [line.split('\t') for line in output.read_text().splitlines()]
+    assert lines[0] == ["sample", "s0", "s1", "s2"]
+    assert [row[0] for row in lines[1:]] == ["s0", "s1", "s2"]
+    assert float(lines[1][1]) == 0 and 0 < float(lines[1][2]) < float(lines[1][3]) < 1
+    assert np.asarray(matrix).shape == (3, 3)
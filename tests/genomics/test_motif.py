@@ -0,0 +1,87 @@
+import pickle
+import re
+import numpy as np
+import pytest
+from src.genomics import motif
+from src.genomics.motif import MotifAutomaton, MotifFinder, expand_iupac, load_motifs
+from src.genomics.packed_sequence import PackedSequence
+
+def _reverse_complement(sequence):
+    return sequence[::-1].translate(str.maketrans("ACGT", "TGCA"))
+
+def _naive_hits(contigs, motifs):
+    hits = set()
+    for contig, sequence in contigs:
+        for name, pattern in motifs.items():
+            concretes = expand_iupac(pattern)
+            for concrete in concretes:
+                for strand, query in ((1, concrete), (-1, _reverse_complement(concrete))):
+                    if strand < 0 and query in concretes:
+                        continue  # Sites the motif matches forward are reported once, on +
+                    for match in re.finditer(f"(?={query})", sequence):
+                        hits.add((contig, match.start(), name, strand))
+    return hits
+
+def _as_set(hits):
+    return {(hits.contigs[c], s, hits.motifs[m], strand) for c, s, m, strand in
+            zip(hits.contig.tolist(), hits.start.tolist(), hits.motif.tolist(), hits.strand.tolist())}
+
+MOTIFS = {"EcoRI": "GAATTC", "TATA": "TATAWAWR", "short": "ACG", "adapter": "AGATCGGAAG"}
+
+def test_expand_iupac():
+    """Test degenerate code expansion and validation"""
+    assert sorted(expand_iupac("ARN")) == sorted(a + b + c for a in "A" for b in "AG" for c in "ACGT")
+    with pytest.raises(ValueError):
+        expand_iupac("AXG")
+    with pytest.raises(ValueError):
+        expand_iupac("N" * 7)
+
+@pytest.mark.parametrize("workers,chunk_size", [(1, 1 << 20), (2, 997)])
+def test_find_matches_naive_search(workers, chunk_size):
+    """Test both-strand search against regex, across chunk boundaries"""
+    rng = np.random.default_rng(3)
+    contigs = [(f"chr{i}", ''.join(rng.choice(list("ACGTN"), 5000, p=[.24, .24, .24, .24, .04])))
+               for i in range(3)]
+    hits = MotifFinder(MOTIFS, workers=workers, chunk_size=chunk_size, cache=False).find(contigs)
+    assert _as_set(hits) == _naive_hits(contigs, MOTIFS)
+    assert np.all(hits.end - hits.start == [len(MOTIFS[hits.motifs[m]]) for m in hits.motif])
+
+def test_packed_and_forward_only():
+    """Test packed input and single-strand search"""
+    sequence = "TTGAATTCAAGTCC"
+    packed = PackedSequence.from_string(sequence, name="chr1")
+    hits = MotifFinder(["GAATTC", "GGAC"], both_strands=False, cache=False).find([packed])
+    assert list(hits) == [("chr1", 2, 8, "GAATTC", 0, "+")]
+    both = MotifFinder(["GGAC"], cache=False).find([packed])
+    assert list(both) == [("chr1", 10, 14, "GGAC", 0, "-")]
+    assert both.counts() == {"GGAC": 1}
+
+def test_palindromes_reported_once():
+    """Test that sites matching a motif on both strands are one + hit"""
+    hits = MotifFinder({"EcoRI": "GAATTC", "pair": "WW"}, cache=False).find([("c1", "AAAGAATTCAAA")])
+    assert [row for row in hits if row[3] == "EcoRI"] == [("c1", 3, 9, "EcoRI", 0, "+")]
+    assert hits.counts() == {"EcoRI": 1, "pair": 7} and set(hits.strand.tolist()) == {1}
+
+def test_automaton_disk_cache(tmp_path, monkeypatch):
+    """Test that compiled automata are reused from the on-disk cache"""
+    monkeypatch.setattr(motif, "_AUTOMATA", {})
+    first = MotifAutomaton.compile(["GAATTC", "TATAWAWR"], cache_dir=str(tmp_path))
+    assert len(list(tmp_path.glob("motifs-*"))) == 1 and isinstance(first.transitions, np.memmap)
+
+    monkeypatch.setattr(motif, "_AUTOMATA", {})
+    monkeypatch.setattr(MotifAutomaton, "build", classmethod(lambda *a, **k: pytest.fail("rebuilt")))
+    second = MotifAutomaton.compile(["gaattc", "TATAWAWR"], cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(first.transitions, second.transitions)
+    assert second.max_length == 8
+
+    # Workers receive the cached automaton as its path and map it themselves
+    assert len(pickle.dumps(second)) < 1000 and pickle.loads(pickle.dumps(second)) is second
+
+def test_load_motifs(tmp_path):
+    """Test motif files in FASTA and tab-separated form"""
+    fasta = tmp_path / "motifs.fa"
+    fasta.write_text(">EcoRI site\nGAATTC\n>long\nAGATCG\nGAAG\n")
+    assert load_motifs(str(fasta)) == {"EcoRI": "GAATTC", "long": "AGATCGGAAG"}
+    table = tmp_path / "motifs.txt"
+    table.write_text("# comment\nBamHI\tGGATCC\nTATAWAWR\n")
+    assert load_motifs(str(table)) == {"BamHI": "GGATCC", "TATAWAWR": "TATAWAWR"}
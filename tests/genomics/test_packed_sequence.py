@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from src.genomics.kmer import KmerCounter
+from src.genomics.gc_content import gc_windows
+from src.genomics.packed_sequence import PackedSequence, read_2bit, write_2bit
+from src.genomics.parsers.fasta_parser import FASTAParser
+from src.genomics.parsers.twobit_parser import TwoBitParser
+
+SEQUENCE = "ACGTNNNNacgtRYacGGCCttaaNACG"
+
+def _reverse_complement(sequence):
+    return sequence[::-1].translate(str.maketrans("ACGTRYacgtry", "TGCAYRtgcayr"))
+
+def test_round_trip_string():
+    """Test that packing keeps N runs, IUPAC codes and soft-masking"""
+    packed = PackedSequence.from_string(SEQUENCE, name="chr1")
+    assert str(packed) == SEQUENCE
+    assert len(packed) == len(SEQUENCE)
+    assert PackedSequence.from_string("ACGT" * 1000).nbytes == 1000
+
+@pytest.mark.parametrize("start,stop", [(0, 28), (3, 17), (5, 6), (10, 10), (-6, None)])
+def test_slices_and_reverse_complement(start, stop):
+    """Test views against string slicing, on both strands"""
+    packed = PackedSequence.from_string(SEQUENCE)
+    assert str(packed[start:stop]) == SEQUENCE[start:stop]
+    reverse = packed.reverse_complement()
+    assert str(reverse[start:stop]) == _reverse_complement(SEQUENCE)[start:stop]
+    assert str(reverse[start:stop].reverse_complement()) == _reverse_complement(
+        _reverse_complement(SEQUENCE)[start:stop])
+    assert packed[start:stop]._store is packed._store
+
+def test_indexing_and_codes():
+    """Test single-base access and k-mer base codes"""
+    packed = PackedSequence.from_string("ACgtN")
+    assert packed[2] == "g" and packed[-1] == "N"
+    assert packed.base_codes().tolist() == [0, 1, 2, 3, 4]
+    assert packed.reverse_complement().base_codes().tolist() == [4, 0, 1, 2, 3]
+    with pytest.raises(IndexError):
+        packed[5]
+    with pytest.raises(ValueError):
+        packed[::2]
+
+def test_2bit_round_trip(tmp_path):
+    """Test writing and memory-mapping a .2bit file"""
+    path = tmp_path / "genome.2bit"
+    packed = PackedSequence.from_string(SEQUENCE, name="chr1 primary")
+    write_2bit(str(path), [packed, PackedSequence.from_string("GATTACA" * 3, name="chrM")])
+
+    chr1, chr_m = read_2bit(str(path))
+    assert (chr1.name, chr_m.name) == ("chr1", "chrM")
+    # .2bit stores ambiguity codes other than N as N
+    assert str(chr1) == SEQUENCE.replace("RY", "NN")
+    assert str(chr_m) == "GATTACA" * 3
+    assert not chr1._store.packed.flags.owndata  # view into the mapping
+    assert str(read_2bit(str(path), soft_mask=False)[0]) == SEQUENCE.replace("RY", "NN").upper()
+
+def test_parsers_produce_packed(tmp_path):
+    """Test FASTA and 2bit parsers yielding packed sequences"""
+    fasta = tmp_path / "genome.fa"
+    fasta.write_text(f">chr1\n{SEQUENCE}\n")
+    records = list(FASTAParser(packed=True).parse(str(fasta)))
+    assert isinstance(records[0], PackedSequence) and str(records[0]) == SEQUENCE
+
+    path = tmp_path / "genome.2bit"
+    write_2bit(str(path), records)
+    parser = TwoBitParser()
+    assert parser.validate(str(path)) and not parser.validate(str(fasta))
+    assert [s.name for s in parser.parse(str(path))] == ["chr1"]
+
+def test_consumers_accept_packed():
+    """Test that k-mer counting and GC windows give the same result on packed input"""
+    packed = PackedSequence.from_string(SEQUENCE, name="chr1")
+    counter = KmerCounter(k=3, workers=1)
+    assert counter.count([packed]).most_common(50) == counter.count([SEQUENCE]).most_common(50)
+    np.testing.assert_allclose(gc_windows(packed, 5, 3), gc_windows(SEQUENCE, 5, 3), equal_nan=True)
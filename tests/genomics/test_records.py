@@ -0,0 +1,13 @@
+import numpy as np
+from src.genomics.records import sequence_fields
+
+def test_dict_fields_use_the_first_present_key():
+    """Test that array qualities work and empty values do not fall through to other keys"""
+    qualities = np.array([30, 31, 32, 33], dtype=np.uint8)
+    name, sequence, scores = sequence_fields({'id': 'r1', 'sequence': 'ACGT', 'quality_scores': qualities,
+                                              'qualities': [1, 2, 3, 4]})
+    assert (name, sequence) == ('r1', 'ACGT') and scores is qualities
+
+    assert sequence_fields({'name': '', 'id': 'other', 'sequence': '', 'bases': 'TT',
+                            'quality_scores': [], 'qualities': [5]}) == ('', '', [])
+    assert sequence_fields({'seq': 'GG'}) == ('', 'GG', None)
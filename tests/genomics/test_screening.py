@@ -0,0 +1,55 @@
+import pickle
+import numpy as np
+import pytest
+from src.genomics.kmer import kmer_codes
+from src.genomics.screening import BlockedBloomFilter, ReadScreener, open_or_build
+from src.genomics.writers import export_records
+
+def _genomes(seed=0, length=50000):
+    rng = np.random.default_rng(seed)
+    return [''.join(rng.choice(list("ACGT"), length)) for _ in range(2)]
+
+def test_filter_has_no_false_negatives_and_bounded_fpr():
+    """Test every inserted k-mer is found and foreign k-mers rarely are"""
+    host, other = _genomes()
+    bloom = BlockedBloomFilter.build([("chr1", host[:30000]), ("chr2", host[30000:])], k=21, fpr=0.01)
+
+    assert bloom.contains(kmer_codes(host, 21)[:29980]).all()
+    assert bloom.contains(kmer_codes(host[30000:], 21)).all()
+    assert bloom.contains(kmer_codes(other, 21)).mean() < 0.02
+    with pytest.raises(ValueError):
+        BlockedBloomFilter(k=40, blocks=1)
+
+def test_saved_filter_is_mapped_and_rebuilt_when_stale(tmp_path):
+    """Test persistence by memory map, pickling by path and invalidation"""
+    host, _ = _genomes(1)
+    reference = tmp_path / "host.fa"
+    export_records([("chr1", host)], str(reference))
+    path = str(tmp_path / "host.fa.bloom")
+
+    bloom = open_or_build([("chr1", host)], path, str(reference), k=25, workers=1)
+    assert isinstance(bloom.bits, np.memmap)
+    assert open_or_build(None, path, str(reference), k=25) is bloom
+    assert pickle.loads(pickle.dumps(bloom)) is bloom
+
+    rebuilt = open_or_build([("chr1", host[:1000])], path, str(reference), k=21, workers=1)
+    assert rebuilt.k == 21 and rebuilt is not bloom
+
+def test_reads_classified_by_hit_fraction(tmp_path):
+    """Test host, foreign, chimeric and short reads, exported as TSV"""
+    host, other = _genomes(2)
+    bloom = BlockedBloomFilter.build([("chr1", host)], k=21, fpr=0.001)
+    reads = [("host", host[100:250]), ("foreign", other[100:250]),
+             ("chimera", host[500:560] + other[500:590]), ("short", "ACGT"), ("ns", "N" * 50)]
+
+    hits = ReadScreener(bloom, threshold=0.5, batch_size=2).screen(reads)
+
+    assert hits.kmers.tolist() == [130, 130, 130, 0, 0]
+    assert hits.hits[0] == 130 and hits.hits[1] < 3 and 40 <= hits.hits[2] <= 45
+    assert hits.matched.tolist() == [True, False, False, False, False]
+    assert hits.summary()['matched'] == 1
+    output = tmp_path / "screen.tsv"
+    export_records(hits, str(output))
+    lines = output.read_text().splitlines()
+    assert lines[0] == "read\tkmers\thits\tfraction\tclass"
+    assert lines[1] == "host\t130\t130\t1.0000\tmatch"
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from src.genomics.compressed_io import BGZFWriter, read_bgzf_blocks_at
+from src.genomics.records import FileRecords
+from src.genomics.sketches import (ApproxProfiler, CountMinSketch, DDSketch, HyperLogLog,
+                                   ReservoirSample, mix64)
+
+def _write_fastq(path, count, rng, length=60):
+    bases = np.array(list("ACGT"))
+    with BGZFWriter(str(path)) as handle:
+        for i in range(count):
+            sequence = ''.join(bases[rng.integers(0, 4, length)])
+            handle.write(f"@read{i}\n{sequence}\n+\n{'I' * length}\n".encode())
+
+def test_hyperloglog_accuracy_and_merge():
+    """Test distinct counts within the error bound and exact merging"""
+    keys = mix64(np.arange(200000, dtype=np.uint64))
+    left, right, whole = HyperLogLog(0.01), HyperLogLog(0.01), HyperLogLog(0.01)
+    left.add(keys[:120000])
+    right.add(keys[80000:])
+    whole.add(keys)
+
+    assert abs(whole.estimate() - 200000) / 200000 < 0.03
+    assert left.merge(right).estimate() == whole.estimate()
+
+def test_ddsketch_quantiles():
+    """Test quantiles within the relative accuracy after a merge"""
+    values = np.random.default_rng(0).lognormal(3, 1, 100000)
+    left, right = DDSketch(0.01), DDSketch(0.01)
+    left.add(values[:50000])
+    right.add(values[50000:])
+    merged = left.merge(right)
+
+    for q in (0.05, 0.5, 0.95):
+        exact = np.quantile(values, q)
+        assert abs(merged.quantile(q) - exact) / exact < 0.02
+
+def test_count_min_heavy_hitters():
+    """Test that frequent keys are found and never underestimated"""
+    rng = np.random.default_rng(1)
+    keys = np.concatenate((rng.integers(0, 10**9, 50000), np.repeat([7, 11, 13], [3000, 2000, 1000])))
+    sketch, other = CountMinSketch(0.001, capacity=10), CountMinSketch(0.001, capacity=10)
+    sketch.add(keys[::2].astype(np.uint64))
+    other.add(keys[1::2].astype(np.uint64))
+    sketch.merge(other)
+
+    top = sketch.heavy_hitters(3)
+    assert [key for key, _ in top] == [7, 11, 13]
+    assert top[0][1] >= 3000
+
+def test_reservoir_merge_keeps_size():
+    """Test that merged reservoirs stay a fixed-size sample of both inputs"""
+    left, right = ReservoirSample(10, seed=0), ReservoirSample(10, seed=1)
+    left.add(list(range(100)))
+    right.add(list(range(100, 200)))
+    items = left.merge(right).items
+
+    assert len(items) == 10
+    assert set(items) <= set(range(200))
+
+def test_bgzf_resync_at_arbitrary_offsets(tmp_path):
+    """Test reading whole BGZF blocks from offsets inside a block"""
+    path = tmp_path / "reads.fq.gz"
+    _write_fastq(path, 3000, np.random.default_rng(2))
+    size = path.stat().st_size
+
+    first_offset, first_size, payloads = read_bgzf_blocks_at(str(path), 0, 1)
+    assert first_offset == 0 and len(payloads) == 1
+    offset, block_size, payloads = read_bgzf_blocks_at(str(path), first_size // 2, 2)
+    assert offset == first_size and block_size > 0 and len(payloads) == 2
+    assert read_bgzf_blocks_at(str(path), size - 10, 1)[0] < 0  # only the EOF marker is left
+
+def test_sampled_profile_of_bgzf_fastq(tmp_path):
+    """Test block sampling against a full pass over the same file"""
+    path = tmp_path / "reads.fq.gz"
+    _write_fastq(path, 20000, np.random.default_rng(3))
+    records = FileRecords(str(path))
+
+    full = ApproxProfiler(error=0.02, k=15, workers=1, seed=0).profile(records)
+    sampled = ApproxProfiler(error=0.02, k=15, sample=0.2, workers=1, seed=0).profile(records)
+
+    assert full.reads == 20000 and full.fraction == 1.0
+    assert abs(full.summary()['distinct_reads'] - 20000) / 20000 < 0.05
+    assert 0 < sampled.reads < full.reads
+    assert 0.1 < sampled.fraction < 0.4
+    assert sampled.summary()['quality_quantiles'][0.5] == pytest.approx(40, rel=0.03)
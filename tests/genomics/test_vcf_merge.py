@@ -0,0 +1,67 @@
+import pysam
+import pytest
+from src.genomics.vcf_merge import VCFMerger, genotype_codes
+from src.genomics.writers import export_records
+
+HEADER = ("##fileformat=VCFv4.2\n##contig=<ID=chr1,length=1000>\n##contig=<ID=chr2,length=1000>\n"
+          "##FORMAT=<ID=GT,Number=1,Type=String,Description=\"Genotype\">\n"
+          "##FORMAT=<ID=DP,Number=1,Type=Integer,Description=\"Depth\">\n"
+          "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{}\n")
+
+def _write(path, samples, records):
+    lines = [f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t50\tPASS\t.\tGT:DP\t" + '\t'.join(f"{gt}:7" for gt in gts)
+             for chrom, pos, ref, alt, gts in records]
+    export_records(lines, str(path), header=HEADER.format('\t'.join(samples)))
+    return str(path)
+
+def _cohort(tmp_path):
+    return [
+        _write(tmp_path / "a.vcf.gz", ["A"], [("chr1", 10, "A", "G", ["0/1"]), ("chr2", 5, "C", "T", ["1/1"])]),
+        _write(tmp_path / "b.vcf.gz", ["B1", "B2"], [("chr1", 10, "A", "G", ["1|1", "0/0"]),
+                                                      ("chr1", 10, "A", "C", ["0/1", "./."])]),
+        _write(tmp_path / "c.vcf.gz", ["C"], [("chr1", 3, "T", "A", ["0/1"]), ("chr2", 5, "C", "T", ["0/1"])]),
+    ]
+
+def test_merge_aligns_sites_and_samples(tmp_path):
+    """Test sites keyed by (chrom, pos, ref, alt) with missing calls for absent inputs"""
+    merged = VCFMerger().merge(_cohort(tmp_path))
+
+    assert merged.samples == ["A", "B1", "B2", "C"]
+    rows = [line.split('\t') for line in merged]
+    assert [(r[0], r[1], r[4]) for r in rows] == [("chr1", "3", "A"), ("chr1", "10", "C"),
+                                                  ("chr1", "10", "G"), ("chr2", "5", "T")]
+    assert rows[2][8:] == ["GT", "0/1", "1|1", "0/0", "./."]
+    assert rows[3][9:] == ["1/1", "./.", "./.", "0/1"]
+
+    output = tmp_path / "cohort.vcf.gz"
+    export_records(merged, str(output))
+    with pysam.VariantFile(str(output)) as cohort:
+        assert list(cohort.header.samples) == merged.samples
+        assert [r.pos for r in cohort.fetch("chr1")] == [3, 10, 10]
+
+def test_multi_pass_merge_matches_direct(tmp_path):
+    """Test that bounding open files to two merges in passes with the same result"""
+    paths = _cohort(tmp_path)
+
+    direct = VCFMerger().merge(paths)
+    passes = VCFMerger(max_open=2, workers=1).merge(paths)
+
+    assert len(passes.paths) == 2
+    assert list(passes) == list(direct) and passes.samples == direct.samples
+
+def test_genotype_blocks(tmp_path):
+    """Test columnar genotype blocks and GT decoding"""
+    blocks = list(VCFMerger().merge(_cohort(tmp_path)).blocks(3))
+
+    assert [len(block) for block in blocks] == [3, 1]
+    assert blocks[0].genotypes.shape == (3, 4, 2)
+    assert blocks[0].genotypes[2].tolist() == [[0, 1], [1, 1], [0, 0], [-1, -1]]
+    assert blocks[1].chrom == ["chr2"] and blocks[1].pos.tolist() == [5]
+    assert genotype_codes(["1", "0/12", "./1"]).tolist() == [[1, -1], [0, 12], [-1, 1]]
+
+def test_unsorted_input_rejected(tmp_path):
+    """Test that out-of-order records are reported"""
+    path = _write(tmp_path / "bad.vcf", ["X"], [("chr1", 50, "A", "G", ["0/1"]), ("chr1", 5, "A", "G", ["0/1"])])
+
+    with pytest.raises(ValueError, match="not position-sorted"):
+        list(VCFMerger().merge([path]))
@@ -0,0 +1,146 @@
+import pysam
+import pytest
+from src.genomics.writers import (
+    BAMWriter, BEDWriter, FASTAWriter, TabixWriter, VCFWriter,
+    detect_output_format, export_records
+)
+from src.genomics.packed_sequence import read_2bit
+
+BAM_HEADER = {'HD': {'VN': '1.0', 'SO': 'coordinate'},
+              'SQ': [{'LN': 100000, 'SN': 'chr1'}, {'LN': 50000, 'SN': 'chr2'}]}
+
+VCF_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##contig=<ID=chr1,length=100000>\n"
+    "##INFO=<ID=DP,Number=1,Type=Integer,Description=\"Depth\">\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+)
+
+def _segments(header, positions):
+    segments = []
+    for ref_id, pos in positions:
+        a = pysam.AlignedSegment(header)
+        a.query_name = f"read_{ref_id}_{pos}"
+        a.query_sequence = "ACGTACGTAC"
+        a.reference_id = ref_id
+        a.reference_start = pos
+        a.mapping_quality = 30
+        a.cigartuples = [(0, 5), (2, 3), (0, 5)]
+        a.query_qualities = pysam.qualitystring_to_array("IIIIIIIIII")
+        a.set_tag("NM", 3)
+        a.set_tag("RG", "grp1")
+        segments.append(a)
+    return segments
+
+def test_detect_output_format():
+    """Test format inference from extensions"""
+    assert detect_output_format("calls.vcf.gz") == "VCF"
+    assert detect_output_format("reads.fq") == "FASTQ"
+    assert detect_output_format("gc.bedgraph") == "BED"
+    with pytest.raises(ValueError):
+        detect_output_format("results.xyz")
+
+def test_bam_writer_builds_index(tmp_path):
+    """Test BAM output and on-the-fly .bai against pysam region queries"""
+    header = pysam.AlignmentHeader.from_dict(BAM_HEADER)
+    positions = [(0, p) for p in range(0, 90000, 150)] + [(1, p) for p in range(0, 40000, 300)]
+    path = str(tmp_path / "out.bam")
+
+    with BAMWriter(path, header=header, threads=4) as writer:
+        assert writer.write_all(_segments(header, positions)) == len(positions)
+
+    with pysam.AlignmentFile(path) as bam:
+        assert bam.check_index()
+        assert bam.mapped == len(positions)
+        hits = list(bam.fetch("chr1", 45000, 45200))
+        assert [a.reference_start for a in hits] == [45000, 45150]
+        assert hits[0].cigarstring == "5M3D5M"
+        assert hits[0].get_tag("RG") == "grp1"
+        assert len(list(bam.fetch("chr2", 39000, 40000))) == 4
+
+def test_bam_writer_rejects_unsorted(tmp_path):
+    """Test that the index requires coordinate-sorted input"""
+    header = pysam.AlignmentHeader.from_dict(BAM_HEADER)
+    with pytest.raises(ValueError, match="not coordinate-sorted"):
+        with BAMWriter(str(tmp_path / "bad.bam"), header=header) as writer:
+            writer.write_all(_segments(header, [(0, 500), (0, 100)]))
+
+def test_vcf_writer_builds_tabix_index(tmp_path):
+    """Test bgzipped VCF output with a .tbi built while writing"""
+    path = str(tmp_path / "out.vcf.gz")
+    with VCFWriter(path, header=VCF_HEADER) as writer:
+        for pos in range(1, 90000, 37):
+            writer.write({'CHROM': 'chr1', 'POS': pos, 'ID': '.', 'REF': 'A', 'ALT': 'T',
+                          'QUAL': 30, 'FILTER': 'PASS', 'INFO': 'DP=10'})
+
+    with pysam.VariantFile(path) as vcf:
+        assert [r.pos for r in vcf.fetch("chr1", 50000, 50100)] == [50025, 50062, 50099]
+
+def test_bed_writer_builds_tabix_index(tmp_path):
+    """Test bgzipped BED output from tuples"""
+    path = str(tmp_path / "windows.bed.gz")
+    with BEDWriter(path) as writer:
+        writer.write_all(("chr1", start, start + 100, 0.5) for start in range(0, 100000, 100))
+
+    with pysam.TabixFile(path) as tbx:
+        assert list(tbx.fetch("chr1", 250, 350)) == [
+            "chr1\t200\t300\t0.5", "chr1\t300\t400\t0.5"
+        ]
+
+def test_incomplete_writer_is_rejected(tmp_path):
+    """Test that a writer missing its serialization hooks cannot be created"""
+    class LineWriter(TabixWriter):
+        def _format(self, record):
+            return str(record)
+
+    with pytest.raises(TypeError, match="_interval"):
+        LineWriter(str(tmp_path / "lines.txt"))
+    assert not (tmp_path / "lines.txt").exists()
+
+def test_fasta_writer_builds_fai(tmp_path):
+    """Test FASTA output with .fai and .gzi for random access"""
+    path = str(tmp_path / "contigs.fa.gz")
+    with FASTAWriter(path, line_width=50) as writer:
+        writer.write(("contig1", "ACGT" * 30000))
+        writer.write({'header': 'contig2 description', 'sequence': "GATTACA" * 100})
+
+    with pysam.FastaFile(path) as fasta:
+        assert list(fasta.references) == ["contig1", "contig2"]
+        assert fasta.fetch("contig1", 100001, 100009) == "CGTACGTA"
+        assert fasta.fetch("contig2", 7, 14) == "GATTACA"
+
+def test_fastq_writer_from_sff_records(tmp_path):
+    """Test FASTQ output from SFF parser dictionaries"""
+    path = str(tmp_path / "reads.fq")
+    records = [{'name': 'read1', 'bases': 'ACGT', 'quality_scores': [30, 31, 32, 33]}]
+    assert export_records(records, path) == 1
+
+    assert open(path).read() == "@read1\nACGT\n+\n?@AB\n"
+    assert open(path + ".fai").read() == "read1\t4\t7\t4\t5\t14\n"
+
+def test_export_2bit(tmp_path):
+    """Test exporting plain sequences to .2bit and reading them back"""
+    path = tmp_path / "contigs.2bit"
+    assert export_records([("chr1", "ACGTnnACGT"), ("chr2", "GGCC")], str(path)) == 2
+    assert [str(s) for s in read_2bit(str(path))] == ["ACGTnnACGT", "GGCC"]
+
+def test_export_unnamed_sequences(tmp_path):
+    """Test that unnamed records get `seq<n>` names in the header and .fai"""
+    path = str(tmp_path / "x.fa")
+    assert export_records(["ACGT", ("", "GGCC")], path, "FASTA") == 2
+
+    with pysam.FastaFile(path) as fasta:
+        assert list(fasta.references) == ["seq1", "seq2"]
+        assert fasta.fetch("seq2") == "GGCC"
+
+def test_export_bam_header_from_segments(tmp_path):
+    """Test BAM export from a plain list of reads and the error without any header"""
+    header = pysam.AlignmentHeader.from_dict(BAM_HEADER)
+    path = str(tmp_path / "reads.bam")
+    assert export_records(_segments(header, [(0, 100), (1, 200)]), path) == 2
+    with pysam.AlignmentFile(path) as bam:
+        assert bam.references == ("chr1", "chr2") and bam.mapped == 2
+
+    with pytest.raises(ValueError, match="needs a header"):
+        BAMWriter(str(tmp_path / "empty.bam"))
+    assert not (tmp_path / "empty.bam").exists()
@@ -0,0 +1,352 @@
+import pytest
+import numpy as np
+import pysam
+from src.compiler.lexer import Lexer
+from src.compiler.parser import Parser
+from src.genomics.packed_sequence import PackedSequence
+from src.compiler.bytecode import BytecodeGenerator, Instruction, OpCode
+from src.vm import optimized_vm
+from src.vm.genome_vm import GenomeVM
+from src.config import settings
+
+def _run(vm, script):
+    vm.execute(Parser(Lexer(script).tokenize()).parse())
+
+def _run_compiled(vm, script):
+    vm.execute_bytecode(BytecodeGenerator().generate(Parser(Lexer(script).tokenize()).parse()))
+
+@pytest.fixture
+def compiled_vm(monkeypatch, stub_predictor):
+    """An OptimizedGenomeVM predicting with the stub model"""
+    monkeypatch.setattr(optimized_vm, "shared_predictor", lambda: stub_predictor)
+    vm = optimized_vm.OptimizedGenomeVM(num_workers=1)
+    yield vm
+    vm.pool.terminate()
+
+def test_export_streams_variable(tmp_path):
+    """Test EXPORT writes a variable's records with an index"""
+    vm = GenomeVM()
+    vm.variables['contigs'] = [("chr1", "ACGT" * 50), ("chr2", "GGCC" * 10)]
+    output = tmp_path / "contigs.fa"
+
+    _run(vm, f'EXPORT contigs TO "{output}"')
+
+    assert output.read_text().startswith(">chr1\n")
+    assert (tmp_path / "contigs.fa.fai").read_text().splitlines()[1].startswith("chr2\t40\t")
+
+def test_export_explicit_format(tmp_path):
+    """Test EXPORT with an explicit format overriding the extension"""
+    vm = GenomeVM()
+    vm.variables['windows'] = [("chr1", 0, 100, 0.4)]
+    output = tmp_path / "windows.txt"
+
+    _run(vm, f'EXPORT windows TO "{output}" BED')
+
+    assert output.read_text() == "chr1\t0\t100\t0.4\n"
+
+def test_export_undefined_variable(tmp_path):
+    """Test EXPORT of an unknown variable"""
+    with pytest.raises(RuntimeError):
+        _run(GenomeVM(), f'EXPORT missing TO "{tmp_path / "out.fa"}"')
+
+def test_load_and_count_kmers(tmp_path):
+    """Test LOAD FASTA followed by ANALYZE ... KMER k=N"""
+    fasta = tmp_path / "genome.fa"
+    fasta.write_text(">chr1\nACGTACGTAC\n>chr2\nAAAANAAAA\n")
+    vm = GenomeVM()
+
+    _run(vm, f'''
+    LOAD FASTA "{fasta}" -> genome
+    ANALYZE genome KMER k=4 workers=1 -> spectrum
+    ''')
+
+    spectrum = vm.variables['spectrum']
+    assert spectrum.k == 4
+    assert spectrum.get("ACGT") == 2
+    assert spectrum.get("TACG") == 3  # CGTA and its reverse complement
+    assert spectrum.get("TTTT") == 2  # canonical form of AAAA
+
+def test_load_fasta_is_packed(tmp_path):
+    """Test that LOAD FASTA keeps sequences 2-bit packed, with names, N runs and soft-masking"""
+    fasta = tmp_path / "genome.fa"
+    fasta.write_text(">chr1 assembled\nACGTNNacgt\n")
+    vm = GenomeVM()
+
+    _run(vm, f'LOAD FASTA "{fasta}" -> genome')
+
+    [sequence] = vm.variables['genome']
+    assert isinstance(sequence, PackedSequence)
+    assert sequence.name == "chr1 assembled" and str(sequence) == "ACGTNNacgt"
+
+def test_unknown_analysis(tmp_path):
+    """Test that unknown ANALYZE operations are rejected"""
+    vm = GenomeVM()
+    vm.variables['genome'] = ["ACGT"]
+    with pytest.raises(ValueError, match="Unsupported analysis operation"):
+        _run(vm, 'ANALYZE genome INVALID_OPERATION -> result')
+
+def test_count_gc_windows(tmp_path):
+    """Test ANALYZE ... COUNT_GC with windows exported as bedGraph"""
+    vm = GenomeVM()
+    vm.variables['genome'] = [("chr1", "GGGGAAAATTCC")]
+    output = tmp_path / "gc.bedgraph"
+
+    _run(vm, f'''
+    ANALYZE genome COUNT_GC -> gc_content
+    ANALYZE genome COUNT_GC window=4 -> gc_track
+    ANALYZE genome COUNT_GC window=8 step=4 format=array -> gc_values
+    EXPORT gc_track TO "{output}"
+    ''')
+
+    assert vm.variables['gc_content'] == pytest.approx(0.5)
+    assert vm.variables['gc_values'].tolist() == [0.5, 0.25]
+    assert output.read_text() == "chr1\t0\t4\t1.0\nchr1\t4\t8\t0.0\nchr1\t8\t12\t0.5\n"
+
+def test_load_2bit(tmp_path):
+    """Test LOAD TWOBIT producing packed sequences that ANALYZE consumes"""
+    fasta = tmp_path / "genome.fa"
+    fasta.write_text(">chr1\nGGGGAAAA\n")
+    twobit = tmp_path / "genome.2bit"
+    vm = GenomeVM()
+
+    _run(vm, f'''
+    LOAD FASTA "{fasta}" -> genome
+    EXPORT genome TO "{twobit}"
+    LOAD TWOBIT "{twobit}" -> packed
+    ANALYZE packed COUNT_GC window=4 -> gc_track
+    ''')
+
+    assert str(vm.variables['packed'][0]) == "GGGGAAAA"
+    assert list(vm.variables['gc_track']) == [("chr1", 0, 4, 1.0), ("chr1", 4, 8, 0.0)]
+
+def test_coverage_from_loaded_bam(tmp_path):
+    """Test LOAD BAM followed by windowed and per-base COVERAGE"""
+    import pysam
+    path = str(tmp_path / "reads.bam")
+    header = {'HD': {'VN': '1.0', 'SO': 'coordinate'}, 'SQ': [{'LN': 200, 'SN': 'chr1'}]}
+    with pysam.AlignmentFile(path, "wb", header=header) as out:
+        for start in (10, 50):
+            read = pysam.AlignedSegment(out.header)
+            read.query_name = f"read_{start}"
+            read.reference_id = 0
+            read.reference_start = start
+            read.mapping_quality = 60
+            read.cigartuples = [(0, 60)]
+            read.query_sequence = "A" * 60
+            out.write(read)
+    pysam.index(path)
+    vm = GenomeVM()
+
+    _run(vm, f'''
+    LOAD BAM "{path}" -> reads
+    ANALYZE reads COVERAGE window=100 workers=1 -> coverage
+    ANALYZE reads COVERAGE mode=per_base -> depth
+    ''')
+
+    assert vm.variables['coverage'].to_array().tolist() == pytest.approx([1.1, 0.1])
+    assert list(vm.variables['depth']) == [("chr1", 10, 50, 1), ("chr1", 50, 70, 2),
+                                           ("chr1", 70, 110, 1)]
+
+def test_find_motif(tmp_path, monkeypatch):
+    """Test ANALYZE ... FIND_MOTIF with inline and file motifs"""
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path / "cache"))
+    motifs = tmp_path / "motifs.txt"
+    motifs.write_text("BamHI\tGGATCC\n")
+    vm = GenomeVM()
+    vm.variables['genome'] = [("chr1", "GAATTCAAGGATCC")]
+
+    _run(vm, f'ANALYZE genome FIND_MOTIF GAATTC motifs="{motifs}" workers=1 -> hits')
+
+    hits = vm.variables['hits']
+    assert hits.counts() == {"GAATTC": 1, "BamHI": 1}
+    assert hits.start.tolist() == [0, 8]
+    assert len(list((tmp_path / "cache" / "motifs").glob("motifs-*"))) == 1
+
+def test_align_builds_and_reuses_index(tmp_path):
+    """Test ALIGN persists the minimizer index and exports BAM"""
+    rng = np.random.default_rng(4)
+    reference = ''.join(rng.choice(list("ACGT"), 5000))
+    vm = GenomeVM()
+    vm.variables['genome'] = [("chr1", reference)]
+    vm.variables['reads'] = [("r1", reference[1000:1150]), ("r2", reference[3000:3120])]
+    index = tmp_path / "genome.gsi"
+    output = tmp_path / "aligned.bam"
+
+    _run(vm, f'ALIGN reads TO genome k=13 index="{index}" workers=1 -> alignments\n'
+             f'EXPORT alignments TO "{output}"')
+
+    assert index.exists()
+    assert [(r.reference_start, r.cigarstring) for r in vm.variables['alignments']] == [
+        (1000, "150M"), (3000, "120M")]
+    assert [r.reference_start for r in pysam.AlignmentFile(str(output))] == [1000, 3000]
+
+    del vm.variables['genome']  # the saved index alone is enough
+    _run(vm, f'ALIGN reads TO genome index="{index}" workers=1 -> again')
+    assert vm.variables['again'].mapped == 2
+
+def test_overlap_bed_annotations(tmp_path):
+    """Test LOAD BED and ANALYZE ... OVERLAP in pair and count modes"""
+    bed = tmp_path / "exons.bed"
+    bed.write_text("chr1\t10\t20\texon1\nchr1\t15\t50\texon2\n")
+    vm = GenomeVM()
+    vm.variables['variants'] = [("chr1", 16, 17), ("chr1", 60, 61)]
+    output = tmp_path / "hits.bed"
+
+    _run(vm, f'LOAD BED "{bed}" -> exons\n'
+             'ANALYZE variants OVERLAP exons -> hits\n'
+             'ANALYZE variants OVERLAP exons mode=count -> counts\n'
+             f'EXPORT hits TO "{output}"')
+
+    assert vm.variables['counts'].tolist() == [2, 0]
+    assert output.read_text().splitlines() == ["chr1\t16\t17\tchr1\t10\t20\texon1",
+                                               "chr1\t16\t17\tchr1\t15\t50\texon2"]
+
+def test_approx_profile_of_file_path(tmp_path):
+    """Test ANALYZE on a file path streams it into approximate sketches"""
+    fastq = tmp_path / "reads.fq"
+    fastq.write_text("".join(f"@r{i}\n{'ACGT' * 10 if i % 2 else 'GGCCA' * 8}\n+\n{'5' * 40}\n"
+                             for i in range(100)))
+    vm = GenomeVM()
+
+    _run(vm, f'ANALYZE "{fastq}" APPROX distinct_reads quality error=0.01 k=11 -> profile')
+
+    summary = vm.variables['profile'].summary()
+    assert summary['reads'] == 100
+    assert round(summary['distinct_reads']) == 2
+    assert summary['quality_quantiles'][0.5] == pytest.approx(20, rel=0.02)
+    assert 'distinct_kmers' not in summary
+
+def test_similarity_of_loaded_and_path_samples(tmp_path):
+    """Test ANALYZE ... SIMILARITY over a LOADed variable and a file path, exported as TSV"""
+    first, second = tmp_path / "a.fa", tmp_path / "b.fa"
+    first.write_text(">chr1\n" + "ACGTTGCATGCCATGA" * 20 + "\n")
+    second.write_text(">chr1\n" + "ACGTTGCATGCCATGA" * 20 + "TTTTGGGGCCCCAAAT\n")
+    output = tmp_path / "similarity.tsv"
+    vm = GenomeVM()
+
+    _run(vm, f'LOAD FASTA "{first}" -> a\n'
+             f'ANALYZE a SIMILARITY "{second}" k=5 size=100 workers=1 -> matrix\n'
+             f'EXPORT matrix TO "{output}"')
+
+    matrix = np.asarray(vm.variables['matrix'])
+    assert matrix[0, 0] == 1 and 0 < matrix[0, 1] < 1
+    assert (tmp_path / "a.fa.minhash").exists() and (tmp_path / "b.fa.minhash").exists()
+    assert output.read_text().splitlines()[0] == f"sample\ta\t{second}"
+
+def test_filter_dedup_streams_to_bam(tmp_path):
+    """Test FILTER ... DEDUP on a loaded BAM, exported without materializing the reads"""
+    header = {'HD': {'VN': '1.6', 'SO': 'coordinate'}, 'SQ': [{'LN': 1000, 'SN': 'chr1'}]}
+    bam, output = tmp_path / "reads.bam", tmp_path / "dedup.bam"
+    with pysam.AlignmentFile(str(bam), 'wb', header=header) as handle:
+        for i, start in enumerate([100, 100, 100, 400]):
+            read = pysam.AlignedSegment(handle.header)
+            read.query_name, read.reference_id, read.reference_start = f"r{i}", 0, start
+            read.cigarstring, read.query_sequence = "50M", "A" * 50
+            read.query_qualities = pysam.qualitystring_to_array(chr(33 + 20 + i) * 50)
+            handle.write(read)
+    vm = GenomeVM()
+
+    _run(vm, f'LOAD BAM "{bam}" -> reads\n'
+             'FILTER reads DEDUP -> unique\n'
+             'FILTER reads DEDUP mode=mark -> marked\n'
+             f'EXPORT unique TO "{output}"')
+
+    assert [r.query_name for r in pysam.AlignmentFile(str(output))] == ["r2", "r3"]
+    assert [r.is_duplicate for r in vm.variables['marked']] == [True, True, False, False]
+
+def test_sort_by_coordinate_then_export(tmp_path):
+    """Test SORT ... BY coordinate on tuples exported as BED"""
+    vm = GenomeVM()
+    vm.variables['peaks'] = [("chr2", 5, 9), ("chr1", 30, 40), ("chr1", 2, 8)]
+    output = tmp_path / "peaks.bed"
+
+    _run(vm, f'SORT peaks BY coordinate memory_mb=1 workers=1 -> ordered\n'
+             f'EXPORT ordered TO "{output}"')
+
+    assert output.read_text() == "chr1\t2\t8\nchr1\t30\t40\nchr2\t5\t9\n"
+    with pytest.raises(ValueError, match="Unknown sort key"):
+        _run(vm, 'SORT peaks BY size -> ordered')
+
+def test_screen_against_reference_path(tmp_path):
+    """Test ANALYZE ... SCREEN AGAINST a FASTA path builds its filter once beside it"""
+    rng = np.random.default_rng(0)
+    host, other = (''.join(rng.choice(list("ACGT"), 5000)) for _ in range(2))
+    reference = tmp_path / "host.fa"
+    reference.write_text(f">chr1\n{host}\n")
+    vm = GenomeVM()
+    vm.variables['reads'] = [("r1", host[:100]), ("r2", other[:100])]
+
+    _run(vm, f'ANALYZE reads SCREEN AGAINST "{reference}" k=21 workers=1 -> hits')
+
+    assert vm.variables['hits'].matched.tolist() == [True, False]
+    assert (tmp_path / "host.fa.bloom").exists()
+
+def test_merge_vcf_glob_and_loaded_variable(tmp_path):
+    """Test MERGE over a glob and a LOADed VCF, streamed to a compressed VCF"""
+    header = ("##fileformat=VCFv4.2\n##contig=<ID=chr1,length=1000>\n"
+              "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{}\n")
+    (tmp_path / "cohort").mkdir()
+    for sample, pos in (("s1", 10), ("s2", 20), ("s3", 10)):
+        folder = tmp_path / ("cohort" if sample != "s3" else "")
+        (folder / f"{sample}.vcf").write_text(header.format(sample) + f"chr1\t{pos}\t.\tA\tG\t.\t.\t.\tGT\t0/1\n")
+    output = tmp_path / "merged.vcf.gz"
+    vm = GenomeVM()
+
+    _run(vm, f'LOAD VCF "{tmp_path / "s3.vcf"}" -> third\n'
+             f'MERGE "{tmp_path / "cohort" / "*.vcf"}" third max_open=2 workers=1 -> cohort\n'
+             f'EXPORT cohort TO "{output}"')
+
+    with pysam.VariantFile(str(output)) as merged:
+        assert list(merged.header.samples) == ["s1", "s2", "s3"]
+        assert [(r.pos, r.samples["s3"]["GT"]) for r in merged] == [(10, (0, 1)), (20, (None, None))]
+
+def test_compiled_load_align_filter_merge(tmp_path, compiled_vm):
+    """Test LOAD, ALIGN, FILTER, MERGE and ANALYZE compiled to bytecode, each kept by its STORE"""
+    rng = np.random.default_rng(4)
+    reference = ''.join(rng.choice(list("ACGT"), 5000))
+    (tmp_path / "genome.fa").write_text(f">chr1\n{reference}\n")
+    (tmp_path / "reads.fa").write_text(f">r1\n{reference[1000:1150]}\n>r2\n{reference[3000:3120]}\n")
+    header = {'HD': {'VN': '1.6', 'SO': 'coordinate'}, 'SQ': [{'LN': 1000, 'SN': 'chr1'}]}
+    with pysam.AlignmentFile(str(tmp_path / "dups.bam"), 'wb', header=header) as handle:
+        for i, start in enumerate([100, 100, 400]):
+            read = pysam.AlignedSegment(handle.header)
+            read.query_name, read.reference_id, read.reference_start = f"d{i}", 0, start
+            read.cigarstring, read.query_sequence = "50M", "A" * 50
+            read.query_qualities = pysam.qualitystring_to_array(chr(33 + 20 + i) * 50)
+            handle.write(read)
+    vcf = "##fileformat=VCFv4.2\n##contig=<ID=chr1,length=1000>\n" \
+          "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{}\nchr1\t{}\t.\tA\tG\t.\t.\t.\tGT\t0/1\n"
+    (tmp_path / "s1.vcf").write_text(vcf.format("s1", 10))
+    (tmp_path / "s2.vcf").write_text(vcf.format("s2", 20))
+    vm = compiled_vm
+
+    _run_compiled(vm, f'''
+    LOAD FASTA "{tmp_path / "genome.fa"}" -> genome
+    LOAD FASTA "{tmp_path / "reads.fa"}" -> reads
+    ALIGN reads TO genome k=13 workers=1 -> alignments
+    ANALYZE genome COUNT_GC -> gc
+    LOAD BAM "{tmp_path / "dups.bam"}" -> dups
+    FILTER dups DEDUP -> unique
+    LOAD VCF "{tmp_path / "s1.vcf"}" -> first
+    LOAD VCF "{tmp_path / "s2.vcf"}" -> second
+    MERGE first second workers=1 -> cohort
+    ''')
+
+    assert str(vm.variables['genome'][0]) == reference
+    assert vm.genome_vm.sources['genome'][0] == str(tmp_path / "genome.fa")
+    assert [(r.reference_start, r.cigarstring) for r in vm.variables['alignments']] == [
+        (1000, "150M"), (3000, "120M")]
+    assert vm.variables['gc'] == pytest.approx(sum(base in "GC" for base in reference) / 5000)
+    assert [r.query_name for r in vm.variables['unique']] == ["d1", "d2"]
+    assert [line.split("\t")[1] for line in vm.variables['cohort']] == ["10", "20"]
+    assert vm.result is None and vm.source is None
+
+def test_compiled_predict_and_unknown_opcode(compiled_vm):
+    """Test that PREDICT_IMPACT sets the result a STORE keeps, and unhandled opcodes raise"""
+    vm = compiled_vm
+    vm.execute_bytecode([Instruction(OpCode.PREDICT_IMPACT, [["ACGT" * 250, "GATTACA" * 100]]),
+                         Instruction(OpCode.STORE, ["impacts"])])
+
+    assert len(vm.variables['impacts']) == 2 and vm.variant_predictor.model.batches == [2]
+    with pytest.raises(ValueError, match="Unsupported opcode"):
+        vm.execute_bytecode([Instruction(OpCode.SUBMIT_PROOF, [])])
@@ -1,6 +1,6 @@
 import pytest
 from src.compiler.lexer import Lexer
-from src.compiler.parser import Parser, LoadNode, AnalyzeNode, FilterNode
+from src.compiler.parser import Parser, LoadNode, AnalyzeNode, FilterNode, ExportNode, AlignNode, SortNode, MergeNode
 
 def test_basic_parsing():
     """Test basic parsing of GenomeScript code"""
@@ -62,4 +62,61 @@ def test_error_recovery():
     parser = Parser(lexer.tokenize())
     
     with pytest.raises(SyntaxError):
-        parser.parse() 
\ No newline at end of file
+        parser.parse() 
+
+
+def test_export_parsing():
+    """Test parsing of EXPORT statements"""
+    source = """
+    EXPORT gc_content TO "results.bed.gz"
+    EXPORT reads TO "reads.out" FASTQ
+    """
+
+    lexer = Lexer(source)
+    parser = Parser(lexer.tokenize())
+    ast = parser.parse()
+
+    assert ast == [
+        ExportNode("gc_content", "results.bed.gz", None),
+        ExportNode("reads", "reads.out", "FASTQ"),
+    ]
+
+
+def test_align_parsing():
+    """Test parsing of ALIGN statements"""
+    source = 'ALIGN reads TO genome k=15 index="genome.gsi" -> alignments'
+
+    ast = Parser(Lexer(source).tokenize()).parse()
+
+    assert ast == [AlignNode("reads", "genome", ["k=15", "index=genome.gsi"], "alignments")]
+
+
+def test_filter_parsing():
+    """Test parsing of FILTER statements with options"""
+    source = 'FILTER reads DEDUP mode=mark window=500 -> marked'
+
+    ast = Parser(Lexer(source).tokenize()).parse()
+
+    assert ast == [FilterNode("reads", "DEDUP", "marked", ["mode=mark", "window=500"])]
+
+
+def test_sort_parsing():
+    """Test parsing of SORT ... BY statements"""
+    source = 'SORT reads BY name memory_mb=256 -> by_name'
+
+    ast = Parser(Lexer(source).tokenize()).parse()
+
+    assert ast == [SortNode("reads", "name", ["memory_mb=256"], "by_name")]
+
+
+def test_merge_parsing():
+    """Test parsing of MERGE over files and variables"""
+    source = 'MERGE "cohort/*.vcf.gz" extra max_open=64 -> cohort'
+
+    ast = Parser(Lexer(source).tokenize()).parse()
+
+    assert ast == [MergeNode(["cohort/*.vcf.gz", "extra"], {"max_open": "64"}, "cohort")]
+    ast = Parser(Lexer('MERGE "runs/batch=3/s.vcf.gz" -> cohort').tokenize()).parse()
+    assert ast == [MergeNode(["runs/batch=3/s.vcf.gz"], {}, "cohort")]
+    with pytest.raises(SyntaxError):
+        Parser(Lexer('MERGE max_open=64 -> cohort').tokenize()).parse()
@@ -0,0 +1,60 @@
+import hashlib
+from dataclasses import dataclass
+from src.ai.prediction_cache import PredictionCache
+from src.blockchain import pouw_consensus
+from src.blockchain.pouw_consensus import PoUWConsensus, WorkProof
+
+@dataclass
+class Impact:
+    severity_score: float
+
+class BatchSensitivePredictor:
+    """Scores that drift with the size of the batch a sequence is predicted in, like float noise"""
+    def __init__(self):
+        self.sequence_length = 1000
+        self.prediction_cache = object()
+        self.batches = []
+
+    def clone(self):
+        return BatchSensitivePredictor()
+
+    def predict_impact_batch(self, sequences, batch_size=256):
+        sequences = list(sequences)
+        impacts = []
+        for start in range(0, len(sequences), batch_size):
+            chunk = sequences[start:start + batch_size]
+            self.batches.append(len(chunk))
+            impacts.extend(Impact(len(sequence) + 1e-7 * len(chunk)) for sequence in chunk)
+        return impacts
+
+def _mine(work, result):
+    nonce = 0
+    while not hashlib.sha256(work.query_id.encode() + result + str(nonce).encode()).hexdigest().startswith('0'):
+        nonce += 1
+    return WorkProof(work.query_id, result, 0.0, nonce, "0x0")
+
+def test_batched_verification_matches_single_work_results(monkeypatch):
+    """Test that verifying many works yields the same result bytes a miner computes for one work"""
+    monkeypatch.setattr(pouw_consensus.ModelRegistry, "load",
+                        lambda self, version=None, warmup=True: BatchSensitivePredictor())
+    consensus = PoUWConsensus(model_version="v0001")
+    assert isinstance(consensus.variant_predictor.prediction_cache, PredictionCache)
+
+    works = [consensus.generate_work(("ACGT" * i).encode(), 1) for i in range(1, 6)]
+    proofs = [_mine(work, consensus._compute_result(work.sequence_data)) for work in works]
+
+    assert consensus.verify_works(works, proofs) == [True] * 5
+    assert set(consensus.variant_predictor.batches) == {1}
+
+def test_repeated_verification_skips_the_model(monkeypatch, stub_predictor):
+    """Test that consensus's own cache answers a second verify_work without running the model"""
+    monkeypatch.setattr(pouw_consensus.ModelRegistry, "load",
+                        lambda self, version=None, warmup=True: stub_predictor)
+    consensus = PoUWConsensus(model_version="v0001")
+    model = consensus.variant_predictor.model
+    work = consensus.generate_work(b"GATTACA" * 100, 1)
+    proof = _mine(work, consensus._compute_result(work.sequence_data))
+    assert model.calls == 1
+
+    assert consensus.verify_work(work, proof) and consensus.verify_work(work, proof)
+    assert model.calls == 1